@@ -0,0 +1,181 @@
+"""
+Contrôle d'admission et délestage pour les routes de l'API
+
+Chaque route appartient à une classe (lookup, listing, heavy) qui fixe :
+- sa priorité dans la file d'attente (les lectures unitaires passent d'abord)
+- son nombre maximal de requêtes simultanées
+- son budget d'attente : au-delà, réponse 503 immédiate avec Retry-After
+- le statement_timeout PostgreSQL appliqué à ses requêtes
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from math import ceil
+from typing import Dict, List
+
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+
+class RouteClass:
+    """Classe de service d'un groupe de routes"""
+
+    def __init__(
+        self,
+        name: str,
+        priority: int,
+        max_concurrency: int,
+        queue_timeout: float,
+        max_queue: int,
+        statement_timeout_ms: int
+    ):
+        self.name = name
+        self.priority = priority  # 0 = plus prioritaire
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.max_queue = max_queue
+        self.statement_timeout_ms = statement_timeout_ms
+
+
+class AdmissionController:
+    """
+    Sémaphore à priorités partagé par toutes les routes.
+
+    `total_slots` borne le nombre de connexions PostgreSQL simultanées ; chaque
+    classe est en plus plafonnée par son `max_concurrency`, ce qui garde des
+    créneaux libres pour les classes prioritaires.
+    """
+
+    def __init__(self, total_slots: int, route_classes: List[RouteClass], routes: Dict[str, str]):
+        self.total_slots = total_slots
+        self.classes = {rc.name: rc for rc in route_classes}
+        self.routes = routes
+
+        self.in_use = 0
+        self.active = {name: 0 for name in self.classes}
+        self.queued = {name: 0 for name in self.classes}
+        self._waiters = []  # heap (priorité, ordre d'arrivée, future, classe)
+        self._sequence = itertools.count()
+
+        self.stats = {
+            name: {"admitted": 0, "shed": 0, "max_queue_depth": 0, "wait_time_total_ms": 0.0}
+            for name in self.classes
+        }
+
+    def route_class(self, route: str) -> RouteClass:
+        """Classe de service d'une route (par nom de route)"""
+        return self.classes[self.routes[route]]
+
+    def _has_capacity(self, rc: RouteClass) -> bool:
+        return self.in_use < self.total_slots and self.active[rc.name] < rc.max_concurrency
+
+    def _grant(self, rc: RouteClass):
+        self.in_use += 1
+        self.active[rc.name] += 1
+        self.stats[rc.name]["admitted"] += 1
+
+    def _dispatch(self):
+        """Attribue les créneaux libres aux attentes, par ordre de priorité"""
+        skipped = []
+        while self._waiters and self.in_use < self.total_slots:
+            entry = heapq.heappop(self._waiters)
+            _, _, future, rc = entry
+            if future.done():
+                continue  # Attente expirée
+            if self.active[rc.name] >= rc.max_concurrency:
+                skipped.append(entry)
+                continue
+            self._grant(rc)
+            future.set_result(True)
+        for entry in skipped:
+            heapq.heappush(self._waiters, entry)
+
+    def _release(self, rc: RouteClass):
+        self.in_use -= 1
+        self.active[rc.name] -= 1
+        self._dispatch()
+
+    def _reject(self, rc: RouteClass, reason: str):
+        self.stats[rc.name]["shed"] += 1
+        retry_after = max(1, ceil(rc.queue_timeout))
+        logger.warning(f"⛔ Requête {rc.name} délestée ({reason})")
+        raise HTTPException(
+            status_code=503,
+            detail="Service surchargé, réessayez plus tard",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+    @asynccontextmanager
+    async def admit(self, class_name: str):
+        """Attend un créneau pour la classe, ou lève une 503 si le budget est dépassé"""
+        rc = self.classes[class_name]
+        waiting_ahead = any(
+            not future.done() and priority <= rc.priority
+            for priority, _, future, _ in self._waiters
+        )
+
+        if self._has_capacity(rc) and not waiting_ahead:
+            self._grant(rc)
+        else:
+            if self.queued[rc.name] >= rc.max_queue:
+                self._reject(rc, "file pleine")
+
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (rc.priority, next(self._sequence), future, rc))
+            self.queued[rc.name] += 1
+            self.stats[rc.name]["max_queue_depth"] = max(
+                self.stats[rc.name]["max_queue_depth"], self.queued[rc.name]
+            )
+            start = time.perf_counter()
+            try:
+                await asyncio.wait_for(future, timeout=rc.queue_timeout)
+            except asyncio.TimeoutError:
+                self._reject(rc, f"attente > {rc.queue_timeout}s")
+            except asyncio.CancelledError:
+                # Client parti : rendre le créneau s'il a été attribué entre-temps
+                if future.done() and not future.cancelled():
+                    self._release(rc)
+                raise
+            finally:
+                self.queued[rc.name] -= 1
+                self.stats[rc.name]["wait_time_total_ms"] += (time.perf_counter() - start) * 1000
+
+        try:
+            yield rc
+        finally:
+            self._release(rc)
+
+    def snapshot(self) -> Dict:
+        """Métriques courantes (profondeur de file, délestages, ...)"""
+        return {
+            "total_slots": self.total_slots,
+            "in_use": self.in_use,
+            "classes": {
+                name: {
+                    "priority": rc.priority,
+                    "max_concurrency": rc.max_concurrency,
+                    "active": self.active[name],
+                    "queue_depth": self.queued[name],
+                    "statement_timeout_ms": rc.statement_timeout_ms,
+                    **{
+                        key: round(value, 3) if isinstance(value, float) else value
+                        for key, value in self.stats[name].items()
+                    },
+                }
+                for name, rc in self.classes.items()
+            },
+        }
+
+
+def build_admission_controller(config) -> AdmissionController:
+    """Construit le contrôleur à partir d'APIConfig"""
+    route_classes = [
+        RouteClass(name, **settings)
+        for name, settings in config.ADMISSION_CLASSES.items()
+    ]
+    return AdmissionController(config.DB_MAX_CONNECTIONS, route_classes, config.ROUTE_CLASSES)
@@ -0,0 +1,88 @@
+"""
+Coalescence des requêtes identiques concurrentes (single-flight)
+
+Quand plusieurs requêtes identiques (même route, mêmes paramètres normalisés)
+arrivent pendant qu'une exécution est en cours, elles attendent toutes ce même
+appel base de données et partagent son résultat.
+
+Ordre de composition prévu : cache de réponse éventuel -> single-flight ->
+contrôle d'admission -> PostgreSQL. Seul l'appel "meneur" consomme un créneau.
+"""
+
+import asyncio
+import json
+import logging
+from datetime import date, datetime
+from typing import Any, Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+class SingleFlight:
+    """Déduplique les appels asynchrones concurrents par clé"""
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def make_key(route: str, args: tuple = (), kwargs: Dict = None) -> str:
+        """Clé normalisée : route + paramètres non nuls triés"""
+        params = {k: _normalize(v) for k, v in (kwargs or {}).items() if v is not None}
+        return json.dumps(
+            [route, [_normalize(a) for a in args], params],
+            sort_keys=True, ensure_ascii=False, default=str
+        )
+
+    def _route_stats(self, route: str) -> Dict[str, int]:
+        return self.stats.setdefault(route, {"requests": 0, "executions": 0, "coalesced": 0})
+
+    @staticmethod
+    def _consume_exception(task: asyncio.Task):
+        # Évite "exception was never retrieved" si tous les appelants sont partis
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, route: str, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Exécute func() une seule fois pour toutes les requêtes concurrentes de même clé"""
+        stats = self._route_stats(route)
+        stats["requests"] += 1
+
+        task = self._inflight.get(key)
+        if task is not None:
+            stats["coalesced"] += 1
+        else:
+            stats["executions"] += 1
+            # Tâche dédiée : l'annulation d'un client n'interrompt pas les autres
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._inflight.pop(key, None))
+            task.add_done_callback(self._consume_exception)
+
+        return await asyncio.shield(task)
+
+    def snapshot(self) -> Dict:
+        """Métriques : requêtes, exécutions réelles et taux de regroupement"""
+        requests = sum(s["requests"] for s in self.stats.values())
+        executions = sum(s["executions"] for s in self.stats.values())
+        return {
+            "in_flight": len(self._inflight),
+            "requests": requests,
+            "executions": executions,
+            "collapse_ratio": round(requests / executions, 3) if executions else 1.0,
+            "routes": {
+                route: {
+                    **s,
+                    "collapse_ratio": round(s["requests"] / s["executions"], 3) if s["executions"] else 1.0,
+                }
+                for route, s in self.stats.items()
+            },
+        }
@@ -29,11 +29,14 @@ class DatabaseConfig:
 
 
 @contextmanager
-def get_db_connection():
+def get_db_connection(statement_timeout_ms: Optional[int] = None):
     """Context manager pour connexion PostgreSQL"""
     conn = None
     try:
         dsn = DatabaseConfig.get_postgres_dsn()
+        if statement_timeout_ms:
+            # Appliqué dès l'ouverture de session (pas d'aller-retour supplémentaire)
+            dsn += f" options='-c statement_timeout={int(statement_timeout_ms)}'"
         conn = psycopg.connect(dsn, row_factory=dict_row)
         yield conn
     except Exception as e:
@@ -68,6 +71,7 @@ class APIConfig:
     ## Fonctionnalités
     
     * **Events** - Liste et détails des événements
+    * **Nearby** - Événements autour d'un point (recherche KNN)
     * **Search** - Recherche plein texte
     * **Stats** - Statistiques et analyses
     * **Categories** - Liste des catégories
@@ -92,4 +96,52 @@ class APIConfig:
     
     # Pagination
     DEFAULT_PAGE_SIZE = 20
-    MAX_PAGE_SIZE = 100
\ No newline at end of file
+    MAX_PAGE_SIZE = 100
+    
+    # Mode de service de GET /events : "postgres" ou "snapshot" (colonnes en mémoire)
+    SERVING_MODE = os.getenv("API_SERVING_MODE", "postgres")
+    SNAPSHOT_CHANNEL = "events_published"  # Canal NOTIFY du loader
+    
+    # Coalescence des requêtes identiques concurrentes (single-flight)
+    REQUEST_COALESCING = os.getenv("REQUEST_COALESCING", "true").lower() == "true"
+    
+    # Contrôle d'admission : connexions PostgreSQL simultanées max
+    DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "10"))
+    
+    # Classes de service (priorité 0 = servie en premier)
+    ADMISSION_CLASSES = {
+        "lookup": {
+            "priority": 0,
+            "max_concurrency": DB_MAX_CONNECTIONS,
+            "queue_timeout": 2.0,
+            "max_queue": 200,
+            "statement_timeout_ms": 2000,
+        },
+        "listing": {
+            "priority": 1,
+            "max_concurrency": max(1, DB_MAX_CONNECTIONS * 6 // 10),
+            "queue_timeout": 1.0,
+            "max_queue": 100,
+            "statement_timeout_ms": 5000,
+        },
+        "heavy": {
+            "priority": 2,
+            "max_concurrency": max(1, DB_MAX_CONNECTIONS * 3 // 10),
+            "queue_timeout": 0.5,
+            "max_queue": 20,
+            "statement_timeout_ms": 10000,
+        },
+    }
+    
+    # Route -> classe de service
+    ROUTE_CLASSES = {
+        "get_event": "lookup",
+        "get_similar_events": "lookup",
+        "get_categories": "lookup",
+        "get_cities": "lookup",
+        "get_events": "listing",
+        "get_nearby_events": "listing",
+        "get_history": "heavy",
+        "search_events": "heavy",
+        "get_stats": "heavy",
+    }
\ No newline at end of file
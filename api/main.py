@@ -4,16 +4,21 @@ API REST FastAPI pour les événements culturels
 
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
+import psycopg
 from typing import Optional, List
 from datetime import date, datetime
 import logging
 
 from api.config import APIConfig, get_db_connection, test_postgres_connection
 from api.models import (
-    EventList, EventDetail, CategoryBase, CityBase,
+    EventList, EventDetail, NearbyEvent, SimilarEvent, CategoryBase, CityBase,
     Stats, SearchResult, HealthCheck
 )
 from api.service import EventService
+from api.admission import build_admission_controller
+from api.coalescing import SingleFlight
+from api.snapshot import SnapshotStore
 
 # Configuration logging
 logging.basicConfig(level=logging.INFO)
@@ -38,6 +43,50 @@ app.add_middleware(
 )
 
 
+# Contrôle d'admission (priorités, plafonds, délestage)
+admission = build_admission_controller(APIConfig)
+
+# Coalescence des requêtes identiques concurrentes
+single_flight = SingleFlight()
+
+# Snapshot colonnaire en mémoire (API_SERVING_MODE=snapshot)
+snapshot_store = SnapshotStore() if APIConfig.SERVING_MODE == "snapshot" else None
+
+
+async def run_db(route: str, func, *args, **kwargs):
+    """
+    Exécute func(conn, *args, **kwargs) sous contrôle d'admission.
+    
+    Les requêtes identiques concurrentes partagent une seule exécution
+    (single-flight). La requête SQL tourne dans le pool de threads (la boucle
+    asyncio reste libre pour gérer la file d'attente) avec le statement_timeout
+    de la route.
+    """
+    route_class = admission.route_class(route)
+    
+    def call():
+        with get_db_connection(route_class.statement_timeout_ms) as conn:
+            return func(conn, *args, **kwargs)
+    
+    async def execute():
+        async with admission.admit(route_class.name):
+            try:
+                return await run_in_threadpool(call)
+            except psycopg.errors.QueryCanceled:
+                logger.warning(f"⏱️ statement_timeout dépassé ({route})")
+                raise HTTPException(
+                    status_code=503,
+                    detail="Requête trop longue, réessayez plus tard",
+                    headers={"Retry-After": str(max(1, route_class.statement_timeout_ms // 1000))}
+                )
+    
+    if not APIConfig.REQUEST_COALESCING:
+        return await execute()
+    
+    key = SingleFlight.make_key(route, args, kwargs)
+    return await single_flight.do(route, key, execute)
+
+
 # ============================================================
 # HEALTH CHECK
 # ============================================================
@@ -67,6 +116,17 @@ async def health_check():
     )
 
 
+@app.get("/metrics", tags=["Health"])
+async def metrics():
+    """Métriques internes (admission : files, délestages ; coalescence : taux de regroupement)"""
+    return {
+        "serving_mode": APIConfig.SERVING_MODE,
+        "admission": admission.snapshot(),
+        "coalescing": single_flight.snapshot(),
+        "snapshot": snapshot_store.stats() if snapshot_store else None
+    }
+
+
 # ============================================================
 # EVENTS
 # ============================================================
@@ -82,35 +142,125 @@ async def get_events(
     is_weekend: Optional[bool] = Query(None, description="Uniquement les événements du weekend"),
     season: Optional[str] = Query(None, description="Filtrer par saison (Printemps, Été, Automne, Hiver)"),
     date_from: Optional[date] = Query(None, description="Date de début (YYYY-MM-DD)"),
-    date_to: Optional[date] = Query(None, description="Date de fin (YYYY-MM-DD)")
+    date_to: Optional[date] = Query(None, description="Date de fin (YYYY-MM-DD)"),
+    facets: bool = Query(False, description="Inclure les comptages par catégorie, arrondissement et saison")
 ):
     """
     Récupère la liste des événements avec pagination et filtres.
+    
+    En mode snapshot, servi depuis la mémoire (PostgreSQL en secours).
     """
     
+    params = dict(
+        page=page,
+        page_size=page_size,
+        category=category,
+        city=city,
+        arrondissement=arrondissement,
+        is_free=is_free,
+        is_weekend=is_weekend,
+        season=season,
+        date_from=date_from,
+        date_to=date_to,
+        facets=facets
+    )
+    
     try:
-        with get_db_connection() as conn:
-            result = EventService.get_events(
-                conn=conn,
-                page=page,
-                page_size=page_size,
-                category=category,
-                city=city,
-                arrondissement=arrondissement,
-                is_free=is_free,
-                is_weekend=is_weekend,
-                season=season,
-                date_from=date_from,
-                date_to=date_to
-            )
-            
-            return EventList(**result)
+        snapshot = snapshot_store.current if snapshot_store else None
+        if snapshot is not None:
+            result = await run_in_threadpool(snapshot.get_events, **params)
+        else:
+            result = await run_db("get_events", EventService.get_events, **params)
+        
+        return EventList(**result)
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erreur get_events: {e}")
         raise HTTPException(status_code=500, detail="Erreur serveur")
 
 
+@app.get("/events/nearby", response_model=List[NearbyEvent], tags=["Events"])
+async def get_nearby_events(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude du point de référence"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude du point de référence"),
+    radius: float = Query(2.0, gt=0, le=50, description="Rayon de recherche (km)"),
+    limit: int = Query(20, ge=1, le=100, description="Nombre de résultats"),
+    category: Optional[str] = Query(None, description="Filtrer par catégorie"),
+    city: Optional[str] = Query(None, description="Filtrer par ville"),
+    arrondissement: Optional[str] = Query(None, description="Filtrer par arrondissement (ex: 11e)"),
+    is_free: Optional[bool] = Query(None, description="Uniquement les événements gratuits"),
+    is_weekend: Optional[bool] = Query(None, description="Uniquement les événements du weekend"),
+    season: Optional[str] = Query(None, description="Filtrer par saison (Printemps, Été, Automne, Hiver)"),
+    date_from: Optional[date] = Query(None, description="Date de début (YYYY-MM-DD)"),
+    date_to: Optional[date] = Query(None, description="Date de fin (YYYY-MM-DD)")
+):
+    """
+    Événements les plus proches d'un point, triés par distance réelle (km).
+    
+    Combinable avec les filtres habituels de /events.
+    """
+    
+    try:
+        events = await run_db(
+            "get_nearby_events",
+            EventService.get_nearby_events,
+            lat=lat,
+            lon=lon,
+            radius_km=radius,
+            limit=limit,
+            category=category,
+            city=city,
+            arrondissement=arrondissement,
+            is_free=is_free,
+            is_weekend=is_weekend,
+            season=season,
+            date_from=date_from,
+            date_to=date_to
+        )
+        return [NearbyEvent(**e) for e in events]
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erreur get_nearby_events: {e}")
+        raise HTTPException(status_code=500, detail="Erreur serveur")
+
+
+@app.get("/events/history", response_model=EventList, tags=["Events"])
+async def get_event_history(
+    page: int = Query(1, ge=1, description="Numéro de page"),
+    page_size: int = Query(20, ge=1, le=100, description="Taille de page"),
+    category: Optional[str] = Query(None, description="Filtrer par catégorie"),
+    city: Optional[str] = Query(None, description="Filtrer par ville"),
+    date_from: Optional[date] = Query(None, description="Date de début (YYYY-MM-DD)"),
+    date_to: Optional[date] = Query(None, description="Date de fin (YYYY-MM-DD)")
+):
+    """
+    Événements archivés (hors horizon de rétention), du plus récent au plus ancien.
+    """
+    
+    try:
+        result = await run_db(
+            "get_history",
+            EventService.get_archived_events,
+            page=page,
+            page_size=page_size,
+            category=category,
+            city=city,
+            date_from=date_from,
+            date_to=date_to
+        )
+        return EventList(**result)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erreur get_event_history: {e}")
+        raise HTTPException(status_code=500, detail="Erreur serveur")
+
+
 @app.get("/events/{event_id}", response_model=EventDetail, tags=["Events"])
 async def get_event(event_id: int):
     """
@@ -119,13 +269,12 @@ async def get_event(event_id: int):
     """
     
     try:
-        with get_db_connection() as conn:
-            event = EventService.get_event_by_id(conn, event_id)
-            
-            if not event:
-                raise HTTPException(status_code=404, detail="Événement non trouvé")
-            
-            return EventDetail(**event)
+        event = await run_db("get_event", EventService.get_event_by_id, event_id)
+        
+        if not event:
+            raise HTTPException(status_code=404, detail="Événement non trouvé")
+        
+        return EventDetail(**event)
     
     except HTTPException:
         raise
@@ -134,6 +283,29 @@ async def get_event(event_id: int):
         raise HTTPException(status_code=500, detail="Erreur serveur")
 
 
+@app.get("/events/{event_id}/similar", response_model=List[SimilarEvent], tags=["Events"])
+async def get_similar_events(
+    event_id: int,
+    limit: int = Query(6, ge=1, le=20, description="Nombre de recommandations")
+):
+    """
+    Événements similaires ("Vous aimerez aussi").
+    
+    Voisins pré-calculés hors ligne (TF-IDF titre/description/mots-clés,
+    catégorie et localisation).
+    """
+    
+    try:
+        events = await run_db("get_similar_events", EventService.get_similar_events, event_id, limit)
+        return [SimilarEvent(**e) for e in events]
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erreur get_similar_events: {e}")
+        raise HTTPException(status_code=500, detail="Erreur serveur")
+
+
 # ============================================================
 # SEARCH
 # ============================================================
@@ -148,10 +320,11 @@ async def search_events(
     """
     
     try:
-        with get_db_connection() as conn:
-            results = EventService.search_events(conn, q, limit)
-            return [SearchResult(**r) for r in results]
+        results = await run_db("search_events", EventService.search_events, q, limit)
+        return [SearchResult(**r) for r in results]
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erreur search: {e}")
         raise HTTPException(status_code=500, detail="Erreur serveur")
@@ -178,10 +351,11 @@ async def get_categories():
     """
     
     try:
-        with get_db_connection() as conn:
-            categories = EventService.get_categories(conn)
-            return [CategoryBase(**c) for c in categories]
+        categories = await run_db("get_categories", EventService.get_categories)
+        return [CategoryBase(**c) for c in categories]
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erreur get_categories: {e}")
         raise HTTPException(status_code=500, detail="Erreur serveur")
@@ -198,10 +372,11 @@ async def get_cities():
     """
     
     try:
-        with get_db_connection() as conn:
-            cities = EventService.get_cities(conn)
-            return [CityBase(**c) for c in cities]
+        cities = await run_db("get_cities", EventService.get_cities)
+        return [CityBase(**c) for c in cities]
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erreur get_cities: {e}")
         raise HTTPException(status_code=500, detail="Erreur serveur")
@@ -212,9 +387,12 @@ async def get_cities():
 # ============================================================
 
 @app.get("/stats", response_model=Stats, tags=["Statistics"])
-async def get_stats():
+async def get_stats(
+    date_from: Optional[date] = Query(None, description="Date de début (YYYY-MM-DD)"),
+    date_to: Optional[date] = Query(None, description="Date de fin (YYYY-MM-DD)")
+):
     """
-    Récupère les statistiques globales.
+    Récupère les statistiques globales, ou d'une période (date_from / date_to).
     
     **Inclut :**
     - Nombre total d'événements
@@ -226,10 +404,11 @@ async def get_stats():
     """
     
     try:
-        with get_db_connection() as conn:
-            stats = EventService.get_stats(conn)
-            return Stats(**stats)
+        stats = await run_db("get_stats", EventService.get_stats, date_from=date_from, date_to=date_to)
+        return Stats(**stats)
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erreur get_stats: {e}")
         raise HTTPException(status_code=500, detail="Erreur serveur")
@@ -250,11 +429,18 @@ async def startup_event():
         logger.info("✅ PostgreSQL connecté")
     else:
         logger.warning("⚠️ PostgreSQL indisponible")
+    
+    # Mode snapshot : chargement initial puis rechargement à chaque publication
+    if snapshot_store:
+        await run_in_threadpool(snapshot_store.refresh)
+        snapshot_store.start()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Actions à l'arrêt de l'API"""
+    if snapshot_store:
+        snapshot_store.stop()
     logger.info("👋 API arrêtée")
 
 
@@ -3,7 +3,7 @@ Modèles Pydantic pour l'API
 """
 
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import date, datetime
 
 
@@ -76,6 +76,25 @@ class EventDetail(EventBase):
         from_attributes = True
 
 
+class NearbyEvent(EventBase):
+    """Événement proche d'un point, avec sa distance"""
+    latitude: float
+    longitude: float
+    category_name: Optional[str] = None
+    distance_km: float
+    
+    class Config:
+        from_attributes = True
+
+
+class SimilarEvent(EventBase):
+    """Événement similaire (recommandation)"""
+    score: float
+    
+    class Config:
+        from_attributes = True
+
+
 class EventList(BaseModel):
     """Liste paginée d'événements"""
     total: int
@@ -83,6 +102,7 @@ class EventList(BaseModel):
     page_size: int
     total_pages: int
     events: List[EventBase]
+    facets: Optional[Dict[str, Dict[str, int]]] = None
 
 
 class Stats(BaseModel):
@@ -2,12 +2,16 @@
 Service de gestion des événements
 """
 
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import date
+from math import sin, pi
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Rayon moyen de la Terre (km), identique à GeocodingEnricher._calculate_distance
+EARTH_RADIUS_KM = 6371
+
 
 class EventService:
     """Service pour les opérations sur les événements"""
@@ -24,7 +28,8 @@ class EventService:
         is_weekend: Optional[bool] = None,
         season: Optional[str] = None,
         date_from: Optional[date] = None,
-        date_to: Optional[date] = None
+        date_to: Optional[date] = None,
+        facets: bool = False
     ) -> Dict[str, Any]:
         """Récupère la liste des événements avec filtres et pagination"""
 
@@ -67,15 +72,84 @@ class EventService:
                 c.parent_category
             FROM events e
             LEFT JOIN event_categories ec 
-                ON e.id = ec.event_id AND ec.is_primary = TRUE
+                ON e.id = ec.event_id AND e.event_date = ec.event_date AND ec.is_primary = TRUE
             LEFT JOIN categories c 
                 ON ec.category_id = c.id
             WHERE 1=1
         """
 
-        params = []
+        query, params = EventService._apply_filters(
+            query, [],
+            category=category,
+            city=city,
+            arrondissement=arrondissement,
+            is_free=is_free,
+            is_weekend=is_weekend,
+            season=season,
+            date_from=date_from,
+            date_to=date_to
+        )
+
+        # Total
+        count_query = f"SELECT COUNT(*) as total FROM ({query}) AS subq"
+        cursor.execute(count_query, params)
+        total = cursor.fetchone()["total"]
+
+        # Facettes (même ensemble filtré, avant pagination)
+        facet_counts = EventService._facets(cursor, query, params) if facets else None
+
+        # Pagination
+        query += " ORDER BY COALESCE(e.event_date, e.event_datetime), e.id LIMIT %s OFFSET %s"
+        offset = (page - 1) * page_size
+        params = params + [page_size, offset]
+
+        cursor.execute(query, params)
+        events = cursor.fetchall()
+
+        total_pages = (total + page_size - 1) // page_size
+
+        result = {
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "total_pages": total_pages,
+            "events": events
+        }
+        if facet_counts is not None:
+            result["facets"] = facet_counts
+
+        return result
+
+    @staticmethod
+    def _facets(cursor, query: str, params: List[Any]) -> Dict[str, Dict[str, int]]:
+        """Comptages par catégorie, arrondissement et saison sur la requête filtrée"""
+        facets = {}
+        for name, column in (("category", "category_name"), ("arrondissement", "arrondissement"), ("season", "season")):
+            cursor.execute(f"""
+                SELECT {column} AS value, COUNT(*) AS count
+                FROM ({query}) AS subq
+                WHERE {column} IS NOT NULL
+                GROUP BY {column}
+                ORDER BY count DESC
+            """, params)
+            facets[name] = {row["value"]: row["count"] for row in cursor.fetchall()}
+        return facets
+
+    @staticmethod
+    def _apply_filters(
+        query: str,
+        params: List[Any],
+        category: Optional[str] = None,
+        city: Optional[str] = None,
+        arrondissement: Optional[str] = None,
+        is_free: Optional[bool] = None,
+        is_weekend: Optional[bool] = None,
+        season: Optional[str] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None
+    ) -> Tuple[str, List[Any]]:
+        """Ajoute les filtres communs (alias e = events, c = categories)"""
 
-        # Filtres
         if category:
             query += " AND c.name = %s"
             params.append(category)
@@ -108,29 +182,130 @@ class EventService:
             query += " AND e.event_date <= %s"
             params.append(date_to)
 
-        # Total
-        count_query = f"SELECT COUNT(*) as total FROM ({query}) AS subq"
-        cursor.execute(count_query, params)
-        total = cursor.fetchone()["total"]
+        return query, params
 
-        # Pagination
-        query += " ORDER BY COALESCE(e.event_date, e.event_datetime), e.id LIMIT %s OFFSET %s"
-        offset = (page - 1) * page_size
-        params.extend([page_size, offset])
+    @staticmethod
+    def get_archived_events(
+        conn,
+        page: int = 1,
+        page_size: int = 20,
+        category: Optional[str] = None,
+        city: Optional[str] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """
+        Historique : événements sortis des tables chaudes par etl/retention.py
+        (schéma events_archive, partitionné par mois comme events)
+        """
 
-        cursor.execute(query, params)
-        events = cursor.fetchall()
+        cursor = conn.cursor()
 
-        total_pages = (total + page_size - 1) // page_size
+        cursor.execute("SELECT to_regclass('events_archive.events') IS NOT NULL AS archived")
+        if not cursor.fetchone()["archived"]:
+            return {"total": 0, "page": page, "page_size": page_size, "total_pages": 0, "events": []}
+
+        query = """
+            SELECT
+                e.id,
+                e.title,
+                e.event_date,
+                e.arrondissement,
+                e.is_free,
+                e.city_name,
+                ec.category_name
+            FROM events_archive.events e
+            LEFT JOIN events_archive.event_categories ec
+                ON e.id = ec.event_id AND e.event_date = ec.event_date AND ec.is_primary = TRUE
+            WHERE 1=1
+        """
+        params: List[Any] = []
+
+        if category:
+            query += " AND ec.category_name = %s"
+            params.append(category)
+
+        if city:
+            query += " AND e.city_name = %s"
+            params.append(city)
+
+        query, params = EventService._apply_filters(query, params, date_from=date_from, date_to=date_to)
+
+        cursor.execute(f"SELECT COUNT(*) as total FROM ({query}) AS subq", params)
+        total = cursor.fetchone()["total"]
+
+        query += " ORDER BY e.event_date DESC, e.id LIMIT %s OFFSET %s"
+        cursor.execute(query, params + [page_size, (page - 1) * page_size])
 
         return {
             "total": total,
             "page": page,
             "page_size": page_size,
-            "total_pages": total_pages,
-            "events": events
+            "total_pages": (total + page_size - 1) // page_size,
+            "events": cursor.fetchall()
         }
 
+    @staticmethod
+    def get_nearby_events(
+        conn,
+        lat: float,
+        lon: float,
+        radius_km: float = 2.0,
+        limit: int = 20,
+        **filters
+    ) -> List[Dict]:
+        """
+        Événements les plus proches d'un point, triés par distance réelle.
+
+        Recherche KNN assistée par l'index GiST sur geo_point(latitude, longitude) :
+        la distance euclidienne (corde) sur la sphère unité est monotone avec la
+        distance orthodromique, donc l'ordre de l'index est l'ordre réel.
+        """
+
+        cursor = conn.cursor()
+
+        # Rayon en km -> longueur de corde sur la sphère unité
+        chord = 2 * sin(min(radius_km / (2 * EARTH_RADIUS_KM), pi / 2))
+
+        query = """
+            SELECT
+                e.id,
+                e.title,
+                e.event_date,
+                e.arrondissement,
+                e.is_free,
+                e.latitude,
+                e.longitude,
+                c.name AS category_name,
+                2 * %s * asin(LEAST(
+                    extensions.cube_distance(geo_point(e.latitude, e.longitude), geo_point(%s, %s)) / 2,
+                    1
+                )) AS distance_km
+            FROM events e
+            LEFT JOIN event_categories ec
+                ON e.id = ec.event_id AND e.event_date = ec.event_date AND ec.is_primary = TRUE
+            LEFT JOIN categories c
+                ON ec.category_id = c.id
+            WHERE e.latitude IS NOT NULL
+              AND e.longitude IS NOT NULL
+              AND extensions.cube_enlarge(geo_point(%s, %s), %s, 3)
+                  OPERATOR(extensions.@>) geo_point(e.latitude, e.longitude)
+              AND extensions.cube_distance(geo_point(e.latitude, e.longitude), geo_point(%s, %s)) <= %s
+        """
+
+        params = [EARTH_RADIUS_KM, lat, lon, lat, lon, chord, lat, lon, chord]
+        query, params = EventService._apply_filters(query, params, **filters)
+
+        # Tri KNN : l'opérateur <-> est servi directement par l'index GiST
+        query += """
+            ORDER BY geo_point(e.latitude, e.longitude) OPERATOR(extensions.<->) geo_point(%s, %s)
+            LIMIT %s
+        """
+        params.extend([lat, lon, limit])
+
+        cursor.execute(query, params)
+        return cursor.fetchall()
+
     @staticmethod
     def get_event_by_id(conn, event_id: int) -> Optional[Dict]:
         """Récupère un événement par son ID"""
@@ -146,7 +321,7 @@ class EventService:
             FROM events e
             LEFT JOIN cities ci ON e.city_id = ci.id
             LEFT JOIN event_categories ec 
-                ON e.id = ec.event_id AND ec.is_primary = TRUE
+                ON e.id = ec.event_id AND e.event_date = ec.event_date AND ec.is_primary = TRUE
             LEFT JOIN categories c 
                 ON ec.category_id = c.id
             WHERE e.id = %s
@@ -155,6 +330,31 @@ class EventService:
         cursor.execute(query, (event_id,))
         return cursor.fetchone()
 
+    @staticmethod
+    def get_similar_events(conn, event_id: int, limit: int = 10) -> List[Dict]:
+        """Événements similaires pré-calculés (une seule lecture indexée)"""
+
+        cursor = conn.cursor()
+
+        query = """
+            SELECT
+                e.id,
+                e.title,
+                e.event_date,
+                e.arrondissement,
+                e.is_free,
+                s.score
+            FROM event_similarities s
+            JOIN events e
+                ON e.id = s.similar_event_id AND e.event_date = s.similar_event_date
+            WHERE s.event_id = %s
+            ORDER BY s.rank
+            LIMIT %s
+        """
+
+        cursor.execute(query, (event_id, limit))
+        return cursor.fetchall()
+
     @staticmethod
     def search_events(conn, query: str, limit: int = 20) -> List[Dict]:
         """Recherche plein texte dans les événements"""
@@ -200,12 +400,28 @@ class EventService:
         return cursor.fetchall()
 
     @staticmethod
-    def get_stats(conn) -> Dict[str, Any]:
-        """Récupère les statistiques globales"""
+    def get_stats(
+        conn,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """
+        Récupère les statistiques globales, ou d'une période.
+
+        Le filtre de dates porte sur la clé de partitionnement (event_date) :
+        seules les partitions mensuelles de la période sont lues.
+        """
 
         cursor = conn.cursor()
 
-        cursor.execute("SELECT COUNT(*) as total FROM events")
+        # Événements de la période (alias e), réutilisé par chaque agrégat
+        events, params = EventService._apply_filters(
+            "FROM events e WHERE 1=1", [],
+            date_from=date_from,
+            date_to=date_to
+        )
+
+        cursor.execute(f"SELECT COUNT(*) as total {events}", params)
         total_events = cursor.fetchone()["total"]
 
         cursor.execute("SELECT COUNT(*) as total FROM categories")
@@ -214,40 +430,37 @@ class EventService:
         cursor.execute("SELECT COUNT(*) as total FROM cities")
         total_cities = cursor.fetchone()["total"]
 
-        cursor.execute("SELECT COUNT(*) as total FROM events WHERE is_free = TRUE")
+        cursor.execute(f"SELECT COUNT(*) as total {events} AND e.is_free = TRUE", params)
         free_events = cursor.fetchone()["total"]
 
-        cursor.execute("SELECT COUNT(*) as total FROM events WHERE is_weekend = TRUE")
+        cursor.execute(f"SELECT COUNT(*) as total {events} AND e.is_weekend = TRUE", params)
         weekend_events = cursor.fetchone()["total"]
 
-        cursor.execute("""
-            SELECT c.name, COUNT(e.id) as count
-            FROM categories c
-            LEFT JOIN event_categories ec ON c.id = ec.category_id AND ec.is_primary = TRUE
-            LEFT JOIN events e ON ec.event_id = e.id
-            GROUP BY c.name
-            HAVING COUNT(e.id) > 0
-            ORDER BY count DESC
-            LIMIT 10
-        """)
+        query, category_params = EventService._apply_filters("""
+            SELECT c.name, COUNT(*) as count
+            FROM events e
+            JOIN event_categories ec
+                ON e.id = ec.event_id AND e.event_date = ec.event_date AND ec.is_primary = TRUE
+            JOIN categories c ON ec.category_id = c.id
+            WHERE 1=1
+        """, [], date_from=date_from, date_to=date_to)
+        cursor.execute(query + " GROUP BY c.name ORDER BY count DESC LIMIT 10", category_params)
         by_category = cursor.fetchall()
 
-        cursor.execute("""
-            SELECT arrondissement, COUNT(*) as count
-            FROM events
-            WHERE arrondissement IS NOT NULL
-            GROUP BY arrondissement
+        cursor.execute(f"""
+            SELECT e.arrondissement, COUNT(*) as count
+            {events} AND e.arrondissement IS NOT NULL
+            GROUP BY e.arrondissement
             ORDER BY count DESC
-        """)
+        """, params)
         by_arrondissement = cursor.fetchall()
 
-        cursor.execute("""
-            SELECT season, COUNT(*) as count
-            FROM events
-            WHERE season IS NOT NULL
-            GROUP BY season
+        cursor.execute(f"""
+            SELECT e.season, COUNT(*) as count
+            {events} AND e.season IS NOT NULL
+            GROUP BY e.season
             ORDER BY count DESC
-        """)
+        """, params)
         by_season = cursor.fetchall()
 
         return {
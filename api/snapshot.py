@@ -0,0 +1,333 @@
+"""
+Snapshot colonnaire en mémoire pour le mode de service "snapshot"
+
+Le catalogue ne change qu'au passage de l'ETL : à chaque publication du loader
+(NOTIFY events_published), les événements publiés sont rechargés dans des
+tableaux NumPy (dates, booléens, coordonnées, codes de chaînes) et une table de
+chaînes internées. Les filtres, le tri, les comptages et les facettes de
+GET /events sont alors évalués par masques vectorisés, sans PostgreSQL.
+
+Le remplacement du snapshot est atomique (simple échange de référence) : une
+requête en cours garde le snapshot qu'elle a lu. Sans snapshot chargé, l'API
+retombe sur PostgreSQL.
+"""
+
+import logging
+import sys
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from psycopg.rows import tuple_row
+
+from api.config import APIConfig, get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# Tri de GET /events : COALESCE(event_date, event_datetime) ASC NULLS LAST, id
+_NULL_SORT_KEY = np.iinfo(np.int64).max
+
+# Facette -> colonne de codes
+FACETS = {
+    "category": "category",
+    "arrondissement": "arrondissement",
+    "season": "season",
+}
+
+SNAPSHOT_QUERY = """
+    SELECT
+        e.id,
+        e.title,
+        e.event_date,
+        COALESCE(e.event_date, e.event_datetime) AS sort_key,
+        e.arrondissement,
+        e.is_free,
+        e.is_weekend,
+        e.season,
+        e.latitude,
+        e.longitude,
+        ci.name AS city_name,
+        c.name AS category_name
+    FROM events e
+    LEFT JOIN cities ci
+        ON ci.id = e.city_id
+    LEFT JOIN event_categories ec
+        ON e.id = ec.event_id AND e.event_date = ec.event_date AND ec.is_primary = TRUE
+    LEFT JOIN categories c
+        ON ec.category_id = c.id
+"""
+
+
+def _tri_state(value: Optional[bool]) -> int:
+    """Booléen SQL nullable -> int8 (1 vrai, 0 faux, -1 NULL)"""
+    if value is None:
+        return -1
+    return 1 if value else 0
+
+
+def _sort_key(value) -> int:
+    if value is None:
+        return _NULL_SORT_KEY
+    if not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    return int(np.datetime64(value, "s").astype(np.int64))
+
+
+class EventSnapshot:
+    """Catalogue d'événements en colonnes NumPy, trié comme GET /events"""
+
+    def __init__(self, rows: Iterable[Tuple]):
+        """
+        rows : (id, title, event_date, sort_key, arrondissement, is_free,
+                is_weekend, season, latitude, longitude, city_name, category_name)
+        """
+        self.strings: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+        ids, titles, dates, sort_keys = [], [], [], []
+        arrondissements, is_free, is_weekend, seasons = [], [], [], []
+        latitudes, longitudes, cities, categories = [], [], [], []
+
+        for row in rows:
+            (event_id, title, event_date, sort_key, arrondissement, free,
+             weekend, season, lat, lon, city, category) = row
+            ids.append(event_id)
+            titles.append(self._intern(title))
+            dates.append(event_date)
+            sort_keys.append(_sort_key(sort_key))
+            arrondissements.append(self._intern(arrondissement))
+            is_free.append(_tri_state(free))
+            is_weekend.append(_tri_state(weekend))
+            seasons.append(self._intern(season))
+            latitudes.append(np.nan if lat is None else lat)
+            longitudes.append(np.nan if lon is None else lon)
+            cities.append(self._intern(city))
+            categories.append(self._intern(category))
+
+        # Ordre de service calculé une fois : la pagination devient un simple découpage
+        order = np.lexsort((np.array(ids, dtype=np.int64), np.array(sort_keys, dtype=np.int64)))
+
+        self.id = np.array(ids, dtype=np.int64)[order]
+        self.title = np.array(titles, dtype=np.int32)[order]
+        self.event_date = np.array(dates, dtype="datetime64[D]")[order]
+        self.arrondissement = np.array(arrondissements, dtype=np.int32)[order]
+        self.is_free = np.array(is_free, dtype=np.int8)[order]
+        self.is_weekend = np.array(is_weekend, dtype=np.int8)[order]
+        self.season = np.array(seasons, dtype=np.int32)[order]
+        self.latitude = np.array(latitudes, dtype=np.float32)[order]
+        self.longitude = np.array(longitudes, dtype=np.float32)[order]
+        self.city = np.array(cities, dtype=np.int32)[order]
+        self.category = np.array(categories, dtype=np.int32)[order]
+
+        self.size = len(self.id)
+        self.loaded_at = datetime.now()
+
+    def _intern(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.strings)
+            self._codes[value] = code
+            self.strings.append(value)
+        return code
+
+    @classmethod
+    def load(cls, conn) -> "EventSnapshot":
+        """Charge les événements publiés depuis PostgreSQL"""
+        cursor = conn.cursor(row_factory=tuple_row)
+        return cls(cursor.stream(SNAPSHOT_QUERY))
+
+    # ------------------------------------------------------------
+    # Évaluation vectorisée
+    # ------------------------------------------------------------
+
+    def _match_string(self, column: np.ndarray, value: str) -> np.ndarray:
+        code = self._codes.get(value)
+        if code is None:
+            return np.zeros(self.size, dtype=bool)
+        return column == code
+
+    def mask(
+        self,
+        category: Optional[str] = None,
+        city: Optional[str] = None,
+        arrondissement: Optional[str] = None,
+        is_free: Optional[bool] = None,
+        is_weekend: Optional[bool] = None,
+        season: Optional[str] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None
+    ) -> np.ndarray:
+        """Masque booléen équivalent à EventService._apply_filters"""
+        mask = np.ones(self.size, dtype=bool)
+
+        if category:
+            mask &= self._match_string(self.category, category)
+        if city:
+            mask &= self._match_string(self.city, city)
+        if arrondissement:
+            mask &= self._match_string(self.arrondissement, arrondissement)
+        if is_free is not None:
+            mask &= self.is_free == int(is_free)
+        if is_weekend is not None:
+            mask &= self.is_weekend == int(is_weekend)
+        if season:
+            mask &= self._match_string(self.season, season)
+        # NaT (date NULL) n'est jamais retenu, comme en SQL
+        if date_from:
+            mask &= self.event_date >= np.datetime64(date_from, "D")
+        if date_to:
+            mask &= self.event_date <= np.datetime64(date_to, "D")
+
+        return mask
+
+    def facets(self, mask: np.ndarray) -> Dict[str, Dict[str, int]]:
+        """Comptages par valeur (catégorie, arrondissement, saison) pour le masque"""
+        result = {}
+        for name, column in FACETS.items():
+            codes = getattr(self, column)[mask]
+            counts = np.bincount(codes[codes >= 0], minlength=len(self.strings))
+            present = np.flatnonzero(counts)
+            present = present[np.argsort(-counts[present], kind="stable")]
+            result[name] = {self.strings[c]: int(counts[c]) for c in present}
+        return result
+
+    def _event(self, i: int) -> Dict[str, Any]:
+        event_date = self.event_date[i]
+        category = self.category[i]
+        is_free = self.is_free[i]
+        return {
+            "id": int(self.id[i]),
+            "title": self.strings[self.title[i]] if self.title[i] >= 0 else None,
+            "event_date": None if np.isnat(event_date) else event_date.item(),
+            "arrondissement": self.strings[self.arrondissement[i]] if self.arrondissement[i] >= 0 else None,
+            "is_free": None if is_free < 0 else bool(is_free),
+            "category_name": self.strings[category] if category >= 0 else None,
+        }
+
+    def get_events(
+        self,
+        page: int = 1,
+        page_size: int = 20,
+        facets: bool = False,
+        **filters
+    ) -> Dict[str, Any]:
+        """Même contrat que EventService.get_events, sans connexion"""
+        mask = self.mask(**filters)
+        matches = np.flatnonzero(mask)
+        total = len(matches)
+        offset = (page - 1) * page_size
+
+        result = {
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "total_pages": (total + page_size - 1) // page_size,
+            "events": [self._event(i) for i in matches[offset:offset + page_size]],
+        }
+        if facets:
+            result["facets"] = self.facets(mask)
+        return result
+
+    # ------------------------------------------------------------
+    # Mémoire
+    # ------------------------------------------------------------
+
+    def memory_bytes(self) -> int:
+        """Empreinte approximative : tableaux + table de chaînes"""
+        arrays = sum(
+            column.nbytes for column in (
+                self.id, self.title, self.event_date, self.arrondissement,
+                self.is_free, self.is_weekend, self.season, self.latitude,
+                self.longitude, self.city, self.category,
+            )
+        )
+        strings = sum(sys.getsizeof(s) for s in self.strings)
+        return arrays + strings + sys.getsizeof(self.strings) + sys.getsizeof(self._codes)
+
+    def memory_stats(self) -> Dict[str, Any]:
+        total = self.memory_bytes()
+        return {
+            "events": self.size,
+            "strings": len(self.strings),
+            "memory_mb": round(total / 2**20, 2),
+            "memory_mb_per_million_events": round(total / self.size * 1e6 / 2**20, 1) if self.size else 0.0,
+        }
+
+
+class SnapshotStore:
+    """Snapshot courant + rechargement sur NOTIFY du loader"""
+
+    def __init__(self, channel: str = APIConfig.SNAPSHOT_CHANNEL):
+        self.channel = channel
+        self.current: Optional[EventSnapshot] = None
+        self.swaps = 0
+        self.last_load_ms = None
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def swap(self, snapshot: EventSnapshot):
+        """Remplace le snapshot servi (échange de référence atomique)"""
+        self.current = snapshot
+        self.swaps += 1
+
+    def refresh(self) -> Optional[EventSnapshot]:
+        """Recharge depuis PostgreSQL ; en cas d'échec, l'ancien snapshot reste servi"""
+        with self._reload_lock:
+            start = time.perf_counter()
+            try:
+                with get_db_connection() as conn:
+                    snapshot = EventSnapshot.load(conn)
+            except Exception as e:
+                logger.error(f"❌ Chargement du snapshot impossible: {e}")
+                return None
+            self.last_load_ms = round((time.perf_counter() - start) * 1000, 1)
+            self.swap(snapshot)
+
+        stats = snapshot.memory_stats()
+        logger.info(
+            f"📸 Snapshot chargé: {stats['events']} événements, {stats['memory_mb']} MB "
+            f"({stats['memory_mb_per_million_events']} MB/million) en {self.last_load_ms} ms"
+        )
+        return snapshot
+
+    def _listen(self):
+        """Boucle LISTEN : recharge à chaque publication du loader"""
+        reconnecting = False
+        while not self._stop.is_set():
+            try:
+                with get_db_connection() as conn:
+                    conn.autocommit = True
+                    conn.execute(f"LISTEN {self.channel}")
+                    logger.info(f"👂 En écoute sur '{self.channel}'")
+                    # Publication éventuellement manquée pendant la déconnexion
+                    if reconnecting or self.current is None:
+                        self.refresh()
+                    while not self._stop.is_set():
+                        if any(True for _ in conn.notifies(timeout=1.0, stop_after=1)):
+                            self.refresh()
+            except Exception as e:
+                logger.warning(f"⚠️ Écoute '{self.channel}' interrompue: {e}")
+                reconnecting = True
+                self._stop.wait(5)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._listen, name="snapshot-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self.current
+        return {
+            "loaded": snapshot is not None,
+            "loaded_at": snapshot.loaded_at.isoformat() if snapshot else None,
+            "swaps": self.swaps,
+            "last_load_ms": self.last_load_ms,
+            **(snapshot.memory_stats() if snapshot else {}),
+        }
@@ -0,0 +1,104 @@
+"""
+Benchmark - Parsing des dates
+
+Mesure, sur les dates de N documents synthétiques (benchmarks/generate_raw.py :
+ISO avec décalage de Que faire à Paris, "...000Z" d'OpenAgenda, dates seules
+et quelques dates françaises), l'ancien parsing de DateEnricher (dateutil à
+chaque appel) face au parseur partagé enrichment/dates.py, cache vide puis
+cache chaud (ré-enrichissement). Vérifie que les instants UTC sont identiques
+pour les dates ISO (dateutil lisait 10/03/2026 comme le 3 octobre).
+Aucune base de données requise.
+
+Usage :
+    python benchmarks/bench_dates.py --events 100000
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import random
+from typing import List
+
+from dateutil import parser as date_parser
+
+from benchmarks.bench_transform import timed
+from benchmarks.common import run_metadata, save_results
+from benchmarks.generate_raw import generate_raw_documents
+from enrichment import dates
+from enrichment.dates import parse_date
+from enrichment.extractors import extract
+
+
+def make_corpus(count: int, seed: int) -> List[str]:
+    """Dates de début et de fin telles que lues par DateEnricher"""
+    rng = random.Random(seed)
+    corpus = []
+    for raw_doc in generate_raw_documents(count, seed):
+        record = extract(raw_doc)
+        for value in (record.start, record.end):
+            if not value:
+                continue
+            roll = rng.random()
+            if roll < 0.05:
+                value = value[:10]  # Date seule
+            elif roll < 0.08:
+                value = f"{value[8:10]}/{value[5:7]}/{value[:4]} {value[11:16]}"  # Format français
+            corpus.append(value)
+    return corpus
+
+
+def dateutil_utc(text: str):
+    """Ancien chemin (dateutil à chaque appel), ramené en UTC pour comparaison"""
+    return dates._to_utc(date_parser.parse(text))
+
+
+def main():
+    """🚀 Point d'entrée principal"""
+    parser = argparse.ArgumentParser(description="Benchmark du parsing des dates")
+    parser.add_argument("--events", type=int, default=100_000, help="Nombre de documents")
+    parser.add_argument("--seed", type=int, default=42, help="Graine aléatoire")
+    parser.add_argument("--output", default=None, help="Fichier JSON de sortie")
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.events, args.seed)
+
+    baseline, dateutil_seconds = timed(lambda: [dateutil_utc(text) for text in corpus])
+    dates._parse_text.cache_clear()
+    cold, cold_seconds = timed(lambda: [parse_date(text) for text in corpus])
+    warm, warm_seconds = timed(lambda: [parse_date(text) for text in corpus])
+    info = dates.cache_info()
+
+    iso = [i for i, text in enumerate(corpus) if "/" not in text]
+    identical = all(cold[i].utc == baseline[i] for i in iso) and warm == cold
+
+    def rate(seconds: float) -> float:
+        return round(len(corpus) / seconds, 1) if seconds else None
+
+    results = {
+        "benchmark": "dates",
+        "meta": run_metadata(),
+        "events": args.events,
+        "dates": len(corpus),
+        "distinct": len(set(corpus)),
+        "identical": identical,
+        "dateutil": {"seconds": round(dateutil_seconds, 3), "dates_per_sec": rate(dateutil_seconds)},
+        "cold_cache": {"seconds": round(cold_seconds, 3), "dates_per_sec": rate(cold_seconds)},
+        "warm_cache": {"seconds": round(warm_seconds, 3), "dates_per_sec": rate(warm_seconds)},
+        "cache": {"hits": info.hits, "misses": info.misses, "size": info.currsize, "max_size": info.maxsize},
+        "speedup_cold": round(dateutil_seconds / cold_seconds, 1) if cold_seconds else None,
+        "speedup_warm": round(dateutil_seconds / warm_seconds, 1) if warm_seconds else None,
+    }
+
+    print(f"📅 {len(corpus)} dates ({results['distinct']} distinctes)")
+    print(f"🐢 dateutil: {dateutil_seconds:.2f}s ({results['dateutil']['dates_per_sec']} dates/s)")
+    print(f"🚀 parse_date, cache vide: {cold_seconds:.2f}s ({results['cold_cache']['dates_per_sec']} dates/s)")
+    print(f"⚡ parse_date, cache chaud: {warm_seconds:.2f}s ({results['warm_cache']['dates_per_sec']} dates/s)")
+    print(f"{'✅' if identical else '❌'} Instants UTC identiques: {identical}")
+    print(f"📈 Accélération: x{results['speedup_cold']} (vide), x{results['speedup_warm']} (chaud)")
+    print(f"💾 Résultats: {save_results('dates', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
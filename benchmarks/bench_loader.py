@@ -0,0 +1,105 @@
+"""
+Benchmark - Chargement PostgreSQL (PostgreSQLLoader)
+
+Compare, sur des événements transformés synthétiques (sans MongoDB), la
+boucle historique (un INSERT par événement, commit tous les 50) au chargement
+par lots (COPY vers events_staging + fusion ensembliste), en lignes/s.
+
+⚠️ Recrée le schéma de la base ciblée avant chaque mode.
+
+Usage :
+    python benchmarks/bench_loader.py --events 100000 --batch-size 1000
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+from typing import Dict, List
+
+from benchmarks.common import run_metadata, save_results
+from benchmarks.seed_postgres import CITIES, EVENT_COLUMNS, INDEXES_FILE, SCHEMA_FILE, generate_events
+from etl.loader import PostgreSQLLoader
+from etl.transformer import DataTransformer
+
+
+def synthetic_events(count: int, seed: int) -> List[Dict]:
+    """Événements au format de DataTransformer.transform_event"""
+    city_names = {name: name for name, _ in CITIES}
+    events = []
+    for row, main_category, sub_category in generate_events(count, seed, city_names):
+        event_data = dict(zip(EVENT_COLUMNS, row))
+        event_data["city_name"] = event_data.pop("city_id")
+        event_data["main_category"] = main_category
+        event_data["sub_category"] = sub_category
+        event_data["category_confidence"] = 0.8
+        events.append(event_data)
+    return events
+
+
+def run_row_by_row(loader: PostgreSQLLoader, events: List[Dict], batch_size: int) -> int:
+    inserted = 0
+    for start in range(0, len(events), batch_size):
+        inserted += loader.insert_rows(events[start:start + batch_size])["inserted"]
+    return inserted
+
+
+def run_bulk(loader: PostgreSQLLoader, events: List[Dict], batch_size: int) -> int:
+    inserted = 0
+    for start in range(0, len(events), batch_size):
+        # Lot en colonnes, comme produit par DataTransformer.transform_batch
+        inserted += loader.bulk_insert(DataTransformer.columns(events[start:start + batch_size]))["inserted"]
+    return inserted
+
+
+def main():
+    """🚀 Point d'entrée principal"""
+    parser = argparse.ArgumentParser(description="Benchmark du chargement PostgreSQL")
+    parser.add_argument("--events", type=int, default=100_000, help="Nombre d'événements (mode bulk)")
+    parser.add_argument("--row-events", type=int, default=10_000,
+                        help="Nombre d'événements pour la boucle ligne à ligne (plus lente)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Taille des lots COPY")
+    parser.add_argument("--seed", type=int, default=42, help="Graine aléatoire")
+    parser.add_argument("--output", default=None, help="Fichier JSON de sortie")
+    args = parser.parse_args()
+
+    events = synthetic_events(max(args.events, args.row_events), args.seed)
+
+    loader = PostgreSQLLoader()
+    if not loader.connect():
+        sys.exit(1)
+
+    runs = {}
+    for mode, subset in (("row", events[:args.row_events]), ("bulk", events[:args.events])):
+        loader.initialize_schema(SCHEMA_FILE, INDEXES_FILE)
+        start = time.perf_counter()
+        if mode == "row":
+            inserted = run_row_by_row(loader, subset, args.batch_size)
+        else:
+            inserted = run_bulk(loader, subset, args.batch_size)
+        elapsed = time.perf_counter() - start
+        runs[mode] = {
+            "events": len(subset),
+            "inserted": inserted,
+            "seconds": round(elapsed, 3),
+            "rows_per_sec": round(len(subset) / elapsed, 1),
+        }
+        print(f"⏱️ {mode:>4}: {len(subset)} événements en {elapsed:.1f}s → {runs[mode]['rows_per_sec']} lignes/s")
+
+    loader.disconnect()
+
+    results = {
+        "benchmark": "loader",
+        "meta": run_metadata(),
+        "batch_size": args.batch_size,
+        "runs": runs,
+        "speedup": round(runs["bulk"]["rows_per_sec"] / runs["row"]["rows_per_sec"], 1),
+    }
+    print(f"🚀 Accélération: x{results['speedup']}")
+    print(f"💾 Résultats: {save_results('loader', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
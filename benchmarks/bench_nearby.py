@@ -0,0 +1,158 @@
+"""
+Benchmark - Recherche de proximité (/events/nearby)
+
+Compare la recherche KNN indexée (EventService.get_nearby_events) à un
+balayage complet avec calcul Haversine, sur un jeu synthétique (100k par défaut).
+
+Usage :
+    python benchmarks/bench_nearby.py --events 100000 --queries 200
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import random
+import time
+
+import psycopg
+from psycopg.rows import dict_row
+
+from api.config import DatabaseConfig
+from api.service import EventService
+from benchmarks.common import latency_summary, run_metadata, save_results
+
+# Emprise approximative de Paris intra-muros
+PARIS_BBOX = (48.815, 48.902, 2.224, 2.470)
+
+HAVERSINE_SQL = """
+    SELECT e.id, e.title,
+        2 * 6371 * asin(sqrt(
+            power(sin(radians(e.latitude - %(lat)s) / 2), 2)
+            + cos(radians(%(lat)s)) * cos(radians(e.latitude))
+            * power(sin(radians(e.longitude - %(lon)s) / 2), 2)
+        )) AS distance_km
+    FROM events e
+    WHERE e.latitude IS NOT NULL AND e.longitude IS NOT NULL
+      AND 2 * 6371 * asin(sqrt(
+            power(sin(radians(e.latitude - %(lat)s) / 2), 2)
+            + cos(radians(%(lat)s)) * cos(radians(e.latitude))
+            * power(sin(radians(e.longitude - %(lon)s) / 2), 2)
+        )) <= %(radius)s
+    ORDER BY distance_km
+    LIMIT %(limit)s
+"""
+
+
+def seed_events(conn, count: int):
+    """Insère `count` événements synthétiques géolocalisés (source = 'benchmark')"""
+    lat_min, lat_max, lon_min, lon_max = PARIS_BBOX
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM events WHERE source = 'benchmark'")
+    cursor.execute(
+        """
+        INSERT INTO events (raw_id, source, title, event_date, latitude, longitude, is_free)
+        SELECT
+            'bench' || lpad(g::text, 19, '0'),
+            'benchmark',
+            'Événement synthétique ' || g,
+            CURRENT_DATE + (g %% 365),
+            %s + random() * %s,
+            %s + random() * %s,
+            (g %% 3 = 0)
+        FROM generate_series(1, %s) AS g
+        """,
+        (lat_min, lat_max - lat_min, lon_min, lon_max - lon_min, count)
+    )
+    cursor.execute("ANALYZE events")
+    conn.commit()
+
+
+def time_queries(run, points):
+    """Exécute `run(lat, lon)` pour chaque point et retourne les latences (ms)"""
+    latencies = []
+    for lat, lon in points:
+        start = time.perf_counter()
+        run(lat, lon)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latency_summary(latencies)
+
+
+def main():
+    """🚀 Point d'entrée principal"""
+    parser = argparse.ArgumentParser(description="Benchmark /events/nearby")
+    parser.add_argument("--events", type=int, default=100_000, help="Nombre d'événements synthétiques")
+    parser.add_argument("--queries", type=int, default=200, help="Nombre de requêtes mesurées")
+    parser.add_argument("--radius", type=float, default=1.0, help="Rayon de recherche (km)")
+    parser.add_argument("--limit", type=int, default=20, help="Nombre de résultats par requête")
+    parser.add_argument("--keep", action="store_true", help="Conserver les données synthétiques")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("📍 BENCHMARK RECHERCHE DE PROXIMITÉ")
+    print("=" * 70 + "\n")
+
+    conn = psycopg.connect(DatabaseConfig.get_postgres_dsn(), row_factory=dict_row)
+
+    try:
+        print(f"🌱 Insertion de {args.events} événements synthétiques...")
+        seed_events(conn, args.events)
+
+        lat_min, lat_max, lon_min, lon_max = PARIS_BBOX
+        rng = random.Random(42)
+        points = [
+            (rng.uniform(lat_min, lat_max), rng.uniform(lon_min, lon_max))
+            for _ in range(args.queries)
+        ]
+
+        def knn(lat, lon):
+            return EventService.get_nearby_events(conn, lat, lon, args.radius, args.limit)
+
+        def full_scan(lat, lon):
+            cursor = conn.cursor()
+            cursor.execute(HAVERSINE_SQL, {"lat": lat, "lon": lon, "radius": args.radius, "limit": args.limit})
+            return cursor.fetchall()
+
+        # Vérification : mêmes résultats, même ordre
+        for lat, lon in points[:10]:
+            expected = [r["id"] for r in full_scan(lat, lon)]
+            got = [r["id"] for r in knn(lat, lon)]
+            if expected != got:
+                print(f"⚠️ Résultats divergents pour ({lat:.5f}, {lon:.5f})")
+
+        print("⏱️ Mesure KNN indexé...")
+        knn_stats = time_queries(knn, points)
+        print("⏱️ Mesure balayage Haversine...")
+        scan_stats = time_queries(full_scan, points)
+
+        results = {
+            "benchmark": "nearby",
+            "meta": run_metadata(),
+            "events": args.events,
+            "queries": args.queries,
+            "radius_km": args.radius,
+            "limit": args.limit,
+            "knn_index": knn_stats,
+            "haversine_scan": scan_stats,
+        }
+
+        print("\n" + "=" * 70)
+        print("📊 RÉSULTATS")
+        print("=" * 70)
+        print(f"\n🚀 KNN indexé:      p50={knn_stats['p50_ms']} ms  p95={knn_stats['p95_ms']} ms")
+        print(f"🐢 Scan Haversine:  p50={scan_stats['p50_ms']} ms  p95={scan_stats['p95_ms']} ms")
+
+        output = save_results("nearby", results)
+        print(f"\n💾 Résultats sauvegardés dans {output}")
+
+    finally:
+        if not args.keep:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM events WHERE source = 'benchmark'")
+            conn.commit()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
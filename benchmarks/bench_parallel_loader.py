@@ -0,0 +1,77 @@
+"""
+Benchmark - Passage à l'échelle du loader parallèle
+
+Recharge complètement la collection enrichie (MongoDB locale) avec
+1, 2, 4 puis 8 workers (etl/parallel_loader.py) et mesure durée, lignes/s
+et accélération par rapport à un worker. La durée comprend la reconstruction
+des compteurs event_count après les workers ; les compteurs sont vérifiés
+contre un recomptage complet (etl/counters.py) après chaque mesure.
+
+⚠️ Recrée le schéma de la base ciblée avant chaque mesure.
+
+Usage :
+    python benchmarks/bench_parallel_loader.py --workers 1,2,4,8
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+
+from benchmarks.common import run_metadata, save_results
+from benchmarks.seed_postgres import INDEXES_FILE, SCHEMA_FILE
+from etl.counters import verify
+from etl.loader import PostgreSQLLoader
+from etl.parallel_loader import parallel_load
+
+
+def main():
+    """🚀 Point d'entrée principal"""
+    parser = argparse.ArgumentParser(description="Benchmark du loader parallèle")
+    parser.add_argument("--workers", default="1,2,4,8", help="Nombres de workers (liste)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Taille des lots")
+    parser.add_argument("--output", default=None, help="Fichier JSON de sortie")
+    args = parser.parse_args()
+
+    loader = PostgreSQLLoader()
+    if not loader.connect():
+        sys.exit(1)
+
+    runs = []
+    for workers in [int(w) for w in args.workers.split(",") if w.strip()]:
+        loader.initialize_schema(SCHEMA_FILE, INDEXES_FILE)
+        stats = parallel_load(loader, workers, args.batch_size)
+        mismatches = sum(len(rows) for rows in verify(loader.conn).values())
+        runs.append({
+            "workers": workers,
+            "processed": stats.get("processed", 0),
+            "errors": stats.get("errors", 0),
+            "seconds": stats.get("seconds"),
+            "rows_per_sec": stats.get("rows_per_sec"),
+            "counters_seconds": stats.get("counters_seconds"),
+            "counter_mismatches": mismatches,
+            "peak_rss_mb": stats.get("peak_rss_mb"),
+        })
+        print(f"👷 {workers} worker(s): {stats.get('processed', 0)} événements en {stats.get('seconds')}s "
+              f"→ {stats.get('rows_per_sec')} lignes/s (compteurs {stats.get('counters_seconds')}s, "
+              f"{'✅' if not mismatches else f'❌ {mismatches} divergent(s)'})")
+
+    loader.disconnect()
+
+    baseline = runs[0]["rows_per_sec"] if runs and runs[0]["rows_per_sec"] else None
+    for run in runs:
+        run["speedup"] = round(run["rows_per_sec"] / baseline, 2) if baseline else None
+        print(f"📈 {run['workers']} worker(s): x{run['speedup']}")
+
+    results = {
+        "benchmark": "parallel_loader",
+        "meta": run_metadata(),
+        "batch_size": args.batch_size,
+        "runs": runs,
+    }
+    print(f"💾 Résultats: {save_results('parallel_loader', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Benchmark - Élagage des partitions mensuelles (events par event_date)
+
+Sur le jeu synthétique publié (benchmarks/seed_postgres.py), mesure la
+latence de GET /events et de GET /stats filtrés sur une période
+(EventService.get_events / get_stats avec date_from / date_to), avec
+l'élagage des partitions activé puis désactivé (enable_partition_pruning),
+et compte les partitions lues d'après EXPLAIN. Vérifie que les deux modes
+renvoient les mêmes résultats.
+
+Usage :
+    python benchmarks/seed_postgres.py --events 1000000
+    python benchmarks/bench_partitions.py --queries 100 --days 14
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import random
+import time
+from datetime import date, timedelta
+from typing import Dict, List, Tuple
+
+import psycopg
+from psycopg.rows import dict_row
+
+from api.config import DatabaseConfig
+from api.service import EventService
+from benchmarks.common import latency_summary, run_metadata, save_results
+from benchmarks.seed_postgres import SEED_DAYS, SEED_DAYS_BEFORE
+
+# Requête représentative du filtre de période (comptage des partitions lues)
+EXPLAIN_SQL = """
+    EXPLAIN (FORMAT JSON)
+    SELECT COUNT(*) FROM events e
+    WHERE e.event_date >= %s AND e.event_date <= %s
+"""
+
+
+def random_periods(rng: random.Random, count: int, days: int) -> List[Tuple[date, date]]:
+    """Périodes de `days` jours tirées dans la fenêtre du jeu synthétique"""
+    start = date.today() - timedelta(days=SEED_DAYS_BEFORE)
+    periods = []
+    for _ in range(count):
+        date_from = start + timedelta(days=rng.randrange(max(1, SEED_DAYS - days)))
+        periods.append((date_from, date_from + timedelta(days=days - 1)))
+    return periods
+
+
+def scanned_partitions(conn, period: Tuple[date, date]) -> int:
+    """Nombre de partitions de events présentes dans le plan"""
+    cursor = conn.cursor()
+    cursor.execute(EXPLAIN_SQL, period)
+    plan = cursor.fetchone()["QUERY PLAN"][0]["Plan"]
+
+    relations = set()
+    nodes = [plan]
+    while nodes:
+        node = nodes.pop()
+        if node.get("Relation Name", "").startswith("events_p"):
+            relations.add(node["Relation Name"])
+        nodes.extend(node.get("Plans", []))
+    return len(relations)
+
+
+def measure(func, periods) -> List[float]:
+    latencies = []
+    for date_from, date_to in periods:
+        start = time.perf_counter()
+        func(date_from=date_from, date_to=date_to)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def run_mode(conn, pruning: bool, periods) -> Dict:
+    """Latences de /events et /stats, et partitions lues, pour un mode"""
+    cursor = conn.cursor()
+    cursor.execute(f"SET enable_partition_pruning = {'on' if pruning else 'off'}")
+
+    listing = measure(lambda **p: EventService.get_events(conn, **p), periods)
+    stats = measure(lambda **p: EventService.get_stats(conn, **p), periods)
+    return {
+        "partitions_scanned": scanned_partitions(conn, periods[0]),
+        "events": latency_summary(listing),
+        "stats": latency_summary(stats),
+    }
+
+
+def main():
+    """🚀 Point d'entrée principal"""
+    parser = argparse.ArgumentParser(description="Benchmark de l'élagage des partitions")
+    parser.add_argument("--queries", type=int, default=100, help="Nombre de périodes par mode")
+    parser.add_argument("--days", type=int, default=14, help="Longueur des périodes (jours)")
+    parser.add_argument("--seed", type=int, default=42, help="Graine des périodes")
+    parser.add_argument("--output", default=None, help="Fichier JSON de sortie")
+    args = parser.parse_args()
+
+    periods = random_periods(random.Random(args.seed), args.queries, args.days)
+
+    with psycopg.connect(DatabaseConfig.get_postgres_dsn(), row_factory=dict_row) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) AS n FROM pg_inherits WHERE inhparent = 'events'::regclass")
+        partitions = cursor.fetchone()["n"]
+
+        # Mêmes résultats avec et sans élagage
+        identical = True
+        for date_from, date_to in periods[:5]:
+            outputs = []
+            for pruning in ("on", "off"):
+                cursor.execute(f"SET enable_partition_pruning = {pruning}")
+                outputs.append((
+                    EventService.get_events(conn, date_from=date_from, date_to=date_to),
+                    EventService.get_stats(conn, date_from=date_from, date_to=date_to),
+                ))
+            identical &= outputs[0] == outputs[1]
+
+        # Premier passage non mesuré (cache PostgreSQL chaud pour les deux modes)
+        run_mode(conn, True, periods[:10])
+        pruned = run_mode(conn, True, periods)
+        unpruned = run_mode(conn, False, periods)
+        cursor.execute("RESET enable_partition_pruning")
+
+    def speedup(route: str) -> float:
+        pruned_ms = pruned[route]["p50_ms"]
+        return round(unpruned[route]["p50_ms"] / pruned_ms, 1) if pruned_ms else None
+
+    results = {
+        "benchmark": "partitions",
+        "meta": run_metadata(),
+        "queries": args.queries,
+        "days": args.days,
+        "partitions": partitions,
+        "identical": identical,
+        "pruning_on": pruned,
+        "pruning_off": unpruned,
+        "speedup_p50": {"events": speedup("events"), "stats": speedup("stats")},
+    }
+
+    print(f"🗓️ {partitions} partitions mensuelles, périodes de {args.days} jours")
+    print(f"✂️ Élagage:      {pruned['partitions_scanned']} partition(s) lue(s), "
+          f"/events p50={pruned['events']['p50_ms']} ms, /stats p50={pruned['stats']['p50_ms']} ms")
+    print(f"🐢 Sans élagage: {unpruned['partitions_scanned']} partition(s) lue(s), "
+          f"/events p50={unpruned['events']['p50_ms']} ms, /stats p50={unpruned['stats']['p50_ms']} ms")
+    print(f"{'✅' if identical else '❌'} Résultats identiques: {identical}")
+    print(f"📈 Accélération p50: /events x{results['speedup_p50']['events']}, /stats x{results['speedup_p50']['stats']}")
+    print(f"💾 Résultats: {save_results('partitions', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Benchmark - Pipeline ETL de bout en bout
+
+Génère N documents RAW synthétiques (benchmarks/generate_raw.py), puis
+chronomètre chaque étape séparément et l'ensemble :
+génération, insertion RAW (MongoDB), enrichissement (détail géocodage /
+catégorisation / dates), insertion des documents enrichis, chargement
+PostgreSQL (détail lecture MongoDB / transformation / écriture).
+
+MongoDB : base dédiée (--mongo-database, vidée à chaque run).
+⚠️ Recrée le schéma PostgreSQL de la base ciblée.
+
+Géocodage "offline" (défaut) : aucun appel HTTP, seules les coordonnées de
+la source sont utilisées ; "online" interroge l'API adresse (lent, limité),
+à travers le cache SQLite du géocodage : un second run sur les mêmes
+documents ne fait plus d'appel HTTP (taux de hit dans les résultats).
+
+Usage :
+    python benchmarks/bench_pipeline.py --events 10000
+    python benchmarks/bench_pipeline.py --events 100000 --batch-size 2000
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import logging
+import time
+from typing import Callable, Dict
+
+from benchmarks.common import run_metadata, save_results
+from benchmarks.generate_raw import generate_raw_documents, insert_documents
+from benchmarks.seed_postgres import INDEXES_FILE, SCHEMA_FILE
+from enrichment.enrichment_pipeline import EnrichmentPipeline
+from etl.loader import PostgreSQLLoader
+from storage.mongodb_client import MongoDBClient
+
+# Enrichisseur -> attribut de EnrichmentPipeline
+ENRICHERS = {
+    "geocoding": "geo_enricher",
+    "categorization": "cat_enricher",
+    "dates": "date_enricher",
+}
+
+
+def use_database(client: MongoDBClient, name: str):
+    """Redirige le client vers la base de benchmark"""
+    client.database_name = name
+    client.db = client.client[name]
+    client.raw = client.db[client.raw_collection_name]
+    client.enriched = client.db[client.enriched_collection_name]
+
+
+def _timed(func: Callable, timings: Dict[str, float], key: str) -> Callable:
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings[key] += time.perf_counter() - start
+    return wrapper
+
+
+def enrich_all(pipeline: EnrichmentPipeline, client: MongoDBClient, batch_size: int, stages: Dict[str, float]) -> Dict:
+    """Enrichit events_raw vers events_enriched (mêmes documents que process_all_events)"""
+    counts = {"success": 0, "failed": 0}
+    batch = []
+
+    def flush():
+        start = time.perf_counter()
+        client.enriched.insert_many(batch, ordered=False)
+        stages["mongo_enriched_insert"] += time.perf_counter() - start
+        batch.clear()
+
+    start = time.perf_counter()
+    for raw_event in client.raw.find().batch_size(batch_size):
+        enriched_doc = pipeline.build_document(raw_event)
+        counts[enriched_doc["status"]] += 1
+        batch.append(enriched_doc)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    stages["enrich"] += time.perf_counter() - start - stages["mongo_enriched_insert"]
+    return counts
+
+
+def main():
+    """🚀 Point d'entrée principal"""
+    parser = argparse.ArgumentParser(description="Benchmark du pipeline ETL de bout en bout")
+    parser.add_argument("--events", type=int, default=10_000, help="Nombre de documents RAW")
+    parser.add_argument("--seed", type=int, default=42, help="Graine aléatoire")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Taille des lots (MongoDB et loader)")
+    parser.add_argument("--geocoding", choices=["offline", "online"], default="offline",
+                        help="offline : sans appel HTTP ; online : API adresse")
+    parser.add_argument("--mongo-database", default="cultural_events_bench", help="Base MongoDB de benchmark")
+    parser.add_argument("--output", default=None, help="Fichier JSON de sortie")
+    args = parser.parse_args()
+
+    # Pas de log par événement (les enrichisseurs journalisent leurs erreurs une à une)
+    logging.disable(logging.ERROR)
+
+    print("=" * 70)
+    print(f"🏁 BENCHMARK PIPELINE ({args.events} événements, géocodage {args.geocoding})")
+    print("=" * 70 + "\n")
+
+    stages = {name: 0.0 for name in (
+        "generate", "mongo_raw_insert", "enrich", "mongo_enriched_insert", "postgres_load",
+    )}
+    wall_start = time.perf_counter()
+
+    start = time.perf_counter()
+    documents = list(generate_raw_documents(args.events, args.seed))
+    stages["generate"] = time.perf_counter() - start
+
+    client = MongoDBClient()
+    if not client.connect():
+        sys.exit(1)
+    use_database(client, args.mongo_database)
+    client.raw.drop()
+    client.enriched.drop()
+
+    start = time.perf_counter()
+    insert_documents(client.raw, iter(documents), args.batch_size)
+    stages["mongo_raw_insert"] = time.perf_counter() - start
+
+    # Enrichissement, avec le temps de chaque enrichisseur
+    pipeline = EnrichmentPipeline()
+    enricher_timings = {name: 0.0 for name in ENRICHERS}
+    for name, attribute in ENRICHERS.items():
+        enricher = getattr(pipeline, attribute)
+        enricher.enrich_record = _timed(enricher.enrich_record, enricher_timings, name)
+    if args.geocoding == "offline":
+        pipeline.geo_enricher._geocode_address = lambda record: None
+        pipeline.geo_enricher._reverse_geocode = lambda lat, lon: {}
+    enrichment = enrich_all(pipeline, client, args.batch_size, stages)
+    pipeline.geo_enricher.close()
+
+    # Chargement PostgreSQL depuis la base de benchmark
+    loader = PostgreSQLLoader()
+    loader.mongo_client = client
+    if not loader.connect():
+        sys.exit(1)
+    loader.initialize_schema(SCHEMA_FILE, INDEXES_FILE)
+    start = time.perf_counter()
+    load = loader.load_all_events(batch_size=args.batch_size)
+    stages["postgres_load"] = time.perf_counter() - start
+    loader.disconnect()
+
+    wall = time.perf_counter() - wall_start
+
+    results = {
+        "benchmark": "pipeline",
+        "meta": run_metadata(),
+        "events": args.events,
+        "seed": args.seed,
+        "batch_size": args.batch_size,
+        "geocoding": args.geocoding,
+        "stages": {
+            name: {
+                "seconds": round(seconds, 3),
+                "rows_per_sec": round(args.events / seconds, 1) if seconds else None,
+            }
+            for name, seconds in stages.items()
+        },
+        "enrichment": {
+            **enrichment,
+            "seconds": {name: round(seconds, 3) for name, seconds in enricher_timings.items()},
+            "geocoding_cache": pipeline.geo_enricher.cache.get_stats(),
+        },
+        "load": {key: load.get(key) for key in (
+            "processed", "inserted", "updated", "skipped", "errors", "timings", "peak_rss_mb",
+        )},
+        "end_to_end": {
+            "seconds": round(wall, 3),
+            "rows_per_sec": round(args.events / wall, 1),
+        },
+    }
+
+    for name, stage in results["stages"].items():
+        print(f"⏱️ {name:<22} {stage['seconds']:>9.2f}s  {stage['rows_per_sec'] or 0:>10.1f} lignes/s")
+    print(f"   🧩 enrichisseurs: {results['enrichment']['seconds']}")
+    if args.geocoding == "online":
+        print(f"   🗺️ cache géocodage: {results['enrichment']['geocoding_cache']['hit_rate']}% de hits")
+    print(f"   🗄️ chargement: {results['load']['timings']} ({results['load']['inserted']} insérés, {results['load']['errors']} erreurs)")
+    print(f"🏁 Bout en bout: {wall:.1f}s → {results['end_to_end']['rows_per_sec']} événements/s")
+    print(f"💾 Résultats: {save_results(f'pipeline_{args.events}', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark - Appariement RAW / enrichi dans le loader
+
+Compare, pour N documents enrichis, l'ancienne lecture des documents RAW
+(un find_one par événement) à la lecture par lots ($in + projection,
+PostgreSQLLoader.fetch_raw_documents). Lecture seule.
+
+Usage :
+    python benchmarks/bench_raw_fetch.py --documents 10000 --batch-size 1000
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+
+from benchmarks.common import run_metadata, save_results
+from etl.loader import PostgreSQLLoader
+
+
+def main():
+    """🚀 Point d'entrée principal"""
+    parser = argparse.ArgumentParser(description="Benchmark de la lecture des documents RAW")
+    parser.add_argument("--documents", type=int, default=10_000, help="Nombre de documents enrichis")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Taille des lots $in")
+    parser.add_argument("--output", default=None, help="Fichier JSON de sortie")
+    args = parser.parse_args()
+
+    loader = PostgreSQLLoader()
+    if not loader.mongo_client.connect():
+        sys.exit(1)
+
+    enriched_docs = list(loader.mongo_client.enriched.find({}, {"raw_id": 1}).limit(args.documents))
+    count = len(enriched_docs)
+
+    start = time.perf_counter()
+    found_single = sum(
+        1 for doc in enriched_docs
+        if loader.mongo_client.raw.find_one({"_id": doc.get("raw_id")})
+    )
+    per_event = time.perf_counter() - start
+
+    start = time.perf_counter()
+    found_batched = 0
+    for offset in range(0, count, args.batch_size):
+        found_batched += len(loader.fetch_raw_documents(enriched_docs[offset:offset + args.batch_size]))
+    batched = time.perf_counter() - start
+
+    loader.mongo_client.disconnect()
+
+    results = {
+        "benchmark": "raw_fetch",
+        "meta": run_metadata(),
+        "documents": count,
+        "batch_size": args.batch_size,
+        "per_event": {"seconds": round(per_event, 3), "found": found_single},
+        "batched": {"seconds": round(batched, 3), "found": found_batched},
+        "speedup": round(per_event / batched, 1) if batched else None,
+    }
+
+    print(f"🐢 find_one par événement: {per_event:.2f}s ({found_single}/{count})")
+    print(f"🚀 $in par lots de {args.batch_size}: {batched:.2f}s ({found_batched}/{count})")
+    print(f"📈 Accélération: x{results['speedup']}")
+    print(f"💾 Résultats: {save_results('raw_fetch', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
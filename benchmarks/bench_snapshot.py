@@ -0,0 +1,96 @@
+"""
+Benchmark - Mode snapshot de GET /events
+
+Charge le catalogue publié dans un snapshot colonnaire (api/snapshot.py),
+mesure le temps de chargement et la mémoire par million d'événements, puis
+compare la latence d'un même mélange de filtres servi depuis la mémoire et
+depuis PostgreSQL (EventService.get_events).
+
+Usage :
+    python benchmarks/seed_postgres.py --events 1000000
+    python benchmarks/bench_snapshot.py --queries 500
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import random
+import time
+
+import psycopg
+from psycopg.rows import dict_row
+
+from api.config import DatabaseConfig
+from api.service import EventService
+from api.snapshot import EventSnapshot
+from benchmarks.common import latency_summary, run_metadata, save_results
+from benchmarks.load_test import SEASONS, ARRONDISSEMENTS
+from benchmarks.seed_postgres import CATEGORIES
+
+
+def random_filters(rng: random.Random) -> dict:
+    """Mélange de filtres proche de /events (1 à 3 filtres, pages 1-5, facettes parfois)"""
+    filters = [
+        ("category", lambda: rng.choice(CATEGORIES)[0]),
+        ("arrondissement", lambda: rng.choice(ARRONDISSEMENTS)),
+        ("is_free", lambda: True),
+        ("is_weekend", lambda: rng.choice([True, False])),
+        ("season", lambda: rng.choice(SEASONS)),
+    ]
+    params = {name: value() for name, value in rng.sample(filters, rng.randint(1, 3))}
+    params["page"] = rng.randint(1, 5)
+    params["facets"] = rng.random() < 0.2
+    return params
+
+
+def measure(func, queries) -> list:
+    latencies = []
+    for params in queries:
+        start = time.perf_counter()
+        func(**params)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main():
+    """🚀 Point d'entrée principal"""
+    parser = argparse.ArgumentParser(description="Benchmark du mode snapshot")
+    parser.add_argument("--queries", type=int, default=500, help="Nombre de requêtes par mode")
+    parser.add_argument("--seed", type=int, default=42, help="Graine du mélange de filtres")
+    parser.add_argument("--output", default=None, help="Fichier JSON de sortie")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    queries = [random_filters(rng) for _ in range(args.queries)]
+
+    with psycopg.connect(DatabaseConfig.get_postgres_dsn(), row_factory=dict_row) as conn:
+        start = time.perf_counter()
+        snapshot = EventSnapshot.load(conn)
+        load_ms = (time.perf_counter() - start) * 1000
+        memory = snapshot.memory_stats()
+        print(f"📸 Snapshot: {memory['events']} événements en {load_ms:.0f} ms, "
+              f"{memory['memory_mb']} MB ({memory['memory_mb_per_million_events']} MB/million)")
+
+        postgres = measure(lambda **p: EventService.get_events(conn, **p), queries)
+
+    in_memory = measure(snapshot.get_events, queries)
+
+    results = {
+        "benchmark": "snapshot",
+        "meta": run_metadata(),
+        "queries": args.queries,
+        "load_ms": round(load_ms, 1),
+        "memory": memory,
+        "postgres": latency_summary(postgres),
+        "snapshot": latency_summary(in_memory),
+    }
+
+    print(f"🐘 PostgreSQL p50={results['postgres']['p50_ms']} ms  p95={results['postgres']['p95_ms']} ms")
+    print(f"⚡ Snapshot   p50={results['snapshot']['p50_ms']} ms  p95={results['snapshot']['p95_ms']} ms")
+    print(f"💾 Résultats: {save_results('snapshot', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Benchmark - Transformation MongoDB -> PostgreSQL
+
+Compare, sur N documents synthétiques (benchmarks/generate_raw.py), la
+transformation ligne à ligne (DataTransformer.transform_event) au mode lot
+en colonnes (transform_batch), avec et sans reconstruction des dicts
+d'événements attendus par le loader. Vérifie que les valeurs sont identiques.
+Aucune base de données requise.
+
+Usage :
+    python benchmarks/bench_transform.py --events 100000 --batch-size 1000
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import gc
+import logging
+import random
+import time
+from typing import Callable, Dict, List, Tuple
+
+from benchmarks.common import run_metadata, save_results
+from benchmarks.generate_raw import generate_raw_documents
+from etl.transformer import DataTransformer
+
+CATEGORIES = [("Musique", "Jazz"), ("Musique", None), ("Spectacle", "Théâtre"), ("Exposition", None), ("Autre", None)]
+
+
+def make_pairs(count: int, seed: int) -> List[Tuple[Dict, Dict]]:
+    """(document RAW, document enrichi) tels que produits par l'enrichissement"""
+    rng = random.Random(seed)
+    pairs = []
+    for i, raw_doc in enumerate(generate_raw_documents(count, seed)):
+        raw_doc = dict(raw_doc, _id=f"{i:024x}")
+        payload = raw_doc["payload"]
+        if raw_doc["source"] == "openagenda":
+            start = payload["timings"][0]["start"].replace(".000Z", "+00:00")
+        else:
+            start = payload["dates"]["start"]
+        main, sub = rng.choice(CATEGORIES)
+        data = {
+            "city": "Paris",
+            "latitude": round(48.85 + rng.gauss(0, 0.02), 6),
+            "longitude": round(2.35 + rng.gauss(0, 0.03), 6),
+            "geocoded": True,
+            "arrondissement": str(rng.randint(1, 20)),
+            "main_category": main,
+            "sub_category": sub,
+            "confidence": round(rng.random(), 2),
+            "keywords": ["concert"] if main == "Musique" else [],
+            "is_free": rng.random() < 0.35,
+        }
+        # Dates manquantes ou jour seul dans une partie des documents
+        roll = rng.random()
+        if roll < 0.8:
+            data["event_datetime"] = start
+        elif roll < 0.95:
+            data["event_date"] = start[:10]
+        pairs.append((raw_doc, {"raw_id": raw_doc["_id"], "data": data}))
+    return pairs
+
+
+def batches(pairs: List, batch_size: int):
+    for offset in range(0, len(pairs), batch_size):
+        yield pairs[offset:offset + batch_size]
+
+
+def timed(func: Callable):
+    """(résultat, secondes), ramasse-miettes coupé comme dans timeit"""
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        result = func()
+        return result, time.perf_counter() - start
+    finally:
+        gc.enable()
+
+
+def transform_records(transformer: DataTransformer, pairs: List, batch_size: int) -> List[Dict]:
+    records = []
+    for batch in batches(pairs, batch_size):
+        records.extend(DataTransformer.records(transformer.transform_batch(batch)[0]))
+    return records
+
+
+def main():
+    """🚀 Point d'entrée principal"""
+    parser = argparse.ArgumentParser(description="Benchmark de la transformation par lots")
+    parser.add_argument("--events", type=int, default=100_000, help="Nombre de documents")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Taille des lots")
+    parser.add_argument("--seed", type=int, default=42, help="Graine aléatoire")
+    parser.add_argument("--output", default=None, help="Fichier JSON de sortie")
+    args = parser.parse_args()
+
+    # Documents sans champ exploitable : erreurs attendues, pas de log par ligne
+    logging.disable(logging.ERROR)
+
+    pairs = make_pairs(args.events, args.seed)
+
+    transformer = DataTransformer()
+    per_row, per_row_seconds = timed(
+        lambda: [transformer.transform_event(raw_doc, enriched_doc) for raw_doc, enriched_doc in pairs]
+    )
+    column_batches, columns_seconds = timed(
+        lambda: [transformer.transform_batch(batch)[0] for batch in batches(pairs, args.batch_size)]
+    )
+    records, records_seconds = timed(lambda: transform_records(DataTransformer(), pairs, args.batch_size))
+
+    identical = records == [event_data for event_data in per_row if event_data]
+    rows = sum(len(columns["raw_id"]) for columns in column_batches)
+
+    def rate(seconds: float) -> float:
+        return round(args.events / seconds, 1) if seconds else None
+
+    results = {
+        "benchmark": "transform",
+        "meta": run_metadata(),
+        "events": args.events,
+        "rows": rows,
+        "batch_size": args.batch_size,
+        "identical": identical,
+        "per_row": {"seconds": round(per_row_seconds, 3), "rows_per_sec": rate(per_row_seconds)},
+        "columns": {"seconds": round(columns_seconds, 3), "rows_per_sec": rate(columns_seconds)},
+        "columns_to_records": {"seconds": round(records_seconds, 3), "rows_per_sec": rate(records_seconds)},
+        "speedup": round(per_row_seconds / columns_seconds, 1) if columns_seconds else None,
+    }
+
+    print(f"🐢 transform_event: {per_row_seconds:.2f}s ({results['per_row']['rows_per_sec']} lignes/s)")
+    print(f"🚀 transform_batch: {columns_seconds:.2f}s ({results['columns']['rows_per_sec']} lignes/s)")
+    print(f"📦 transform_batch + dicts: {records_seconds:.2f}s ({results['columns_to_records']['rows_per_sec']} lignes/s)")
+    print(f"{'✅' if identical else '❌'} Valeurs identiques: {identical}")
+    print(f"📈 Accélération: x{results['speedup']}")
+    print(f"💾 Résultats: {save_results('transform', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
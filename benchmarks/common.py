@@ -0,0 +1,64 @@
+"""
+Outils communs aux benchmarks (percentiles, métadonnées, sauvegarde des résultats)
+"""
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+from datetime import datetime
+from typing import Dict, List
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentile par rang le plus proche (valeurs non vides)"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def latency_summary(latencies_ms: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/moyenne/max en millisecondes"""
+    if not latencies_ms:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "mean_ms": 0.0, "max_ms": 0.0}
+    return {
+        "p50_ms": round(percentile(latencies_ms, 50), 3),
+        "p95_ms": round(percentile(latencies_ms, 95), 3),
+        "p99_ms": round(percentile(latencies_ms, 99), 3),
+        "mean_ms": round(statistics.mean(latencies_ms), 3),
+        "max_ms": round(max(latencies_ms), 3),
+    }
+
+
+def run_metadata() -> Dict[str, str]:
+    """Contexte d'exécution pour comparer des runs entre eux"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        commit = "unknown"
+
+    return {
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": str(os.cpu_count()),
+    }
+
+
+def save_results(name: str, results: Dict, output: str = None) -> str:
+    """Sauvegarde les résultats en JSON (benchmarks/results/<name>.json par défaut)"""
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{name}.json")
+
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False, default=str)
+
+    return output
@@ -0,0 +1,308 @@
+"""
+Benchmark - Documents RAW synthétiques
+
+Génère N documents bruts reproductibles (graine fixe) aux formats des
+collecteurs : "paris_open_data" (payload normalisé de Que faire à Paris) et
+"openagenda" (événement OpenAgenda tel quel). Catégories et arrondissements
+asymétriques, adresses avec ou sans coordonnées, descriptions HTML, formats
+de dates variés et doublons (même raw_hash, nouveau fetched_at).
+
+Usage :
+    python benchmarks/generate_raw.py --events 100000 --output events_raw.json
+    python benchmarks/generate_raw.py --events 100000 --mongo-database cultural_events_bench
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import hashlib
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Dict, Iterator
+
+# (catégorie source Que faire à Paris, poids) - distribution volontairement asymétrique
+PARIS_CATEGORIES = [
+    ("Concerts -> Jazz", 10), ("Concerts -> Classique", 8), ("Concerts -> Pop / Variété", 6),
+    ("Concerts -> Rock", 4), ("Concerts -> Musiques du Monde", 3), ("Concerts -> Électronique", 2),
+    ("Spectacles -> Théâtre", 12), ("Spectacles -> Humour", 5), ("Spectacles -> Danse", 4),
+    ("Expositions -> Art Contemporain", 9), ("Expositions -> Photographie", 4),
+    ("Expositions -> Peinture", 4), ("Animations -> Conférence", 6), ("Animations -> Atelier", 7),
+    ("Animations -> Visite guidée", 5), ("Cinéma -> Projection", 4), ("Sport -> Course", 1),
+    (None, 2),
+]
+
+# Mots-clés OpenAgenda par thème (même asymétrie, libellés libres)
+OPENAGENDA_THEMES = [
+    (["concert", "jazz"], 10), (["concert", "orchestre", "classique"], 8), (["théâtre", "comédie"], 10),
+    (["exposition", "art contemporain"], 9), (["atelier", "enfants", "famille"], 7),
+    (["conférence", "débat"], 6), (["danse", "ballet"], 4), (["cinéma", "projection"], 4),
+    (["balade", "patrimoine"], 3), ([], 3),
+]
+
+VENUES = [
+    "Philharmonie de Paris", "Le Sunset", "New Morning", "Théâtre du Châtelet", "Bibliothèque Forney",
+    "Maison de la Poésie", "Centre Pompidou", "Le 104", "La Gaîté Lyrique", "Mairie du 11e",
+    "Médiathèque Marguerite Duras", "Parc de la Villette", "Musée Carnavalet", "Le Hasard Ludique",
+    "Bibliothèque Václav Havel", "Théâtre de la Ville", "Pavillon de l'Arsenal", "Le Comedy Club",
+]
+
+STREETS = [
+    "rue de Rivoli", "boulevard Voltaire", "rue Oberkampf", "avenue Jean Jaurès", "rue de la Roquette",
+    "rue des Pyrénées", "boulevard de Belleville", "rue du Faubourg Saint-Antoine", "quai de la Seine",
+    "rue Saint-Maur", "avenue de France", "rue de Vaugirard", "rue Lecourbe", "boulevard Raspail",
+    "rue de Ménilmontant", "place de la République", "rue du Temple", "rue Mouffetard",
+]
+
+# Communes limitrophes (hors arrondissements)
+SUBURBS = [("Montreuil", "93100", 48.8638, 2.4485), ("Saint-Denis", "93200", 48.9362, 2.3574),
+           ("Boulogne-Billancourt", "92100", 48.8397, 2.2399), ("Vincennes", "94300", 48.8474, 2.4397)]
+
+# Centre approximatif de chaque arrondissement (lat, lon)
+ARRONDISSEMENT_CENTERS = [
+    (48.8625, 2.3364), (48.8683, 2.3428), (48.8630, 2.3600), (48.8543, 2.3576), (48.8445, 2.3507),
+    (48.8491, 2.3328), (48.8562, 2.3121), (48.8727, 2.3125), (48.8770, 2.3374), (48.8761, 2.3608),
+    (48.8591, 2.3800), (48.8350, 2.4213), (48.8283, 2.3623), (48.8292, 2.3265), (48.8401, 2.2928),
+    (48.8604, 2.2620), (48.8873, 2.3067), (48.8925, 2.3481), (48.8871, 2.3848), (48.8634, 2.4012),
+]
+
+TITLE_WORDS = [
+    "Nuit", "Carte blanche", "Rencontre", "Festival", "Soirée", "Lecture", "Atelier", "Balade",
+    "Hommage", "Création", "Cycle", "Résidence", "Scène ouverte", "Masterclass", "Vernissage",
+]
+
+SENTENCES = [
+    "Une soirée exceptionnelle avec des artistes de la scène parisienne.",
+    "Entrée libre dans la limite des places disponibles.",
+    "Réservation conseillée, spectacle familial à partir de 6 ans.",
+    "L'orchestre interprète un programme consacré au répertoire classique.",
+    "Une exposition qui réunit photographie et peinture contemporaine.",
+    "Atelier créatif pour les enfants accompagnés de leurs parents.",
+    "Conférence suivie d'un débat avec le public.",
+    "Un quartet de jazz revisite les standards des années 50.",
+    "Visite guidée du patrimoine du quartier par une conférencière.",
+    "Comédie déjantée, mise en scène par une jeune compagnie.",
+]
+
+PRICE_DETAILS = [
+    "Plein tarif : 25 €<br>Tarif réduit : 15 €", "10 €", "De 8 € à 22 €",
+    "Gratuit sur réservation", "Tarif unique : 5 €", "Pass 3 jours : 40 €",
+]
+
+
+def generate_hash(data: Dict) -> str:
+    """Hash du contenu comme les collecteurs (raw_hash)"""
+    return hashlib.md5(json.dumps(data, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+def _html_description(rng: random.Random) -> str:
+    sentences = rng.sample(SENTENCES, rng.randint(2, 5))
+    parts = [f"<p>{sentences[0]}</p>"]
+    for sentence in sentences[1:]:
+        parts.append(rng.choice([
+            f"<p>{sentence}</p>",
+            f"<p><strong>{sentence}</strong></p>",
+            f"<br/>{sentence}&nbsp;",
+            f"<ul><li>{sentence}</li></ul>",
+        ]))
+    return "".join(parts)
+
+
+def _place(rng: random.Random) -> Dict:
+    """Adresse, code postal, ville et coordonnées (arrondissements centraux plus représentés)"""
+    if rng.random() < 0.06:
+        city, zipcode, lat, lon = rng.choice(SUBURBS)
+    else:
+        arr_num = min(20, max(1, int(abs(rng.gauss(0, 7))) + 1))
+        lat, lon = ARRONDISSEMENT_CENTERS[arr_num - 1]
+        city, zipcode = "Paris", f"750{arr_num:02d}"
+    return {
+        "venue": rng.choice(VENUES),
+        "street": f"{rng.randint(1, 180)} {rng.choice(STREETS)}",
+        "zipcode": zipcode,
+        "city": city,
+        "lat": round(lat + rng.gauss(0, 0.006), 6),
+        "lon": round(lon + rng.gauss(0, 0.008), 6),
+    }
+
+
+def _start(rng: random.Random, base: datetime) -> datetime:
+    day = base + timedelta(days=int(rng.expovariate(1 / 120)) % 455)
+    hour = rng.choice([10, 11, 14, 15, 18, 19, 20, 20, 21, 23])
+    return day.replace(hour=hour, minute=rng.choice([0, 0, 30]), second=0, microsecond=0)
+
+
+def paris_open_data_payload(rng: random.Random, i: int, base: datetime) -> Dict:
+    """Payload normalisé du collecteur Que faire à Paris"""
+    category = rng.choices([c[0] for c in PARIS_CATEGORIES], [c[1] for c in PARIS_CATEGORIES])[0]
+    place = _place(rng)
+    start = _start(rng, base)
+    end = start + timedelta(hours=2) if rng.random() < 0.8 else start + timedelta(days=rng.randint(1, 60))
+    is_free = rng.random() < 0.35
+    tags = rng.sample(["Musique", "Enfants", "Gratuit", "Plein air", "Nocturne", "Expo", "Théâtre"], rng.randint(0, 3))
+
+    return {
+        "id": f"{i:08x}{rng.getrandbits(32):08x}",
+        "title": f"{rng.choice(TITLE_WORDS)} {category.split(' -> ')[-1].lower() if category else 'surprise'} #{i}",
+        "description": _html_description(rng),
+        "category": category,
+        "tags": tags,
+        "address": {
+            "street": place["street"] if rng.random() < 0.95 else None,
+            "zipcode": place["zipcode"],
+            "city": place["city"],
+            "name": place["venue"],
+        },
+        # Coordonnées absentes : géocodage de l'adresse nécessaire
+        "location": [place["lat"], place["lon"]] if rng.random() < 0.8 else None,
+        "dates": {
+            "start": start.strftime("%Y-%m-%dT%H:%M:%S+01:00"),
+            "end": end.strftime("%Y-%m-%dT%H:%M:%S+01:00"),
+            "description": f"Le {start.day:02d}/{start.month:02d}/{start.year} à {start.hour}h{start.minute:02d}",
+        },
+        "contact": {
+            "url": f"https://www.example-billetterie.fr/evenement/{i}" if rng.random() < 0.7 else None,
+            "phone": f"01 {rng.randint(40, 59)} {rng.randint(10, 99)} {rng.randint(10, 99)} {rng.randint(10, 99)}" if rng.random() < 0.4 else None,
+            "email": f"contact{i % 500}@example.org" if rng.random() < 0.3 else None,
+        },
+        "price": {
+            "type": rng.choice(["gratuit", "gratuit sous condition"]) if is_free else "payant",
+            "detail": "Entrée libre" if is_free else rng.choice(PRICE_DETAILS),
+        },
+        "accessibility": rng.choice([None, "PMR", "PMR;Malvoyant", "Malentendant"]),
+        "audience": rng.choice(["Tout public.", "Adultes.", "Enfants à partir de 6 ans.", None]),
+    }
+
+
+def openagenda_payload(rng: random.Random, i: int, base: datetime) -> Dict:
+    """Événement OpenAgenda brut (champs multilingues, lieu et horaires imbriqués)"""
+    keywords = rng.choices([t[0] for t in OPENAGENDA_THEMES], [t[1] for t in OPENAGENDA_THEMES])[0]
+    place = _place(rng)
+    start = _start(rng, base)
+    timings = [
+        {"start": (start + timedelta(days=7 * k)).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+         "end": (start + timedelta(days=7 * k, hours=2)).strftime("%Y-%m-%dT%H:%M:%S.000Z")}
+        for k in range(rng.choice([1, 1, 1, 2, 4]))
+    ]
+    is_free = rng.random() < 0.4
+
+    return {
+        "uid": 10_000_000 + i,
+        "slug": f"evenement-{i}",
+        "title": {"fr": f"{rng.choice(TITLE_WORDS)} {' '.join(keywords) or 'découverte'} #{i}"},
+        "description": {"fr": rng.choice(SENTENCES)},
+        "longDescription": {"fr": _html_description(rng)},
+        "keywords": {"fr": list(keywords)},
+        "location": {
+            "name": place["venue"],
+            "address": f"{place['street']}, {place['zipcode']} {place['city']}",
+            "postalCode": place["zipcode"],
+            "city": place["city"],
+            "latitude": place["lat"],
+            "longitude": place["lon"],
+        },
+        "timings": timings,
+        "firstDate": timings[0]["start"][:10],
+        "lastDate": timings[-1]["end"][:10],
+        "conditions": {"fr": "Entrée libre" if is_free else rng.choice(PRICE_DETAILS)},
+        "registrationUrl": f"https://openagenda.com/events/evenement-{i}" if rng.random() < 0.5 else None,
+        "updatedAt": (base - timedelta(minutes=rng.randint(0, 60 * 24 * 30))).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+    }
+
+
+def generate_raw_documents(
+    count: int,
+    seed: int = 42,
+    openagenda_share: float = 0.3,
+    duplicate_rate: float = 0.03
+) -> Iterator[Dict]:
+    """
+    Documents RAW (sans _id) : ~openagenda_share au format OpenAgenda, le reste
+    au format Que faire à Paris. duplicate_rate des documents sont des
+    recollectes d'un document déjà émis (même payload et raw_hash).
+    """
+    rng = random.Random(seed)
+    base = datetime(2026, 1, 1)
+    fetched_at = datetime(2026, 1, 1, 6, 0)
+    recent = []
+
+    for i in range(count):
+        fetched_at += timedelta(milliseconds=rng.randint(5, 50))
+
+        if recent and rng.random() < duplicate_rate:
+            source, payload, raw_hash = rng.choice(recent)
+        elif rng.random() < openagenda_share:
+            payload = openagenda_payload(rng, i, base)
+            source, raw_hash = "openagenda", generate_hash(payload)
+        else:
+            payload = paris_open_data_payload(rng, i, base)
+            source, raw_hash = "paris_open_data", generate_hash(payload)
+
+        # Fenêtre bornée de candidats aux doublons (mémoire constante)
+        if len(recent) < 1000:
+            recent.append((source, payload, raw_hash))
+        else:
+            recent[rng.randrange(1000)] = (source, payload, raw_hash)
+
+        yield {
+            "source": source,
+            "fetched_at": fetched_at.isoformat() + "Z",
+            "raw_hash": raw_hash,
+            "payload": payload,
+        }
+
+
+def insert_documents(collection, documents: Iterator[Dict], batch_size: int = 1000) -> int:
+    """insert_many par lots ; renvoie le nombre de documents insérés"""
+    inserted = 0
+    while True:
+        # Copies : insert_many ajoute _id aux dicts (doublons partagés)
+        batch = [dict(doc) for doc in islice(documents, batch_size)]
+        if not batch:
+            return inserted
+        inserted += len(collection.insert_many(batch, ordered=False).inserted_ids)
+
+
+def main():
+    """🚀 Point d'entrée principal"""
+    parser = argparse.ArgumentParser(description="Documents RAW synthétiques")
+    parser.add_argument("--events", type=int, default=10_000, help="Nombre de documents")
+    parser.add_argument("--seed", type=int, default=42, help="Graine aléatoire (reproductibilité)")
+    parser.add_argument("--openagenda-share", type=float, default=0.3, help="Part de documents OpenAgenda")
+    parser.add_argument("--duplicate-rate", type=float, default=0.03, help="Part de doublons recollectés")
+    parser.add_argument("--output", default=None, help="Fichier JSON (sinon insertion MongoDB)")
+    parser.add_argument("--mongo-database", default="cultural_events_bench",
+                        help="Base MongoDB cible (events_raw y est vidée)")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("🌱 DOCUMENTS RAW SYNTHÉTIQUES")
+    print("=" * 70 + "\n")
+
+    documents = generate_raw_documents(args.events, args.seed, args.openagenda_share, args.duplicate_rate)
+    start = time.perf_counter()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(list(documents), f, ensure_ascii=False)
+        print(f"✅ {args.events} documents écrits dans {args.output} en {time.perf_counter() - start:.1f}s")
+        return
+
+    from storage.mongodb_client import MongoDBClient
+
+    client = MongoDBClient()
+    if not client.connect():
+        sys.exit(1)
+    collection = client.client[args.mongo_database]["events_raw"]
+    collection.drop()
+    inserted = insert_documents(collection, documents)
+    client.disconnect()
+    print(f"✅ {inserted} documents insérés dans {args.mongo_database}.events_raw en {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Benchmark - Test de charge HTTP de l'API
+
+Rejoue un mélange réaliste de requêtes (/events filtrés, pages profondes,
+/search, /stats, détails) à plusieurs niveaux de concurrence, et produit
+un rapport JSON (débit, p50/p95/p99) comparable d'un run à l'autre.
+
+Usage :
+    python benchmarks/seed_postgres.py --events 100000
+    uvicorn api.main:app --port 8000 --workers 4
+    python benchmarks/load_test.py --concurrency 1,8,32 --duration 30
+    python benchmarks/load_test.py --baseline benchmarks/results/load_test.json
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Callable, Dict, List, Tuple
+
+import httpx
+
+from benchmarks.common import latency_summary, run_metadata, save_results
+from benchmarks.seed_postgres import CATEGORIES, VOCABULARY
+
+SEASONS = ["Printemps", "Été", "Automne", "Hiver"]
+ARRONDISSEMENTS = ["1er"] + [f"{n}e" for n in range(2, 21)]
+
+
+# ============================================================
+# SCÉNARIOS
+# ============================================================
+
+def events_default(rng: random.Random, ctx: Dict) -> Tuple[str, Dict]:
+    return "/events", {"page": rng.randint(1, 5)}
+
+
+def events_filtered(rng: random.Random, ctx: Dict) -> Tuple[str, Dict]:
+    params = {}
+    filters = [
+        ("category", lambda: rng.choice(CATEGORIES)[0]),
+        ("arrondissement", lambda: rng.choice(ARRONDISSEMENTS)),
+        ("is_free", lambda: "true"),
+        ("is_weekend", lambda: rng.choice(["true", "false"])),
+        ("season", lambda: rng.choice(SEASONS)),
+    ]
+    for name, value in rng.sample(filters, rng.randint(1, 3)):
+        params[name] = value()
+    return "/events", params
+
+
+def events_deep_page(rng: random.Random, ctx: Dict) -> Tuple[str, Dict]:
+    page_size = 20
+    last_page = max(1, ctx["total_events"] // page_size)
+    return "/events", {"page": rng.randint(max(1, last_page // 2), last_page), "page_size": page_size}
+
+
+def search(rng: random.Random, ctx: Dict) -> Tuple[str, Dict]:
+    return "/search", {"q": rng.choice(VOCABULARY), "limit": 20}
+
+
+def stats(rng: random.Random, ctx: Dict) -> Tuple[str, Dict]:
+    return "/stats", {}
+
+
+def detail(rng: random.Random, ctx: Dict) -> Tuple[str, Dict]:
+    return f"/events/{rng.randint(1, ctx['max_event_id'])}", {}
+
+
+# (nom, poids, générateur de requête)
+SCENARIOS: List[Tuple[str, int, Callable]] = [
+    ("events_default", 25, events_default),
+    ("events_filtered", 20, events_filtered),
+    ("events_deep_page", 10, events_deep_page),
+    ("search", 15, search),
+    ("stats", 10, stats),
+    ("detail", 20, detail),
+]
+
+
+# ============================================================
+# EXÉCUTION
+# ============================================================
+
+async def worker(client: httpx.AsyncClient, worker_id: int, seed: int, ctx: Dict,
+                 deadline: float, samples: List[Tuple[str, int, float]]):
+    """Boucle fermée : une requête à la fois jusqu'à l'échéance"""
+    rng = random.Random(seed * 1000 + worker_id)
+    names = [s[0] for s in SCENARIOS]
+    weights = [s[1] for s in SCENARIOS]
+    builders = {s[0]: s[2] for s in SCENARIOS}
+
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        path, params = builders[name](rng, ctx)
+        start = time.perf_counter()
+        try:
+            response = await client.get(path, params=params)
+            status = response.status_code
+        except httpx.HTTPError:
+            status = 0
+        samples.append((name, status, (time.perf_counter() - start) * 1000))
+
+
+async def run_level(base_url: str, concurrency: int, duration: float, warmup: float,
+                    seed: int, ctx: Dict, timeout: float) -> Dict:
+    """Mesure un niveau de concurrence"""
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        if warmup > 0:
+            await asyncio.gather(*(
+                worker(client, i, seed + 1, ctx, time.perf_counter() + warmup, [])
+                for i in range(concurrency)
+            ))
+
+        samples: List[Tuple[str, int, float]] = []
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*(
+            worker(client, i, seed, ctx, deadline, samples)
+            for i in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+
+    ok = [s for s in samples if 200 <= s[1] < 400]
+    by_scenario = {}
+    for name, _, _ in SCENARIOS:
+        scenario_samples = [s for s in samples if s[0] == name]
+        scenario_ok = [s[2] for s in scenario_samples if 200 <= s[1] < 400]
+        by_scenario[name] = {
+            "requests": len(scenario_samples),
+            "errors": len(scenario_samples) - len(scenario_ok),
+            "latency": latency_summary(scenario_ok),
+        }
+
+    status_counts: Dict[str, int] = {}
+    for _, status, _ in samples:
+        status_counts[str(status)] = status_counts.get(str(status), 0) + 1
+
+    return {
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 3),
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+        "latency": latency_summary([s[2] for s in ok]),
+        "status_codes": status_counts,
+        "by_scenario": by_scenario,
+    }
+
+
+async def discover_dataset(base_url: str, timeout: float) -> Dict:
+    """Taille du jeu de données servi (pour les pages profondes et les détails)"""
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout) as client:
+        response = await client.get("/events", params={"page": 1, "page_size": 1})
+        response.raise_for_status()
+        total = response.json()["total"]
+    return {"total_events": total, "max_event_id": max(1, total)}
+
+
+def compare(current: Dict, baseline: Dict):
+    """Affiche l'écart avec un run de référence (même niveaux de concurrence)"""
+    reference = {level["concurrency"]: level for level in baseline.get("levels", [])}
+
+    print("\n" + "=" * 70)
+    print("📐 COMPARAISON AVEC LA RÉFÉRENCE")
+    print("=" * 70)
+
+    for level in current["levels"]:
+        ref = reference.get(level["concurrency"])
+        if not ref:
+            continue
+
+        def delta(new, old):
+            return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+        print(
+            f"\n👥 c={level['concurrency']:>3}  "
+            f"débit {delta(level['throughput_rps'], ref['throughput_rps'])}  "
+            f"p50 {delta(level['latency']['p50_ms'], ref['latency']['p50_ms'])}  "
+            f"p95 {delta(level['latency']['p95_ms'], ref['latency']['p95_ms'])}  "
+            f"p99 {delta(level['latency']['p99_ms'], ref['latency']['p99_ms'])}"
+        )
+
+
+def main():
+    """🚀 Point d'entrée principal"""
+    parser = argparse.ArgumentParser(description="Test de charge HTTP de l'API")
+    parser.add_argument("--base-url", default="http://localhost:8000", help="URL de l'API")
+    parser.add_argument("--concurrency", default="1,8,32", help="Niveaux de concurrence (liste)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Durée de mesure par niveau (s)")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Échauffement par niveau (s)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Timeout HTTP (s)")
+    parser.add_argument("--seed", type=int, default=42, help="Graine du mélange de requêtes")
+    parser.add_argument("--output", default=None, help="Fichier JSON de sortie")
+    parser.add_argument("--baseline", default=None, help="Rapport JSON de référence à comparer")
+    args = parser.parse_args()
+
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    # Lu avant le run : la sortie par défaut peut écraser le même fichier
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    print("=" * 70)
+    print("🔥 TEST DE CHARGE API")
+    print("=" * 70 + "\n")
+
+    ctx = asyncio.run(discover_dataset(args.base_url, args.timeout))
+    print(f"📊 Jeu de données: {ctx['total_events']} événements\n")
+
+    report = {
+        "benchmark": "load_test",
+        "meta": run_metadata(),
+        "config": {
+            "base_url": args.base_url,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "seed": args.seed,
+            "scenarios": {name: weight for name, weight, _ in SCENARIOS},
+            "dataset_events": ctx["total_events"],
+        },
+        "levels": [],
+    }
+
+    for concurrency in levels:
+        print(f"⏳ Concurrence {concurrency}...")
+        result = asyncio.run(run_level(
+            args.base_url, concurrency, args.duration, args.warmup, args.seed, ctx, args.timeout
+        ))
+        report["levels"].append(result)
+        print(
+            f"   ✅ {result['throughput_rps']} req/s  "
+            f"p50={result['latency']['p50_ms']} ms  "
+            f"p95={result['latency']['p95_ms']} ms  "
+            f"p99={result['latency']['p99_ms']} ms  "
+            f"erreurs={result['errors']}"
+        )
+
+    output = save_results("load_test", report, args.output)
+    print(f"\n💾 Rapport sauvegardé dans {output}")
+
+    if baseline:
+        compare(report, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Benchmark - Jeu de données synthétique PostgreSQL
+
+Recrée le schéma (sql/schema.sql) puis insère N événements synthétiques
+reproductibles (graine fixe) via COPY : catégories et arrondissements
+asymétriques, dates sur 15 mois, descriptions pour la recherche plein texte.
+
+⚠️ Supprime les données existantes de la base ciblée.
+
+Usage :
+    python benchmarks/seed_postgres.py --events 100000 --seed 42
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+import psycopg
+
+from api.config import DatabaseConfig
+
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sql", "schema.sql")
+INDEXES_FILE = os.path.join(os.path.dirname(SCHEMA_FILE), "indexes.sql")
+
+# (catégorie, parent, poids) - distribution volontairement asymétrique
+CATEGORIES = [
+    ("Musique", None, 30), ("Jazz", "Musique", 8), ("Classique", "Musique", 6),
+    ("Rock", "Musique", 4), ("Théâtre", None, 15), ("Comédie", "Théâtre", 6),
+    ("Exposition", None, 14), ("Photographie", "Exposition", 4), ("Peinture", "Exposition", 4),
+    ("Danse", None, 5), ("Cinéma", None, 6), ("Conférence", None, 5),
+    ("Sport", None, 2), ("Autre", None, 3),
+]
+
+VOCABULARY = [
+    "concert", "jazz", "quartet", "orchestre", "symphonie", "festival", "spectacle",
+    "comédie", "théâtre", "exposition", "peinture", "photographie", "sculpture",
+    "danse", "ballet", "cinéma", "projection", "documentaire", "conférence", "débat",
+    "atelier", "famille", "enfants", "gratuit", "nocturne", "musée", "galerie",
+    "jardin", "bibliothèque", "patrimoine", "visite", "balade", "lecture", "poésie",
+    "rencontre", "artiste", "création", "contemporain", "classique", "improvisation",
+]
+
+CITIES = [("Paris", 90), ("Montreuil", 3), ("Saint-Denis", 3), ("Boulogne-Billancourt", 2), ("Vincennes", 2)]
+
+EVENT_COLUMNS = [
+    "raw_id", "source", "title", "description", "keywords", "city_id",
+    "address_street", "zipcode", "arrondissement", "latitude", "longitude",
+    "distance_center", "geocoded", "event_date", "event_datetime",
+    "is_multi_day", "duration_days", "price_type", "is_free",
+    "accessibility_score",
+]
+
+
+# Fenêtre des dates générées : 90 jours passés, 455 jours au total
+SEED_DAYS_BEFORE = 90
+SEED_DAYS = 455
+
+
+def generate_events(count: int, seed: int, city_ids: dict):
+    """Génère (ligne events, catégorie principale, sous-catégorie)"""
+    rng = random.Random(seed)
+    start = date.today() - timedelta(days=SEED_DAYS_BEFORE)
+    names = [c[0] for c in CATEGORIES]
+    weights = [c[2] for c in CATEGORIES]
+    parents = {c[0]: c[1] for c in CATEGORIES}
+    city_names = [c[0] for c in CITIES]
+    city_weights = [c[1] for c in CITIES]
+
+    for i in range(1, count + 1):
+        category = rng.choices(names, weights)[0]
+        # Arrondissements centraux plus représentés
+        arr_num = min(20, max(1, int(abs(rng.gauss(0, 7))) + 1))
+        city = rng.choices(city_names, city_weights)[0]
+        day = start + timedelta(days=int(rng.expovariate(1 / 120)) % SEED_DAYS)
+        hour = rng.choice([10, 14, 15, 18, 19, 20, 20, 21])
+        dt = datetime(day.year, day.month, day.day, hour, rng.choice([0, 30]))
+        words = rng.sample(VOCABULARY, 12)
+        is_free = rng.random() < 0.3
+        lat = 48.815 + rng.random() * 0.087
+        lon = 2.224 + rng.random() * 0.246
+
+        row = (
+            f"seed{i:020d}",
+            "synthetic",
+            f"{words[0].capitalize()} {words[1]} {category.lower()} #{i}",
+            " ".join(words) + ".",
+            words[:3],
+            city_ids[city],
+            f"{rng.randint(1, 200)} rue {words[4]}",
+            f"750{arr_num:02d}" if city == "Paris" else None,
+            (f"{arr_num}e" if arr_num > 1 else "1er") if city == "Paris" else None,
+            round(lat, 6),
+            round(lon, 6),
+            round(rng.uniform(0.2, 9.0), 2),
+            True,
+            dt.date(),
+            dt,
+            False,
+            None,
+            "gratuit" if is_free else "payant",
+            is_free,
+            round(rng.random(), 2),
+        )
+        sub_category = category if parents[category] else None
+        main_category = parents[category] or category
+        yield row, main_category, sub_category
+
+
+def seed(conn, count: int, seed_value: int):
+    """Recrée le schéma et insère `count` événements synthétiques"""
+    cursor = conn.cursor()
+
+    with open(SCHEMA_FILE, "r", encoding="utf-8") as f:
+        cursor.execute(f.read())
+
+    for name, _ in CITIES:
+        cursor.execute("INSERT INTO cities (name) VALUES (%s) ON CONFLICT (name) DO NOTHING", (name,))
+    cursor.execute("SELECT name, id FROM cities")
+    city_ids = dict(cursor.fetchall())
+
+    cursor.execute("CREATE TEMP TABLE seed_links (raw_id VARCHAR(24), category VARCHAR(100), is_primary BOOLEAN)")
+
+    # Partitions mensuelles de toute la fenêtre (pas de partition par défaut)
+    start = date.today() - timedelta(days=SEED_DAYS_BEFORE)
+    cursor.execute("SELECT ensure_event_partitions(%s, %s)", (start, start + timedelta(days=SEED_DAYS)))
+
+    links = []
+    with cursor.copy(f"COPY events ({', '.join(EVENT_COLUMNS)}) FROM STDIN") as copy:
+        for row, main_category, sub_category in generate_events(count, seed_value, city_ids):
+            copy.write_row(row)
+            links.append((row[0], main_category, True))
+            if sub_category:
+                links.append((row[0], sub_category, False))
+
+    with cursor.copy("COPY seed_links (raw_id, category, is_primary) FROM STDIN") as copy:
+        for link in links:
+            copy.write_row(link)
+
+    cursor.execute("""
+        INSERT INTO event_categories (event_id, event_date, category_id, is_primary, confidence)
+        SELECT e.id, e.event_date, c.id, l.is_primary, 0.8
+        FROM seed_links l
+        JOIN events e ON e.raw_id = l.raw_id
+        JOIN categories c ON c.name = l.category
+        ON CONFLICT DO NOTHING
+    """)
+
+    # Index secondaires après le chargement en masse
+    with open(INDEXES_FILE, "r", encoding="utf-8") as f:
+        cursor.execute(f.read())
+    conn.commit()
+
+    conn.autocommit = True
+    cursor.execute("VACUUM ANALYZE")
+    conn.autocommit = False
+
+
+def main():
+    """🚀 Point d'entrée principal"""
+    parser = argparse.ArgumentParser(description="Jeu de données synthétique PostgreSQL")
+    parser.add_argument("--events", type=int, default=100_000, help="Nombre d'événements")
+    parser.add_argument("--seed", type=int, default=42, help="Graine aléatoire (reproductibilité)")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("🌱 JEU DE DONNÉES SYNTHÉTIQUE")
+    print("=" * 70 + "\n")
+    print(f"🎯 Base: {DatabaseConfig.POSTGRES_HOST}:{DatabaseConfig.POSTGRES_PORT}/{DatabaseConfig.POSTGRES_DATABASE}")
+
+    start = time.perf_counter()
+    with psycopg.connect(DatabaseConfig.get_postgres_dsn()) as conn:
+        seed(conn, args.events, args.seed)
+
+    print(f"✅ {args.events} événements insérés en {time.perf_counter() - start:.1f}s (graine {args.seed})\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,13 @@
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 import re
 from typing import Dict, List, Set
 import logging
 
+from enrichment.extractors import EventRecord, extract
+
 logger = logging.getLogger(__name__)
 
 
@@ -88,7 +94,11 @@ class CategorizationEnricher:
         }
     
     def enrich(self, event: Dict) -> Dict:
-        """Enrichit un événement avec catégorisation"""
+        """Enrichit un événement RAW avec catégorisation"""
+        return self.enrich_record(extract(event))
+    
+    def enrich_record(self, record: EventRecord) -> Dict:
+        """Catégorise un événement extrait (enrichment/extractors.py)"""
         result = {
             "main_category": "Autre",
             "sub_category": None,
@@ -97,18 +107,15 @@ class CategorizationEnricher:
         }
         
         try:
-            payload = event.get("payload", {})
-            
-            # Extraire le texte à analyser (avec gestion de None)
-            title = (payload.get("title") or "").lower()
-            description = (payload.get("description") or "").lower()
-            category_source = (payload.get("category") or "").lower()
-            tags = payload.get("tags", [])
+            # Texte à analyser (champs absents : chaîne vide)
+            title = str(record.title or "").lower()
+            description = str(record.description or "").lower()
+            category_source = str(record.category or "").lower()
             
             # Concaténer tout le texte
             full_text = f"{title} {description} {category_source}"
-            if isinstance(tags, list):
-                full_text += " " + " ".join(str(t).lower() for t in tags)
+            if record.tags:
+                full_text += " " + " ".join(tag.lower() for tag in record.tags)
             
             # Chercher les catégories
             scores = {}
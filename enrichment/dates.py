@@ -0,0 +1,133 @@
+"""
+Enrichissement - Parsing des dates
+Parseur partagé par DateEnricher et le transformer :
+- ISO 8601 d'abord (datetime.fromisoformat, "Z" compris) : Que faire à Paris,
+  OpenAgenda et les dates déjà enrichies
+- formats français connus ensuite (15/03/2026, 15/03/2026 20:30)
+- dateutil seulement pour les chaînes restantes, avec les mois et jours
+  français ("samedi 15 mars 2026 à 20h30", "1er août 2026")
+Les chaînes parsées sont mémorisées (LRU borné) : les mêmes dates reviennent
+d'un lot à l'autre (horaires récurrents, ré-enrichissement).
+Toutes les dates sont normalisées en UTC ; une chaîne sans fuseau est une
+heure locale de Paris, un datetime sans fuseau (BSON lu par pymongo) est UTC. to_local redonne l'heure locale stockée dans
+events.event_datetime (TIMESTAMP sans fuseau).
+"""
+
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import NamedTuple, Optional
+from zoneinfo import ZoneInfo
+import logging
+import re
+
+from dateutil import parser as date_parser
+
+logger = logging.getLogger(__name__)
+
+# Fuseau des sources (heure locale des événements)
+LOCAL_TZ = ZoneInfo("Europe/Paris")
+
+# Nombre de chaînes distinctes mémorisées
+CACHE_SIZE = 65536
+
+# Formats des sources non ISO, essayés avant dateutil : (format, avec heure)
+KNOWN_FORMATS = (
+    ("%d/%m/%Y", False),
+    ("%d/%m/%Y %H:%M", True),
+    ("%d/%m/%Y %H:%M:%S", True),
+    ("%d/%m/%Y %Hh%M", True),
+)
+
+# Ordinal du premier du mois ("1er mars") que dateutil ne lit pas
+FIRST_OF_MONTH = re.compile(r"\b1er\b", re.IGNORECASE)
+
+
+class FrenchParserInfo(date_parser.parserinfo):
+    """Mois, jours et mots de liaison français pour dateutil (anglais conservé)"""
+
+    JUMP = date_parser.parserinfo.JUMP + ["le", "à", "a", "du", "au"]
+    # "mar" reste le mois (Mar), mardi s'écrit en entier
+    WEEKDAYS = [
+        ("lun", "lundi", "Mon", "Monday"), ("mardi", "Tue", "Tuesday"),
+        ("mer", "mercredi", "Wed", "Wednesday"), ("jeu", "jeudi", "Thu", "Thursday"),
+        ("ven", "vendredi", "Fri", "Friday"), ("sam", "samedi", "Sat", "Saturday"),
+        ("dim", "dimanche", "Sun", "Sunday"),
+    ]
+    MONTHS = [
+        ("janv", "janvier", "Jan", "January"), ("févr", "février", "fevrier", "Feb", "February"),
+        ("mars", "Mar", "March"), ("avr", "avril", "Apr", "April"), ("mai", "May"),
+        ("juin", "Jun", "June"), ("juil", "juillet", "Jul", "July"),
+        ("août", "aout", "Aug", "August"), ("sept", "septembre", "Sep", "September"),
+        ("oct", "octobre", "Oct", "October"), ("nov", "novembre", "Nov", "November"),
+        ("déc", "décembre", "decembre", "Dec", "December"),
+    ]
+
+    def __init__(self):
+        super().__init__(dayfirst=True)
+
+
+FRENCH = FrenchParserInfo()
+
+
+class ParsedDate(NamedTuple):
+    """Date parsée : instant UTC et présence d'une heure dans la source"""
+    utc: datetime
+    has_time: bool
+
+
+def _to_utc(dt: datetime, naive_tz=LOCAL_TZ) -> datetime:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=naive_tz)
+    return dt.astimezone(timezone.utc)
+
+
+def _parse_fallback(text: str) -> Optional[ParsedDate]:
+    """dateutil (lent) : formats inconnus, français compris"""
+    text = FIRST_OF_MONTH.sub("1", text)
+    midnight = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    try:
+        dt = date_parser.parse(text, FRENCH, default=midnight)
+        # Heure absente de la chaîne : elle suit la valeur par défaut
+        has_time = date_parser.parse(text, FRENCH, default=midnight.replace(hour=12)).hour == dt.hour
+        return ParsedDate(_to_utc(dt), has_time)
+    except (ValueError, OverflowError) as e:
+        logger.debug(f"Impossible de parser la date '{text}': {e}")
+        return None
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse_text(text: str) -> Optional[ParsedDate]:
+    """Chaîne -> ParsedDate (None si illisible), mémorisée"""
+    iso = text[:-1] + "+00:00" if text.endswith(("Z", "z")) else text
+    try:
+        # Heure ISO : après "T" ou une espace (2026-03-15T20:00, 20260315T2000)
+        return ParsedDate(_to_utc(datetime.fromisoformat(iso)), any(c in text for c in "Tt "))
+    except ValueError:
+        pass
+
+    for fmt, has_time in KNOWN_FORMATS:
+        try:
+            return ParsedDate(_to_utc(datetime.strptime(text, fmt)), has_time)
+        except ValueError:
+            continue
+
+    return _parse_fallback(text)
+
+
+def parse_date(value) -> Optional[ParsedDate]:
+    """Chaîne (heure de Paris si sans fuseau) ou datetime (UTC si sans fuseau) -> ParsedDate"""
+    if isinstance(value, datetime):
+        return ParsedDate(_to_utc(value, timezone.utc), True)
+    if isinstance(value, str) and value.strip():
+        return _parse_text(value.strip())
+    return None
+
+
+def to_local(dt: datetime) -> datetime:
+    """Instant UTC -> heure locale de Paris sans fuseau"""
+    return dt.astimezone(LOCAL_TZ).replace(tzinfo=None)
+
+
+def cache_info():
+    """Statistiques du cache de parsing (hits, misses, currsize...)"""
+    return _parse_text.cache_info()
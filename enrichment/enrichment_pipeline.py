@@ -3,8 +3,10 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from datetime import datetime
-from typing import Dict, List
+import argparse
+from datetime import date, datetime
+from itertools import islice
+from typing import Dict, List, Optional
 from bson import ObjectId
 import logging
 
@@ -12,10 +14,21 @@ from storage.mongodb_client import MongoDBClient
 from enrichment.geocoding import GeocodingEnricher
 from enrichment.categorization import CategorizationEnricher
 from enrichment.date_processor import DateEnricher
+from enrichment.extractors import EventRecord, extract
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Version des enrichisseurs : à incrémenter quand leur sortie change
+# (règles de catégorisation, géocodage, dates...) pour tout ré-enrichir
+ENRICHER_VERSION = 2
+
+# Documents RAW lus et comparés à events_enriched par requête
+BATCH_SIZE = 500
+
+# Champs des documents enrichis comparés au document RAW
+STATE_PROJECTION = {"raw_id": 1, "status": 1, "raw_hash": 1, "enricher_version": 1}
+
 
 class EnrichmentPipeline:
     """Pipeline complet d'enrichissement"""
@@ -42,27 +55,29 @@ class EnrichmentPipeline:
         return False
     
     def enrich_event(self, raw_event: Dict) -> Dict:
-        """Enrichit un seul événement"""
+        """Enrichit un seul événement (payload extrait une fois, selon sa source)"""
         enriched_data = {}
         
         try:
+            record = extract(raw_event)
+            
             # 1. Géocodage
             logger.debug("Enrichissement géographique...")
-            geo_data = self.geo_enricher.enrich(raw_event)
+            geo_data = self.geo_enricher.enrich_record(record)
             enriched_data.update(geo_data)
             
             # 2. Catégorisation
             logger.debug("Catégorisation...")
-            cat_data = self.cat_enricher.enrich(raw_event)
+            cat_data = self.cat_enricher.enrich_record(record)
             enriched_data.update(cat_data)
             
             # 3. Dates
             logger.debug("Parsing des dates...")
-            date_data = self.date_enricher.enrich(raw_event)
+            date_data = self.date_enricher.enrich_record(record)
             enriched_data.update(date_data)
             
             # 4. Enrichissements additionnels
-            enriched_data["is_free"] = self._check_if_free(raw_event)
+            enriched_data["is_free"] = self._check_if_free(record)
             enriched_data["accessibility_score"] = self._calculate_accessibility(enriched_data)
             
         except Exception as e:
@@ -71,18 +86,12 @@ class EnrichmentPipeline:
         
         return enriched_data
     
-    def _check_if_free(self, event: Dict) -> bool:
+    def _check_if_free(self, record: EventRecord) -> bool:
         """Détermine si l'événement est gratuit"""
-        payload = event.get("payload", {})
-        price_info = payload.get("price", {})
+        price_type = str(record.price_type or "").lower()
+        price_detail = str(record.price_detail or "").lower()
         
-        if isinstance(price_info, dict):
-            price_type = price_info.get("type", "").lower()
-            price_detail = str(price_info.get("detail", "")).lower()
-            
-            return "gratuit" in price_type or "gratuit" in price_detail or "free" in price_type
-        
-        return False
+        return "gratuit" in price_type or "gratuit" in price_detail or "free" in price_type
     
     def _calculate_accessibility(self, enriched_data: Dict) -> float:
         """Calcule un score d'accessibilité (0-1)"""
@@ -104,29 +113,74 @@ class EnrichmentPipeline:
         if enriched_data.get("geocoded"):
             score += 0.3
         
-        # +0.2 si weekend
-        if enriched_data.get("is_weekend"):
+        # +0.2 si weekend (samedi, dimanche)
+        event_date = enriched_data.get("event_date")
+        if event_date and date.fromisoformat(event_date).isoweekday() >= 6:
             score += 0.2
         
         return round(min(score, 1.0), 2)
     
-    def process_all_events(self, limit: Optional[int] = None) -> Dict:
-        """Enrichit tous les événements RAW"""
+    @staticmethod
+    def is_unchanged(raw_event: Dict, existing: Optional[Dict]) -> bool:
+        """
+        Vrai si le document enrichi existant correspond au contenu RAW actuel
+        (même raw_hash) et à la version courante des enrichisseurs. Les échecs
+        sont retentés ; sans raw_hash, aucun changement n'est détectable.
+        """
+        if not existing or existing.get("status") == "failed":
+            return False
+        raw_hash = raw_event.get("raw_hash")
+        return (
+            raw_hash is not None
+            and existing.get("raw_hash") == raw_hash
+            and existing.get("enricher_version") == ENRICHER_VERSION
+        )
+    
+    def build_document(self, raw_event: Dict) -> Dict:
+        """Document events_enriched d'un événement RAW (succès ou échec)"""
+        try:
+            data, status, error = self.enrich_event(raw_event), "success", None
+        except Exception as e:
+            data, status, error = {}, "failed", {"message": str(e)}
+        return {
+            "raw_id": raw_event["_id"],
+            "raw_hash": raw_event.get("raw_hash"),
+            "enricher_version": ENRICHER_VERSION,
+            "status": status,
+            "enriched_at": datetime.utcnow(),
+            "data": data,
+            "error": error,
+        }
+    
+    def process_all_events(self, limit: Optional[int] = None, force: bool = False) -> Dict:
+        """
+        Enrichit les événements RAW nouveaux ou modifiés.
+        
+        Un événement dont le raw_hash et la version des enrichisseurs n'ont pas
+        changé depuis son dernier enrichissement est ignoré (stats["skipped"]) :
+        ni géocodage ni écriture, et enriched_at inchangé, donc pas de
+        rechargement PostgreSQL. `force` ré-enrichit tout.
+        
+        Un passage complet (sans `limit`) marque ensuite supprimés les
+        événements dont le document RAW a disparu (tombstone_missing).
+        """
         if not self.is_connected:
             logger.error("Pas de connexion MongoDB")
-            return {"processed": 0, "success": 0, "failed": 0}
+            return {"processed": 0, "success": 0, "failed": 0, "skipped": 0, "changed": 0, "deleted": 0}
         
         stats = {
             "processed": 0,
             "success": 0,
             "failed": 0,
-            "skipped": 0
+            "skipped": 0,
+            "changed": 0,
+            "deleted": 0
         }
         
         try:
             # Récupérer les événements RAW
             query = {}
-            cursor = self.raw_collection.find(query)
+            cursor = self.raw_collection.find(query).batch_size(BATCH_SIZE)
             
             if limit:
                 cursor = cursor.limit(limit)
@@ -137,63 +191,85 @@ class EnrichmentPipeline:
             
             logger.info(f"Enrichissement de {total} événements...")
             
-            for i, raw_event in enumerate(cursor, 1):
-                try:
+            # Recherche et remplacement par raw_id
+            self.enriched_collection.create_index([("raw_id", 1)])
+            done = 0
+            raw_events = iter(cursor)
+            while True:
+                chunk = list(islice(raw_events, BATCH_SIZE))
+                if not chunk:
+                    break
+                
+                # État enrichi du lot en une requête $in (au lieu d'un find_one par événement)
+                existing = {} if force else {
+                    doc["raw_id"]: doc
+                    for doc in self.enriched_collection.find(
+                        {"raw_id": {"$in": [raw_event["_id"] for raw_event in chunk]}}, STATE_PROJECTION
+                    )
+                }
+                
+                for raw_event in chunk:
                     raw_id = raw_event["_id"]
-                    
-                    # Vérifier si déjà enrichi
-                    existing = self.enriched_collection.find_one({"raw_id": raw_id})
-                    if existing:
+                    previous = existing.get(raw_id)
+                    if self.is_unchanged(raw_event, previous):
                         stats["skipped"] += 1
                         continue
                     
-                    # Enrichir
-                    enriched_data = self.enrich_event(raw_event)
-                    
-                    # Créer le document enriched
-                    enriched_doc = {
-                        "raw_id": raw_id,
-                        "status": "success",
-                        "enriched_at": datetime.utcnow(),
-                        "data": enriched_data,
-                        "error": None
-                    }
-                    
-                    # Insérer
-                    self.enriched_collection.insert_one(enriched_doc)
-                    
-                    stats["success"] += 1
-                    stats["processed"] += 1
-                    
-                    # Afficher progression
-                    if i % 50 == 0:
-                        progress = (i / total) * 100
-                        logger.info(f"⏳ Progression: {i}/{total} ({progress:.1f}%)")
-                
-                except Exception as e:
-                    logger.error(f"Erreur événement {i}: {e}")
-                    
-                    # Insérer un document d'erreur
+                    enriched_doc = self.build_document(raw_event)
                     try:
-                        enriched_doc = {
-                            "raw_id": raw_event["_id"],
-                            "status": "failed",
-                            "enriched_at": datetime.utcnow(),
-                            "data": {},
-                            "error": {"message": str(e)}
-                        }
-                        self.enriched_collection.insert_one(enriched_doc)
-                    except:
-                        pass
+                        # Un document par raw_id, remplacé s'il a changé
+                        self.enriched_collection.replace_one({"raw_id": raw_id}, enriched_doc, upsert=True)
+                    except Exception as e:
+                        logger.error(f"Erreur écriture {raw_id}: {e}")
+                        enriched_doc["status"] = "failed"
                     
-                    stats["failed"] += 1
+                    if enriched_doc["status"] == "success":
+                        stats["success"] += 1
+                    else:
+                        logger.error(f"Erreur événement {raw_id}: {(enriched_doc['error'] or {}).get('message')}")
+                        stats["failed"] += 1
+                    if previous:
+                        stats["changed"] += 1
                     stats["processed"] += 1
+                
+                done += len(chunk)
+                # Afficher progression
+                progress = (done / max(total, 1)) * 100
+                logger.info(f"⏳ Progression: {done}/{total} ({progress:.1f}%), {stats['skipped']} inchangés")
+            
+            # Passage partiel : les RAW non lus ne sont pas forcément supprimés
+            if not limit:
+                stats["deleted"] = self.tombstone_missing()
         
         except Exception as e:
             logger.error(f"Erreur pipeline: {e}")
         
         return stats
     
+    def tombstone_missing(self) -> int:
+        """
+        Marque supprimés (MongoDBClient.tombstone) les événements enrichis dont
+        le document RAW n'est plus dans events_raw (retiré par la source ou
+        supprimé à la main) : le chargement incrémental (etl/loader.py) et
+        etl/sync.py suppriment alors la ligne PostgreSQL correspondante.
+        """
+        tombstoned = 0
+        cursor = self.enriched_collection.find({"status": {"$ne": "deleted"}}, {"raw_id": 1}).batch_size(BATCH_SIZE)
+        enriched_docs = iter(cursor)
+        while True:
+            raw_ids = [doc["raw_id"] for doc in islice(enriched_docs, BATCH_SIZE)]
+            if not raw_ids:
+                break
+            present = {doc["_id"] for doc in self.raw_collection.find({"_id": {"$in": raw_ids}}, {"_id": 1})}
+            for raw_id in raw_ids:
+                if raw_id not in present:
+                    self.client.tombstone(raw_id)
+                    tombstoned += 1
+        
+        if tombstoned:
+            logger.info(f"🪦 {tombstoned} événements marqués supprimés (document RAW disparu)")
+        return tombstoned
+    
     def get_enrichment_stats(self) -> Dict:
         """Statistiques de la collection enriched"""
         if not self.is_connected:
@@ -220,6 +296,12 @@ class EnrichmentPipeline:
 
 def main():
     """🚀 Point d'entrée principal"""
+    parser = argparse.ArgumentParser(description="Enrichissement events_raw → events_enriched")
+    parser.add_argument("--force", action="store_true",
+                        help="Ré-enrichit tout, même les événements inchangés (raw_hash et version)")
+    parser.add_argument("--limit", type=int, default=None, help="Nombre maximal d'événements RAW lus")
+    args = parser.parse_args()
+    
     print("=" * 70)
     print("🎨 PIPELINE D'ENRICHISSEMENT")
     print("=" * 70 + "\n")
@@ -244,23 +326,10 @@ def main():
     enriched_count = pipeline.enriched_collection.count_documents({})
     print(f"📊 Événements déjà enrichis: {enriched_count}")
     
-    if enriched_count >= raw_count:
-        print("\n✅ Tous les événements sont déjà enrichis!")
-        stats = pipeline.get_enrichment_stats()
-        print(f"\n📈 Statistiques:")
-        print(f"   Total: {stats['total']}")
-        print(f"   Succès: {stats['success']}")
-        print(f"   Échecs: {stats['failed']}")
-        print(f"   Taux de succès: {stats['success_rate']}%")
-        pipeline.disconnect()
-        return
-    
-    # Lancer l'enrichissement
-    print(f"\n🚀 Lancement de l'enrichissement...\n")
+    # Les événements déjà enrichis et inchangés (raw_hash, version) sont ignorés
+    print(f"\n🚀 Lancement de l'enrichissement (version {ENRICHER_VERSION}{', forcé' if args.force else ''})...\n")
     
-    # Pour le test, limiter à 50 événements
-    # Retirez limit=50 pour enrichir tous les événements
-    stats = pipeline.process_all_events(limit=None)
+    stats = pipeline.process_all_events(limit=args.limit, force=args.force)
     
     # Résultats
     print("\n" + "=" * 70)
@@ -269,12 +338,22 @@ def main():
     print(f"\n✅ Traités:   {stats['processed']} événements")
     print(f"✅ Succès:    {stats['success']} événements")
     print(f"❌ Échecs:    {stats['failed']} événements")
-    print(f"⏭️ Ignorés:   {stats['skipped']} événements (déjà enrichis)")
+    print(f"🔄 Modifiés:  {stats['changed']} événements (contenu ou version changés)")
+    print(f"⏭️ Inchangés: {stats['skipped']} événements (raw_hash et version identiques)")
+    print(f"🪦 Supprimés: {stats['deleted']} événements (document RAW disparu, supprimés au prochain chargement)")
+    
+    seen = stats['processed'] + stats['skipped']
+    if seen > 0:
+        print(f"\n💡 Travail évité: {stats['skipped']}/{seen} enrichissements ({stats['skipped'] / seen * 100:.1f}%)")
     
     if stats['processed'] > 0:
         success_rate = (stats['success'] / stats['processed']) * 100
         print(f"\n📈 Taux de succès: {success_rate:.1f}%")
     
+    geo_cache = pipeline.geo_enricher.cache.get_stats()
+    print(f"🗺️ Cache géocodage: {geo_cache['hit_rate']}% de hits, "
+          f"{geo_cache['misses']} appels API, {geo_cache['entries']} entrées")
+    
     # Statistiques finales
     final_stats = pipeline.get_enrichment_stats()
     print("\n" + "=" * 70)
@@ -295,17 +374,16 @@ def main():
     for i, doc in enumerate(examples, 1):
         data = doc.get("data", {})
         raw_event = pipeline.raw_collection.find_one({"_id": doc["raw_id"]})
-        title = raw_event.get("payload", {}).get("title", "Sans titre") if raw_event else "N/A"
+        title = (extract(raw_event).title or "Sans titre") if raw_event else "N/A"
         
         print(f"\n{i}. {title}")
         print(f"   📍 Position: {data.get('arrondissement', 'N/A')}")
         print(f"   🏷️ Catégorie: {data.get('main_category', 'N/A')}")
         if data.get('sub_category'):
             print(f"   🏷️ Sous-catégorie: {data['sub_category']}")
-        print(f"   📅 Jour: {data.get('day_of_week_name', 'N/A')}")
-        print(f"   🌦️ Saison: {data.get('season', 'N/A')}")
+        print(f"   📅 Date: {data.get('event_datetime', 'N/A')}")
         print(f"   💰 Gratuit: {'Oui' if data.get('is_free') else 'Non'}")
-        print(f("   ⭐ Accessibilité: {data.get('accessibility_score', 0)}/1"))
+        print(f"   ⭐ Accessibilité: {data.get('accessibility_score', 0)}/1")
     
     pipeline.disconnect()
     print("\n✅ Enrichissement terminé avec succès!\n")
@@ -0,0 +1,169 @@
+"""
+Enrichissement - Extracteurs par source
+Chaque source (paris_open_data, openagenda...) a son extracteur, instancié
+une fois à l'enregistrement : il aplatit le payload d'un document RAW en un
+EventRecord (slots typés). Les enrichisseurs, le transformer et
+etl/enrich_raw_events.py lisent ce record au lieu de reparcourir le payload.
+Ajouter une source = une classe décorée par @register.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+
+@dataclass(slots=True)
+class EventRecord:
+    """Champs d'un événement RAW lus par le pipeline, indépendants de la source"""
+    source: str
+    title: Optional[str] = None
+    description: Optional[str] = None
+    category: Optional[str] = None
+    tags: List[str] = field(default_factory=list)
+    venue: Optional[str] = None
+    street: Optional[str] = None
+    zipcode: Optional[str] = None
+    city: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    start: Any = None  # Chaîne ou datetime, parsé par DateEnricher
+    end: Any = None
+    date: Any = None  # Date brute de repli (anciens payloads)
+    price_type: Optional[str] = None
+    price_detail: Optional[str] = None
+    contact_url: Optional[str] = None
+    contact_phone: Optional[str] = None
+    contact_email: Optional[str] = None
+
+
+def _dict(value) -> Dict:
+    return value if isinstance(value, dict) else {}
+
+
+def _text(value):
+    """Champ multilingue OpenAgenda ({"fr": ...}) -> texte français (ou première langue)"""
+    if isinstance(value, dict):
+        return value.get("fr") or next(iter(value.values()), None)
+    return value
+
+
+class SourceExtractor:
+    """Aplatit le payload d'une source en EventRecord"""
+
+    source = "default"
+    # Champs de premier niveau du payload lus par extract (projection MongoDB)
+    fields: Tuple[str, ...] = ()
+
+    def extract(self, payload: Dict) -> EventRecord:
+        raise NotImplementedError
+
+
+# Extracteurs enregistrés, par valeur du champ "source" des documents RAW
+EXTRACTORS: Dict[str, SourceExtractor] = {}
+
+
+def register(extractor_class: Type[SourceExtractor]) -> Type[SourceExtractor]:
+    """Décorateur : enregistre une instance de l'extracteur pour sa source"""
+    EXTRACTORS[extractor_class.source] = extractor_class()
+    return extractor_class
+
+
+@register
+class ParisOpenDataExtractor(SourceExtractor):
+    """Payload normalisé du collecteur Que faire à Paris (format par défaut)"""
+
+    source = "paris_open_data"
+    fields = ("title", "description", "category", "tags", "address", "location",
+              "dates", "date", "event_date", "price", "contact")
+
+    def extract(self, payload: Dict) -> EventRecord:
+        address = _dict(payload.get("address"))
+        dates = _dict(payload.get("dates"))
+        price = _dict(payload.get("price"))
+        contact = _dict(payload.get("contact"))
+        location = payload.get("location")
+        latitude, longitude = location if isinstance(location, list) and len(location) == 2 else (None, None)
+        tags = payload.get("tags")
+
+        return EventRecord(
+            source=self.source,
+            title=payload.get("title"),
+            description=payload.get("description"),
+            category=payload.get("category"),
+            tags=[str(tag) for tag in tags] if isinstance(tags, list) else [],
+            venue=address.get("name"),
+            street=address.get("street"),
+            zipcode=address.get("zipcode"),
+            city=address.get("city"),
+            latitude=latitude,
+            longitude=longitude,
+            start=dates.get("start"),
+            end=dates.get("end"),
+            date=payload.get("date") or payload.get("event_date"),
+            price_type=price.get("type"),
+            price_detail=price.get("detail"),
+            contact_url=contact.get("url"),
+            contact_phone=contact.get("phone"),
+            contact_email=contact.get("email"),
+        )
+
+
+@register
+class OpenAgendaExtractor(SourceExtractor):
+    """Événement OpenAgenda brut : textes multilingues, lieu et horaires imbriqués"""
+
+    source = "openagenda"
+    fields = ("title", "description", "longDescription", "keywords", "location", "timings",
+              "firstDate", "lastDate", "conditions", "registrationUrl")
+
+    def extract(self, payload: Dict) -> EventRecord:
+        location = _dict(payload.get("location"))
+        timings = [t for t in payload.get("timings") or [] if isinstance(t, dict)]
+        keywords = _text(payload.get("keywords"))
+        zipcode, city = location.get("postalCode"), location.get("city")
+
+        # "12 rue X, 75011 Paris" : code postal et ville ont leurs propres champs
+        street = location.get("address")
+        if isinstance(street, str) and zipcode and city and street.endswith(f", {zipcode} {city}"):
+            street = street[:-len(f", {zipcode} {city}")]
+
+        return EventRecord(
+            source=self.source,
+            title=_text(payload.get("title")),
+            description=_text(payload.get("longDescription")) or _text(payload.get("description")),
+            tags=[str(keyword) for keyword in keywords] if isinstance(keywords, list) else [],
+            venue=location.get("name"),
+            street=street,
+            zipcode=zipcode,
+            city=city,
+            latitude=location.get("latitude"),
+            longitude=location.get("longitude"),
+            start=timings[0].get("start") if timings else payload.get("firstDate"),
+            end=timings[-1].get("end") if timings else payload.get("lastDate"),
+            date=payload.get("firstDate"),
+            price_detail=_text(payload.get("conditions")),
+            contact_url=payload.get("registrationUrl"),
+        )
+
+
+# Sources inconnues : payload normalisé comme celui de Que faire à Paris
+DEFAULT_EXTRACTOR = EXTRACTORS[ParisOpenDataExtractor.source]
+
+
+def extractor_for(source: Optional[str]) -> SourceExtractor:
+    return EXTRACTORS.get(source, DEFAULT_EXTRACTOR)
+
+
+def extract(raw_doc: Dict) -> EventRecord:
+    """Document RAW -> EventRecord (extracteur de sa source)"""
+    payload = _dict(raw_doc.get("payload"))
+    record = extractor_for(raw_doc.get("source")).extract(payload)
+    record.source = raw_doc.get("source", "unknown")
+    return record
+
+
+def payload_projection() -> Dict[str, int]:
+    """Projection MongoDB des documents RAW : champs lus par tous les extracteurs"""
+    projection = {"source": 1}
+    for extractor in EXTRACTORS.values():
+        projection.update({f"payload.{name}": 1 for name in extractor.fields})
+    return projection
@@ -1,24 +1,38 @@
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import requests
 import time
 from typing import Dict, Optional
 import logging
 
+from enrichment.extractors import EventRecord, extract
+from enrichment.geocoding_cache import MISS, REVERSE_PRECISION, GeocodingCache, coordinates_key, normalize_address
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
 class GeocodingEnricher:
-    """Enrichissement géographique via API adresse.data.gouv.fr"""
+    """
+    Enrichissement géographique via API adresse.data.gouv.fr.
+    Les réponses (adresses et reverse geocoding) sont mises en cache dans
+    SQLite (enrichment/geocoding_cache.py) et réutilisées d'un run à l'autre.
+    """
     
-    def __init__(self):
+    def __init__(self, cache: Optional[GeocodingCache] = None):
         self.api_url = "https://api-adresse.data.gouv.fr/search/"
         self.reverse_url = "https://api-adresse.data.gouv.fr/reverse/"
         self.session = requests.Session()
-        self.cache = {}
+        self.cache = cache if cache is not None else GeocodingCache()
     
     def enrich(self, event: Dict) -> Dict:
-        """Enrichit un événement avec données géographiques"""
+        """Enrichit un événement RAW avec données géographiques"""
+        return self.enrich_record(extract(event))
+    
+    def enrich_record(self, record: EventRecord) -> Dict:
+        """Enrichit un événement extrait (enrichment/extractors.py)"""
         result = {
             "latitude": None,
             "longitude": None,
@@ -31,25 +45,21 @@ class GeocodingEnricher:
         }
         
         try:
-            payload = event.get("payload", {})
-            
             # 1. Vérifier coordonnées existantes
-            location = payload.get("location")
-            if location and isinstance(location, list) and len(location) == 2:
-                result["latitude"] = location[0]
-                result["longitude"] = location[1]
+            if record.latitude is not None and record.longitude is not None:
+                result["latitude"] = record.latitude
+                result["longitude"] = record.longitude
                 result["geocoded"] = True
                 result["address_quality"] = "from_source"
                 
                 # Reverse geocoding
-                reverse_data = self._reverse_geocode(location[0], location[1])
+                reverse_data = self._reverse_geocode(record.latitude, record.longitude)
                 if reverse_data:
                     result.update(reverse_data)
             
             # 2. Sinon, géocoder l'adresse
             else:
-                address_data = payload.get("address", {})
-                coords = self._geocode_address(address_data)
+                coords = self._geocode_address(record)
                 
                 if coords:
                     result["latitude"] = coords["lat"]
@@ -78,29 +88,18 @@ class GeocodingEnricher:
         
         return result
     
-    def _geocode_address(self, address_data: Dict) -> Optional[Dict]:
-        """Géocode une adresse"""
-        address_parts = []
-        
-        if isinstance(address_data, dict):
-            street = address_data.get("street") or address_data.get("name")
-            zipcode = address_data.get("zipcode")
-            city = address_data.get("city", "Paris")
-            
-            if street:
-                address_parts.append(street)
-            if zipcode:
-                address_parts.append(zipcode)
-            if city:
-                address_parts.append(city)
-        
-        if not address_parts:
-            return None
+    def _geocode_address(self, record: EventRecord) -> Optional[Dict]:
+        """Géocode l'adresse d'un événement"""
+        address_parts = [
+            str(part) for part in (record.street or record.venue, record.zipcode, record.city or "Paris") if part
+        ]
         
         query = " ".join(address_parts)
+        key = normalize_address(query)
         
-        if query in self.cache:
-            return self.cache[query]
+        cached = self.cache.get("forward", key)
+        if cached is not MISS:
+            return cached
         
         try:
             params = {"q": query, "limit": 1}
@@ -109,7 +108,9 @@ class GeocodingEnricher:
             
             data = response.json()
             features = data.get("features", [])
+            time.sleep(0.1)  # Rate limiting
             
+            result = None
             if features:
                 feature = features[0]
                 geometry = feature.get("geometry", {})
@@ -121,11 +122,10 @@ class GeocodingEnricher:
                     "postcode": properties.get("postcode"),
                     "city": properties.get("city")
                 }
-                
-                self.cache[query] = result
-                time.sleep(0.1)  # Rate limiting
-                
-                return result
+            
+            # Adresse introuvable : mise en cache aussi (cache négatif)
+            self.cache.put("forward", key, result)
+            return result
             
         except Exception as e:
             logger.warning(f"Géocodage échoué: {e}")
@@ -133,23 +133,38 @@ class GeocodingEnricher:
         return None
     
     def _reverse_geocode(self, lat: float, lon: float) -> Dict:
-        """Reverse geocoding"""
+        """Reverse geocoding (coordonnées arrondies : clé du cache et requête)"""
         try:
-            params = {"lat": lat, "lon": lon}
+            # Les sources fournissent parfois des chaînes ("48.8534")
+            lat, lon = float(lat), float(lon)
+        except (TypeError, ValueError):
+            logger.warning(f"Coordonnées invalides: {lat}, {lon}")
+            return {}
+        
+        key = coordinates_key(lat, lon)
+        cached = self.cache.get("reverse", key)
+        if cached is not MISS:
+            return cached or {}
+        
+        try:
+            params = {"lat": round(lat, REVERSE_PRECISION), "lon": round(lon, REVERSE_PRECISION)}
             response = self.session.get(self.reverse_url, params=params, timeout=5)
             response.raise_for_status()
             
             data = response.json()
             features = data.get("features", [])
             
+            result = None
             if features:
                 properties = features[0].get("properties", {})
-                return {
+                result = {
                     "postcode": properties.get("postcode"),
                     "city": properties.get("city")
                 }
-        except:
-            pass
+            self.cache.put("reverse", key, result)
+            return result or {}
+        except (requests.RequestException, ValueError) as e:
+            logger.warning(f"Reverse geocoding échoué: {e}")
         
         return {}
     
@@ -181,8 +196,10 @@ class GeocodingEnricher:
         return round(R * c, 2)
     
     def close(self):
-        """Ferme la session HTTP"""
+        """Ferme la session HTTP et le cache"""
+        logger.info(f"🗺️ Cache géocodage: {self.cache.get_stats()}")
         self.session.close()
+        self.cache.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,183 @@
+"""
+Enrichissement - Cache persistant du géocodage
+Réponses de l'API adresse.data.gouv.fr conservées dans SQLite d'un run à
+l'autre : un ré-enrichissement des mêmes adresses ne refait aucun appel HTTP.
+- forward : clé = adresse normalisée (minuscules, sans accents ni ponctuation)
+- reverse : clé = coordonnées arrondies (REVERSE_PRECISION décimales, ~10 m)
+Les réponses vides sont aussi mises en cache (cache négatif, TTL plus court) ;
+les erreurs réseau ne le sont pas. Au-delà de max_entries, les entrées
+expirées puis les moins récemment utilisées sont supprimées.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+from typing import Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Fichier du cache (":memory:" : cache limité au processus)
+DEFAULT_PATH = os.getenv(
+    "GEOCODING_CACHE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "cultural_events", "geocoding.sqlite")
+)
+
+DAY = 24 * 3600
+TTL_SECONDS = 90 * DAY  # Adresses trouvées
+NEGATIVE_TTL_SECONDS = 7 * DAY  # Adresses introuvables : réessayées plus tôt
+MAX_ENTRIES = 200_000
+
+# Décimales des coordonnées du reverse geocoding (4 : ~11 m)
+REVERSE_PRECISION = 4
+
+# last_used n'est réécrit qu'au-delà de cet âge (pas d'écriture à chaque hit)
+TOUCH_SECONDS = DAY
+
+# Écritures groupées par transaction
+COMMIT_EVERY = 100
+
+# Valeur de get() quand la clé est absente ou expirée
+MISS = object()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocoding_cache (
+    kind TEXT NOT NULL,            -- forward / reverse
+    key TEXT NOT NULL,
+    result TEXT,                   -- JSON, NULL : aucun résultat (cache négatif)
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (kind, key)
+);
+CREATE INDEX IF NOT EXISTS idx_geocoding_cache_last_used ON geocoding_cache (last_used);
+"""
+
+
+def normalize_address(query: str) -> str:
+    """Clé forward : 12, Rue de l'Église 75011 PARIS -> 12 rue de l eglise 75011 paris"""
+    text = unicodedata.normalize("NFKD", query).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]+", " ", text.lower()).strip()
+
+
+def coordinates_key(lat: float, lon: float) -> str:
+    """Clé reverse : coordonnées arrondies à REVERSE_PRECISION décimales"""
+    return f"{round(float(lat), REVERSE_PRECISION)},{round(float(lon), REVERSE_PRECISION)}"
+
+
+class GeocodingCache:
+    """Cache SQLite des géocodages (forward et reverse), ouvert au premier accès"""
+
+    def __init__(self, path: str = DEFAULT_PATH, ttl: float = TTL_SECONDS,
+                 negative_ttl: float = NEGATIVE_TTL_SECONDS, max_entries: int = MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.conn = None
+        self.size = 0
+        self.pending = 0
+        self.stats = {"hits": 0, "negative_hits": 0, "misses": 0, "expired": 0, "writes": 0, "evicted": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self.conn = sqlite3.connect(self.path)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(SCHEMA)
+            self.size = self.conn.execute("SELECT COUNT(*) FROM geocoding_cache").fetchone()[0]
+            logger.info(f"🗺️ Cache géocodage: {self.path} ({self.size} entrées)")
+        return self.conn
+
+    def get(self, kind: str, key: str):
+        """Résultat en cache (None : réponse vide en cache), MISS si absent ou expiré"""
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT result, created_at, last_used FROM geocoding_cache WHERE kind = ? AND key = ?", (kind, key)
+        ).fetchone()
+        if row is None:
+            self.stats["misses"] += 1
+            return MISS
+
+        result, created_at, last_used = row
+        now = time.time()
+        if now - created_at > (self.ttl if result is not None else self.negative_ttl):
+            self.stats["expired"] += 1
+            self.stats["misses"] += 1
+            return MISS
+
+        if now - last_used > TOUCH_SECONDS:
+            conn.execute("UPDATE geocoding_cache SET last_used = ? WHERE kind = ? AND key = ?", (now, kind, key))
+            self._written()
+
+        if result is None:
+            self.stats["negative_hits"] += 1
+            return None
+        self.stats["hits"] += 1
+        return json.loads(result)
+
+    def put(self, kind: str, key: str, result: Optional[Dict]):
+        """Enregistre une réponse (None : aucun résultat)"""
+        conn = self._connect()
+        now = time.time()
+        value = None if result is None else json.dumps(result)
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO geocoding_cache (kind, key, result, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+            (kind, key, value, now, now)
+        )
+        if cursor.rowcount:
+            self.size += 1
+        else:
+            # Entrée expirée remplacée
+            conn.execute(
+                "UPDATE geocoding_cache SET result = ?, created_at = ?, last_used = ? WHERE kind = ? AND key = ?",
+                (value, now, now, kind, key)
+            )
+        self.stats["writes"] += 1
+        if self.size > self.max_entries:
+            self._evict(now)
+        self._written()
+
+    def _evict(self, now: float):
+        """Supprime les entrées expirées puis les moins récemment utilisées (10 % de marge)"""
+        conn = self.conn
+        evicted = conn.execute(
+            "DELETE FROM geocoding_cache WHERE created_at < ? OR (result IS NULL AND created_at < ?)",
+            (now - self.ttl, now - self.negative_ttl)
+        ).rowcount
+        size = conn.execute("SELECT COUNT(*) FROM geocoding_cache").fetchone()[0]
+        target = int(self.max_entries * 0.9)
+        if size > target:
+            evicted += conn.execute(
+                "DELETE FROM geocoding_cache WHERE rowid IN "
+                "(SELECT rowid FROM geocoding_cache ORDER BY last_used LIMIT ?)", (size - target,)
+            ).rowcount
+        self.size = conn.execute("SELECT COUNT(*) FROM geocoding_cache").fetchone()[0]
+        self.stats["evicted"] += evicted
+        logger.info(f"🧹 Cache géocodage: {evicted} entrées supprimées ({self.size} restantes)")
+
+    def _written(self):
+        self.pending += 1
+        if self.pending >= COMMIT_EVERY:
+            self.commit()
+
+    def commit(self):
+        if self.conn is not None and self.pending:
+            self.conn.commit()
+            self.pending = 0
+
+    def get_stats(self) -> Dict:
+        """Compteurs du run et taux de hit (réponses vides comprises)"""
+        stats = dict(self.stats, entries=self.size)
+        lookups = stats["hits"] + stats["negative_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["negative_hits"]) / lookups * 100, 1) if lookups else 0.0
+        return stats
+
+    def close(self):
+        if self.conn is not None:
+            self.commit()
+            self.conn.close()
+            self.conn = None
@@ -0,0 +1,96 @@
+"""
+ETL - Compteurs event_count
+Vérifie (et reconstruit si besoin) les compteurs cities.event_count et
+categories.event_count maintenus par les triggers de sql/schema.sql
+
+Usage :
+    python etl/counters.py          # Compare avec un recomptage complet
+    python etl/counters.py --fix    # Reconstruit les compteurs divergents
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import logging
+from typing import Dict, List, Tuple
+
+from etl.loader import PostgreSQLLoader
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Table de dimension -> recomptage complet (id, nombre réel d'événements)
+RECOUNT_QUERIES = {
+    "cities": """
+        SELECT d.id, d.name, d.event_count, COUNT(e.id) AS actual
+        FROM cities d
+        LEFT JOIN events e ON e.city_id = d.id
+        GROUP BY d.id, d.name, d.event_count
+    """,
+    "categories": """
+        SELECT d.id, d.name, d.event_count, COUNT(ec.event_id) AS actual
+        FROM categories d
+        LEFT JOIN event_categories ec ON ec.category_id = d.id
+        GROUP BY d.id, d.name, d.event_count
+    """,
+}
+
+
+def verify(conn) -> Dict[str, List[Tuple]]:
+    """Compteurs divergents par table : [(id, name, event_count, actual), ...]"""
+    cursor = conn.cursor()
+    mismatches = {}
+    for table, query in RECOUNT_QUERIES.items():
+        cursor.execute(f"SELECT * FROM ({query}) r WHERE r.event_count IS DISTINCT FROM r.actual ORDER BY r.id")
+        mismatches[table] = [tuple(row) for row in cursor.fetchall()]
+    return mismatches
+
+
+def rebuild(conn) -> Dict[str, int]:
+    """Réaligne les compteurs sur un recomptage complet (lignes corrigées par table)"""
+    cursor = conn.cursor()
+    fixed = {}
+    for table, query in RECOUNT_QUERIES.items():
+        cursor.execute(f"""
+            UPDATE {table} d SET event_count = r.actual
+            FROM ({query}) r
+            WHERE d.id = r.id AND d.event_count IS DISTINCT FROM r.actual
+        """)
+        fixed[table] = cursor.rowcount
+    conn.commit()
+    return fixed
+
+
+def main():
+    """🚀 Point d'entrée principal"""
+    parser = argparse.ArgumentParser(description="Vérification des compteurs event_count")
+    parser.add_argument("--fix", action="store_true", help="Reconstruire les compteurs divergents")
+    args = parser.parse_args()
+
+    loader = PostgreSQLLoader()
+    if not loader.connect():
+        sys.exit(2)
+
+    try:
+        mismatches = verify(loader.conn)
+        total = sum(len(rows) for rows in mismatches.values())
+
+        for table, rows in mismatches.items():
+            print(f"{'✅' if not rows else '❌'} {table}: {len(rows)} compteur(s) divergent(s)")
+            for row_id, name, stored, actual in rows[:20]:
+                print(f"   - {name} (id={row_id}): {stored} enregistré, {actual} réel")
+
+        if total and args.fix:
+            fixed = rebuild(loader.conn)
+            print(f"🔧 Compteurs reconstruits: {fixed}")
+            total = 0
+    finally:
+        loader.disconnect()
+
+    sys.exit(1 if total else 0)
+
+
+if __name__ == "__main__":
+    main()
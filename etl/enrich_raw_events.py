@@ -1,25 +1,20 @@
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 from pymongo import MongoClient
 from datetime import datetime
 import re
 
+from enrichment.dates import parse_date, to_local
+from enrichment.extractors import extract
+
 client = MongoClient("mongodb://localhost:27017/")
 db = client["cultural_events"]
 
 raw = db["events_raw"]
 enriched = db["events_enriched"]
 
-def detect_season(month):
-    if month in [12, 1, 2]:
-        return "Hiver"
-    if month in [3, 4, 5]:
-        return "Printemps"
-    if month in [6, 7, 8]:
-        return "Été"
-    return "Automne"
-
-def is_weekend(date_obj):
-    return date_obj.weekday() >= 5
-
 def extract_arrondissement(zipcode):
     if not zipcode or not str(zipcode).startswith("75"):
         return None
@@ -135,47 +130,32 @@ def categorize_event(title, description, category_source):
     return "Autre", None
 
 def enrich_event(raw_doc):
-    payload = raw_doc.get("payload", {})
+    record = extract(raw_doc)
 
-    title = payload.get("title")
-    description = payload.get("description")
-    category_source = payload.get("category")
+    title = record.title
+    description = record.description
+    category_source = record.category
 
-    address = payload.get("address", {})
-    zipcode = address.get("zipcode")
-    city = address.get("city", "Paris")
+    zipcode = record.zipcode
+    city = record.city or "Paris"
 
     arrondissement = extract_arrondissement(zipcode)
 
-    # Dates
-    dates = payload.get("dates", {})
-    date_str = dates.get("start") or payload.get("date") or payload.get("event_date")
-
-    if date_str:
-        try:
-            date_str = str(date_str).replace("Z", "+00:00")
-            date_obj = datetime.fromisoformat(date_str)
-        except Exception as e:
-            date_obj = None
-    else:
-        date_obj = None
+    # Dates (parseur partagé, heure locale de Paris)
+    date = parse_date(record.start or record.date)
+    date_obj = to_local(date.utc) if date else None
 
     # Prix
-    price = payload.get("price", {})
-    price_type = price.get("type", "")
-    price_detail = price.get("detail", "")
+    price_type = record.price_type or ""
+    price_detail = record.price_detail or ""
     is_free = "gratuit" in str(price_type).lower() or "gratuit" in str(price_detail).lower()
 
     # Catégorisation améliorée
     main_cat, sub_cat = categorize_event(title, description, category_source)
 
     # Coordonnées GPS
-    location = payload.get("location")
-    latitude = None
-    longitude = None
-    if location and isinstance(location, list) and len(location) == 2:
-        latitude = location[0]
-        longitude = location[1]
+    latitude = record.latitude
+    longitude = record.longitude
 
     enriched_data = {
         "title": title,
@@ -185,16 +165,8 @@ def enrich_event(raw_doc):
         "arrondissement": arrondissement,
 
         "event_date": date_obj.date().isoformat() if date_obj else None,
-        "event_datetime": date_obj.isoformat() if date_obj else None,
-        "year": date_obj.year if date_obj else None,
-        "month": date_obj.month if date_obj else None,
-        "day": date_obj.day if date_obj else None,
-        "day_of_week": (date_obj.weekday() + 1) if date_obj else None,  # 1=Lundi
-        "day_of_week_name": ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi", "Samedi", "Dimanche"][date_obj.weekday()] if date_obj else None,
-        "month_name": ["Janvier", "Février", "Mars", "Avril", "Mai", "Juin", "Juillet", "Août", "Septembre", "Octobre", "Novembre", "Décembre"][date_obj.month - 1] if date_obj else None,
-        "season": detect_season(date_obj.month) if date_obj else None,
-        "is_weekend": is_weekend(date_obj) if date_obj else False,
-        "time_period": None,
+        # Date seule : pas d'heure (time_period NULL dans PostgreSQL)
+        "event_datetime": date_obj.isoformat() if date and date.has_time else None,
 
         "price_type": str(price_type) if price_type else None,
         "price_detail": str(price_detail) if price_detail else None,
@@ -7,24 +7,184 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import argparse
+import json
+import queue
+import threading
+import time
+from itertools import islice
 import psycopg as psycopg2
 from psycopg import sql
-from typing import Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from datetime import datetime, timedelta
 import logging
 from dotenv import load_dotenv
 
 from storage.mongodb_client import MongoDBClient
 from etl.transformer import DataTransformer
+from etl.similarity import SimilarityBuilder
+from etl.publish import SHADOW_SCHEMA, prepare_shadow, swap
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Canal NOTIFY écouté par l'API en mode snapshot (APIConfig.SNAPSHOT_CHANNEL)
+PUBLISH_CHANNEL = "events_published"
+
+# Colonnes de events alimentées par le loader (ordre des INSERT et du COPY).
+# Les colonnes calendrier (year, season, is_weekend...) sont générées par PostgreSQL.
+EVENT_COLUMNS = [
+    "raw_id", "source", "raw_hash", "enricher_version", "title", "description", "keywords",
+    "city_id", "address_street", "address_name", "zipcode", "arrondissement",
+    "latitude", "longitude", "distance_center", "geocoded",
+    "event_date", "event_datetime", "is_multi_day", "duration_days",
+    "price_type", "price_detail", "is_free", "accessibility_score",
+    "contact_url", "contact_phone", "contact_email",
+]
+
+# Colonnes réécrites par un upsert (tout sauf la clé raw_id, event_date)
+UPSERT_COLUMNS = [c for c in EVENT_COLUMNS if c not in ("raw_id", "event_date")]
+
+# Filigrane du chargement incrémental : marge pour les écritures MongoDB
+# horodatées juste avant le début du chargement mais pas encore visibles
+WATERMARK_NAME = "events"
+WATERMARK_LAG = timedelta(minutes=1)
+
+# Table de staging : ids de ville et de catégories résolus par le loader
+STAGING_COLUMNS = EVENT_COLUMNS + ["main_category_id", "sub_category_id", "category_confidence"]
+
+# Validation avant écriture (contraintes de sql/schema.sql) : une ligne
+# invalide est mise en quarantaine au lieu de faire échouer le lot
+REQUIRED_COLUMNS = ("raw_id", "source", "title", "event_date")
+
+VARCHAR_LIMITS = {
+    "raw_id": 24, "source": 50, "raw_hash": 64, "title": 500,
+    "address_street": 255, "address_name": 255, "zipcode": 10, "arrondissement": 10,
+    "price_type": 50, "price_detail": 255,
+    "contact_url": 500, "contact_phone": 50, "contact_email": 255,
+    "city_name": 100, "main_category": 100, "sub_category": 100,
+}
+
+# DECIMAL(p, s) : valeur absolue < 10^(p - s)
+NUMERIC_LIMITS = {
+    "latitude": 100, "longitude": 1000, "distance_center": 10000,
+    "accessibility_score": 10, "category_confidence": 10,
+}
+
+QUARANTINE_EVENT = """
+    INSERT INTO events_dead_letter (raw_id, source, error, payload)
+    VALUES (%s, %s, %s, %s::jsonb)
+"""
+
+# Partitions mensuelles créées d'avance au début d'un chargement
+PARTITION_MONTHS_AHEAD = 12
+
+ENSURE_PARTITIONS = "SELECT ensure_event_partitions(m, m) FROM unnest(%s::date[]) AS m"
+
+# Valeurs par défaut des dimensions
+DEFAULT_CITY = "Paris"
+DEFAULT_CATEGORY = "Autre"
+
+# Événements du lot dont la date a changé : déplacés vers leur nouvelle
+# partition (liens et similarités suivent par ON UPDATE CASCADE) avant l'upsert
+MOVE_EVENTS = """
+    UPDATE events e SET event_date = s.event_date
+    FROM events_staging s
+    WHERE s.session_id = pg_backend_pid()
+      AND e.raw_id = s.raw_id
+      AND e.event_date <> s.event_date
+    RETURNING e.id
+"""
+
+# Fusion ensembliste staging -> events (lignes de la session courante)
+MERGE_EVENTS = f"""
+    INSERT INTO events ({", ".join(EVENT_COLUMNS)})
+    SELECT DISTINCT ON (s.raw_id) {", ".join(f"s.{c}" for c in EVENT_COLUMNS)}
+    FROM events_staging s
+    WHERE s.session_id = pg_backend_pid()
+    ORDER BY s.raw_id
+    ON CONFLICT (raw_id, event_date) DO UPDATE SET
+        {", ".join(f"{c} = EXCLUDED.{c}" for c in UPSERT_COLUMNS)}
+    WHERE ({", ".join(f"events.{c}" for c in UPSERT_COLUMNS)})
+        IS DISTINCT FROM ({", ".join(f"EXCLUDED.{c}" for c in UPSERT_COLUMNS)})
+    RETURNING id, (xmax = 0) AS inserted
+"""
+
+# Événements du lot déjà chargés avec le même contenu (raw_hash) et la même
+# version des enrichisseurs : écartés avant le COPY et la fusion
+UNCHANGED_EVENTS = """
+    SELECT b.raw_id, b.raw_hash, b.enricher_version
+    FROM unnest(%s::varchar[], %s::varchar[], %s::integer[]) AS b(raw_id, raw_hash, enricher_version)
+    JOIN events e ON e.raw_id = b.raw_id
+    WHERE e.raw_hash = b.raw_hash AND e.enricher_version = b.enricher_version
+"""
+
+# Événements dont seules les catégories ont changé : la garde de MERGE_EVENTS
+# ne voit que les colonnes de events, les liens sont donc comparés à part
+# (sous-catégorie égale à la principale : un seul lien, comme à l'insertion)
+CHANGED_CATEGORIES = """
+    SELECT e.id
+    FROM events_staging s
+    JOIN events e ON e.raw_id = s.raw_id AND e.event_date = s.event_date
+    LEFT JOIN LATERAL (
+        SELECT
+            max(ec.category_id) FILTER (WHERE ec.is_primary) AS main_category_id,
+            max(ec.category_id) FILTER (WHERE NOT ec.is_primary) AS sub_category_id,
+            max(ec.confidence) AS confidence
+        FROM event_categories ec
+        WHERE ec.event_id = e.id AND ec.event_date = e.event_date
+    ) l ON TRUE
+    WHERE s.session_id = pg_backend_pid()
+      AND (
+          s.main_category_id,
+          NULLIF(s.sub_category_id, s.main_category_id),
+          CASE WHEN COALESCE(s.main_category_id, s.sub_category_id) IS NOT NULL THEN s.category_confidence END
+      ) IS DISTINCT FROM (l.main_category_id, l.sub_category_id, l.confidence)
+"""
+
+# Liens des événements mis à jour : remplacés par ceux du lot
+CLEAR_EVENT_CATEGORIES = "DELETE FROM event_categories WHERE event_id = ANY(%s)"
+
+# Tombstones : événements supprimés à la source
+DELETE_EVENTS = "DELETE FROM events WHERE raw_id = ANY(%s) RETURNING id"
+
+MERGE_EVENT_CATEGORIES = """
+    INSERT INTO event_categories (event_id, event_date, category_id, is_primary, confidence)
+    SELECT e.id, e.event_date, l.category_id, l.is_primary, l.confidence
+    FROM (
+        SELECT raw_id, event_date, main_category_id AS category_id, TRUE AS is_primary, category_confidence AS confidence
+        FROM events_staging
+        WHERE session_id = pg_backend_pid() AND main_category_id IS NOT NULL
+        UNION ALL
+        SELECT raw_id, event_date, sub_category_id, FALSE, category_confidence
+        FROM events_staging
+        WHERE session_id = pg_backend_pid() AND sub_category_id IS NOT NULL
+    ) l
+    JOIN events e ON e.raw_id = l.raw_id AND e.event_date = l.event_date
+    WHERE e.id = ANY(%s)
+    ON CONFLICT DO NOTHING
+"""
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Pic de mémoire résidente du processus (Mo), si disponible"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux : Ko ; macOS : octets
+    return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
 
 class PostgreSQLLoader:
     """Charge les données dans PostgreSQL"""
     
-    def __init__(self):
+    def __init__(self, schema: Optional[str] = None, defer_counters: bool = False):
         # Configuration PostgreSQL (en dur pour éviter problème encodage .env)
         self.host = "localhost"
         self.port = "5433"
@@ -35,13 +195,32 @@ class PostgreSQLLoader:
         self.conn = None
         self.cursor = None
         
+        # Schéma cible (search_path) : None = public, sinon schéma shadow (etl/publish.py)
+        self.schema = schema
+        
+        # Compteurs event_count non maintenus par les triggers de cette session
+        # (workers du loader parallèle : reconstruits une fois à la fin)
+        self.defer_counters = defer_counters
+        
         # MongoDB et transformer
         self.mongo_client = MongoDBClient()
         self.transformer = DataTransformer()
         
-        # Cache pour IDs
-        self.city_cache = {}
-        self.category_cache = {}
+        # Cache nom -> id des dimensions (préchargé par prefetch_dimensions)
+        self.city_cache: Dict[str, int] = {}
+        self.category_cache: Dict[str, int] = {}
+        
+        # Entrées du cache créées dans la transaction en cours (oubliées si annulée)
+        self._pending_dimensions: List[Tuple[Dict[str, int], str]] = []
+        
+        # Mois (1er du mois, ISO) dont les partitions existent
+        self._partition_months: set = set()
+        
+        # IDs insérés ou modifiés pendant ce chargement (mise à jour des similarités)
+        self.inserted_event_ids = []
+        
+        # Lots non écrits (le filigrane n'avance pas)
+        self.failed_batches = 0
     
     def connect(self) -> bool:
         """Connexion à PostgreSQL"""
@@ -60,6 +239,15 @@ class PostgreSQLLoader:
             self.conn = psycopg2.connect(dsn)
             self.cursor = self.conn.cursor()
             
+            if self.schema:
+                self.cursor.execute("SELECT set_config('search_path', %s, false)", (self.schema,))
+                self.conn.commit()
+                logger.info(f"   Schéma: {self.schema}")
+            
+            if self.defer_counters:
+                self.cursor.execute("SELECT set_config('etl.defer_event_count', 'on', false)")
+                self.conn.commit()
+            
             logger.info("✅ Connexion PostgreSQL établie")
             return True
             
@@ -69,8 +257,8 @@ class PostgreSQLLoader:
             logger.info("   docker run -d -p 5432:5432 -e POSTGRES_PASSWORD=postgres --name postgres postgres:15")
             return False
     
-    def initialize_schema(self, schema_file: str = "sql/schema.sql") -> bool:
-        """Initialise le schéma SQL"""
+    def initialize_schema(self, schema_file: str = "sql/schema.sql", indexes_file: Optional[str] = "sql/indexes.sql") -> bool:
+        """Initialise le schéma SQL (index secondaires inclus sauf indexes_file=None)"""
         try:
             logger.info(f"📊 Chargement du schéma: {schema_file}")
             
@@ -78,8 +266,17 @@ class PostgreSQLLoader:
                 schema_sql = f.read()
             
             self.cursor.execute(schema_sql)
+            if indexes_file:
+                with open(indexes_file, 'r', encoding='utf-8') as f:
+                    self.cursor.execute(f.read())
             self.conn.commit()
             
+            # Tables recréées : les ids en cache ne sont plus valides
+            self.city_cache.clear()
+            self.category_cache.clear()
+            self._pending_dimensions.clear()
+            self._partition_months.clear()
+            
             logger.info("✅ Schéma SQL créé")
             return True
             
@@ -91,163 +288,295 @@ class PostgreSQLLoader:
             self.conn.rollback()
             return False
     
-    def get_or_create_city(self, city_name: str) -> int:
-        """Récupère ou crée une ville"""
-        if not city_name:
-            city_name = "Paris"
-        
-        # Vérifier le cache
-        if city_name in self.city_cache:
-            return self.city_cache[city_name]
+    def create_indexes(self, indexes_file: str = "sql/indexes.sql"):
+        """Crée les index secondaires puis met à jour les statistiques (après un chargement en masse)"""
+        start = time.perf_counter()
+        with open(indexes_file, 'r', encoding='utf-8') as f:
+            self.cursor.execute(f.read())
+        self.cursor.execute("ANALYZE cities, categories, events, event_categories, event_similarities")
+        self.conn.commit()
+        logger.info(f"📇 Index créés et statistiques à jour en {time.perf_counter() - start:.1f}s")
+    
+    def schema_exists(self) -> bool:
+        """Vrai si le schéma a déjà été créé (chargement incrémental possible)"""
+        self.cursor.execute("SELECT to_regclass('etl_state') IS NOT NULL")
+        return self.cursor.fetchone()[0]
+    
+    def get_watermark(self) -> Optional[datetime]:
+        """Dernier filigrane enriched_at chargé (UTC)"""
+        self.cursor.execute("SELECT watermark FROM etl_state WHERE name = %s", (WATERMARK_NAME,))
+        row = self.cursor.fetchone()
+        return row[0] if row else None
+    
+    def save_watermark(self, watermark: datetime):
+        """Enregistre le filigrane après un chargement complet et sans erreur d'écriture"""
+        self.cursor.execute(
+            """INSERT INTO etl_state (name, watermark) VALUES (%s, %s)
+               ON CONFLICT (name) DO UPDATE
+               SET watermark = EXCLUDED.watermark, updated_at = CURRENT_TIMESTAMP""",
+            (WATERMARK_NAME, watermark)
+        )
+        self.conn.commit()
+        logger.info(f"🔖 Filigrane enregistré: {watermark.isoformat()}")
+    
+    def _commit(self):
+        self.conn.commit()
+        self._pending_dimensions.clear()
+    
+    def _rollback(self):
+        """Annule la transaction et retire du cache les dimensions qu'elle a créées"""
+        self.conn.rollback()
+        for cache, name in self._pending_dimensions:
+            cache.pop(name, None)
+        self._pending_dimensions.clear()
+    
+    def prefetch_dimensions(self):
+        """Charge toutes les villes et catégories (une requête par table)"""
+        self.cursor.execute("SELECT name, id FROM cities")
+        self.city_cache = dict(self.cursor.fetchall())
+        self.cursor.execute("SELECT name, id FROM categories")
+        self.category_cache = dict(self.cursor.fetchall())
+        self._pending_dimensions.clear()
+        logger.info(f"🏷️ Dimensions en cache: {len(self.city_cache)} villes, {len(self.category_cache)} catégories")
+    
+    def ensure_future_partitions(self, months_ahead: int = PARTITION_MONTHS_AHEAD):
+        """Crée les partitions du mois courant et des mois à venir"""
+        self.cursor.execute(
+            "SELECT ensure_event_partitions(CURRENT_DATE, (CURRENT_DATE + make_interval(months => %s))::date)",
+            (months_ahead,)
+        )
+        created = self.cursor.fetchone()[0]
+        self.conn.commit()
+        if created:
+            logger.info(f"🗓️ {created} partition(s) mensuelle(s) créée(s)")
+    
+    def ensure_partitions(self, event_dates: Iterable[str]):
+        """
+        Crée les partitions des mois du lot (dates ISO) absentes du cache.
+        Transaction courte et validée avant l'écriture du lot : la création
+        verrouille brièvement les tables partitionnées.
+        """
+        months = {f"{event_date[:7]}-01" for event_date in event_dates} - self._partition_months
+        if not months:
+            return
+        self.cursor.execute(ENSURE_PARTITIONS, (sorted(months),))
+        self.conn.commit()
+        self._partition_months |= months
+    
+    def _create_missing(self, table: str, rows: Dict[str, Optional[str]]) -> Dict[str, int]:
+        """
+        Insère les noms absents (table cities, ou categories avec leur parent)
+        en une instruction et renvoie l'id de chacun.
         
-        try:
-            # Chercher si existe
+        Insertions triées par nom : des connexions concurrentes prennent les
+        verrous d'unicité dans le même ordre (pas d'interblocage). Les noms
+        déjà présents sont relus par une seconde requête : son instantané voit
+        aussi ceux validés par une autre connexion pendant l'INSERT.
+        """
+        names = sorted(rows)
+        if table == "categories":
             self.cursor.execute(
-                "SELECT id FROM cities WHERE name = %s",
-                (city_name,)
+                """INSERT INTO categories (name, parent_category)
+                   SELECT name, parent FROM unnest(%s::text[], %s::text[]) AS c(name, parent)
+                   ORDER BY name
+                   ON CONFLICT (name) DO NOTHING
+                   RETURNING name, id""",
+                (names, [rows[name] for name in names])
             )
+        else:
+            self.cursor.execute(
+                """INSERT INTO cities (name)
+                   SELECT name FROM unnest(%s::text[]) AS name
+                   ORDER BY name
+                   ON CONFLICT (name) DO NOTHING
+                   RETURNING name, id""",
+                (names,)
+            )
+        ids = dict(self.cursor.fetchall())
+        
+        existing = [name for name in names if name not in ids]
+        if existing:
+            self.cursor.execute(f"SELECT name, id FROM {table} WHERE name = ANY(%s)", (existing,))
+            ids.update(self.cursor.fetchall())
+        return ids
+    
+    def _cache_dimensions(self, table: str, cache: Dict[str, int], rows: Dict[str, Optional[str]]):
+        if not rows:
+            return
+        ids = self._create_missing(table, rows)
+        cache.update(ids)
+        self._pending_dimensions.extend((cache, name) for name in ids)
+    
+    def resolve_dimensions(self, columns: Dict[str, list], rows: Optional[List[int]] = None):
+        """
+        Crée les villes et catégories du lot (colonnes, lignes `rows` ou toutes)
+        absentes du cache, avant les événements et dans la même transaction
+        (pas de commit intermédiaire).
+        """
+        city_names = columns["city_name"]
+        main_categories = columns["main_category"]
+        sub_categories = columns["sub_category"]
+        cities = {}
+        categories = {}
+        for i in range(len(city_names)) if rows is None else rows:
+            city = city_names[i] or DEFAULT_CITY
+            if city not in self.city_cache:
+                cities[city] = None
             
-            row = self.cursor.fetchone()
-            
-            if row:
-                city_id = row[0]
-            else:
-                # Créer
-                self.cursor.execute(
-                    "INSERT INTO cities (name) VALUES (%s) RETURNING id",
-                    (city_name,)
-                )
-                city_id = self.cursor.fetchone()[0]
-                self.conn.commit()
-            
-            self.city_cache[city_name] = city_id
-            return city_id
-            
-        except psycopg2.Error as e:
-            logger.error(f"Erreur get_or_create_city: {e}")
-            self.conn.rollback()
-            return self.get_or_create_city("Paris")  # Fallback
+            main = main_categories[i]
+            sub = sub_categories[i]
+            if main and main not in self.category_cache:
+                categories[main] = None
+            if sub and sub not in self.category_cache:
+                categories.setdefault(sub, main or None)
+        
+        self._cache_dimensions("cities", self.city_cache, cities)
+        self._cache_dimensions("categories", self.category_cache, categories)
+    
+    def ensure_dimensions(self, cities: List[str], categories: List[Tuple[str, Optional[str]]]):
+        """Crée en une transaction les villes et catégories (nom, parent) manquantes"""
+        parents = {}
+        for name, parent in sorted(categories, key=lambda c: c[1] is not None):
+            if name:
+                parents.setdefault(name, parent)
+        
+        self._cache_dimensions("cities", self.city_cache, {name: None for name in cities if name})
+        self._cache_dimensions("categories", self.category_cache, parents)
+        self._commit()
+    
+    def get_or_create_city(self, city_name: str) -> int:
+        """Récupère ou crée une ville (sans commit)"""
+        city_name = city_name or DEFAULT_CITY
+        if city_name not in self.city_cache:
+            self._cache_dimensions("cities", self.city_cache, {city_name: None})
+        return self.city_cache[city_name]
     
     def get_or_create_category(self, category_name: str, parent: Optional[str] = None) -> int:
-        """Récupère ou crée une catégorie"""
-        if not category_name:
-            category_name = "Autre"
+        """Récupère ou crée une catégorie (sans commit, cache indexé par nom)"""
+        category_name = category_name or DEFAULT_CATEGORY
+        if category_name not in self.category_cache:
+            self._cache_dimensions("categories", self.category_cache, {category_name: parent})
+        return self.category_cache[category_name]
+    
+    def _savepoint(self) -> int:
+        """Point de sauvegarde dans la transaction du lot (repère pour _rollback_to_savepoint)"""
+        self.cursor.execute("SAVEPOINT loader_rows")
+        return len(self._pending_dimensions)
+    
+    def _release_savepoint(self):
+        self.cursor.execute("RELEASE SAVEPOINT loader_rows")
+    
+    def _rollback_to_savepoint(self, mark: int):
+        """Annule depuis le point de sauvegarde, le reste du lot est conservé"""
+        self.cursor.execute("ROLLBACK TO SAVEPOINT loader_rows")
+        self.cursor.execute("RELEASE SAVEPOINT loader_rows")
+        for cache, name in self._pending_dimensions[mark:]:
+            cache.pop(name, None)
+        del self._pending_dimensions[mark:]
+    
+    @staticmethod
+    def validate_columns(columns: Dict[str, list]) -> Dict[int, str]:
+        """
+        Erreurs de validation d'un lot en colonnes : {indice de ligne: erreur}.
+        Vérifié colonne par colonne ; chaque ligne garde sa première erreur
+        (obligatoires, puis longueurs, puis bornes numériques).
+        """
+        count = DataTransformer.row_count(columns)
+        errors = {}
         
-        cache_key = f"{category_name}_{parent}"
+        for column in REQUIRED_COLUMNS:
+            for i, value in enumerate(columns.get(column) or [None] * count):
+                if not value and i not in errors:
+                    errors[i] = f"{column} manquant"
         
-        if cache_key in self.category_cache:
-            return self.category_cache[cache_key]
+        for column, limit in VARCHAR_LIMITS.items():
+            for i, value in enumerate(columns.get(column) or ()):
+                if value is not None and i not in errors and len(str(value)) > limit:
+                    errors[i] = f"{column} trop long ({len(str(value))} > {limit})"
         
-        try:
-            # Chercher si existe
-            self.cursor.execute(
-                "SELECT id FROM categories WHERE name = %s",
-                (category_name,)
-            )
-            
-            row = self.cursor.fetchone()
-            
-            if row:
-                category_id = row[0]
+        for column, bound in NUMERIC_LIMITS.items():
+            for i, value in enumerate(columns.get(column) or ()):
+                if value is None or i in errors:
+                    continue
+                try:
+                    if abs(float(value)) >= bound:
+                        errors[i] = f"{column} hors limites ({value})"
+                except (TypeError, ValueError):
+                    errors[i] = f"{column} non numérique ({value!r})"
+        
+        return errors
+    
+    @staticmethod
+    def validate_event(event_data: Dict) -> Optional[str]:
+        """Erreur de validation d'un événement transformé (None si valide)"""
+        return PostgreSQLLoader.validate_columns({c: [v] for c, v in event_data.items()}).get(0)
+    
+    def _validate(self, events: List[Dict]) -> Tuple[List[Dict], List[Tuple[Dict, str]]]:
+        """Sépare les événements valides des rejetés (événement, erreur)"""
+        valid, rejected = [], []
+        for event_data in events:
+            error = self.validate_event(event_data)
+            if error:
+                rejected.append((event_data, error))
             else:
-                # Créer
-                self.cursor.execute(
-                    "INSERT INTO categories (name, parent_category) VALUES (%s, %s) RETURNING id",
-                    (category_name, parent)
-                )
-                category_id = self.cursor.fetchone()[0]
-                self.conn.commit()
-            
-            self.category_cache[cache_key] = category_id
-            return category_id
-            
-        except psycopg2.Error as e:
-            logger.error(f"Erreur get_or_create_category: {e}")
-            self.conn.rollback()
-            return self.get_or_create_category("Autre")
+                valid.append(event_data)
+        return valid, rejected
+    
+    def quarantine(self, rejected: List[Tuple[Dict, str]]):
+        """Écrit les lignes rejetées et leur erreur dans events_dead_letter (transaction du lot)"""
+        if not rejected:
+            return
+        self.cursor.executemany(QUARANTINE_EVENT, [
+            (
+                str(event_data.get("raw_id")),
+                event_data.get("source"),
+                error,
+                json.dumps(event_data, default=str, ensure_ascii=False),
+            )
+            for event_data, error in rejected
+        ])
+        logger.warning(f"🚫 {len(rejected)} événement(s) en quarantaine (events_dead_letter), ex.: {rejected[0][1]}")
     
     def insert_event(self, event_data: Dict) -> Optional[int]:
-        """Insère un événement"""
+        """
+        Insère un événement sous un point de sauvegarde : en cas d'erreur, seule
+        cette ligne est annulée et l'exception est propagée.
+        """
+        mark = self._savepoint()
         try:
+            # Événement déjà chargé (quelle que soit sa date) : ignoré
+            self.cursor.execute("SELECT 1 FROM events WHERE raw_id = %s", (event_data.get("raw_id"),))
+            if self.cursor.fetchone():
+                self._release_savepoint()
+                return None
+            
             # Récupérer city_id
             city_id = self.get_or_create_city(event_data.get("city_name"))
             
             # Préparer les données
-            sql = """
-                INSERT INTO events (
-                    raw_id, source, title, description,
-                    city_id, address_street, address_name, zipcode, arrondissement,
-                    latitude, longitude, distance_center, geocoded,
-                    event_date, event_datetime, year, month, day,
-                    day_of_week, day_of_week_name, month_name, season, time_period,
-                    is_weekend, is_multi_day, duration_days,
-                    price_type, price_detail, is_free, accessibility_score,
-                    contact_url, contact_phone, contact_email
-                ) VALUES (
-                    %s, %s, %s, %s,
-                    %s, %s, %s, %s, %s,
-                    %s, %s, %s, %s,
-                    %s, %s, %s, %s, %s,
-                    %s, %s, %s, %s, %s,
-                    %s, %s, %s,
-                    %s, %s, %s, %s,
-                    %s, %s, %s
-                )
-                ON CONFLICT (raw_id) DO NOTHING
+            sql = f"""
+                INSERT INTO events ({", ".join(EVENT_COLUMNS)})
+                VALUES ({", ".join(["%s"] * len(EVENT_COLUMNS))})
+                ON CONFLICT (raw_id, event_date) DO NOTHING
                 RETURNING id
             """
             
-            values = (
-                event_data.get("raw_id"),
-                event_data.get("source"),
-                event_data.get("title"),
-                event_data.get("description"),
-                city_id,
-                event_data.get("address_street"),
-                event_data.get("address_name"),
-                event_data.get("zipcode"),
-                event_data.get("arrondissement"),
-                event_data.get("latitude"),
-                event_data.get("longitude"),
-                event_data.get("distance_center"),
-                event_data.get("geocoded"),
-                event_data.get("event_date"),
-                event_data.get("event_datetime"),
-                event_data.get("year"),
-                event_data.get("month"),
-                event_data.get("day"),
-                event_data.get("day_of_week"),
-                event_data.get("day_of_week_name"),
-                event_data.get("month_name"),
-                event_data.get("season"),
-                event_data.get("time_period"),
-                event_data.get("is_weekend"),
-                event_data.get("is_multi_day"),
-                event_data.get("duration_days"),
-                event_data.get("price_type"),
-                event_data.get("price_detail"),
-                event_data.get("is_free"),
-                event_data.get("accessibility_score"),
-                event_data.get("contact_url"),
-                event_data.get("contact_phone"),
-                event_data.get("contact_email")
-            )
+            values = self._event_values(event_data, city_id)
             
             self.cursor.execute(sql, values)
             result = self.cursor.fetchone()
+            event_id = result[0] if result else None
             
-            if result:
-                event_id = result[0]
-                
+            if event_id:
                 # Insérer les catégories
                 main_cat = event_data.get("main_category")
                 if main_cat:
                     cat_id = self.get_or_create_category(main_cat)
                     self.cursor.execute(
-                        """INSERT INTO event_categories (event_id, category_id, is_primary, confidence)
-                           VALUES (%s, %s, TRUE, %s)
+                        """INSERT INTO event_categories (event_id, event_date, category_id, is_primary, confidence)
+                           VALUES (%s, %s, %s, TRUE, %s)
                            ON CONFLICT DO NOTHING""",
-                        (event_id, cat_id, event_data.get("category_confidence", 0.0))
+                        (event_id, event_data["event_date"], cat_id, event_data.get("category_confidence", 0.0))
                     )
                 
                 # Sous-catégorie
@@ -255,89 +584,462 @@ class PostgreSQLLoader:
                 if sub_cat:
                     cat_id = self.get_or_create_category(sub_cat, parent=main_cat)
                     self.cursor.execute(
-                        """INSERT INTO event_categories (event_id, category_id, is_primary, confidence)
-                           VALUES (%s, %s, FALSE, %s)
+                        """INSERT INTO event_categories (event_id, event_date, category_id, is_primary, confidence)
+                           VALUES (%s, %s, %s, FALSE, %s)
                            ON CONFLICT DO NOTHING""",
-                        (event_id, cat_id, event_data.get("category_confidence", 0.0))
+                        (event_id, event_data["event_date"], cat_id, event_data.get("category_confidence", 0.0))
                     )
-                
-                return event_id
             
-            return None
+            self._release_savepoint()
+            return event_id
+            
+        except psycopg2.Error:
+            self._rollback_to_savepoint(mark)
+            raise
+    
+    def insert_rows(self, events: List[Dict]) -> Dict:
+        """
+        Mode ligne à ligne : un INSERT par événement, un commit par lot.
+        Une ligne en erreur part en quarantaine, le reste du lot est validé.
+        """
+        stats = {"inserted": 0, "updated": 0, "skipped": 0, "errors": 0}
+        valid, rejected = self._validate(events)
+        event_ids = []
+        
+        try:
+            self.ensure_partitions(event_data["event_date"] for event_data in valid)
+            self.resolve_dimensions(DataTransformer.columns(valid))
+            for event_data in valid:
+                try:
+                    event_id = self.insert_event(event_data)
+                except psycopg2.Error as e:
+                    rejected.append((event_data, str(e).strip()))
+                    continue
+                if event_id:
+                    event_ids.append(event_id)
+            
+            self.quarantine(rejected)
+            self._commit()
             
+        except psycopg2.Error as e:
+            logger.error(f"❌ Erreur chargement du lot ({len(events)} événements): {e}")
+            self._rollback()
+            self.failed_batches += 1
+            stats["errors"] = len(events)
+            return stats
+        
+        # Comptés après le commit : ce qui a réellement été écrit
+        self.inserted_event_ids.extend(event_ids)
+        stats["inserted"] = len(event_ids)
+        stats["errors"] = len(rejected)
+        stats["skipped"] = len(events) - len(event_ids) - len(rejected)
+        return stats
+    
+    @staticmethod
+    def _event_values(event_data: Dict, city_id: Optional[int]) -> tuple:
+        """Valeurs d'un événement dans l'ordre de EVENT_COLUMNS (mode ligne à ligne)"""
+        values = []
+        for column in EVENT_COLUMNS:
+            if column == "city_id":
+                values.append(city_id)
+            elif column == "keywords":
+                values.append(event_data.get("keywords") or None)
+            else:
+                values.append(event_data.get(column))
+        return tuple(values)
+    
+    def _dimension_columns(self, columns: Dict[str, list], rows: List[int]) -> Tuple[list, list, list]:
+        """(city_id, main_category_id, sub_category_id) des lignes `rows`, depuis le cache"""
+        city_names = columns["city_name"]
+        main_categories = columns["main_category"]
+        sub_categories = columns["sub_category"]
+        categories = self.category_cache
+        return (
+            [self.city_cache[city_names[i] or DEFAULT_CITY] for i in rows],
+            [categories[main_categories[i]] if main_categories[i] else None for i in rows],
+            [categories[sub_categories[i]] if sub_categories[i] else None for i in rows],
+        )
+    
+    @staticmethod
+    def _staging_columns(
+        columns: Dict[str, list],
+        rows: List[int],
+        city_ids: list,
+        main_category_ids: list,
+        sub_category_ids: list
+    ) -> List[list]:
+        """Colonnes de events_staging (ordre de STAGING_COLUMNS) pour les lignes `rows`"""
+        resolved = {
+            "city_id": city_ids,
+            "main_category_id": main_category_ids,
+            "sub_category_id": sub_category_ids,
+        }
+        staged = []
+        for column in STAGING_COLUMNS:
+            if column in resolved:
+                staged.append(resolved[column])
+            elif column == "keywords":
+                # [] -> NULL comme en mode ligne à ligne
+                staged.append([columns[column][i] or None for i in rows])
+            else:
+                staged.append([columns[column][i] for i in rows])
+        return staged
+    
+    def _merge(self, columns: Dict[str, list], rows: List[int]) -> List[Tuple[int, bool]]:
+        """COPY des lignes `rows` vers events_staging puis fusion ensembliste : [(id, inséré), ...]"""
+        # Un raw_id en double dans le lot : la dernière version l'emporte
+        # (déplacement et upsert doivent voir la même date)
+        raw_ids = columns["raw_id"]
+        latest = list({raw_ids[i]: i for i in rows}.values())
+        staged = self._staging_columns(columns, latest, *self._dimension_columns(columns, latest))
+        with self.cursor.copy(f"COPY events_staging ({', '.join(STAGING_COLUMNS)}) FROM STDIN") as copy:
+            for row in zip(*staged):
+                copy.write_row(row)
+        
+        self.cursor.execute(MOVE_EVENTS)
+        moved_ids = [row[0] for row in self.cursor.fetchall()]
+        self.cursor.execute(MERGE_EVENTS)
+        merged = self.cursor.fetchall()
+        merged_ids = {row[0] for row in merged}
+        # Liens à réécrire sans autre changement (les insérés n'en ont pas encore)
+        self.cursor.execute(CHANGED_CATEGORIES)
+        recategorized_ids = [row[0] for row in self.cursor.fetchall()]
+        # Événements déplacés ou recatégorisés sans autre changement : comptés comme mis à jour
+        for event_id in moved_ids + recategorized_ids:
+            if event_id not in merged_ids:
+                merged.append((event_id, False))
+                merged_ids.add(event_id)
+        event_ids = [row[0] for row in merged]
+        updated_ids = [row[0] for row in merged if not row[1]]
+        if updated_ids:
+            self.cursor.execute(CLEAR_EVENT_CATEGORIES, (updated_ids,))
+        self.cursor.execute(MERGE_EVENT_CATEGORIES, (event_ids,))
+        
+        self.cursor.execute("DELETE FROM events_staging WHERE session_id = pg_backend_pid()")
+        return merged
+    
+    def _merge_isolated(self, columns: Dict[str, list], rows: List[int]) -> Tuple[List[Tuple[int, bool]], List[Tuple[int, str]]]:
+        """
+        Fusion sous point de sauvegarde. En cas d'erreur, le lot est coupé en
+        deux et chaque moitié refusionnée, jusqu'à isoler les lignes fautives :
+        (lignes fusionnées, [(indice de ligne, erreur), ...]).
+        """
+        mark = self._savepoint()
+        try:
+            merged = self._merge(columns, rows)
+            self._release_savepoint()
+            return merged, []
+        except psycopg2.Error as e:
+            self._rollback_to_savepoint(mark)
+            if len(rows) == 1:
+                return [], [(rows[0], str(e).strip())]
+        
+        middle = len(rows) // 2
+        left_merged, left_failed = self._merge_isolated(columns, rows[:middle])
+        right_merged, right_failed = self._merge_isolated(columns, rows[middle:])
+        return left_merged + right_merged, left_failed + right_failed
+    
+    def bulk_insert(self, columns: Dict[str, list]) -> Dict:
+        """
+        Insère un lot transformé (colonnes de DataTransformer.transform_batch)
+        en une transaction : dimensions manquantes (une instruction par table),
+        COPY des colonnes vers events_staging (UNLOGGED) puis fusion ensembliste
+        (événements, liens). Les lignes invalides ou en erreur partent en
+        quarantaine, le reste du lot est validé.
+        """
+        stats = {"inserted": 0, "updated": 0, "skipped": 0, "errors": 0}
+        count = DataTransformer.row_count(columns)
+        invalid = self.validate_columns(columns)
+        valid = [i for i in range(count) if i not in invalid]
+        rejected = sorted(invalid.items())
+        merged = []
+        
+        try:
+            if valid:
+                event_dates = columns["event_date"]
+                self.ensure_partitions(event_dates[i] for i in valid)
+                self.resolve_dimensions(columns, valid)
+                merged, failed = self._merge_isolated(columns, valid)
+                rejected.extend(failed)
+            # Quarantaine : seules les lignes rejetées redeviennent des dicts
+            self.quarantine([
+                ({c: values[i] for c, values in columns.items()}, error) for i, error in rejected
+            ])
+            self._commit()
+            
+        except psycopg2.Error as e:
+            logger.error(f"❌ Erreur chargement du lot ({count} événements): {e}")
+            self._rollback()
+            self.failed_batches += 1
+            stats["errors"] = count
+            return stats
+        
+        # Un raw_id dupliqué entre deux moitiés d'un lot isolé revient deux fois
+        inserted_ids = {event_id for event_id, inserted in merged if inserted}
+        updated_ids = {event_id for event_id, inserted in merged if not inserted} - inserted_ids
+        
+        self.inserted_event_ids.extend(inserted_ids | updated_ids)
+        stats["inserted"] = len(inserted_ids)
+        stats["updated"] = len(updated_ids)
+        stats["errors"] = len(rejected)
+        # Doublons du lot et lignes inchangées
+        stats["skipped"] = count - len(inserted_ids) - len(updated_ids) - len(rejected)
+        return stats
+    
+    def delete_events(self, raw_ids: List[str]) -> int:
+        """Supprime les événements marqués supprimés (tombstones) dans MongoDB"""
+        if not raw_ids:
+            return 0
+        try:
+            self.cursor.execute(DELETE_EVENTS, (raw_ids,))
+            deleted = len(self.cursor.fetchall())
+            self._commit()
+            return deleted
+        except psycopg2.Error as e:
+            logger.error(f"❌ Erreur suppression de {len(raw_ids)} événements: {e}")
+            self._rollback()
+            self.failed_batches += 1
+            return 0
+    
+    def fetch_raw_documents(self, enriched_docs: List[Dict]) -> Dict:
+        """
+        Documents RAW d'un lot en une requête $in (au lieu d'un find_one par
+        événement), limités aux champs lus par DataTransformer.
+        """
+        raw_ids = [doc.get("raw_id") for doc in enriched_docs if doc.get("raw_id") is not None]
+        cursor = self.mongo_client.raw.find({"_id": {"$in": raw_ids}}, DataTransformer.RAW_PROJECTION)
+        return {doc["_id"]: doc for doc in cursor}
+    
+    def skip_unchanged(self, columns: Dict[str, list]) -> Tuple[Dict[str, list], int]:
+        """
+        Écarte les événements dont le raw_hash et la version des enrichisseurs
+        sont ceux de la ligne déjà chargée (une requête par lot) :
+        (colonnes à écrire, nombre d'inchangés).
+        """
+        keys = list(zip(columns["raw_id"], columns["raw_hash"], columns["enricher_version"]))
+        candidates = [key for key in keys if key[0] and key[1] and key[2] is not None]
+        if not candidates:
+            return columns, 0
+        try:
+            self.cursor.execute(UNCHANGED_EVENTS, tuple(map(list, zip(*candidates))))
+            unchanged = set(self.cursor.fetchall())
+        except psycopg2.Error as e:
+            # Détection impossible : le lot est écrit en entier (upserts idempotents)
+            logger.warning(f"⚠️ Détection des inchangés impossible: {e}")
+            self._rollback()
+            return columns, 0
+        if not unchanged:
+            return columns, 0
+        kept = [i for i, key in enumerate(keys) if key not in unchanged]
+        return DataTransformer.select(columns, kept), len(keys) - len(kept)
+    
+    def load_events(self, columns: Dict[str, list], bulk: bool, stats: Dict):
+        """Insère un lot en colonnes (COPY + fusion, ou ligne à ligne) et met à jour stats"""
+        columns, unchanged = self.skip_unchanged(columns)
+        stats["unchanged"] += unchanged
+        if not DataTransformer.row_count(columns):
+            # Lot vide ou entièrement inchangé : fin de la transaction de lecture
+            self._commit()
+            return
+        batch_stats = self.bulk_insert(columns) if bulk else self.insert_rows(DataTransformer.records(columns))
+        for key, value in batch_stats.items():
+            stats[key] += value
+    
+    def transform_batch(self, enriched_docs: List[Dict], raw_docs: Dict) -> Tuple[Dict[str, list], int]:
+        """Transforme un lot en mode colonnes (colonnes de BATCH_COLUMNS, nombre d'erreurs)"""
+        pairs = []
+        errors = 0
+        for enriched_doc in enriched_docs:
+            raw_doc = raw_docs.get(enriched_doc.get("raw_id"))
+            if not raw_doc:
+                errors += 1
+                continue
+            pairs.append((raw_doc, enriched_doc))
+        
+        columns, failed = self.transformer.transform_batch(pairs)
+        return columns, errors + failed
+    
+    @staticmethod
+    def _put(batches: queue.Queue, item, stop: threading.Event):
+        """put bloquant, interrompu si le consommateur s'est arrêté"""
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+    
+    def _read_batches(self, query: Dict, batch_size: int, batches: queue.Queue, stop: threading.Event, timings: Dict):
+        """
+        Thread lecteur : curseur MongoDB par lots -> RAW -> transformation ->
+        file bornée. Tourne pendant que le thread principal écrit dans PostgreSQL.
+        """
+        cursor = None
+        try:
+            cursor = self.mongo_client.enriched.find(query, DataTransformer.ENRICHED_PROJECTION).batch_size(batch_size)
+            while not stop.is_set():
+                start = time.perf_counter()
+                chunk = list(islice(cursor, batch_size))
+                if not chunk:
+                    break
+                # Tombstones : pas de document RAW à lire, seulement l'identifiant
+                tombstones = [str(doc.get("raw_id")) for doc in chunk if doc.get("status") == "deleted"]
+                live = [doc for doc in chunk if doc.get("status") != "deleted"]
+                raw_docs = self.fetch_raw_documents(live)
+                timings["mongo"] += time.perf_counter() - start
+                
+                start = time.perf_counter()
+                events, errors = self.transform_batch(live, raw_docs)
+                timings["transform"] += time.perf_counter() - start
+                
+                self._put(batches, (len(chunk), events, errors, tombstones), stop)
         except Exception as e:
-            logger.error(f"Erreur insertion événement: {e}")
-            self.conn.rollback()
-            return None
+            self._put(batches, e, stop)
+        finally:
+            if cursor is not None:
+                cursor.close()
+            self._put(batches, None, stop)
     
-    def load_all_events(self) -> Dict:
-        """Charge tous les événements depuis MongoDB"""
+    def load_all_events(
+        self,
+        bulk: bool = True,
+        batch_size: int = 1000,
+        max_in_flight: int = 2,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        id_range: Optional[Tuple[Any, Any, bool]] = None,
+        disconnect: bool = True
+    ) -> Dict:
+        """
+        Charge les événements depuis MongoDB en flux continu.
+        
+        Au plus (max_in_flight + 2) lots sont en mémoire : ceux de la file, celui
+        en cours de lecture et celui en cours d'écriture. L'empreinte mémoire ne
+        dépend donc pas de la taille de la collection.
+        
+        Avec `since` (filigrane), seuls les documents enrichis après cette date
+        sont chargés : upsert des événements modifiés, suppression des tombstones.
+        stats["watermark"] est le filigrane à enregistrer si le chargement aboutit.
+        
+        `id_range` (min, max, max inclus) restreint le chargement à une plage
+        d'_id enrichis (workers de etl/parallel_loader.py).
+        
+        `disconnect=False` laisse le client MongoDB ouvert en fin de chargement,
+        quand l'appelant continue de s'en servir (rattrapage de etl/sync.py).
+        """
         stats = {
             "processed": 0,
             "inserted": 0,
+            "updated": 0,
+            "unchanged": 0,
             "skipped": 0,
-            "errors": 0
+            "deleted": 0,
+            "errors": 0,
+            "completed": False
         }
         
+        # Borne haute fixée au départ : les documents enrichis pendant le
+        # chargement seront repris au prochain passage (upserts idempotents)
+        until = until or datetime.utcnow() - WATERMARK_LAG
+        query = {"enriched_at": {"$gt": since, "$lte": until}} if since else {}
+        if id_range:
+            lower, upper, inclusive = id_range
+            query["_id"] = {"$gte": lower, ("$lte" if inclusive else "$lt"): upper}
+        stats["watermark"] = until
+        timings = {"mongo": 0.0, "transform": 0.0, "postgres": 0.0}
+        
         if not self.mongo_client.connect():
             logger.error("❌ Impossible de se connecter à MongoDB")
             return stats
         
+        batches = queue.Queue(maxsize=max_in_flight)
+        stop = threading.Event()
+        reader = threading.Thread(
+            target=self._read_batches, args=(query, batch_size, batches, stop, timings),
+            name="mongo-reader", daemon=True
+        )
+        
         try:
-            # Récupérer tous les événements enrichis
-            enriched_docs = list(self.mongo_client.enriched.find({}))
-            total = len(enriched_docs)
-            
-            logger.info(f"📊 {total} événements enrichis à charger\n")
+            if since:
+                self.mongo_client.enriched.create_index([("enriched_at", 1)])
+                total = self.mongo_client.enriched.count_documents(query)
+                logger.info(f"📊 {total} événements enrichis depuis {since.isoformat()}\n")
+            elif id_range:
+                total = self.mongo_client.enriched.count_documents(query)
+                logger.info(f"📊 {total} événements enrichis dans la plage\n")
+            else:
+                total = self.mongo_client.enriched.estimated_document_count()
+                logger.info(f"📊 ~{total} événements enrichis à charger\n")
             
-            for i, enriched_doc in enumerate(enriched_docs, 1):
-                try:
-                    # Récupérer le document RAW
-                    raw_id = enriched_doc.get("raw_id")
-                    raw_doc = self.mongo_client.raw.find_one({"_id": raw_id})
-                    
-                    if not raw_doc:
-                        stats["errors"] += 1
-                        continue
-                    
-                    # Transformer
-                    event_data = self.transformer.transform_event(raw_doc, enriched_doc)
-                    
-                    if not event_data:
-                        stats["errors"] += 1
-                        continue
-                    
-                    # Insérer
-                    event_id = self.insert_event(event_data)
-                    
-                    if event_id:
-                        stats["inserted"] += 1
-                    else:
-                        stats["skipped"] += 1
-                    
-                    stats["processed"] += 1
-                    
-                    # Commit tous les 50
-                    if i % 50 == 0:
-                        self.conn.commit()
-                        progress = (i / total) * 100
-                        logger.info(f"⏳ Progression: {i}/{total} ({progress:.1f}%)")
+            self.prefetch_dimensions()
+            self.ensure_future_partitions()
+            reader.start()
+            done = 0
+            while True:
+                item = batches.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                
+                chunk_size, events, errors, tombstones = item
+                stats["errors"] += errors
+                stats["processed"] += DataTransformer.row_count(events) + len(tombstones)
                 
-                except Exception as e:
-                    logger.error(f"Erreur événement {i}: {e}")
-                    stats["errors"] += 1
+                # Insérer / supprimer
+                start = time.perf_counter()
+                self.load_events(events, bulk, stats)
+                stats["deleted"] += self.delete_events(tombstones)
+                timings["postgres"] += time.perf_counter() - start
+                
+                done += chunk_size
+                logger.info(f"⏳ Progression: {done}/{total} ({done / max(total, 1) * 100:.1f}%)")
             
-            # Commit final
-            self.conn.commit()
+            stats["completed"] = True
             
         except Exception as e:
             logger.error(f"Erreur load_all_events: {e}")
-            self.conn.rollback()
+            self._rollback()
         finally:
-            self.mongo_client.disconnect()
+            stop.set()
+            if reader.is_alive():
+                reader.join()
+            if disconnect:
+                self.mongo_client.disconnect()
         
+        stats["timings"] = {stage: round(seconds, 2) for stage, seconds in timings.items()}
+        stats["peak_rss_mb"] = peak_rss_mb()
         return stats
     
+    def refresh_similarities(self) -> Dict:
+        """Met à jour les événements similaires pour les événements insérés"""
+        try:
+            return SimilarityBuilder().refresh(self.conn, self.inserted_event_ids)
+        except psycopg2.Error as e:
+            logger.error(f"❌ Erreur calcul des similarités: {e}")
+            self.conn.rollback()
+            return {}
+    
+    def publish_shadow(self) -> bool:
+        """Index de la génération shadow puis échange atomique (False : génération actuelle inchangée)"""
+        try:
+            self.create_indexes()
+            swap(self.conn)
+            return True
+        except psycopg2.Error as e:
+            logger.error(f"❌ Publication impossible, génération actuelle inchangée: {e}")
+            return False
+    
+    def publish(self):
+        """Signale aux API en mode snapshot qu'un nouveau catalogue est publié"""
+        try:
+            self.cursor.execute("SELECT pg_notify(%s, %s)", (PUBLISH_CHANNEL, datetime.now().isoformat()))
+            self.conn.commit()
+            logger.info(f"📣 Publication notifiée sur '{PUBLISH_CHANNEL}'")
+        except psycopg2.Error as e:
+            logger.error(f"❌ Erreur notification: {e}")
+            self.conn.rollback()
+    
     def disconnect(self):
         """Fermeture propre"""
         if self.cursor:
@@ -349,24 +1051,60 @@ class PostgreSQLLoader:
 
 def main():
     """🚀 Point d'entrée principal"""
+    parser = argparse.ArgumentParser(description="ETL MongoDB → PostgreSQL")
+    parser.add_argument("--mode", choices=["bulk", "row"], default="bulk",
+                        help="bulk : COPY + fusion ensembliste ; row : un INSERT par événement")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Taille des lots (curseur MongoDB, écriture, un commit par lot)")
+    parser.add_argument("--max-in-flight", type=int, default=2, help="Lots lus d'avance au maximum (mémoire bornée)")
+    parser.add_argument("--full", action="store_true",
+                        help="Reconstruction complète (supprime et recrée le schéma) au lieu du chargement incrémental")
+    parser.add_argument("--shadow", action="store_true",
+                        help="Reconstruction complète dans un schéma shadow puis publication atomique (API disponible)")
+    args = parser.parse_args()
+    
+    if args.mode == "row" and not (args.full or args.shadow):
+        parser.error("--mode row n'est disponible qu'avec --full ou --shadow")
+    
     print("=" * 70)
     print("🗄️ ETL MONGODB → POSTGRESQL")
     print("=" * 70 + "\n")
     
-    loader = PostgreSQLLoader()
+    loader = PostgreSQLLoader(schema=SHADOW_SCHEMA if args.shadow else None)
     
     # Connexion PostgreSQL
     if not loader.connect():
         return
     
-    # Initialiser le schéma
-    if not loader.initialize_schema():
-        loader.disconnect()
-        return
+    # Reconstruction shadow, complète (explicite, ou première exécution) ou incrémental
+    since = None
+    if args.shadow:
+        prepare_shadow(loader.conn)
+        # Index secondaires créés après le chargement
+        if not loader.initialize_schema(indexes_file=None):
+            loader.disconnect()
+            return
+        print("\n💾 Construction de la nouvelle génération (schéma shadow)...\n")
+    elif args.full or not loader.schema_exists():
+        if not loader.initialize_schema():
+            loader.disconnect()
+            return
+        print("\n💾 Chargement complet des événements...\n")
+    else:
+        since = loader.get_watermark()
+        print(f"\n💾 Chargement incrémental depuis {since.isoformat() if since else 'le début'}...\n")
+    
+    stats = loader.load_all_events(
+        bulk=args.mode == "bulk",
+        batch_size=args.batch_size,
+        max_in_flight=args.max_in_flight,
+        since=since
+    )
     
-    # Charger les données
-    print("\n💾 Chargement des événements...\n")
-    stats = loader.load_all_events()
+    # Le filigrane n'avance que si tout a été écrit
+    if stats["completed"] and loader.failed_batches == 0:
+        loader.save_watermark(stats["watermark"])
+    else:
+        print("\n⚠️ Chargement incomplet : filigrane inchangé (reprise au prochain passage)")
     
     # Résultats
     print("\n" + "=" * 70)
@@ -374,12 +1112,38 @@ def main():
     print("=" * 70)
     print(f"\n✅ Traités:  {stats['processed']}")
     print(f"✅ Insérés:  {stats['inserted']}")
-    print(f"⏭️ Ignorés:  {stats['skipped']} (doublons)")
-    print(f"❌ Erreurs:  {stats['errors']}")
+    print(f"🔄 Modifiés: {stats['updated']}")
+    print(f"🗑️ Supprimés: {stats['deleted']}")
+    print(f"⏭️ Inchangés: {stats['unchanged']} (raw_hash et version identiques : ni COPY ni fusion)")
+    print(f"⏭️ Ignorés:  {stats['skipped']} (doublons du lot / lignes identiques)")
+    print(f"❌ Erreurs:  {stats['errors']} (lignes rejetées : table events_dead_letter)")
+    if stats.get("timings"):
+        timings = stats["timings"]
+        print(f"⏱️ Temps:    MongoDB {timings['mongo']}s, transformation {timings['transform']}s, PostgreSQL {timings['postgres']}s")
+    if stats.get("peak_rss_mb"):
+        print(f"💾 Mémoire max: {stats['peak_rss_mb']} Mo")
     
     if stats['processed'] > 0:
-        success_rate = (stats['inserted'] / stats['processed']) * 100
-        print(f"\n📈 Taux de succès: {success_rate:.1f}%")
+        print(f"💡 Travail évité: {stats['unchanged'] / stats['processed'] * 100:.1f}% des événements lus non réécrits")
+    
+    # Événements similaires (incrémental)
+    print("\n🔗 Calcul des événements similaires...")
+    similarity_stats = loader.refresh_similarities()
+    if similarity_stats:
+        print(f"✅ Listes mises à jour: {similarity_stats['updated']} ({similarity_stats['mode']})")
+    
+    # Génération shadow : index, statistiques puis échange atomique
+    if args.shadow:
+        if not (stats["completed"] and loader.failed_batches == 0):
+            print(f"\n⚠️ Génération incomplète : non publiée (conservée dans {SHADOW_SCHEMA})")
+            loader.disconnect()
+            return
+        if not loader.publish_shadow():
+            loader.disconnect()
+            return
+    
+    # Publication (rechargement des snapshots API)
+    loader.publish()
     
     # Statistiques PostgreSQL
     try:
@@ -0,0 +1,258 @@
+"""
+ETL - Loader parallèle
+Répartit la collection enrichie en plages d'_id chargées par N processus,
+chacun avec son curseur MongoDB, son DataTransformer et sa connexion PostgreSQL
+
+Usage :
+    python etl/parallel_loader.py --workers 4
+    python etl/parallel_loader.py --workers 8 --full
+    python etl/parallel_loader.py --workers 8 --shadow
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import logging
+import multiprocessing
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import psycopg as psycopg2
+
+from etl.counters import rebuild
+from etl.loader import PostgreSQLLoader, WATERMARK_LAG
+from etl.publish import SHADOW_SCHEMA, prepare_shadow
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Compteurs additionnés entre workers
+SUMMED_STATS = ("processed", "inserted", "updated", "unchanged", "skipped", "deleted", "errors")
+
+
+def split_id_ranges(enriched_collection, workers: int, query: Optional[Dict] = None) -> List[Tuple[Any, Any, bool]]:
+    """
+    Plages d'_id de tailles équilibrées ($bucketAuto) : (min, max, max inclus).
+    Les bornes se suivent, la dernière plage inclut son maximum.
+    """
+    pipeline = [{"$match": query}] if query else []
+    pipeline.append({"$bucketAuto": {"groupBy": "$_id", "buckets": workers}})
+    buckets = list(enriched_collection.aggregate(pipeline))
+    return [
+        (bucket["_id"]["min"], bucket["_id"]["max"], i == len(buckets) - 1)
+        for i, bucket in enumerate(buckets)
+    ]
+
+
+def collect_dimensions(enriched_collection, query: Optional[Dict] = None) -> Tuple[List[str], List[Tuple[str, Optional[str]]]]:
+    """Villes et couples (catégorie, parent) présents dans les documents enrichis"""
+    pipeline = [{"$match": query}] if query else []
+    pipeline.append({"$group": {"_id": {
+        "city": "$data.city",
+        "main": "$data.main_category",
+        "sub": "$data.sub_category",
+    }}})
+
+    cities = {"Paris"}
+    categories = set()
+    for row in enriched_collection.aggregate(pipeline, allowDiskUse=True):
+        key = row["_id"]
+        if key.get("city"):
+            cities.add(key["city"])
+        main = key.get("main") or "Autre"
+        categories.add((main, None))
+        if key.get("sub"):
+            categories.add((key["sub"], main))
+    return sorted(cities), sorted(categories, key=lambda c: (c[0], c[1] or ""))
+
+
+def load_range(task: Dict) -> Dict:
+    """Worker : charge une plage d'_id avec ses propres connexions"""
+    loader = PostgreSQLLoader(schema=task.get("schema"), defer_counters=True)
+    if not loader.connect():
+        return {"worker": task["worker"], "completed": False, "failed_batches": 1, "event_ids": []}
+
+    start = time.perf_counter()
+    try:
+        stats = loader.load_all_events(
+            batch_size=task["batch_size"],
+            max_in_flight=task["max_in_flight"],
+            since=task["since"],
+            until=task["until"],
+            id_range=task["id_range"]
+        )
+    finally:
+        loader.disconnect()
+
+    stats["worker"] = task["worker"]
+    stats["seconds"] = round(time.perf_counter() - start, 2)
+    stats["failed_batches"] = loader.failed_batches
+    stats["event_ids"] = loader.inserted_event_ids
+    return stats
+
+
+def merge_stats(results: List[Dict]) -> Dict:
+    """Agrège les statistiques des workers"""
+    merged = {key: sum(r.get(key, 0) for r in results) for key in SUMMED_STATS}
+    merged["completed"] = all(r.get("completed") for r in results)
+    merged["failed_batches"] = sum(r.get("failed_batches", 0) for r in results)
+    merged["timings"] = {
+        stage: round(sum(r.get("timings", {}).get(stage, 0.0) for r in results), 2)
+        for stage in ("mongo", "transform", "postgres")
+    }
+    merged["peak_rss_mb"] = max((r.get("peak_rss_mb") or 0 for r in results), default=None)
+    merged["workers"] = [
+        {key: r.get(key) for key in ("worker", "processed", "inserted", "errors", "seconds")}
+        for r in results
+    ]
+    return merged
+
+
+def parallel_load(
+    loader: PostgreSQLLoader,
+    workers: int,
+    batch_size: int = 1000,
+    max_in_flight: int = 2,
+    since: Optional[datetime] = None
+) -> Dict:
+    """
+    Chargement parallèle par plages d'_id.
+
+    Les villes et catégories sont créées avant le lancement des workers (une
+    seule transaction, ordre trié) : les workers n'en créent presque plus et
+    ne se disputent pas les mêmes clés. Les workers ne maintiennent pas
+    event_count (aucun verrou sur les lignes de dimension, la ligne Paris
+    sérialiserait leurs lots) : les compteurs sont reconstruits une fois,
+    après le pool, même si un worker a échoué.
+    """
+    until = datetime.utcnow() - WATERMARK_LAG
+    query = {"enriched_at": {"$gt": since, "$lte": until}} if since else None
+
+    if not loader.mongo_client.connect():
+        logger.error("❌ Impossible de se connecter à MongoDB")
+        return {"completed": False}
+
+    try:
+        cities, categories = collect_dimensions(loader.mongo_client.enriched, query)
+        loader.ensure_dimensions(cities, categories)
+        logger.info(f"🏷️ Dimensions prêtes: {len(cities)} villes, {len(categories)} catégories")
+
+        ranges = split_id_ranges(loader.mongo_client.enriched, workers, query)
+    finally:
+        loader.mongo_client.disconnect()
+
+    if not ranges:
+        return {**{key: 0 for key in SUMMED_STATS}, "completed": True, "watermark": until, "event_ids": []}
+
+    tasks = [
+        {
+            "worker": i,
+            "id_range": id_range,
+            "batch_size": batch_size,
+            "max_in_flight": max_in_flight,
+            "since": since,
+            "until": until,
+            "schema": loader.schema,
+        }
+        for i, id_range in enumerate(ranges)
+    ]
+
+    logger.info(f"🚀 {len(tasks)} workers lancés")
+    start = time.perf_counter()
+    # spawn : pymongo n'est pas sûr après fork
+    with multiprocessing.get_context("spawn").Pool(len(tasks)) as pool:
+        results = pool.map(load_range, tasks)
+    pool_seconds = time.perf_counter() - start
+
+    try:
+        fixed = rebuild(loader.conn)
+        logger.info(f"🔢 Compteurs event_count reconstruits: {fixed}")
+    except psycopg2.Error as e:
+        loader.conn.rollback()
+        logger.error(f"❌ Reconstruction des compteurs impossible (python etl/counters.py --fix): {e}")
+    elapsed = time.perf_counter() - start
+
+    merged = merge_stats(results)
+    merged["counters_seconds"] = round(elapsed - pool_seconds, 2)
+    merged["watermark"] = until
+    merged["seconds"] = round(elapsed, 2)
+    merged["rows_per_sec"] = round(merged["processed"] / elapsed, 1) if elapsed else 0.0
+    merged["event_ids"] = [event_id for r in results for event_id in r.get("event_ids", [])]
+    return merged
+
+
+def main():
+    """🚀 Point d'entrée principal"""
+    parser = argparse.ArgumentParser(description="ETL MongoDB → PostgreSQL (parallèle)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Nombre de processus")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Taille des lots")
+    parser.add_argument("--max-in-flight", type=int, default=2, help="Lots lus d'avance par worker")
+    parser.add_argument("--full", action="store_true", help="Reconstruction complète du schéma")
+    parser.add_argument("--shadow", action="store_true", help="Reconstruction dans un schéma shadow puis publication atomique")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print(f"🗄️ ETL PARALLÈLE MONGODB → POSTGRESQL ({args.workers} workers)")
+    print("=" * 70 + "\n")
+
+    loader = PostgreSQLLoader(schema=SHADOW_SCHEMA if args.shadow else None)
+    if not loader.connect():
+        return
+
+    since = None
+    if args.shadow:
+        prepare_shadow(loader.conn)
+        if not loader.initialize_schema(indexes_file=None):
+            loader.disconnect()
+            return
+    elif args.full or not loader.schema_exists():
+        if not loader.initialize_schema():
+            loader.disconnect()
+            return
+    else:
+        since = loader.get_watermark()
+
+    stats = parallel_load(loader, args.workers, args.batch_size, args.max_in_flight, since)
+
+    if stats.get("completed") and stats.get("failed_batches", 0) == 0:
+        loader.save_watermark(stats["watermark"])
+    else:
+        print("\n⚠️ Chargement incomplet : filigrane inchangé (reprise au prochain passage)")
+
+    print("\n" + "=" * 70)
+    print("📊 RÉSULTATS ETL")
+    print("=" * 70)
+    print(f"\n✅ Traités:  {stats.get('processed', 0)}")
+    print(f"✅ Insérés:  {stats.get('inserted', 0)}")
+    print(f"🔄 Modifiés: {stats.get('updated', 0)}")
+    print(f"⏭️ Inchangés: {stats.get('unchanged', 0)} (raw_hash et version identiques)")
+    print(f"🗑️ Supprimés: {stats.get('deleted', 0)}")
+    print(f"❌ Erreurs:  {stats.get('errors', 0)}")
+    if stats.get("seconds"):
+        print(f"⏱️ Durée:    {stats['seconds']}s ({stats['rows_per_sec']} lignes/s)")
+    for worker in stats.get("workers", []):
+        print(f"   👷 worker {worker['worker']}: {worker['processed']} traités en {worker['seconds']}s")
+
+    # Similarités et publication (comme le loader séquentiel)
+    loader.inserted_event_ids = stats.get("event_ids", [])
+    loader.refresh_similarities()
+
+    if args.shadow:
+        if not (stats.get("completed") and stats.get("failed_batches", 0) == 0):
+            print(f"\n⚠️ Génération incomplète : non publiée (conservée dans {SHADOW_SCHEMA})")
+            loader.disconnect()
+            return
+        if not loader.publish_shadow():
+            loader.disconnect()
+            return
+
+    loader.publish()
+
+    loader.disconnect()
+    print("\n✅ ETL terminé avec succès!\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+ETL - Publication sans interruption (schéma shadow)
+Un chargement complet est construit dans le schéma events_shadow pendant que
+l'API continue de lire public. La publication est une seule transaction de
+renommages de schémas : les lecteurs voient l'ancienne ou la nouvelle
+génération, jamais un chargement partiel. La génération précédente reste
+dans events_previous pour un retour arrière immédiat.
+
+Usage :
+    python etl/loader.py --shadow      # Construit puis publie une nouvelle génération
+    python etl/publish.py              # Générations présentes
+    python etl/publish.py --rollback   # Revient à la génération précédente
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import logging
+from typing import Dict, Optional
+
+from psycopg import sql
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LIVE_SCHEMA = "public"
+SHADOW_SCHEMA = "events_shadow"
+PREVIOUS_SCHEMA = "events_previous"
+
+# Nom temporaire pendant un retour arrière (échange à trois renommages)
+SWAP_SCHEMA = "events_swap"
+
+# L'échange attend au plus ce délai ses verrous plutôt que de bloquer les lecteurs
+SWAP_LOCK_TIMEOUT = "5s"
+
+
+def _schema_exists(cursor, schema: str) -> bool:
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_namespace WHERE nspname = %s)", (schema,))
+    return cursor.fetchone()[0]
+
+
+def _rename(cursor, old: str, new: str):
+    cursor.execute(sql.SQL("ALTER SCHEMA {} RENAME TO {}").format(sql.Identifier(old), sql.Identifier(new)))
+
+
+def prepare_shadow(conn):
+    """(Re)crée un schéma shadow vide, lisible comme public"""
+    cursor = conn.cursor()
+    cursor.execute(sql.SQL("DROP SCHEMA IF EXISTS {} CASCADE").format(sql.Identifier(SHADOW_SCHEMA)))
+    cursor.execute(sql.SQL("CREATE SCHEMA {}").format(sql.Identifier(SHADOW_SCHEMA)))
+    cursor.execute(sql.SQL("GRANT USAGE ON SCHEMA {} TO PUBLIC").format(sql.Identifier(SHADOW_SCHEMA)))
+    conn.commit()
+    logger.info(f"🧱 Schéma shadow prêt: {SHADOW_SCHEMA}")
+
+
+def swap(conn):
+    """
+    Publie la génération shadow : public -> events_previous, shadow -> public.
+    L'état ETL absent du shadow (autres filigranes) est repris de public.
+    """
+    cursor = conn.cursor()
+
+    # Hors de la transaction d'échange : la suppression de l'avant-dernière
+    # génération peut être longue
+    cursor.execute(sql.SQL("DROP SCHEMA IF EXISTS {} CASCADE").format(sql.Identifier(PREVIOUS_SCHEMA)))
+    conn.commit()
+
+    try:
+        cursor.execute("SELECT set_config('lock_timeout', %s, true)", (SWAP_LOCK_TIMEOUT,))
+        cursor.execute("SELECT to_regclass('public.etl_state') IS NOT NULL")
+        if cursor.fetchone()[0]:
+            cursor.execute(sql.SQL(
+                "INSERT INTO {}.etl_state SELECT * FROM public.etl_state ON CONFLICT (name) DO NOTHING"
+            ).format(sql.Identifier(SHADOW_SCHEMA)))
+        _rename(cursor, LIVE_SCHEMA, PREVIOUS_SCHEMA)
+        _rename(cursor, SHADOW_SCHEMA, LIVE_SCHEMA)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    # Le search_path de la connexion visait le shadow
+    cursor.execute("RESET search_path")
+    conn.commit()
+    logger.info(f"🔀 Nouvelle génération publiée (précédente: {PREVIOUS_SCHEMA})")
+
+
+def rollback(conn) -> bool:
+    """Échange public et events_previous (un second appel annule le retour arrière)"""
+    cursor = conn.cursor()
+    if not _schema_exists(cursor, PREVIOUS_SCHEMA):
+        logger.error(f"❌ Aucune génération précédente ({PREVIOUS_SCHEMA})")
+        return False
+
+    try:
+        cursor.execute("SELECT set_config('lock_timeout', %s, true)", (SWAP_LOCK_TIMEOUT,))
+        _rename(cursor, LIVE_SCHEMA, SWAP_SCHEMA)
+        _rename(cursor, PREVIOUS_SCHEMA, LIVE_SCHEMA)
+        _rename(cursor, SWAP_SCHEMA, PREVIOUS_SCHEMA)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    logger.info("⏪ Génération précédente republiée")
+    return True
+
+
+def status(conn) -> Dict[str, Optional[int]]:
+    """Nombre d'événements par génération (None si absente)"""
+    cursor = conn.cursor()
+    counts = {}
+    for schema in (LIVE_SCHEMA, PREVIOUS_SCHEMA, SHADOW_SCHEMA):
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (f"{schema}.events",))
+        if cursor.fetchone()[0]:
+            cursor.execute(sql.SQL("SELECT COUNT(*) FROM {}.events").format(sql.Identifier(schema)))
+            counts[schema] = cursor.fetchone()[0]
+        else:
+            counts[schema] = None
+    conn.commit()
+    return counts
+
+
+def main():
+    """🚀 Point d'entrée principal"""
+    from etl.loader import PostgreSQLLoader
+
+    parser = argparse.ArgumentParser(description="Générations publiées du catalogue")
+    parser.add_argument("--rollback", action="store_true", help="Republier la génération précédente")
+    args = parser.parse_args()
+
+    loader = PostgreSQLLoader()
+    if not loader.connect():
+        sys.exit(2)
+
+    try:
+        if args.rollback:
+            if not rollback(loader.conn):
+                sys.exit(1)
+            loader.publish()
+
+        for schema, count in status(loader.conn).items():
+            print(f"{'📄' if count is not None else '➖'} {schema}: {count if count is not None else 'absent'}")
+    finally:
+        loader.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+"""
+ETL - Rétention et archivage des événements passés
+Les mois entièrement antérieurs à l'horizon de rétention quittent les tables
+chaudes : leurs partitions (events, event_categories, event_similarities) sont
+détachées une à une (DETACH PARTITION CONCURRENTLY : ni lectures ni écritures
+bloquées sur les tables partitionnées), copiées dans le schéma events_archive
+puis supprimées. Les documents events_raw / events_enriched des événements
+archivés sont ensuite supprimés de MongoDB par lots (export gzip optionnel).
+
+Le schéma events_archive garde un chemin de requête pour l'historique
+(GET /events/history) : mêmes colonnes que events, partitionnées par mois,
+avec les noms de ville et de catégorie (les identifiants des dimensions
+changent à chaque reconstruction shadow).
+
+Chaque étape est reprise là où elle s'est arrêtée en cas d'interruption.
+Un mois déjà archivé puis recréé par un chargement tardif est fusionné :
+les versions archivées des mêmes événements (raw_id) sont remplacées et le
+mois est de nouveau purgé de MongoDB.
+
+Usage :
+    python etl/retention.py --dry-run             # Mois archivables
+    python etl/retention.py --days 365            # Archive et purge MongoDB
+    python etl/retention.py --export-dir archives # + documents RAW en .jsonl.gz
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import gzip
+import logging
+import re
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from bson import ObjectId, json_util
+from psycopg import sql
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ARCHIVE_SCHEMA = "events_archive"
+
+# Horizon de rétention par défaut (jours) ; granularité effective : le mois
+RETENTION_DAYS = 365
+
+# Lots de suppression (similarités PostgreSQL, documents MongoDB)
+BATCH_SIZE = 1000
+
+PARTITION_NAME = re.compile(r"^events_p(\d{4})_(\d{2})$")
+
+# Tables d'archive (créées une fois, hors du cycle de vie de sql/schema.sql)
+ARCHIVE_TABLES = [
+    """CREATE TABLE IF NOT EXISTS {archive}.events (
+           LIKE events INCLUDING GENERATED,
+           city_name VARCHAR(100)
+       ) PARTITION BY RANGE (event_date)""",
+    """CREATE TABLE IF NOT EXISTS {archive}.event_categories (
+           event_id INTEGER NOT NULL,
+           event_date DATE NOT NULL,
+           category_name VARCHAR(100),
+           parent_category VARCHAR(100),
+           is_primary BOOLEAN,
+           confidence DECIMAL(3, 2)
+       ) PARTITION BY RANGE (event_date)""",
+    """CREATE TABLE IF NOT EXISTS {archive}.archived_months (
+           month DATE PRIMARY KEY,
+           events INTEGER NOT NULL,
+           archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+           mongo_pruned_at TIMESTAMP
+       )""",
+]
+
+
+def partition_suffix(month: date) -> str:
+    return f"p{month:%Y_%m}"
+
+
+def next_month(month: date) -> date:
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _identifier(*names: str) -> sql.Identifier:
+    return sql.Identifier(*names)
+
+
+def prepare_archive(conn):
+    """Crée le schéma events_archive et ses tables si besoin"""
+    cursor = conn.cursor()
+    cursor.execute(sql.SQL("CREATE SCHEMA IF NOT EXISTS {}").format(_identifier(ARCHIVE_SCHEMA)))
+    for statement in ARCHIVE_TABLES:
+        cursor.execute(sql.SQL(statement).format(archive=_identifier(ARCHIVE_SCHEMA)))
+    conn.commit()
+
+
+def archivable_months(conn, cutoff: date) -> List[date]:
+    """
+    Mois dont toutes les dates sont antérieures à cutoff et qui ont encore
+    une table events_pAAAA_MM dans le schéma courant (rattachée ou non :
+    un archivage interrompu est repris)
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT relname FROM pg_class
+        WHERE relnamespace = current_schema()::regnamespace AND relkind = 'r'
+          AND relname ~ '^events_p[0-9]{4}_[0-9]{2}$'
+    """)
+    months = []
+    for (name,) in cursor.fetchall():
+        match = PARTITION_NAME.match(name)
+        month = date(int(match.group(1)), int(match.group(2)), 1)
+        if next_month(month) <= cutoff:
+            months.append(month)
+    conn.commit()
+    return sorted(months)
+
+
+def _table_state(cursor, table: str) -> Optional[bool]:
+    """None : absente ; True : partition rattachée ; False : table détachée"""
+    cursor.execute(
+        """SELECT c.relispartition FROM pg_class c
+           WHERE c.relnamespace = current_schema()::regnamespace AND c.relname = %s""",
+        (table,)
+    )
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _detach(conn, parent: str, table: str):
+    """DETACH CONCURRENTLY : hors transaction, seul le mois détaché est verrouillé"""
+    conn.commit()
+    conn.autocommit = True
+    try:
+        conn.cursor().execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {} CONCURRENTLY").format(
+            _identifier(parent), _identifier(table)
+        ))
+    finally:
+        conn.autocommit = False
+
+
+def _delete_inbound_similarities(conn, table: str, month: date, batch_size: int) -> int:
+    """Similarités d'autres mois pointant vers le mois archivé, par lots d'événements"""
+    cursor = conn.cursor()
+    cursor.execute(sql.SQL("SELECT id FROM {} ORDER BY id").format(_identifier(table)))
+    ids = [row[0] for row in cursor.fetchall()]
+    deleted = 0
+    for offset in range(0, len(ids), batch_size):
+        cursor.execute(
+            """DELETE FROM event_similarities
+               WHERE similar_event_id = ANY(%s) AND similar_event_date >= %s AND similar_event_date < %s""",
+            (ids[offset:offset + batch_size], month, next_month(month))
+        )
+        deleted += cursor.rowcount
+        conn.commit()
+    return deleted
+
+
+def _copy_to_archive(conn, month: date, events_table: str, categories_table: str) -> int:
+    """Copie le mois détaché dans events_archive puis le supprime (une transaction)"""
+    cursor = conn.cursor()
+    archive = _identifier(ARCHIVE_SCHEMA)
+    suffix = partition_suffix(month)
+    bounds = (month, next_month(month))
+
+    try:
+        for parent in ("events", "event_categories"):
+            cursor.execute(
+                sql.SQL("CREATE TABLE IF NOT EXISTS {} PARTITION OF {} FOR VALUES FROM (%s) TO (%s)").format(
+                    _identifier(ARCHIVE_SCHEMA, f"{parent}_{suffix}"), _identifier(ARCHIVE_SCHEMA, parent)
+                ),
+                bounds
+            )
+
+        # Mois déjà archivé (recréé par un chargement tardif) : fusion, les
+        # versions archivées des événements rechargés sont remplacées
+        cursor.execute(
+            sql.SQL("SELECT EXISTS (SELECT 1 FROM {}.archived_months WHERE month = %s)").format(archive),
+            (month,)
+        )
+        if cursor.fetchone()[0]:
+            archived_events = _identifier(ARCHIVE_SCHEMA, f"events_{suffix}")
+            cursor.execute(sql.SQL("""
+                DELETE FROM {archived_categories} ac
+                USING {archived_events} a, {events} e
+                WHERE a.raw_id = e.raw_id AND ac.event_id = a.id AND ac.event_date = a.event_date
+            """).format(
+                archived_categories=_identifier(ARCHIVE_SCHEMA, f"event_categories_{suffix}"),
+                archived_events=archived_events,
+                events=_identifier(events_table),
+            ))
+            cursor.execute(sql.SQL("DELETE FROM {} a USING {} e WHERE a.raw_id = e.raw_id").format(
+                archived_events, _identifier(events_table)
+            ))
+
+        # Colonnes stockées de events (les colonnes générées sont recalculées)
+        cursor.execute(
+            """SELECT column_name FROM information_schema.columns
+               WHERE table_schema = %s AND table_name = 'events'
+                 AND is_generated = 'NEVER' AND column_name <> 'city_name'
+               ORDER BY ordinal_position""",
+            (ARCHIVE_SCHEMA,)
+        )
+        columns = [_identifier(row[0]) for row in cursor.fetchall()]
+
+        cursor.execute(sql.SQL("""
+            INSERT INTO {archive}.events ({columns}, city_name)
+            SELECT {e_columns}, ci.name
+            FROM {events} e
+            LEFT JOIN cities ci ON ci.id = e.city_id
+        """).format(
+            archive=archive,
+            columns=sql.SQL(", ").join(columns),
+            e_columns=sql.SQL(", ").join(sql.SQL("e.{}").format(c) for c in columns),
+            events=_identifier(events_table),
+        ))
+        archived = cursor.rowcount
+
+        if _table_state(cursor, categories_table) is not None:
+            cursor.execute(sql.SQL("""
+                INSERT INTO {archive}.event_categories
+                    (event_id, event_date, category_name, parent_category, is_primary, confidence)
+                SELECT ec.event_id, ec.event_date, c.name, c.parent_category, ec.is_primary, ec.confidence
+                FROM {categories} ec
+                LEFT JOIN categories c ON c.id = ec.category_id
+            """).format(archive=archive, categories=_identifier(categories_table)))
+            cursor.execute(sql.SQL("DROP TABLE {}").format(_identifier(categories_table)))
+
+        # Nouvelle purge MongoDB du mois (les documents déjà supprimés sont ignorés)
+        cursor.execute(
+            sql.SQL("""
+                INSERT INTO {archive}.archived_months (month, events)
+                SELECT %s, COUNT(*) FROM {archived_events}
+                ON CONFLICT (month) DO UPDATE
+                SET events = EXCLUDED.events, archived_at = CURRENT_TIMESTAMP, mongo_pruned_at = NULL
+            """).format(archive=archive, archived_events=_identifier(ARCHIVE_SCHEMA, f"events_{suffix}")),
+            (month,)
+        )
+        cursor.execute(sql.SQL("DROP TABLE {}").format(_identifier(events_table)))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return archived
+
+
+def archive_month(conn, month: date, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Sort un mois des tables chaudes : similarités entrantes supprimées par
+    lots, partitions détachées (similarités, catégories, événements), copie
+    dans events_archive. Renvoie le nombre d'événements archivés.
+    """
+    cursor = conn.cursor()
+    suffix = partition_suffix(month)
+    events_table = f"events_{suffix}"
+    categories_table = f"event_categories_{suffix}"
+    similarities_table = f"event_similarities_{suffix}"
+
+    if _table_state(cursor, events_table):
+        _delete_inbound_similarities(conn, events_table, month, batch_size)
+
+    # Similarités sortantes : dérivées, supprimées avec leur partition
+    if _table_state(cursor, similarities_table):
+        _detach(conn, "event_similarities", similarities_table)
+    if _table_state(cursor, similarities_table) is not None:
+        cursor.execute(sql.SQL("DROP TABLE {}").format(_identifier(similarities_table)))
+        conn.commit()
+
+    if _table_state(cursor, categories_table):
+        _detach(conn, "event_categories", categories_table)
+    if _table_state(cursor, categories_table) is not None:
+        # La clé étrangère conservée au détachement bloquerait celui des événements
+        cursor.execute(
+            """SELECT conname FROM pg_constraint
+               WHERE conrelid = to_regclass(%s) AND contype = 'f' AND confrelid = 'events'::regclass""",
+            (categories_table,)
+        )
+        for (constraint,) in cursor.fetchall():
+            cursor.execute(sql.SQL("ALTER TABLE {} DROP CONSTRAINT {}").format(
+                _identifier(categories_table), _identifier(constraint)
+            ))
+        conn.commit()
+
+    if _table_state(cursor, events_table):
+        _detach(conn, "events", events_table)
+
+    archived = _copy_to_archive(conn, month, events_table, categories_table)
+    logger.info(f"🗄️ {month:%Y-%m}: {archived} événement(s) archivé(s) dans {ARCHIVE_SCHEMA}")
+    return archived
+
+
+def mongo_ids(raw_ids: Iterable[str]) -> List:
+    """raw_id PostgreSQL (texte) -> valeurs _id MongoDB possibles (texte et ObjectId)"""
+    ids = []
+    for raw_id in raw_ids:
+        ids.append(raw_id)
+        if ObjectId.is_valid(raw_id):
+            ids.append(ObjectId(raw_id))
+    return ids
+
+
+def prune_mongo(conn, mongo_client, batch_size: int = BATCH_SIZE, export_dir: Optional[str] = None) -> Dict[str, int]:
+    """
+    Supprime de events_raw et events_enriched les documents des mois
+    archivés et pas encore purgés, par lots de raw_id. Avec export_dir, les
+    documents RAW sont d'abord écrits en JSON étendu (events_raw_AAAA_MM.jsonl.gz,
+    complété si le mois est de nouveau purgé après un chargement tardif).
+    """
+    cursor = conn.cursor()
+    archive = _identifier(ARCHIVE_SCHEMA)
+    cursor.execute(sql.SQL(
+        "SELECT month FROM {}.archived_months WHERE mongo_pruned_at IS NULL ORDER BY month"
+    ).format(archive))
+    months = [row[0] for row in cursor.fetchall()]
+
+    counts = {"raw": 0, "enriched": 0}
+    for month in months:
+        cursor.execute(
+            sql.SQL("SELECT raw_id FROM {} ORDER BY raw_id").format(
+                _identifier(ARCHIVE_SCHEMA, f"events_{partition_suffix(month)}")
+            )
+        )
+        raw_ids = [row[0] for row in cursor.fetchall()]
+
+        export = None
+        if export_dir:
+            os.makedirs(export_dir, exist_ok=True)
+            export = gzip.open(os.path.join(export_dir, f"events_raw_{month:%Y_%m}.jsonl.gz"), "at", encoding="utf-8")
+        try:
+            for offset in range(0, len(raw_ids), batch_size):
+                ids = mongo_ids(raw_ids[offset:offset + batch_size])
+                if export:
+                    for document in mongo_client.raw.find({"_id": {"$in": ids}}):
+                        export.write(json_util.dumps(document) + "\n")
+                counts["enriched"] += mongo_client.enriched.delete_many({"raw_id": {"$in": ids}}).deleted_count
+                counts["raw"] += mongo_client.raw.delete_many({"_id": {"$in": ids}}).deleted_count
+        finally:
+            if export:
+                export.close()
+
+        cursor.execute(
+            sql.SQL("UPDATE {}.archived_months SET mongo_pruned_at = CURRENT_TIMESTAMP WHERE month = %s").format(archive),
+            (month,)
+        )
+        conn.commit()
+        logger.info(f"🧹 {month:%Y-%m}: {len(raw_ids)} événement(s) purgé(s) de MongoDB")
+
+    return counts
+
+
+def run(loader, retention_days: int = RETENTION_DAYS, batch_size: int = BATCH_SIZE,
+        export_dir: Optional[str] = None) -> Dict:
+    """Archive les mois hors rétention, purge MongoDB, réaligne les compteurs"""
+    from etl.counters import rebuild
+
+    cutoff = date.today() - timedelta(days=retention_days)
+    prepare_archive(loader.conn)
+
+    months = archivable_months(loader.conn, cutoff)
+    archived = sum(archive_month(loader.conn, month, batch_size) for month in months)
+
+    pruned = prune_mongo(loader.conn, loader.mongo_client, batch_size, export_dir)
+
+    # Les partitions supprimées ne passent pas par les triggers de compteurs
+    if months:
+        rebuild(loader.conn)
+        loader.publish()
+
+    return {
+        "cutoff": cutoff.isoformat(),
+        "months": [month.isoformat() for month in months],
+        "archived": archived,
+        "mongo_deleted": pruned,
+    }
+
+
+def main():
+    """🚀 Point d'entrée principal"""
+    from etl.loader import PostgreSQLLoader
+
+    parser = argparse.ArgumentParser(description="Rétention et archivage des événements passés")
+    parser.add_argument("--days", type=int, default=RETENTION_DAYS, help="Horizon de rétention (jours)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Taille des lots de suppression")
+    parser.add_argument("--export-dir", default=None, help="Exporter les documents RAW purgés (.jsonl.gz)")
+    parser.add_argument("--dry-run", action="store_true", help="Lister les mois archivables sans rien modifier")
+    args = parser.parse_args()
+
+    loader = PostgreSQLLoader()
+    if not loader.connect():
+        sys.exit(2)
+
+    try:
+        if args.dry_run:
+            cutoff = date.today() - timedelta(days=args.days)
+            months = archivable_months(loader.conn, cutoff)
+            print(f"🗓️ Horizon: {cutoff.isoformat()} → {len(months)} mois archivable(s)")
+            for month in months:
+                print(f"   - {month:%Y-%m}")
+            return
+
+        if not loader.mongo_client.connect():
+            sys.exit(2)
+        result = run(loader, args.days, args.batch_size, args.export_dir)
+        print(f"🗄️ {result['archived']} événement(s) archivé(s) ({len(result['months'])} mois, avant {result['cutoff']})")
+        print(f"🧹 MongoDB: {result['mongo_deleted']['raw']} RAW, {result['mongo_deleted']['enriched']} enrichis supprimés")
+    finally:
+        loader.disconnect()
+
+
+if __name__ == "__main__":
+    main()
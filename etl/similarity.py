@@ -0,0 +1,391 @@
+"""
+ETL - Similarité
+Pré-calcule les K événements les plus proches de chaque événement
+(TF-IDF sur titre, description et mots-clés + catégorie + localisation)
+
+Les caractéristiques de chaque événement (similarity_features) et les
+fréquences documentaires (similarity_terms) sont conservées : une mise à
+jour incrémentale ne lit que les nouveaux événements et leurs candidats.
+"""
+
+import heapq
+import logging
+import re
+from collections import Counter
+from datetime import date
+from math import log, sqrt
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STOP_WORDS = {
+    "le", "la", "les", "un", "une", "des", "et", "ou", "mais", "donc",
+    "de", "du", "au", "aux", "pour", "par", "sur", "dans", "avec", "sans",
+    "est", "sont", "sera", "seront", "être", "avoir", "qui", "que", "quoi",
+    "ce", "cet", "cette", "ces", "son", "sa", "ses", "leur", "leurs", "nos",
+    "vos", "votre", "notre", "tout", "tous", "toute", "toutes", "plus", "très",
+    "the", "and", "for", "with", "nbsp",
+}
+
+TAG_RE = re.compile(r"<[^>]+>")
+TOKEN_RE = re.compile(r"[^\W\d_]{3,}")
+
+# Poids relatifs des familles de caractéristiques
+TITLE_WEIGHT = 2.0
+DESCRIPTION_WEIGHT = 1.0
+KEYWORD_WEIGHT = 2.0
+CATEGORY_WEIGHT = 3.0
+PARENT_CATEGORY_WEIGHT = 1.5
+ARRONDISSEMENT_WEIGHT = 1.0
+GEO_CELL_WEIGHT = 1.0
+
+# Taille de maille géographique (degrés, ~1 km à Paris)
+GEO_CELL_SIZE = 0.01
+
+# Ligne de similarity_terms dont df est le nombre de documents vectorisés
+DOCUMENTS_TERM = ""
+
+
+class SimilarityBuilder:
+    """Calcule et stocke les voisins les plus similaires (table event_similarities)"""
+
+    def __init__(self, top_k: int = 10, max_df_ratio: float = 0.05, min_postings: int = 50):
+        self.top_k = top_k
+        # Les termes trop fréquents ne servent pas à générer des candidats
+        self.max_df_ratio = max_df_ratio
+        self.min_postings = min_postings
+
+    # -------------------------------------------------
+    # VECTORISATION
+    # -------------------------------------------------
+
+    def _tokens(self, text: Optional[str]) -> List[str]:
+        if not text:
+            return []
+        text = TAG_RE.sub(" ", str(text)).lower()
+        return [t for t in TOKEN_RE.findall(text) if t not in STOP_WORDS]
+
+    def _features(self, row: Dict) -> Dict[str, float]:
+        """Fréquences pondérées des caractéristiques brutes d'un événement"""
+        features = Counter()
+
+        for token in self._tokens(row.get("title")):
+            features[f"w:{token}"] += TITLE_WEIGHT
+        for token in self._tokens(row.get("description")):
+            features[f"w:{token}"] += DESCRIPTION_WEIGHT
+        for keyword in row.get("keywords") or []:
+            for token in self._tokens(keyword):
+                features[f"w:{token}"] += KEYWORD_WEIGHT
+
+        if row.get("category_name"):
+            features[f"cat:{row['category_name']}"] += CATEGORY_WEIGHT
+        if row.get("parent_category"):
+            features[f"cat:{row['parent_category']}"] += PARENT_CATEGORY_WEIGHT
+        if row.get("arrondissement"):
+            features[f"arr:{row['arrondissement']}"] += ARRONDISSEMENT_WEIGHT
+
+        lat, lon = row.get("latitude"), row.get("longitude")
+        if lat is not None and lon is not None:
+            cell = (int(float(lat) // GEO_CELL_SIZE), int(float(lon) // GEO_CELL_SIZE))
+            features[f"geo:{cell[0]}:{cell[1]}"] += GEO_CELL_WEIGHT
+
+        return features
+
+    @staticmethod
+    def _weights(features: Dict[str, float], df: Dict[str, int], n_docs: int) -> Optional[Dict[str, float]]:
+        """Vecteur TF-IDF normalisé (L2) d'un événement, None s'il est vide"""
+        vector = {
+            term: (1 + log(tf)) * (log((1 + n_docs) / (1 + df[term])) + 1)
+            for term, tf in features.items()
+            if tf > 0
+        }
+        norm = sqrt(sum(w * w for w in vector.values()))
+        if not norm:
+            return None
+        return {term: w / norm for term, w in vector.items()}
+
+    def _vectorize(self, raw: Dict[int, Dict[str, float]]) -> Dict[int, Dict[str, float]]:
+        df = self._df_changes([], raw)
+        n_docs = df.pop(DOCUMENTS_TERM, 0)
+        vectors = {}
+        for event_id, features in raw.items():
+            vector = self._weights(features, df, n_docs)
+            if vector:
+                vectors[event_id] = vector
+        return vectors
+
+    def vectorize(self, rows: Iterable[Dict]) -> Dict[int, Dict[str, float]]:
+        """Vecteurs TF-IDF normalisés (L2), indexés par id d'événement"""
+        return self._vectorize({row["id"]: self._features(row) for row in rows})
+
+    @staticmethod
+    def _df_changes(removed: Iterable[Tuple[int, str]], added: Dict[int, Dict[str, float]]) -> Counter:
+        """
+        Variation des fréquences documentaires : lignes (event_id, term) retirées,
+        caractéristiques ajoutées. DOCUMENTS_TERM compte les événements non vides.
+        """
+        changes = Counter()
+        removed_ids = set()
+        for event_id, term in removed:
+            changes[term] -= 1
+            removed_ids.add(event_id)
+        changes[DOCUMENTS_TERM] -= len(removed_ids)
+
+        for features in added.values():
+            if features:
+                changes.update(features.keys())
+                changes[DOCUMENTS_TERM] += 1
+        return changes
+
+    # -------------------------------------------------
+    # VOISINS
+    # -------------------------------------------------
+
+    def _postings(self, vectors: Dict[int, Dict[str, float]]) -> Dict[str, List[int]]:
+        """Index inversé limité aux termes assez rares pour générer des candidats"""
+        postings = {}
+        for event_id, vector in vectors.items():
+            for term in vector:
+                postings.setdefault(term, []).append(event_id)
+
+        max_postings = max(self.min_postings, int(self.max_df_ratio * len(vectors)))
+        return {term: ids for term, ids in postings.items() if len(ids) <= max_postings}
+
+    @staticmethod
+    def _dot(a: Dict[str, float], b: Dict[str, float]) -> float:
+        if len(a) > len(b):
+            a, b = b, a
+        return sum(w * b[t] for t, w in a.items() if t in b)
+
+    def _scores(self, vectors, postings, event_id: int) -> List[Tuple[float, int]]:
+        """Cosinus exact entre un événement et ses candidats"""
+        vector = vectors[event_id]
+        candidates = set()
+        for term in vector:
+            candidates.update(postings.get(term, ()))
+        candidates.discard(event_id)
+        return [(self._dot(vector, vectors[c]), c) for c in candidates]
+
+    def _top(self, scored: Iterable[Tuple[float, int]]) -> List[Tuple[int, float]]:
+        best = heapq.nlargest(self.top_k, (s for s in scored if s[0] > 0))
+        return [(event_id, score) for score, event_id in best]
+
+    def neighbours(self, vectors: Dict[int, Dict[str, float]]) -> Dict[int, List[Tuple[int, float]]]:
+        """Top-K voisins de chaque événement"""
+        postings = self._postings(vectors)
+        return {
+            event_id: self._top(self._scores(vectors, postings, event_id))
+            for event_id in vectors
+        }
+
+    # -------------------------------------------------
+    # POSTGRESQL
+    # -------------------------------------------------
+
+    def _fetch_events(self, conn, event_ids: Optional[List[int]] = None) -> List[Dict]:
+        """Événements à vectoriser (tous, ou ceux de event_ids)"""
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT e.id, e.event_date, e.title, e.description, e.keywords, e.arrondissement,
+                   e.latitude, e.longitude, c.name, c.parent_category
+            FROM events e
+            LEFT JOIN event_categories ec
+                ON e.id = ec.event_id AND e.event_date = ec.event_date AND ec.is_primary = TRUE
+            LEFT JOIN categories c ON ec.category_id = c.id
+        """ + ("WHERE e.id = ANY(%s)" if event_ids is not None else ""),
+            (event_ids,) if event_ids is not None else None)
+        columns = ["id", "event_date", "title", "description", "keywords", "arrondissement",
+                   "latitude", "longitude", "category_name", "parent_category"]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def _write(self, conn, lists: Dict[int, List[Tuple[int, float]]], dates: Dict[int, date],
+               replace_all: bool = False):
+        """dates : event_date de chaque événement (clé de partition des deux côtés)"""
+        cursor = conn.cursor()
+        if replace_all:
+            cursor.execute("TRUNCATE event_similarities")
+        elif lists:
+            cursor.execute(
+                "DELETE FROM event_similarities WHERE event_id = ANY(%s)",
+                (list(lists.keys()),)
+            )
+
+        with cursor.copy(
+            "COPY event_similarities (event_id, event_date, similar_event_id, similar_event_date, rank, score)"
+            " FROM STDIN"
+        ) as copy:
+            for event_id, neighbours in lists.items():
+                for rank, (similar_id, score) in enumerate(neighbours, 1):
+                    copy.write_row((event_id, dates[event_id], similar_id, dates[similar_id], rank, round(score, 4)))
+
+    def _store_features(self, cursor, features: Dict[int, Dict[str, float]],
+                        replaced: Iterable[int] = (), replace_all: bool = False):
+        """
+        Remplace les caractéristiques conservées des événements `replaced`
+        (toutes si replace_all) par `features` et met à jour les df.
+        """
+        if replace_all:
+            cursor.execute("TRUNCATE similarity_features, similarity_terms")
+            removed = []
+        else:
+            cursor.execute(
+                "DELETE FROM similarity_features WHERE event_id = ANY(%s) RETURNING event_id, term",
+                (list(replaced),)
+            )
+            removed = cursor.fetchall()
+
+        with cursor.copy("COPY similarity_features (event_id, term, tf) FROM STDIN") as copy:
+            for event_id, event_features in features.items():
+                for term, tf in event_features.items():
+                    copy.write_row((event_id, term, tf))
+
+        changes = {term: delta for term, delta in self._df_changes(removed, features).items() if delta}
+        if changes:
+            terms = list(changes.keys())
+            cursor.execute(
+                """INSERT INTO similarity_terms (term, df)
+                   SELECT * FROM unnest(%s::text[], %s::integer[])
+                   ON CONFLICT (term) DO UPDATE SET df = similarity_terms.df + EXCLUDED.df""",
+                (terms, list(changes.values()))
+            )
+            cursor.execute("DELETE FROM similarity_terms WHERE term = ANY(%s) AND df <= 0", (terms,))
+
+    def build(self, conn) -> Dict:
+        """Recalcul complet de event_similarities et des caractéristiques conservées"""
+        events = self._fetch_events(conn)
+        raw = {e["id"]: self._features(e) for e in events}
+        vectors = self._vectorize(raw)
+        lists = self.neighbours(vectors)
+        cursor = conn.cursor()
+        self._write(conn, lists, {e["id"]: e["event_date"] for e in events}, replace_all=True)
+        self._store_features(cursor, raw, replace_all=True)
+        conn.commit()
+
+        logger.info(f"✅ Similarités calculées pour {len(lists)} événements")
+        return {"mode": "full", "events": len(lists), "updated": len(lists)}
+
+    def _candidates(self, cursor, rare_terms: List[str]) -> List[int]:
+        """Événements ayant au moins un des termes rares des nouveaux événements"""
+        cursor.execute(
+            "SELECT DISTINCT event_id FROM similarity_features WHERE term = ANY(%s)", (rare_terms,)
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+    def _stored_vectors(self, cursor, event_ids: List[int], n_docs: int) -> Dict[int, Dict[str, float]]:
+        """Vecteurs TF-IDF recalculés depuis les caractéristiques et df conservés"""
+        cursor.execute(
+            """SELECT f.event_id, f.term, f.tf, t.df
+               FROM similarity_features f JOIN similarity_terms t USING (term)
+               WHERE f.event_id = ANY(%s)""",
+            (event_ids,)
+        )
+        raw: Dict[int, Dict[str, float]] = {}
+        df: Dict[str, int] = {}
+        for event_id, term, tf, term_df in cursor.fetchall():
+            raw.setdefault(event_id, {})[term] = tf
+            df[term] = term_df
+
+        vectors = {}
+        for event_id, features in raw.items():
+            vector = self._weights(features, df, n_docs)
+            if vector:
+                vectors[event_id] = vector
+        return vectors
+
+    def refresh(self, conn, new_event_ids: List[int]) -> Dict:
+        """
+        Mise à jour incrémentale après un chargement.
+
+        Seuls les nouveaux événements (insérés ou modifiés) sont lus et
+        vectorisés ; leurs candidats (termes rares en commun) sont relus depuis
+        similarity_features, pondérés avec les df conservés. Les voisins des
+        nouveaux événements sont recalculés et insérés dans les listes
+        existantes qu'ils améliorent. Recalcul complet si aucun df n'est conservé.
+        """
+        cursor = conn.cursor()
+        cursor.execute("SELECT df FROM similarity_terms WHERE term = %s", (DOCUMENTS_TERM,))
+        row = cursor.fetchone()
+        if not row:
+            return self.build(conn)
+
+        new_ids = set(new_event_ids)
+        if not new_ids:
+            return {"mode": "incremental", "events": 0, "updated": 0}
+
+        # Caractéristiques des nouveaux événements (supprimés depuis : retirées)
+        events = self._fetch_events(conn, list(new_ids))
+        raw = {e["id"]: self._features(e) for e in events}
+        self._store_features(cursor, raw, new_ids)
+        dates = {e["id"]: e["event_date"] for e in events}
+
+        cursor.execute("SELECT df FROM similarity_terms WHERE term = %s", (DOCUMENTS_TERM,))
+        row = cursor.fetchone()
+        n_docs = row[0] if row else 0
+        max_postings = max(self.min_postings, int(self.max_df_ratio * n_docs))
+        # Termes assez rares pour générer des candidats (comme _postings)
+        cursor.execute(
+            "SELECT term FROM similarity_terms WHERE term = ANY(%s) AND df <= %s",
+            (sorted({term for features in raw.values() for term in features}), max_postings)
+        )
+        rare_terms = [row[0] for row in cursor.fetchall()]
+        candidate_ids = set(self._candidates(cursor, rare_terms)) - new_ids
+
+        # Dates des candidats ; ceux qui ne sont plus dans events sont purgés
+        if candidate_ids:
+            cursor.execute("SELECT id, event_date FROM events WHERE id = ANY(%s)", (list(candidate_ids),))
+            candidate_dates = dict(cursor.fetchall())
+            orphans = candidate_ids - candidate_dates.keys()
+            if orphans:
+                self._store_features(cursor, {}, orphans)
+            candidate_ids -= orphans
+            dates.update(candidate_dates)
+
+        vectors = self._stored_vectors(cursor, list(new_ids | candidate_ids), n_docs)
+        postings: Dict[str, List[int]] = {term: [] for term in rare_terms}
+        for event_id, vector in vectors.items():
+            for term in vector:
+                if term in postings:
+                    postings[term].append(event_id)
+
+        updated = {}
+        # Meilleur score de chaque nouvel événement vers chaque événement existant
+        improvements: Dict[int, List[Tuple[float, int]]] = {}
+        for event_id in new_ids & vectors.keys():
+            scored = self._scores(vectors, postings, event_id)
+            updated[event_id] = self._top(scored)
+            for score, other_id in scored:
+                if other_id not in new_ids and score > 0:
+                    improvements.setdefault(other_id, []).append((score, event_id))
+
+        if improvements:
+            cursor.execute(
+                """SELECT event_id, similar_event_id, score
+                   FROM event_similarities WHERE event_id = ANY(%s)""",
+                (list(improvements.keys()),)
+            )
+            current: Dict[int, List[Tuple[float, int]]] = {}
+            for event_id, similar_id, score in cursor.fetchall():
+                current.setdefault(event_id, []).append((float(score), similar_id))
+
+            # Dates des voisins conservés (listes réécrites en entier)
+            kept = {other_id for lists in current.values() for _, other_id in lists} - dates.keys()
+            if kept:
+                cursor.execute("SELECT id, event_date FROM events WHERE id = ANY(%s)", (list(kept),))
+                dates.update(cursor.fetchall())
+
+            for event_id, candidates in improvements.items():
+                # Les événements mis à jour sont re-scorés : on écarte leur ancien score
+                existing = [(score, other_id) for score, other_id in current.get(event_id, [])
+                            if other_id not in new_ids and other_id in dates]
+                floor = min(existing)[0] if len(existing) >= self.top_k else 0.0
+                if any(score > floor for score, _ in candidates):
+                    updated[event_id] = self._top(existing + candidates)
+
+        self._write(conn, updated, dates)
+        conn.commit()
+
+        logger.info(
+            f"✅ Similarités mises à jour: {len(updated)} listes ({len(new_ids)} nouveaux événements, "
+            f"{len(candidate_ids)} candidats)"
+        )
+        return {"mode": "incremental", "events": len(new_ids), "updated": len(updated)}
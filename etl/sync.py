@@ -0,0 +1,332 @@
+"""
+ETL - Synchronisation continue MongoDB -> PostgreSQL (change streams)
+Service longue durée : suit le change stream de events_enriched, regroupe
+les changements en micro-lots (taille ou délai max atteint) et les applique
+par le chemin du loader (RAW en $in, transform_batch, COPY + fusion,
+tombstones). Le jeton de reprise du dernier lot écrit est enregistré dans
+etl_state : un redémarrage reprend juste après. Un lot rejoué après un arrêt
+brutal (écrit, jeton pas encore enregistré) est sans effet : les upserts ne
+réécrivent que les lignes modifiées.
+
+Premier démarrage (sans jeton) : le stream est ouvert, puis un chargement
+incrémental rattrape les documents enrichis depuis le filigrane du loader ;
+les changements arrivés entre-temps sont lus ensuite dans le stream.
+Historique perdu (jeton sorti de l'oplog) : même rattrapage depuis l'heure
+du dernier changement appliqué.
+
+Les change streams exigent un replica set ; en local, un seul nœud suffit :
+    mongod --replSet rs0 --dbpath data/rs0
+    mongosh --eval "rs.initiate()"
+    export MONGODB_URI="mongodb://localhost:27017/?replicaSet=rs0"
+
+Les suppressions passent par des tombstones (MongoDBClient.tombstone) :
+un document enrichi supprimé physiquement n'a plus de raw_id et est ignoré.
+
+Usage :
+    python etl/sync.py                       # Lots de 500 changements ou 1 s
+    python etl/sync.py --batch-size 1000 --max-wait 0.5
+    python etl/sync.py --reset               # Oublie le jeton (rattrapage)
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import logging
+import signal
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from bson import json_util
+from pymongo.errors import OperationFailure
+
+from etl.loader import PostgreSQLLoader, WATERMARK_LAG
+from etl.transformer import DataTransformer
+from storage.mongodb_client import MongoDBClient
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Ligne etl_state du change stream (jeton + heure du dernier changement)
+STREAM_STATE_NAME = "events_stream"
+
+# Opérations appliquées (les autres : drop, rename, invalidate... ignorées)
+STREAM_PIPELINE = [{"$match": {"operationType": {"$in": ["insert", "update", "replace", "delete"]}}}]
+
+# ChangeStreamHistoryLost : le jeton n'est plus dans l'oplog
+HISTORY_LOST = 286
+
+# Stream inactif : le jeton de fin de lot serveur est enregistré au plus à
+# cet intervalle (évite de sortir de l'oplog sur une collection calme)
+IDLE_SAVE_SECONDS = 10.0
+
+# Similarités et notification des snapshots API au plus à cet intervalle
+PUBLISH_SECONDS = 60.0
+
+COUNTED = ("changes", "processed", "inserted", "updated", "unchanged", "skipped", "deleted", "errors", "ignored")
+
+
+class ChangeStreamSync:
+    """Applique les changements de events_enriched à PostgreSQL par micro-lots"""
+
+    def __init__(self, loader: PostgreSQLLoader, batch_size: int = 500, max_wait: float = 1.0,
+                 stream_client: Optional[MongoDBClient] = None):
+        self.loader = loader
+        # Client dédié au stream (curseur tailable ouvert pendant tout le service)
+        self.stream_client = stream_client or MongoDBClient()
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+
+        self.stats = {key: 0 for key in COUNTED}
+        self.stats.update({"batches": 0, "lag_seconds": None})
+
+        self._saved_token: Optional[Dict] = None
+        self._last_save = 0.0
+        self._last_publish = time.monotonic()
+
+    # -------------------------------------------------
+    # ÉTAT (etl_state)
+    # -------------------------------------------------
+
+    def load_state(self) -> Tuple[Optional[Dict], Optional[datetime]]:
+        """(jeton de reprise, heure UTC du dernier changement appliqué)"""
+        cursor = self.loader.cursor
+        cursor.execute("SELECT resume_token, watermark FROM etl_state WHERE name = %s", (STREAM_STATE_NAME,))
+        row = cursor.fetchone()
+        self.loader.conn.commit()
+        if not row:
+            return None, None
+        token = json_util.loads(json.dumps(row[0])) if row[0] is not None else None
+        return token, row[1]
+
+    def save_state(self, token: Optional[Dict], changed_at: Optional[datetime] = None):
+        """Enregistre le jeton (et l'heure du dernier changement s'il y en a une)"""
+        self.loader.cursor.execute(
+            """INSERT INTO etl_state (name, resume_token, watermark) VALUES (%s, %s::jsonb, %s)
+               ON CONFLICT (name) DO UPDATE
+               SET resume_token = EXCLUDED.resume_token,
+                   watermark = COALESCE(EXCLUDED.watermark, etl_state.watermark),
+                   updated_at = CURRENT_TIMESTAMP""",
+            (STREAM_STATE_NAME, json_util.dumps(token) if token is not None else None, changed_at)
+        )
+        self.loader.conn.commit()
+        self._saved_token = token
+        self._last_save = time.monotonic()
+
+    def reset(self):
+        """Oublie le jeton : le prochain démarrage rattrape depuis le filigrane"""
+        self.loader.cursor.execute("DELETE FROM etl_state WHERE name = %s", (STREAM_STATE_NAME,))
+        self.loader.conn.commit()
+
+    # -------------------------------------------------
+    # MICRO-LOTS
+    # -------------------------------------------------
+
+    @staticmethod
+    def _changed_at(change: Dict) -> Optional[datetime]:
+        """clusterTime (Timestamp BSON) -> datetime UTC naïf, comme enriched_at"""
+        cluster_time = change.get("clusterTime")
+        if cluster_time is None:
+            return None
+        return datetime.fromtimestamp(cluster_time.time, tz=timezone.utc).replace(tzinfo=None)
+
+    def split_changes(self, changes: List[Dict]) -> Tuple[List[Dict], List[str], int]:
+        """
+        (documents enrichis à upserter, raw_id des tombstones, changements ignorés).
+        Dernière version par document : un même événement modifié plusieurs
+        fois dans le lot n'est écrit qu'une fois.
+        """
+        latest: Dict = {}
+        ignored = 0
+        for change in changes:
+            document = change.get("fullDocument")
+            if change["operationType"] == "delete" or document is None:
+                # Supprimé physiquement (ou avant la lecture de updateLookup)
+                ignored += 1
+                continue
+            latest[change["documentKey"]["_id"]] = document
+
+        live, tombstones = [], []
+        for document in latest.values():
+            if document.get("status") == "deleted":
+                tombstones.append(str(document.get("raw_id")))
+            else:
+                live.append(document)
+        return live, tombstones, ignored
+
+    def flush(self, changes: List[Dict]):
+        """Écrit un micro-lot puis enregistre le jeton de son dernier changement"""
+        live, tombstones, ignored = self.split_changes(changes)
+        failed_batches = self.loader.failed_batches
+
+        raw_docs = self.loader.fetch_raw_documents(live) if live else {}
+        events, errors = self.loader.transform_batch(live, raw_docs)
+        counts = {key: 0 for key in ("inserted", "updated", "unchanged", "skipped", "errors")}
+        # Toujours en fusion ensembliste : le mode ligne n'applique pas les modifications
+        self.loader.load_events(events, True, counts)
+        deleted = self.loader.delete_events(tombstones)
+
+        # Lot entier annulé (base indisponible...) : pas de jeton, arrêt et reprise
+        if self.loader.failed_batches > failed_batches:
+            raise RuntimeError("micro-lot non écrit, jeton de reprise inchangé")
+
+        changed_at = self._changed_at(changes[-1])
+        self.save_state(changes[-1]["_id"], changed_at)
+
+        for key, value in counts.items():
+            self.stats[key] += value
+        self.stats["errors"] += errors
+        self.stats["changes"] += len(changes)
+        self.stats["processed"] += DataTransformer.row_count(events) + len(tombstones)
+        self.stats["deleted"] += deleted
+        self.stats["ignored"] += ignored
+        self.stats["batches"] += 1
+        if changed_at:
+            self.stats["lag_seconds"] = round((datetime.utcnow() - changed_at).total_seconds(), 3)
+
+        logger.info(
+            f"🔄 Lot {self.stats['batches']}: {len(changes)} changement(s), "
+            f"+{counts['inserted']} ~{counts['updated']} ={counts['unchanged']} -{deleted}, retard {self.stats['lag_seconds']}s"
+        )
+
+    def _publish_if_due(self, force: bool = False):
+        """Similarités des événements écrits et notification des snapshots, périodiquement"""
+        if not self.loader.inserted_event_ids:
+            return
+        if not force and time.monotonic() - self._last_publish < PUBLISH_SECONDS:
+            return
+        self.loader.refresh_similarities()
+        self.loader.inserted_event_ids = []
+        self.loader.publish()
+        self._last_publish = time.monotonic()
+
+    def consume(self, stream, stop: threading.Event, max_batches: Optional[int] = None):
+        """Lit le stream jusqu'à stop (ou max_batches lots écrits)"""
+        pending: List[Dict] = []
+        first_at = 0.0
+
+        while not stop.is_set():
+            change = stream.try_next()
+            if change is not None:
+                if not pending:
+                    first_at = time.monotonic()
+                pending.append(change)
+
+            if pending and (len(pending) >= self.batch_size or time.monotonic() - first_at >= self.max_wait):
+                self.flush(pending)
+                pending = []
+                self._publish_if_due()
+                if max_batches and self.stats["batches"] >= max_batches:
+                    break
+            elif not pending:
+                # Rien en attente : le jeton serveur peut avancer sans perte
+                token = stream.resume_token
+                if token is not None and token != self._saved_token \
+                        and time.monotonic() - self._last_save >= IDLE_SAVE_SECONDS:
+                    self.save_state(token)
+                self._publish_if_due()
+
+        self._publish_if_due(force=True)
+
+    # -------------------------------------------------
+    # SERVICE
+    # -------------------------------------------------
+
+    def _open_stream(self, token: Optional[Dict]):
+        return self.stream_client.enriched.watch(
+            STREAM_PIPELINE,
+            full_document="updateLookup",
+            resume_after=token,
+            max_await_time_ms=max(1, int(self.max_wait * 1000)),
+        )
+
+    def _catch_up(self, since: Optional[datetime]):
+        """Chargement incrémental des documents enrichis depuis `since` (tout si None)"""
+        logger.info(f"⏩ Rattrapage depuis {since.isoformat() if since else 'le début'}")
+        # Le client du loader sert encore aux micro-lots (fetch_raw_documents)
+        stats = self.loader.load_all_events(batch_size=self.batch_size, since=since, disconnect=False)
+        if not stats["completed"] or self.loader.failed_batches:
+            raise RuntimeError("rattrapage incomplet")
+        self.loader.save_watermark(stats["watermark"])
+        logger.info(f"✅ Rattrapage: {stats['processed']} événement(s)")
+
+    def run(self, stop: threading.Event, max_batches: Optional[int] = None) -> Dict:
+        """Ouvre le stream (reprise ou rattrapage) puis applique les changements"""
+        token, changed_at = self.load_state()
+        self.loader.prefetch_dimensions()
+        self.loader.ensure_future_partitions()
+
+        since = None
+        try:
+            stream = self._open_stream(token)
+        except OperationFailure as e:
+            if e.code != HISTORY_LOST:
+                raise
+            logger.warning("⚠️ Jeton de reprise hors de l'oplog : rattrapage puis nouveau stream")
+            token = None
+            since = (changed_at - WATERMARK_LAG) if changed_at else self.loader.get_watermark()
+            stream = self._open_stream(None)
+        else:
+            if token is None:
+                since = self.loader.get_watermark()
+
+        with stream:
+            if token is None:
+                # Stream ouvert avant le rattrapage : aucun changement perdu entre les deux
+                self.save_state(stream.resume_token)
+                self._catch_up(since)
+            logger.info(f"👂 Change stream ouvert (lots de {self.batch_size} ou {self.max_wait}s)")
+            self.consume(stream, stop, max_batches)
+
+        return self.stats
+
+
+def main():
+    """🚀 Point d'entrée principal"""
+    parser = argparse.ArgumentParser(description="Synchronisation continue MongoDB → PostgreSQL")
+    parser.add_argument("--batch-size", type=int, default=500, help="Changements max par micro-lot")
+    parser.add_argument("--max-wait", type=float, default=1.0, help="Délai max (s) avant d'écrire un lot incomplet")
+    parser.add_argument("--reset", action="store_true", help="Oublier le jeton de reprise (rattrapage au démarrage)")
+    args = parser.parse_args()
+
+    loader = PostgreSQLLoader()
+    if not loader.connect():
+        sys.exit(2)
+    if not loader.schema_exists():
+        logger.error("❌ Schéma absent : lancer d'abord python etl/loader.py --full")
+        loader.disconnect()
+        sys.exit(2)
+    if not loader.mongo_client.connect():
+        loader.disconnect()
+        sys.exit(2)
+
+    sync = ChangeStreamSync(loader, args.batch_size, args.max_wait)
+    if args.reset:
+        sync.reset()
+
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+
+    print("=" * 70)
+    print("🔁 SYNCHRONISATION CONTINUE MONGODB → POSTGRESQL")
+    print("=" * 70 + "\n")
+
+    try:
+        stats = sync.run(stop)
+    finally:
+        sync.stream_client.disconnect()
+        loader.mongo_client.disconnect()
+        loader.disconnect()
+
+    print(f"\n🛑 Arrêt: {stats['changes']} changement(s) en {stats['batches']} lot(s), "
+          f"{stats['inserted']} insérés, {stats['updated']} modifiés, {stats['deleted']} supprimés, "
+          f"{stats['errors']} erreurs")
+
+
+if __name__ == "__main__":
+    main()
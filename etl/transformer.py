@@ -1,141 +1,209 @@
-from typing import Dict, Optional
-from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 import logging
 
+from enrichment.dates import parse_date, to_local
+from enrichment.extractors import extract, payload_projection
+
 logger = logging.getLogger(__name__)
 
+# Colonnes produites par transform_batch : ordre de EVENT_COLUMNS du loader
+# (city_name à la place de city_id), puis les catégories à résoudre
+BATCH_COLUMNS = [
+    "raw_id", "source", "raw_hash", "enricher_version", "title", "description", "keywords",
+    "city_name", "address_street", "address_name", "zipcode", "arrondissement",
+    "latitude", "longitude", "distance_center", "geocoded",
+    "event_date", "event_datetime", "is_multi_day", "duration_days",
+    "price_type", "price_detail", "is_free", "accessibility_score",
+    "contact_url", "contact_phone", "contact_email",
+    "main_category", "sub_category", "category_confidence",
+]
+
+# Colonnes issues de la date de l'événement. Le calendrier (année, jour de
+# la semaine, saison...) est calculé par PostgreSQL (colonnes générées) ;
+# event_datetime est NULL quand la source ne donne pas d'heure.
+DATE_COLUMNS = ["event_date", "event_datetime"]
+
+# Colonnes texte nettoyées par _clean_text (longueur maximale)
+TEXT_COLUMNS = {
+    "title": 500, "description": None, "address_street": 255, "address_name": 255,
+    "price_type": 50, "price_detail": 255,
+    "contact_url": 500, "contact_phone": 50, "contact_email": 255,
+}
+
 
 class DataTransformer:
     """Transforme les données MongoDB vers PostgreSQL"""
 
+    # Champs des documents RAW lus par les extracteurs (projection MongoDB)
+    RAW_PROJECTION = payload_projection()
+
+    # Champs des documents enrichis lus par transform_event
+    ENRICHED_PROJECTION = {
+        "raw_id": 1,
+        "raw_hash": 1,
+        "enricher_version": 1,
+        "status": 1,
+        "data": 1,
+    }
+
     def __init__(self):
         self.processed_count = 0
         self.error_count = 0
 
     def transform_event(self, raw_doc: Dict, enriched_doc: Dict) -> Optional[Dict]:
         """
-        Transforme un événement MongoDB vers format SQL
+        Transforme un événement MongoDB vers format SQL (dict, None si erreur).
+        Lot d'un seul événement : mêmes règles que transform_batch.
         """
-
-        try:
-            payload = raw_doc.get("payload", {})
-            enriched_data = enriched_doc.get("data", {})
-
-            # -----------------------------
-            # 1. Construction de base
-            # -----------------------------
-            event_data = {
-                "raw_id": str(raw_doc["_id"]),
-                "source": raw_doc.get("source", "unknown"),
-
-                "title": self._clean_text(payload.get("title"), max_length=500),
-                "description": self._clean_text(payload.get("description")),
-
-                "address_street": self._extract_address_street(payload),
-                "address_name": self._extract_address_name(payload),
-                "zipcode": self._extract_zipcode(payload, enriched_data),
-                "arrondissement": enriched_data.get("arrondissement"),
-
-                "latitude": enriched_data.get("latitude"),
-                "longitude": enriched_data.get("longitude"),
-                "distance_center": enriched_data.get("distance_center"),
-                "geocoded": enriched_data.get("geocoded", False),
-
-                # Valeurs brutes (seront recalculées plus bas)
-                "event_date": None,
-                "event_datetime": None,
-                "year": None,
-                "month": None,
-                "day": None,
-                "day_of_week": None,
-                "day_of_week_name": None,
-                "month_name": None,
-                "season": None,
-                "time_period": None,
-                "is_weekend": False,
-                "is_multi_day": enriched_data.get("is_multi_day", False),
-                "duration_days": enriched_data.get("duration_days"),
-
-                "price_type": self._extract_price_type(payload),
-                "price_detail": self._extract_price_detail(payload),
-                "is_free": enriched_data.get("is_free", False),
-                "accessibility_score": enriched_data.get("accessibility_score"),
-
-                "contact_url": self._extract_contact_url(payload),
-                "contact_phone": self._extract_contact_phone(payload),
-                "contact_email": self._extract_contact_email(payload),
-            }
-
-            # -----------------------------
-            # 2. Résolution de la ville
-            # -----------------------------
-            city_name = enriched_data.get("city") or payload.get("address", {}).get("city", "Paris")
-            event_data["city_name"] = city_name
-
-            # -----------------------------
-            # 3. Catégories
-            # -----------------------------
-            event_data["main_category"] = enriched_data.get("main_category", "Autre")
-            event_data["sub_category"] = enriched_data.get("sub_category")
-            event_data["category_confidence"] = enriched_data.get("confidence", 0.0)
-
-            # -----------------------------
-            # 4. CALCUL AUTOMATIQUE DES DATES
-            # -----------------------------
-            raw_dt = (
-                enriched_data.get("event_datetime")
-                or enriched_data.get("event_date")
-                or payload.get("date")
-            )
-
-            if raw_dt:
-                try:
-                    dt = datetime.fromisoformat(raw_dt)
-
-                    event_data["event_datetime"] = dt.isoformat()
-                    event_data["event_date"] = dt.date().isoformat()
-
-                    event_data["year"] = dt.year
-                    event_data["month"] = dt.month
-                    event_data["day"] = dt.day
-
-                    event_data["day_of_week"] = dt.weekday()
-                    event_data["day_of_week_name"] = dt.strftime("%A")
-                    event_data["month_name"] = dt.strftime("%B")
-
-                    event_data["is_weekend"] = dt.weekday() >= 5
-
-                    m = dt.month
-                    if m in (12, 1, 2):
-                        event_data["season"] = "Hiver"
-                    elif m in (3, 4, 5):
-                        event_data["season"] = "Printemps"
-                    elif m in (6, 7, 8):
-                        event_data["season"] = "Été"
-                    else:
-                        event_data["season"] = "Automne"
-
-                    hour = dt.hour
-                    if hour < 12:
-                        event_data["time_period"] = "Matin"
-                    elif hour < 18:
-                        event_data["time_period"] = "Après-midi"
-                    else:
-                        event_data["time_period"] = "Soir"
-
-                except Exception as e:
-                    logger.error(f"Erreur parsing datetime: {e}")
-
-            self.processed_count += 1
-            return event_data
-
-        except Exception as e:
-            logger.error(f"Erreur transformation: {e}")
-            self.error_count += 1
+        columns, errors = self.transform_batch([(raw_doc, enriched_doc)])
+        if errors:
             return None
+        return self.records(columns)[0]
+
+    # -------------------------------------------------
+    # MODE LOT (COLONNES)
+    # -------------------------------------------------
+
+    def transform_batch(self, pairs: List[Tuple[Dict, Dict]]) -> Tuple[Dict[str, list], int]:
+        """
+        Transforme un lot de (document RAW, document enrichi) en colonnes
+        {colonne: [valeurs]} dans l'ordre de BATCH_COLUMNS, et renvoie aussi le
+        nombre d'erreurs. Aucun dict intermédiaire ; chaque date distincte
+        n'est parsée qu'une fois. Le loader écrit ces colonnes telles quelles (COPY).
+        """
+        rows = []
+        raw_dates = []
+        errors = 0
+
+        for raw_doc, enriched_doc in pairs:
+            try:
+                row, raw_dt = self._batch_row(raw_doc, enriched_doc)
+            except Exception as e:
+                logger.error(f"Erreur transformation: {e}")
+                errors += 1
+                continue
+            rows.append(row)
+            raw_dates.append(raw_dt)
+
+        self.processed_count += len(rows)
+        self.error_count += errors
+
+        base_columns = [c for c in BATCH_COLUMNS if c not in DATE_COLUMNS]
+        columns = dict(zip(base_columns, (list(values) for values in zip(*rows))))
+        if not rows:
+            columns = {c: [] for c in base_columns}
+        for column, max_length in TEXT_COLUMNS.items():
+            columns[column] = self._clean_column(columns[column], max_length)
+        columns.update(self._date_columns(raw_dates))
+        return {c: columns[c] for c in BATCH_COLUMNS}, errors
+
+    @staticmethod
+    def records(columns: Dict[str, list]) -> List[Dict]:
+        """Colonnes de transform_batch -> un dict par événement (format de transform_event)"""
+        names = list(columns)
+        return [dict(zip(names, values)) for values in zip(*columns.values())]
+
+    @staticmethod
+    def columns(records: List[Dict]) -> Dict[str, list]:
+        """Inverse de records : dicts au format de transform_event -> colonnes de BATCH_COLUMNS"""
+        return {c: [record.get(c) for record in records] for c in BATCH_COLUMNS}
+
+    @staticmethod
+    def select(columns: Dict[str, list], rows: List[int]) -> Dict[str, list]:
+        """Sous-lot : lignes `rows` (indices) de chaque colonne"""
+        return {c: [values[i] for i in rows] for c, values in columns.items()}
+
+    @staticmethod
+    def row_count(columns: Dict[str, list]) -> int:
+        """Nombre d'événements d'un lot en colonnes"""
+        return len(columns["raw_id"]) if columns else 0
+
+    def _batch_row(self, raw_doc: Dict, enriched_doc: Dict) -> Tuple[tuple, Optional[str]]:
+        """
+        Valeurs hors dates d'un événement (ordre de BATCH_COLUMNS) et sa date
+        brute ; les textes sont nettoyés ensuite, colonne par colonne.
+        """
+        record = extract(raw_doc)
+        enriched_data = enriched_doc.get("data", {})
+
+        row = (
+            str(raw_doc["_id"]),
+            record.source,
+            enriched_doc.get("raw_hash"),
+            enriched_doc.get("enricher_version"),
+            record.title,
+            record.description,
+            enriched_data.get("keywords") or [],
+            enriched_data.get("city") or record.city or "Paris",
+            record.street,
+            record.venue,
+            self._extract_zipcode(record.zipcode, enriched_data),
+            enriched_data.get("arrondissement"),
+            enriched_data.get("latitude"),
+            enriched_data.get("longitude"),
+            enriched_data.get("distance_center"),
+            enriched_data.get("geocoded", False),
+            enriched_data.get("is_multi_day", False),
+            enriched_data.get("duration_days"),
+            record.price_type,
+            record.price_detail,
+            enriched_data.get("is_free", False),
+            enriched_data.get("accessibility_score"),
+            record.contact_url,
+            record.contact_phone,
+            record.contact_email,
+            enriched_data.get("main_category", "Autre"),
+            enriched_data.get("sub_category"),
+            enriched_data.get("confidence", 0.0),
+        )
+        raw_dt = (
+            enriched_data.get("event_datetime")
+            or enriched_data.get("event_date")
+            or record.date
+        )
+        return row, raw_dt
+
+    def _clean_column(self, values: list, max_length: Optional[int]) -> list:
+        """_clean_text sur une colonne (chaînes et None traités sans appel de fonction)"""
+        clean = self._clean_text
+        if max_length is None:
+            return [
+                (v.strip() or None) if type(v) is str else (None if v is None else clean(v))
+                for v in values
+            ]
+        return [
+            (v.strip()[:max_length] or None) if type(v) is str else (None if v is None else clean(v, max_length))
+            for v in values
+        ]
+
+    def _date_columns(self, raw_dates: List) -> Dict[str, list]:
+        """event_date / event_datetime d'un lot (None si date absente ou invalide)"""
+        known = {}
+        event_dates, event_datetimes = [], []
+        for raw_dt in raw_dates:
+            if not raw_dt:
+                parsed = (None, None)
+            elif not isinstance(raw_dt, str):
+                logger.error(f"Erreur parsing datetime: {raw_dt!r} n'est pas une chaîne")
+                parsed = (None, None)
+            elif raw_dt in known:
+                parsed = known[raw_dt]
+            else:
+                date = parse_date(raw_dt)
+                if date:
+                    local = to_local(date.utc)
+                    # Date seule (AAAA-MM-JJ) : pas d'heure, time_period reste NULL
+                    parsed = (local.date().isoformat(), local.isoformat() if date.has_time else None)
+                else:
+                    logger.error(f"Erreur parsing datetime: {raw_dt!r} n'est pas une date")
+                    parsed = (None, None)
+                known[raw_dt] = parsed
+            event_dates.append(parsed[0])
+            event_datetimes.append(parsed[1])
+        return {"event_date": event_dates, "event_datetime": event_datetimes}
 
     # -------------------------------------------------
-    # MÉTHODES UTILITAIRES (inchangées)
+    # MÉTHODES UTILITAIRES
     # -------------------------------------------------
 
     def _clean_text(self, text, max_length=None):
@@ -148,45 +216,12 @@ class DataTransformer:
             return text[:max_length]
         return text
 
-    def _extract_address_street(self, payload):
-        address = payload.get("address", {})
-        return self._clean_text(address.get("street"), 255) if isinstance(address, dict) else None
-
-    def _extract_address_name(self, payload):
-        address = payload.get("address", {})
-        return self._clean_text(address.get("name"), 255) if isinstance(address, dict) else None
-
-    def _extract_zipcode(self, payload, enriched_data):
-        zipcode = enriched_data.get("postcode")
+    def _extract_zipcode(self, source_zipcode, enriched_data):
+        zipcode = enriched_data.get("postcode") or source_zipcode
         if zipcode:
             return str(zipcode)[:10]
-        address = payload.get("address", {})
-        if isinstance(address, dict):
-            zipcode = address.get("zipcode")
-            if zipcode:
-                return str(zipcode)[:10]
         return None
 
-    def _extract_price_type(self, payload):
-        price = payload.get("price", {})
-        return self._clean_text(price.get("type"), 50) if isinstance(price, dict) else None
-
-    def _extract_price_detail(self, payload):
-        price = payload.get("price", {})
-        return self._clean_text(price.get("detail"), 255) if isinstance(price, dict) else None
-
-    def _extract_contact_url(self, payload):
-        contact = payload.get("contact", {})
-        return self._clean_text(contact.get("url"), 500) if isinstance(contact, dict) else None
-
-    def _extract_contact_phone(self, payload):
-        contact = payload.get("contact", {})
-        return self._clean_text(contact.get("phone"), 50) if isinstance(contact, dict) else None
-
-    def _extract_contact_email(self, payload):
-        contact = payload.get("contact", {})
-        return self._clean_text(contact.get("email"), 255) if isinstance(contact, dict) else None
-
     def get_stats(self):
         return {
             "processed": self.processed_count,
@@ -1,16 +1,18 @@
 import { useEffect, useState } from "react";
 import { useParams, useNavigate } from "react-router-dom";
 import { Calendar, MapPin, Tag, DollarSign, ArrowLeft, ExternalLink } from 'lucide-react';
-import { getEvent } from "../services/api";
+import { getEvent, getSimilarEvents } from "../services/api";
 
 export default function EventDetailPage() {
   const { id } = useParams();
   const navigate = useNavigate();
   const [event, setEvent] = useState(null);
+  const [similarEvents, setSimilarEvents] = useState([]);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
     loadEvent();
+    loadSimilarEvents();
   }, [id]);
 
   const loadEvent = async () => {
@@ -24,6 +26,16 @@ export default function EventDetailPage() {
     }
   };
 
+  const loadSimilarEvents = async () => {
+    try {
+      const data = await getSimilarEvents(id);
+      setSimilarEvents(data);
+    } catch (error) {
+      console.error('Erreur chargement événements similaires:', error);
+      setSimilarEvents([]);
+    }
+  };
+
   if (loading) {
     return (
       <div className="h-screen flex items-center justify-center">
@@ -196,6 +208,37 @@ export default function EventDetailPage() {
           </div>
         )}
       </div>
+
+      {/* Vous aimerez aussi */}
+      {similarEvents.length > 0 && (
+        <div className="mt-8">
+          <h2 className="text-xl font-semibold mb-4">Vous aimerez aussi</h2>
+          <div className="grid grid-cols-1 md:grid-cols-3 gap-4">
+            {similarEvents.map((similar) => (
+              <button
+                key={similar.id}
+                onClick={() => navigate(`/events/${similar.id}`)}
+                className="text-left bg-white rounded-lg shadow p-4 hover:shadow-md"
+              >
+                <div className="font-medium mb-2">{similar.title}</div>
+                {similar.event_date && (
+                  <div className="text-sm text-gray-500">
+                    {new Date(similar.event_date).toLocaleDateString('fr-FR')}
+                  </div>
+                )}
+                {similar.arrondissement && (
+                  <div className="text-sm text-gray-500">{similar.arrondissement} arrondissement</div>
+                )}
+                {similar.is_free && (
+                  <span className="inline-block mt-2 px-2 py-1 bg-green-100 text-green-800 text-xs rounded">
+                    Gratuit
+                  </span>
+                )}
+              </button>
+            ))}
+          </div>
+        </div>
+      )}
     </div>
   );
 }
\ No newline at end of file
@@ -54,6 +54,20 @@ export async function getEvent(id) {
   return res.json();
 }
 
+/**
+ * Récupère les événements similaires ("Vous aimerez aussi")
+ */
+export async function getSimilarEvents(id, limit = 6) {
+  const queryString = buildQueryString({ limit });
+  const res = await fetch(`${API_URL}/events/${id}/similar?${queryString}`);
+
+  if (!res.ok) {
+    throw new Error("Erreur lors de la récupération des événements similaires");
+  }
+
+  return res.json();
+}
+
 /**
  * Recherche d'événements
  */
@@ -124,6 +138,7 @@ export async function getHealth() {
 const api = {
   getEvents,
   getEvent,
+  getSimilarEvents,
   searchEvents,
   getCategories,
   getCities,
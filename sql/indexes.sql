@@ -0,0 +1,42 @@
+-- ============================================================
+-- INDEX POUR PERFORMANCES
+-- Index secondaires, créés après sql/schema.sql. Une publication
+-- "shadow" (python etl/loader.py --shadow) les crée après le chargement
+-- en masse, ce qui est plus rapide que de les maintenir ligne à ligne.
+-- Les contraintes (PK, UNIQUE) restent dans le schéma : ON CONFLICT en dépend.
+-- ============================================================
+
+-- Index sur les dates (requêtes fréquentes)
+CREATE INDEX idx_events_date ON events(event_date);
+CREATE INDEX idx_events_datetime ON events(event_datetime);
+CREATE INDEX idx_events_year_month ON events(year, month);
+CREATE INDEX idx_events_season ON events(season);
+CREATE INDEX idx_events_weekend ON events(is_weekend);
+
+-- Index géospatiaux
+CREATE INDEX idx_events_location ON events(latitude, longitude);
+CREATE INDEX idx_events_geo ON events USING gist (geo_point(latitude, longitude))
+    WHERE latitude IS NOT NULL AND longitude IS NOT NULL;
+CREATE INDEX idx_events_arrondissement ON events(arrondissement);
+CREATE INDEX idx_events_zipcode ON events(zipcode);
+CREATE INDEX idx_events_city_id ON events(city_id);
+
+-- Index pour recherche
+CREATE INDEX idx_events_title ON events USING gin(to_tsvector('french', title));
+CREATE INDEX idx_events_description ON events USING gin(to_tsvector('french', description));
+
+-- Index sur les filtres courants
+CREATE INDEX idx_events_is_free ON events(is_free);
+CREATE INDEX idx_events_source ON events(source);
+CREATE INDEX idx_events_day_of_week ON events(day_of_week);
+
+-- Index sur la relation categories
+CREATE INDEX idx_event_categories_event ON event_categories(event_id);
+CREATE INDEX idx_event_categories_category ON event_categories(category_id);
+CREATE INDEX idx_event_categories_primary ON event_categories(is_primary);
+
+-- Similarités par événement cible (cascades des clés étrangères, archivage)
+CREATE INDEX idx_event_similarities_similar ON event_similarities(similar_event_id, similar_event_date);
+
+-- Candidats du calcul incrémental des similarités (événements ayant un terme)
+CREATE INDEX idx_similarity_features_term ON similarity_features(term);
@@ -3,7 +3,21 @@
 -- PostgreSQL 15+
 -- ============================================================
 
+-- ============================================================
+-- EXTENSIONS
+-- cube : index GiST KNN pour la recherche de proximité
+-- (schéma dédié, références qualifiées)
+-- ============================================================
+CREATE SCHEMA IF NOT EXISTS extensions;
+CREATE EXTENSION IF NOT EXISTS cube SCHEMA extensions;
+
 -- Suppression des tables existantes (ordre important pour les FK)
+DROP TABLE IF EXISTS etl_state CASCADE;
+DROP TABLE IF EXISTS events_dead_letter CASCADE;
+DROP TABLE IF EXISTS events_staging CASCADE;
+DROP TABLE IF EXISTS event_similarities CASCADE;
+DROP TABLE IF EXISTS similarity_features CASCADE;
+DROP TABLE IF EXISTS similarity_terms CASCADE;
 DROP TABLE IF EXISTS event_categories CASCADE;
 DROP TABLE IF EXISTS categories CASCADE;
 DROP TABLE IF EXISTS events CASCADE;
@@ -37,18 +51,23 @@ CREATE TABLE categories (
 
 -- ============================================================
 -- TABLE: events
--- Événements culturels enrichis
+-- Événements culturels enrichis, partitionnés par mois de event_date
+-- (partitions créées par ensure_event_partitions). Les clés uniques
+-- incluent donc event_date ; id reste unique (séquence unique).
 -- ============================================================
 CREATE TABLE events (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     
     -- Identification
-    raw_id VARCHAR(24) UNIQUE NOT NULL,  -- ObjectId MongoDB
+    raw_id VARCHAR(24) NOT NULL,  -- ObjectId MongoDB
     source VARCHAR(50) NOT NULL,
+    raw_hash VARCHAR(64),  -- Hash du contenu collecté (détection des changements)
+    enricher_version INTEGER,  -- Version des enrichisseurs (ENRICHER_VERSION)
     
     -- Informations principales
     title VARCHAR(500) NOT NULL,
     description TEXT,
+    keywords TEXT[],  -- Mots-clés (CategorizationEnricher)
     
     -- Localisation
     city_id INTEGER REFERENCES cities(id),
@@ -64,18 +83,46 @@ CREATE TABLE events (
     geocoded BOOLEAN DEFAULT FALSE,
     
     -- Dates et temps
-    event_date DATE,
-    event_datetime TIMESTAMP,
+    event_date DATE NOT NULL,  -- Clé de partitionnement
+    event_datetime TIMESTAMP,  -- Heure locale de l'événement (NULL : date seule)
     event_end_date DATE,
-    year INTEGER,
-    month INTEGER,
-    day INTEGER,
-    day_of_week INTEGER,  -- 1=Lundi, 7=Dimanche
-    day_of_week_name VARCHAR(20),
-    month_name VARCHAR(20),
-    season VARCHAR(20),
-    time_period VARCHAR(20),  -- Matin, Après-midi, Soir, Nuit
-    is_weekend BOOLEAN DEFAULT FALSE,
+    
+    -- Calendrier : colonnes générées depuis event_date (jamais écrites par l'ETL),
+    -- time_period depuis event_datetime, NULL si la source n'a pas d'heure
+    year INTEGER GENERATED ALWAYS AS (EXTRACT(YEAR FROM event_date)::INTEGER) STORED,
+    month INTEGER GENERATED ALWAYS AS (EXTRACT(MONTH FROM event_date)::INTEGER) STORED,
+    day INTEGER GENERATED ALWAYS AS (EXTRACT(DAY FROM event_date)::INTEGER) STORED,
+    day_of_week INTEGER GENERATED ALWAYS AS (EXTRACT(ISODOW FROM event_date)::INTEGER) STORED,  -- 1=Lundi, 7=Dimanche
+    day_of_week_name VARCHAR(20) GENERATED ALWAYS AS (
+        (ARRAY['Lundi', 'Mardi', 'Mercredi', 'Jeudi', 'Vendredi', 'Samedi', 'Dimanche'])
+            [EXTRACT(ISODOW FROM event_date)::INTEGER]
+    ) STORED,
+    month_name VARCHAR(20) GENERATED ALWAYS AS (
+        (ARRAY['Janvier', 'Février', 'Mars', 'Avril', 'Mai', 'Juin', 'Juillet',
+               'Août', 'Septembre', 'Octobre', 'Novembre', 'Décembre'])
+            [EXTRACT(MONTH FROM event_date)::INTEGER]
+    ) STORED,
+    season VARCHAR(20) GENERATED ALWAYS AS (
+        CASE
+            WHEN EXTRACT(MONTH FROM event_date) IN (12, 1, 2) THEN 'Hiver'
+            WHEN EXTRACT(MONTH FROM event_date) IN (3, 4, 5) THEN 'Printemps'
+            WHEN EXTRACT(MONTH FROM event_date) IN (6, 7, 8) THEN 'Été'
+            ELSE 'Automne'
+        END
+    ) STORED,
+    time_period VARCHAR(20) GENERATED ALWAYS AS (
+        CASE
+            WHEN event_datetime IS NULL THEN NULL
+            WHEN EXTRACT(HOUR FROM event_datetime) BETWEEN 5 AND 11 THEN 'Matin'
+            WHEN EXTRACT(HOUR FROM event_datetime) BETWEEN 12 AND 17 THEN 'Après-midi'
+            WHEN EXTRACT(HOUR FROM event_datetime) BETWEEN 18 AND 22 THEN 'Soir'
+            ELSE 'Nuit'
+        END
+    ) STORED,
+    is_weekend BOOLEAN GENERATED ALWAYS AS (
+        COALESCE(EXTRACT(ISODOW FROM event_date) >= 6, FALSE)
+    ) STORED,
+    
     is_multi_day BOOLEAN DEFAULT FALSE,
     duration_days INTEGER,
     
@@ -92,51 +139,177 @@ CREATE TABLE events (
     
     -- Métadonnées
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    PRIMARY KEY (id, event_date),
+    UNIQUE (raw_id, event_date)
+) PARTITION BY RANGE (event_date);
 
 -- ============================================================
 -- TABLE: event_categories
--- Relation Many-to-Many entre events et categories
+-- Relation Many-to-Many entre events et categories, partitionnée
+-- comme events (event_date suit l'événement : ON UPDATE CASCADE,
+-- y compris d'une partition à l'autre à partir de PostgreSQL 15)
 -- ============================================================
 CREATE TABLE event_categories (
-    event_id INTEGER REFERENCES events(id) ON DELETE CASCADE,
+    event_id INTEGER NOT NULL,
+    event_date DATE NOT NULL,
     category_id INTEGER REFERENCES categories(id) ON DELETE CASCADE,
     is_primary BOOLEAN DEFAULT FALSE,  -- Catégorie principale
     confidence DECIMAL(3, 2),  -- Score de confiance 0.00-1.00
-    PRIMARY KEY (event_id, category_id)
+    PRIMARY KEY (event_id, event_date, category_id),
+    FOREIGN KEY (event_id, event_date) REFERENCES events(id, event_date)
+        ON DELETE CASCADE ON UPDATE CASCADE
+) PARTITION BY RANGE (event_date);
+
+-- ============================================================
+-- TABLE: event_similarities
+-- Top-K des événements similaires (pré-calculé par etl/similarity.py),
+-- partitionnée par la date de l'événement source
+-- ============================================================
+CREATE TABLE event_similarities (
+    event_id INTEGER NOT NULL,
+    event_date DATE NOT NULL,
+    similar_event_id INTEGER NOT NULL,
+    similar_event_date DATE NOT NULL,
+    rank SMALLINT NOT NULL,  -- 1 = plus similaire
+    score REAL NOT NULL,  -- Similarité cosinus 0-1
+    PRIMARY KEY (event_id, event_date, rank),
+    FOREIGN KEY (event_id, event_date) REFERENCES events(id, event_date)
+        ON DELETE CASCADE ON UPDATE CASCADE,
+    FOREIGN KEY (similar_event_id, similar_event_date) REFERENCES events(id, event_date)
+        ON DELETE CASCADE ON UPDATE CASCADE
+) PARTITION BY RANGE (event_date);
+
+-- ============================================================
+-- TABLES: similarity_features, similarity_terms
+-- État du calcul incrémental des similarités (etl/similarity.py) :
+-- caractéristiques pondérées de chaque événement vectorisé et fréquences
+-- documentaires (df) de chaque terme ; le terme '' compte les événements.
+-- Sans clé étrangère (partitions détachées par etl/retention.py) : les
+-- lignes d'événements supprimés sont purgées quand ils redeviennent candidats.
+-- ============================================================
+CREATE TABLE similarity_features (
+    event_id INTEGER NOT NULL,
+    term TEXT NOT NULL,
+    tf REAL NOT NULL,  -- Fréquence pondérée (titre, description, catégorie...)
+    PRIMARY KEY (event_id, term)
+);
+
+CREATE TABLE similarity_terms (
+    term TEXT PRIMARY KEY,
+    df INTEGER NOT NULL  -- Nombre d'événements ayant ce terme
 );
 
 -- ============================================================
--- INDEX POUR PERFORMANCES
+-- FONCTION : Partitions mensuelles
+-- Crée les partitions manquantes de events, event_categories et
+-- event_similarities pour chaque mois de [first_day, last_day], dans le
+-- schéma courant (shadow compris). Appelée par le loader avant chaque
+-- lot (mois du lot) et au début d'un chargement (mois à venir).
+-- Renvoie le nombre de mois créés.
 -- ============================================================
+CREATE OR REPLACE FUNCTION ensure_event_partitions(first_day DATE, last_day DATE)
+RETURNS INTEGER AS $$
+DECLARE
+    month_start DATE := date_trunc('month', first_day)::DATE;
+    parent TEXT;
+    created INTEGER := 0;
+BEGIN
+    -- Loaders parallèles : une seule création à la fois
+    PERFORM pg_advisory_xact_lock(hashtext(current_schema() || '.event_partitions'));
 
--- Index sur les dates (requêtes fréquentes)
-CREATE INDEX idx_events_date ON events(event_date);
-CREATE INDEX idx_events_datetime ON events(event_datetime);
-CREATE INDEX idx_events_year_month ON events(year, month);
-CREATE INDEX idx_events_season ON events(season);
-CREATE INDEX idx_events_weekend ON events(is_weekend);
+    WHILE month_start <= last_day LOOP
+        IF to_regclass(format('%I.%I', current_schema(), 'events_' || to_char(month_start, '"p"YYYY_MM'))) IS NULL THEN
+            FOREACH parent IN ARRAY ARRAY['events', 'event_categories', 'event_similarities'] LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                    parent || '_' || to_char(month_start, '"p"YYYY_MM'), parent,
+                    month_start, (month_start + INTERVAL '1 month')::DATE
+                );
+            END LOOP;
+            created := created + 1;
+        END IF;
+        month_start := (month_start + INTERVAL '1 month')::DATE;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
 
--- Index géospatiaux
-CREATE INDEX idx_events_location ON events(latitude, longitude);
-CREATE INDEX idx_events_arrondissement ON events(arrondissement);
-CREATE INDEX idx_events_zipcode ON events(zipcode);
-CREATE INDEX idx_events_city_id ON events(city_id);
+-- Mois courant et 12 mois à venir
+SELECT ensure_event_partitions(CURRENT_DATE, (CURRENT_DATE + INTERVAL '12 months')::DATE);
 
--- Index pour recherche
-CREATE INDEX idx_events_title ON events USING gin(to_tsvector('french', title));
-CREATE INDEX idx_events_description ON events USING gin(to_tsvector('french', description));
+-- ============================================================
+-- TABLE: etl_state
+-- Filigrane du chargement incrémental (enriched_at MongoDB, UTC) et
+-- jeton de reprise du change stream (etl/sync.py)
+-- ============================================================
+CREATE TABLE etl_state (
+    name VARCHAR(50) PRIMARY KEY,
+    watermark TIMESTAMP,
+    resume_token JSONB,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
 
--- Index sur les filtres courants
-CREATE INDEX idx_events_is_free ON events(is_free);
-CREATE INDEX idx_events_source ON events(source);
-CREATE INDEX idx_events_day_of_week ON events(day_of_week);
+-- ============================================================
+-- TABLE: events_dead_letter
+-- Événements rejetés par le loader (validation ou erreur SQL) avec
+-- leur erreur ; le reste du lot est chargé normalement.
+-- ============================================================
+CREATE TABLE events_dead_letter (
+    id SERIAL PRIMARY KEY,
+    raw_id TEXT,
+    source TEXT,
+    error TEXT NOT NULL,
+    payload JSONB NOT NULL,
+    failed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
 
--- Index sur la relation categories
-CREATE INDEX idx_event_categories_event ON event_categories(event_id);
-CREATE INDEX idx_event_categories_category ON event_categories(category_id);
-CREATE INDEX idx_event_categories_primary ON event_categories(is_primary);
+CREATE INDEX idx_events_dead_letter_raw_id ON events_dead_letter(raw_id);
+
+-- ============================================================
+-- TABLE: events_staging (UNLOGGED)
+-- Lots du loader (COPY) avant fusion ensembliste dans events /
+-- event_categories. session_id isole les connexions concurrentes.
+-- Les ids de ville et de catégories sont résolus par le loader ;
+-- les colonnes calendrier sont calculées par events.
+-- ============================================================
+CREATE UNLOGGED TABLE events_staging (LIKE events);
+ALTER TABLE events_staging
+    DROP COLUMN id,
+    DROP COLUMN year,
+    DROP COLUMN month,
+    DROP COLUMN day,
+    DROP COLUMN day_of_week,
+    DROP COLUMN day_of_week_name,
+    DROP COLUMN month_name,
+    DROP COLUMN season,
+    DROP COLUMN time_period,
+    DROP COLUMN is_weekend,
+    DROP COLUMN created_at,
+    DROP COLUMN updated_at,
+    ADD COLUMN session_id INTEGER NOT NULL DEFAULT pg_backend_pid(),
+    ADD COLUMN main_category_id INTEGER,
+    ADD COLUMN sub_category_id INTEGER,
+    ADD COLUMN category_confidence DECIMAL(3, 2);
+
+CREATE INDEX idx_events_staging_session ON events_staging(session_id);
+
+-- ============================================================
+-- FONCTION : Position 3D sur la sphère unité
+-- La distance euclidienne (corde) entre deux points est monotone avec
+-- la distance orthodromique : un tri KNN sur cet index = tri par distance réelle.
+-- ============================================================
+CREATE OR REPLACE FUNCTION geo_point(lat DOUBLE PRECISION, lon DOUBLE PRECISION)
+RETURNS extensions.cube
+LANGUAGE SQL IMMUTABLE STRICT PARALLEL SAFE
+RETURN extensions.cube(ARRAY[
+    cos(radians(lat)) * cos(radians(lon)),
+    cos(radians(lat)) * sin(radians(lon)),
+    sin(radians(lat))
+]);
+
+-- Index secondaires : sql/indexes.sql (exécuté après ce fichier)
 
 -- ============================================================
 -- VUES UTILES
@@ -150,7 +323,7 @@ SELECT
     c.parent_category,
     ec.confidence
 FROM events e
-LEFT JOIN event_categories ec ON e.id = ec.event_id AND ec.is_primary = TRUE
+LEFT JOIN event_categories ec ON e.id = ec.event_id AND e.event_date = ec.event_date AND ec.is_primary = TRUE
 LEFT JOIN categories c ON ec.category_id = c.id;
 
 -- Vue : Statistiques par arrondissement
@@ -177,7 +350,7 @@ SELECT
     ROUND(AVG(e.accessibility_score), 2) AS avg_accessibility
 FROM categories c
 LEFT JOIN event_categories ec ON c.id = ec.category_id
-LEFT JOIN events e ON ec.event_id = e.id
+LEFT JOIN events e ON ec.event_id = e.id AND ec.event_date = e.event_date
 GROUP BY c.id, c.name, c.parent_category
 ORDER BY total_events DESC;
 
@@ -221,7 +394,7 @@ BEGIN
             plainto_tsquery('french', search_query)
         ) AS rank
     FROM events e
-    LEFT JOIN event_categories ec ON e.id = ec.event_id AND ec.is_primary = TRUE
+    LEFT JOIN event_categories ec ON e.id = ec.event_id AND e.event_date = ec.event_date AND ec.is_primary = TRUE
     LEFT JOIN categories c ON ec.category_id = c.id
     WHERE to_tsvector('french', e.title || ' ' || COALESCE(e.description, '')) 
           @@ plainto_tsquery('french', search_query)
@@ -245,6 +418,90 @@ CREATE TRIGGER update_events_updated_at
     FOR EACH ROW
     EXECUTE FUNCTION update_updated_at_column();
 
+-- ============================================================
+-- TRIGGERS : Compteurs event_count (cities, categories)
+-- Triggers par instruction avec tables de transition : un seul UPDATE
+-- par lot (INSERT ... SELECT, COPY, DELETE en cascade), groupé par clé.
+-- Les workers du loader parallèle les désactivent (etl.defer_event_count) :
+-- les compteurs sont reconstruits une fois à la fin (etl/counters.py).
+-- Vérification / reconstruction : python etl/counters.py [--fix]
+-- ============================================================
+CREATE OR REPLACE FUNCTION maintain_event_count()
+RETURNS TRIGGER AS $$
+DECLARE
+    -- TG_ARGV[0] = table de dimension, TG_ARGV[1] = colonne de clé étrangère
+    deltas TEXT;
+BEGIN
+    -- Loader parallèle : pas de verrou sur les lignes de dimension par lot
+    -- (la ligne Paris sérialiserait les workers jusqu'à leur COMMIT)
+    IF current_setting('etl.defer_event_count', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+
+    deltas := CASE TG_OP
+        WHEN 'INSERT' THEN format('SELECT %I AS key, 1 AS delta FROM new_rows', TG_ARGV[1])
+        WHEN 'DELETE' THEN format('SELECT %I AS key, -1 AS delta FROM old_rows', TG_ARGV[1])
+        ELSE format('SELECT %1$I AS key, 1 AS delta FROM new_rows
+                     UNION ALL SELECT %1$I, -1 FROM old_rows', TG_ARGV[1])
+    END;
+
+    -- Verrous pris par id croissant au sein de l'instruction
+    EXECUTE format(
+        'SELECT 1 FROM %I d WHERE d.id IN (SELECT key FROM (%s) s) ORDER BY d.id FOR UPDATE',
+        TG_ARGV[0], deltas
+    );
+
+    EXECUTE format(
+        'UPDATE %I d SET event_count = d.event_count + t.delta
+         FROM (
+             SELECT key, SUM(delta) AS delta FROM (%s) s
+             WHERE key IS NOT NULL
+             GROUP BY key
+             HAVING SUM(delta) <> 0
+         ) t
+         WHERE d.id = t.key',
+        TG_ARGV[0], deltas
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER events_city_count_insert
+    AFTER INSERT ON events
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION maintain_event_count('cities', 'city_id');
+
+CREATE TRIGGER events_city_count_update
+    AFTER UPDATE ON events
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION maintain_event_count('cities', 'city_id');
+
+CREATE TRIGGER events_city_count_delete
+    AFTER DELETE ON events
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION maintain_event_count('cities', 'city_id');
+
+CREATE TRIGGER event_categories_count_insert
+    AFTER INSERT ON event_categories
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION maintain_event_count('categories', 'category_id');
+
+CREATE TRIGGER event_categories_count_update
+    AFTER UPDATE ON event_categories
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION maintain_event_count('categories', 'category_id');
+
+CREATE TRIGGER event_categories_count_delete
+    AFTER DELETE ON event_categories
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION maintain_event_count('categories', 'category_id');
+
 -- ============================================================
 -- DONNÉES INITIALES
 -- ============================================================
@@ -298,9 +555,11 @@ COMMENT ON TABLE events IS 'Événements culturels enrichis';
 COMMENT ON TABLE categories IS 'Catégories et sous-catégories d''événements';
 COMMENT ON TABLE cities IS 'Villes et métadonnées';
 COMMENT ON TABLE event_categories IS 'Relation Many-to-Many events-categories';
+COMMENT ON TABLE event_similarities IS 'Événements similaires (TF-IDF + catégorie + localisation)';
 
 COMMENT ON COLUMN events.raw_id IS 'Référence ObjectId MongoDB (events_raw)';
 COMMENT ON COLUMN events.accessibility_score IS 'Score d''accessibilité 0-1 (gratuit, proche, géocodé, weekend)';
+COMMENT ON COLUMN events.season IS 'Saison météorologique (générée depuis event_date, comme les autres colonnes calendrier)';
 COMMENT ON COLUMN events.distance_center IS 'Distance en km du centre de Paris (Notre-Dame)';
 
 -- ============================================================
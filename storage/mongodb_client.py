@@ -3,13 +3,15 @@
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure
 import os
+from datetime import datetime
 from dotenv import load_dotenv
 
 load_dotenv()
 
 class MongoDBClient:
     def __init__(self):
-        self.uri = "mongodb://localhost:27017/"
+        # Change streams (etl/sync.py) : replica set requis, ex. mongodb://localhost:27017/?replicaSet=rs0
+        self.uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
         self.client = MongoClient(self.uri)
         self.database_name = "cultural_events"
         self.db = self.client[self.database_name]
@@ -31,7 +33,19 @@ class MongoDBClient:
         self.raw.create_index([("location.coordinates", "2dsphere")])
         self.raw.create_index([("dates.start", 1)])
         self.raw.create_index([("title", "text"), ("description", "text")])
-        print('✅ Index: géo, chrono, texte')
+        # Chargement incrémental (filigrane enriched_at)
+        self.enriched.create_index([("enriched_at", 1)])
+        # Détection des changements (raw_hash) de l'enrichissement
+        self.enriched.create_index([("raw_id", 1)])
+        print('✅ Index: géo, chrono, texte, enriched_at, raw_id')
+    
+    def tombstone(self, raw_id):
+        """Marque un événement supprimé : la suppression est propagée par le chargement incrémental"""
+        self.enriched.update_one(
+            {"raw_id": raw_id},
+            {"$set": {"status": "deleted", "enriched_at": datetime.utcnow(), "data": {}}},
+            upsert=True
+        )
     
     def get_database(self):
         return self.db
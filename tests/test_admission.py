@@ -0,0 +1,75 @@
+import unittest
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi import HTTPException
+
+from api.admission import AdmissionController, RouteClass
+
+
+def make_controller(total_slots=2):
+    classes = [
+        RouteClass("lookup", priority=0, max_concurrency=2, queue_timeout=1.0, max_queue=10, statement_timeout_ms=1000),
+        RouteClass("heavy", priority=2, max_concurrency=1, queue_timeout=0.05, max_queue=1, statement_timeout_ms=5000),
+    ]
+    return AdmissionController(total_slots, classes, {"get_event": "lookup", "search_events": "heavy"})
+
+
+class TestAdmission(unittest.TestCase):
+    """Test admission control and load shedding"""
+
+    def test_heavy_class_is_capped(self):
+        """A second heavy request is shed with 503 and Retry-After"""
+        async def scenario():
+            controller = make_controller()
+            async with controller.admit("heavy"):
+                with self.assertRaises(HTTPException) as ctx:
+                    async with controller.admit("heavy"):
+                        pass
+            return controller, ctx.exception
+
+        controller, error = asyncio.run(scenario())
+        self.assertEqual(error.status_code, 503)
+        self.assertIn("Retry-After", error.headers)
+        self.assertEqual(controller.snapshot()["classes"]["heavy"]["shed"], 1)
+        self.assertEqual(controller.in_use, 0)
+
+    def test_lookup_runs_while_heavy_is_busy(self):
+        """Cheap lookups keep a slot while heavy scans are saturated"""
+        async def scenario():
+            controller = make_controller()
+            async with controller.admit("heavy"):
+                async with controller.admit("lookup"):
+                    return controller.snapshot()
+
+        snapshot = asyncio.run(scenario())
+        self.assertEqual(snapshot["in_use"], 2)
+
+    def test_priority_order_on_release(self):
+        """Queued lookups are served before queued heavy requests"""
+        async def scenario():
+            controller = make_controller(total_slots=1)
+            controller.classes["heavy"].queue_timeout = 1.0
+            order = []
+
+            async def request(name):
+                async with controller.admit(name):
+                    order.append(name)
+                    await asyncio.sleep(0.01)
+
+            async with controller.admit("lookup"):
+                tasks = [asyncio.create_task(request("heavy")), asyncio.create_task(request("lookup"))]
+                await asyncio.sleep(0.01)
+                self.assertEqual(controller.snapshot()["classes"]["heavy"]["queue_depth"], 1)
+            await asyncio.gather(*tasks)
+            return order
+
+        self.assertEqual(asyncio.run(scenario()), ["lookup", "heavy"])
+
+
+if __name__ == '__main__':
+    unittest.main()
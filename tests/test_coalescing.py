@@ -0,0 +1,91 @@
+import unittest
+import asyncio
+import sys
+from datetime import date
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from api.coalescing import SingleFlight
+
+
+class TestCoalescing(unittest.TestCase):
+    """Test single-flight deduplication of concurrent requests"""
+
+    def test_key_normalization(self):
+        """Parameter order and None values do not change the key"""
+        a = SingleFlight.make_key("get_events", (), {"city": "Paris", "page": 1, "season": None})
+        b = SingleFlight.make_key("get_events", (), {"page": 1, "city": "Paris"})
+        c = SingleFlight.make_key("get_events", (), {"page": 2, "city": "Paris"})
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, c)
+        self.assertIn("2025-01-01", SingleFlight.make_key("get_stats", (), {"date_from": date(2025, 1, 1)}))
+
+    def test_identical_requests_share_one_call(self):
+        """Concurrent identical requests run the function once"""
+        async def scenario():
+            flight = SingleFlight()
+            calls = []
+
+            async def fetch():
+                calls.append(1)
+                await asyncio.sleep(0.01)
+                return {"total": 42}
+
+            key = SingleFlight.make_key("get_stats")
+            results = await asyncio.gather(*(flight.do("get_stats", key, fetch) for _ in range(10)))
+            return flight, calls, results
+
+        flight, calls, results = asyncio.run(scenario())
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(r == {"total": 42} for r in results))
+        snapshot = flight.snapshot()
+        self.assertEqual(snapshot["requests"], 10)
+        self.assertEqual(snapshot["executions"], 1)
+        self.assertEqual(snapshot["collapse_ratio"], 10.0)
+        self.assertEqual(snapshot["in_flight"], 0)
+
+    def test_errors_are_shared_and_not_cached(self):
+        """A failure propagates to all waiters, the next call runs again"""
+        async def scenario():
+            flight = SingleFlight()
+            calls = []
+
+            async def failing():
+                calls.append(1)
+                await asyncio.sleep(0.01)
+                raise ValueError("boom")
+
+            results = await asyncio.gather(
+                *(flight.do("get_events", "k", failing) for _ in range(3)),
+                return_exceptions=True
+            )
+            with self.assertRaises(ValueError):
+                await flight.do("get_events", "k", failing)
+            return calls, results
+
+        calls, results = asyncio.run(scenario())
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+        self.assertEqual(len(calls), 2)
+
+    def test_cancelled_caller_does_not_cancel_others(self):
+        """A disconnected client leaves the shared call running"""
+        async def scenario():
+            flight = SingleFlight()
+
+            async def fetch():
+                await asyncio.sleep(0.02)
+                return "ok"
+
+            leader = asyncio.create_task(flight.do("get_events", "k", fetch))
+            follower = asyncio.create_task(flight.do("get_events", "k", fetch))
+            await asyncio.sleep(0.005)
+            leader.cancel()
+            return await follower
+
+        self.assertEqual(asyncio.run(scenario()), "ok")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,7 +5,11 @@ from pathlib import Path
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from datetime import datetime, timezone
+
+from enrichment import dates
 from enrichment.date_processor import DateEnricher
+from enrichment.dates import parse_date
 
 class TestDateProcessor(unittest.TestCase):
     def setUp(self):
@@ -16,6 +20,62 @@ class TestDateProcessor(unittest.TestCase):
     
     def test_date_enricher_has_enrich_method(self):
         self.assertTrue(hasattr(self.enricher, 'enrich'))
+    
+    def test_date_only_start_has_no_datetime(self):
+        result = self.enricher.enrich({"payload": {"dates": {"start": "2026-03-15"}}})
+        self.assertEqual(result["event_date"], "2026-03-15")
+        self.assertIsNone(result["event_datetime"])
+        
+        result = self.enricher.enrich({"payload": {"dates": {"start": "2026-03-15T20:30:00"}}})
+        self.assertEqual(result["event_datetime"], "2026-03-15T20:30:00")
+    
+    def test_dates_are_normalized_to_utc(self):
+        """Offsets, "Z" and naive Paris times denote the same instant"""
+        expected = datetime(2026, 3, 15, 19, 0, tzinfo=timezone.utc)
+        for text in ("2026-03-15T20:00:00+01:00", "2026-03-15T19:00:00.000Z", "2026-03-15T20:00:00",
+                     "15/03/2026 20:00", "March 15 2026 8:00 PM"):
+            self.assertEqual(parse_date(text).utc, expected, text)
+        self.assertFalse(parse_date("15/03/2026").has_time)
+        self.assertIsNone(parse_date("pas une date"))
+        self.assertIsNone(parse_date(None))
+    
+    def test_long_date_only_strings_have_no_time(self):
+        """Spelled-out dates without an hour never get a midnight event_datetime"""
+        for text in ("March 15 2026", "Sun, 15 Mar 2026", "15 mars 2026", "samedi 15 mars 2026"):
+            self.assertFalse(parse_date(text).has_time, text)
+            result = self.enricher.enrich({"payload": {"dates": {"start": text}}})
+            self.assertEqual((result["event_date"], result["event_datetime"]), ("2026-03-15", None), text)
+        self.assertTrue(parse_date("15 mars 2026 20h30").has_time)
+    
+    def test_french_dates(self):
+        """French month and day names go through the dateutil fallback"""
+        expected = datetime(2026, 8, 1, 18, 30, tzinfo=timezone.utc)
+        self.assertEqual(parse_date("samedi 1er août 2026 à 20h30").utc, expected)
+        self.assertEqual(parse_date("1 aout 2026 20:30").utc, expected)
+    
+    def test_naive_datetimes_are_utc(self):
+        """BSON dates come back from pymongo as naive UTC datetimes"""
+        parsed = parse_date(datetime(2026, 3, 15, 19, 0))
+        self.assertEqual(parsed.utc, datetime(2026, 3, 15, 19, 0, tzinfo=timezone.utc))
+        result = self.enricher.enrich({"payload": {"dates": {"start": datetime(2026, 3, 15, 19, 0)}}})
+        self.assertEqual(result["event_datetime"], "2026-03-15T20:00:00")
+    
+    def test_utc_times_are_stored_as_paris_local_time(self):
+        """An OpenAgenda UTC timing lands on the Paris wall clock and day"""
+        result = self.enricher.enrich({"source": "openagenda", "payload": {
+            "timings": [{"start": "2026-07-01T22:30:00.000Z", "end": "2026-07-02T00:30:00.000Z"}]}})
+        self.assertEqual(result["event_date"], "2026-07-02")
+        self.assertEqual(result["event_datetime"], "2026-07-02T00:30:00")
+        self.assertEqual(result["duration_days"], 0)
+    
+    def test_parsed_strings_are_memoized(self):
+        """Repeated strings are served from the bounded cache"""
+        dates._parse_text.cache_clear()
+        for _ in range(3):
+            parse_date("2026-03-15T20:00:00+01:00")
+        info = dates.cache_info()
+        self.assertEqual((info.misses, info.hits), (1, 2))
+        self.assertEqual(info.maxsize, dates.CACHE_SIZE)
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
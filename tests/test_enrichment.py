@@ -1,13 +1,17 @@
 import unittest
 import sys
 from pathlib import Path
+from unittest import mock
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from enrichment.enrichment_pipeline import ENRICHER_VERSION, EnrichmentPipeline
 from enrichment.categorization import CategorizationEnricher
 from enrichment.date_processor import DateEnricher
 from enrichment.geocoding import GeocodingEnricher
+from enrichment.geocoding_cache import GeocodingCache
+from etl.loader import PostgreSQLLoader
 
 class TestEnrichment(unittest.TestCase):
     """Test data enrichment functions"""
@@ -16,7 +20,7 @@ class TestEnrichment(unittest.TestCase):
         """Set up test data"""
         self.date_enricher = DateEnricher()
         self.cat_enricher = CategorizationEnricher()
-        self.geo_enricher = GeocodingEnricher()
+        self.geo_enricher = GeocodingEnricher(GeocodingCache(":memory:"))
         
         self.sample_event = {
             "payload": {
@@ -64,5 +68,222 @@ class TestEnrichment(unittest.TestCase):
         except Exception as e:
             self.fail(f"Geocoding failed: {e}")
 
+
+class FakeCursor(list):
+    def batch_size(self, size):
+        return self
+
+    def close(self):
+        pass
+
+    def limit(self, count):
+        return FakeCursor(self[:count])
+
+
+class FakeCollection:
+    """In-memory collection answering the pipeline's queries"""
+
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+        self.replaced = []
+
+    def find(self, query=None, projection=None):
+        if query and "raw_id" in query:
+            wanted = query["raw_id"]["$in"]
+            return FakeCursor(d for d in self.docs if d["raw_id"] in wanted)
+        if query and "_id" in query:
+            wanted = query["_id"]["$in"]
+            return FakeCursor(d for d in self.docs if d["_id"] in wanted)
+        if query and "status" in query:
+            return FakeCursor(d for d in self.docs if d.get("status") != query["status"]["$ne"])
+        return FakeCursor(self.docs)
+
+    def estimated_document_count(self):
+        return len(self.docs)
+
+    def update_one(self, query, update, upsert=False):
+        doc = next((d for d in self.docs if d["raw_id"] == query["raw_id"]), None)
+        if doc is None:
+            doc = dict(query)
+            self.docs.append(doc)
+        doc.update(update["$set"])
+
+    def count_documents(self, query):
+        return len(self.docs)
+
+    def create_index(self, keys):
+        pass
+
+    def replace_one(self, query, doc, upsert=False):
+        self.replaced.append(doc["raw_id"])
+        self.docs = [d for d in self.docs if d["raw_id"] != query["raw_id"]] + [doc]
+
+
+class RecordingPipeline(EnrichmentPipeline):
+    """Pipeline whose enrichers are replaced by a call recorder (no HTTP)"""
+
+    def __init__(self, raw, enriched):
+        super().__init__()
+        self.raw_collection = FakeCollection(raw)
+        self.enriched_collection = FakeCollection(enriched)
+        # MongoDBClient.tombstone écrit dans la même collection
+        self.client.raw = self.raw_collection
+        self.client.enriched = self.enriched_collection
+        self.is_connected = True
+        self.enriched_ids = []
+
+    def enrich_event(self, raw_event):
+        self.enriched_ids.append(raw_event["_id"])
+        return {"title": raw_event["payload"]["title"]}
+
+
+class TestChangeDetection(unittest.TestCase):
+    """Test that unchanged raw documents are not enriched again"""
+
+    def test_only_new_or_changed_events_are_enriched(self):
+        """Same raw_hash and enricher version: skipped; new hash, old version or failure: re-enriched"""
+        raw = [
+            {"_id": f"r{i}", "raw_hash": f"h{i}", "payload": {"title": f"Event {i}"}}
+            for i in range(5)
+        ]
+        enriched = [
+            {"raw_id": "r0", "raw_hash": "h0", "enricher_version": ENRICHER_VERSION, "status": "success"},
+            {"raw_id": "r1", "raw_hash": "ancien", "enricher_version": ENRICHER_VERSION, "status": "success"},
+            {"raw_id": "r2", "raw_hash": "h2", "enricher_version": ENRICHER_VERSION - 1, "status": "success"},
+            {"raw_id": "r3", "raw_hash": "h3", "enricher_version": ENRICHER_VERSION, "status": "failed"},
+        ]
+        pipeline = RecordingPipeline(raw, enriched)
+
+        stats = pipeline.process_all_events()
+
+        self.assertEqual(pipeline.enriched_ids, ["r1", "r2", "r3", "r4"])
+        self.assertEqual(stats["skipped"], 1)
+        self.assertEqual(stats["changed"], 3)
+        self.assertEqual(stats["success"], 4)
+        stored = {d["raw_id"]: d for d in pipeline.enriched_collection.docs}
+        self.assertEqual(len(stored), 5)
+        self.assertEqual(stored["r1"]["raw_hash"], "h1")
+        self.assertEqual(stored["r2"]["enricher_version"], ENRICHER_VERSION)
+
+        # Deuxième passage : plus rien à faire
+        pipeline.enriched_ids.clear()
+        stats = pipeline.process_all_events()
+        self.assertEqual(pipeline.enriched_ids, [])
+        self.assertEqual(stats["skipped"], 5)
+
+    def test_force_reenriches_everything(self):
+        """force bypasses the raw_hash comparison"""
+        raw = [{"_id": "r0", "raw_hash": "h0", "payload": {"title": "Event"}}]
+        enriched = [{"raw_id": "r0", "raw_hash": "h0", "enricher_version": ENRICHER_VERSION, "status": "success"}]
+        pipeline = RecordingPipeline(raw, enriched)
+
+        stats = pipeline.process_all_events(force=True)
+        self.assertEqual(pipeline.enriched_ids, ["r0"])
+        self.assertEqual(stats["skipped"], 0)
+
+    def test_missing_hash_is_never_unchanged(self):
+        """Without raw_hash, a change cannot be ruled out"""
+        existing = {"raw_id": "r0", "raw_hash": None, "enricher_version": ENRICHER_VERSION, "status": "success"}
+        self.assertFalse(EnrichmentPipeline.is_unchanged({"_id": "r0"}, existing))
+
+
+class StreamingCollection:
+    """find() returns a single-pass cursor, like pymongo (read by islice in the loader)"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def find(self, query=None, projection=None):
+        return StreamingCursor(self.collection.find(query, projection))
+
+    def estimated_document_count(self):
+        return self.collection.estimated_document_count()
+
+
+class StreamingCursor:
+    def __init__(self, docs):
+        self.docs = iter(docs)
+
+    def batch_size(self, size):
+        return self
+
+    def close(self):
+        pass
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.docs)
+
+
+class EventsCursor:
+    """PostgreSQL events table reduced to raw_id -> id, answering DELETE_EVENTS"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def execute(self, query, params=None):
+        self.result = [(self.rows.pop(raw_id),) for raw_id in params[0] if raw_id in self.rows]
+
+    def fetchall(self):
+        return self.result
+
+
+class TombstoneLoader(PostgreSQLLoader):
+    """Loader with real tombstone deletion, live rows only recorded"""
+
+    def __init__(self, mongo_client, rows):
+        super().__init__()
+        self.mongo_client = mongo_client
+        self.conn = mock.Mock()
+        self.cursor = EventsCursor(rows)
+        self.loaded = []
+
+    def prefetch_dimensions(self):
+        pass
+
+    def ensure_future_partitions(self, months_ahead=12):
+        pass
+
+    def load_events(self, columns, bulk, stats):
+        self.loaded.extend(columns["raw_id"])
+
+
+class TestTombstones(unittest.TestCase):
+    """Test that raw documents removed from events_raw are deleted from PostgreSQL"""
+
+    def test_missing_raw_document_is_tombstoned_then_deleted(self):
+        """Enrichment marks the orphan deleted, the next load removes its row"""
+        raw = [{"_id": f"r{i}", "raw_hash": f"h{i}", "payload": {"title": f"Event {i}"}} for i in range(3)]
+        enriched = [
+            {"_id": f"e{i}", "raw_id": f"r{i}", "raw_hash": f"h{i}", "enricher_version": ENRICHER_VERSION,
+             "status": "success", "data": {"event_date": "2026-03-15"}}
+            for i in range(3)
+        ]
+        pipeline = RecordingPipeline(raw[:2], enriched)  # r2 retiré par la source
+
+        stats = pipeline.process_all_events()
+        self.assertEqual(stats["deleted"], 1)
+        self.assertEqual(stats["skipped"], 2)
+        stored = {d["raw_id"]: d for d in pipeline.enriched_collection.docs}
+        self.assertEqual(stored["r2"]["status"], "deleted")
+        self.assertEqual(stored["r2"]["data"], {})
+
+        # Deuxième passage : déjà marqué, rien à refaire
+        self.assertEqual(pipeline.process_all_events()["deleted"], 0)
+        # Passage partiel : pas de tombstone
+        self.assertEqual(pipeline.process_all_events(limit=1)["deleted"], 0)
+
+        mongo = mock.Mock(raw=pipeline.raw_collection, enriched=StreamingCollection(pipeline.enriched_collection))
+        loader = TombstoneLoader(mongo, {"r0": 1, "r1": 2, "r2": 3})
+        load = loader.load_all_events(batch_size=10)
+
+        self.assertTrue(load["completed"])
+        self.assertEqual(load["deleted"], 1)
+        self.assertEqual(loader.cursor.rows, {"r0": 1, "r1": 2})
+        self.assertEqual(sorted(loader.loaded), ["r0", "r1"])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -7,7 +7,8 @@ from bson import ObjectId
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from etl.transformer import DataTransformer
+from etl.transformer import BATCH_COLUMNS, DataTransformer
+from etl.loader import PostgreSQLLoader, EVENT_COLUMNS, STAGING_COLUMNS
 
 class TestETLPipeline(unittest.TestCase):
     def setUp(self):
@@ -30,6 +31,8 @@ class TestETLPipeline(unittest.TestCase):
         }
         
         self.sample_enriched_event = {
+            "raw_hash": "9e107d9d372bb6826bd81d3542a419d6",
+            "enricher_version": 1,
             "data": {
                 "latitude": 48.8566,
                 "longitude": 2.3522,
@@ -69,5 +72,102 @@ class TestETLPipeline(unittest.TestCase):
         self.assertIsNotNone(transformed)
         self.assertEqual(transformed["source"], "test")
 
+    def test_staging_row(self):
+        """Test transformed events map to the COPY staging columns"""
+        transformed = self.transformer.transform_event(self.sample_raw_event, self.sample_enriched_event)
+        columns = DataTransformer.columns([transformed])
+        staged = PostgreSQLLoader._staging_columns(columns, [0], [1], [2], [None])
+        row = dict(zip(STAGING_COLUMNS, next(zip(*staged))))
+        self.assertEqual(len(row), len(STAGING_COLUMNS))
+        self.assertEqual(row["raw_id"], transformed["raw_id"])
+        self.assertEqual(row["city_id"], 1)
+        self.assertEqual(row["main_category_id"], 2)
+        self.assertIsNone(row["sub_category_id"])
+        self.assertIsNone(row["keywords"])  # [] -> NULL comme en mode ligne à ligne
+        self.assertEqual(len(PostgreSQLLoader._event_values(transformed, 1)), len(EVENT_COLUMNS))
+
+    def test_raw_hash_is_carried_to_postgres(self):
+        """Test raw_hash and enricher_version flow from events_enriched to the events row"""
+        transformed = self.transformer.transform_event(self.sample_raw_event, self.sample_enriched_event)
+        row = dict(zip(EVENT_COLUMNS, PostgreSQLLoader._event_values(transformed, 1)))
+        self.assertEqual(row["raw_hash"], "9e107d9d372bb6826bd81d3542a419d6")
+        self.assertEqual(row["enricher_version"], 1)
+        self.assertIn("raw_hash", DataTransformer.ENRICHED_PROJECTION)
+        self.assertIn("enricher_version", DataTransformer.ENRICHED_PROJECTION)
+
+    def test_raw_projection_is_sufficient(self):
+        """Test the raw-document projection keeps every field the transformer reads"""
+        projected = {"_id": self.sample_raw_event["_id"], "payload": {}}
+        for field in DataTransformer.RAW_PROJECTION:
+            parts = field.split(".")
+            if len(parts) == 1:
+                projected[field] = self.sample_raw_event[field]
+            elif parts[1] in self.sample_raw_event["payload"]:
+                projected["payload"][parts[1]] = self.sample_raw_event["payload"][parts[1]]
+
+        full = self.transformer.transform_event(self.sample_raw_event, self.sample_enriched_event)
+        partial = self.transformer.transform_event(projected, self.sample_enriched_event)
+        self.assertEqual(full, partial)
+
+    def test_calendar_columns_are_generated(self):
+        """Test calendar columns are generated by PostgreSQL, not loaded"""
+        schema = (Path(__file__).parent.parent / "sql" / "schema.sql").read_text(encoding="utf-8")
+        for column in ("year", "month", "day", "day_of_week", "day_of_week_name",
+                       "month_name", "season", "time_period", "is_weekend"):
+            self.assertRegex(schema, rf"\n\s+{column} \w+(\(\d+\))? GENERATED ALWAYS AS")
+            self.assertIn(f"DROP COLUMN {column},", schema)  # absente de events_staging
+            self.assertNotIn(column, EVENT_COLUMNS)
+            self.assertNotIn(column, BATCH_COLUMNS)
+
+    def test_event_tables_are_partitioned_by_month(self):
+        """Test events and its dependents are range-partitioned on event_date"""
+        schema = (Path(__file__).parent.parent / "sql" / "schema.sql").read_text(encoding="utf-8")
+        for table in ("events", "event_categories", "event_similarities"):
+            self.assertRegex(schema, rf"CREATE TABLE {table} \([^;]*\) PARTITION BY RANGE \(event_date\);")
+        self.assertIn("UNIQUE (raw_id, event_date)", schema)
+        self.assertIn("SELECT ensure_event_partitions(CURRENT_DATE", schema)
+
+    def test_batch_columns_follow_loader_order(self):
+        """Test batch columns are the loader columns with dimension names"""
+        expected = ["city_name" if c == "city_id" else c for c in EVENT_COLUMNS]
+        self.assertEqual(BATCH_COLUMNS, expected + ["main_category", "sub_category", "category_confidence"])
+
+    def test_transform_batch_matches_transform_event(self):
+        """Test the columnar batch path yields the per-row values"""
+        dates = [
+            {"event_date": "2026-03-15"},
+            {"event_datetime": "2026-12-26T21:30:00+01:00", "city": "Montreuil", "keywords": ["jazz"]},
+            {"event_datetime": "1969-07-20T08:15:00"},
+            {"event_date": "pas une date"},
+            {"event_date": 20260315},
+            {"sub_category": "Jazz", "confidence": 0.7},
+        ]
+        pairs = [
+            (self.sample_raw_event, {"data": {**self.sample_enriched_event["data"], **data}})
+            for data in dates
+        ]
+        pairs.append(({"payload": {}}, self.sample_enriched_event))  # _id manquant
+        # Adresse nulle : tolérée par l'extracteur (ville par défaut)
+        pairs.append(({"_id": "1", "payload": {"address": None}}, {"data": {}}))
+
+        per_row = DataTransformer()
+        expected = [e for e in (per_row.transform_event(raw, enriched) for raw, enriched in pairs) if e]
+        columns, errors = self.transformer.transform_batch(pairs)
+
+        self.assertEqual(list(columns), BATCH_COLUMNS)
+        self.assertEqual(errors, 1)
+        self.assertEqual(columns["city_name"][-1], "Paris")
+        self.assertEqual(self.transformer.get_stats(), per_row.get_stats())
+        records = DataTransformer.records(columns)
+        self.assertEqual(records, expected)
+        for record, event_data in zip(records, expected):
+            self.assertEqual({k: type(v) for k, v in record.items()}, {k: type(v) for k, v in event_data.items()})
+
+    def test_transform_batch_empty(self):
+        """Test an empty batch yields empty columns"""
+        columns, errors = self.transformer.transform_batch([])
+        self.assertEqual(errors, 0)
+        self.assertEqual(columns, {c: [] for c in BATCH_COLUMNS})
+
 if __name__ == '__main__':
     unittest.main()
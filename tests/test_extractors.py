@@ -0,0 +1,83 @@
+import unittest
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.generate_raw import generate_raw_documents
+from enrichment.categorization import CategorizationEnricher
+from enrichment.date_processor import DateEnricher
+from enrichment.extractors import EXTRACTORS, EventRecord, extract, payload_projection
+from etl.transformer import DataTransformer
+
+
+class TestExtractors(unittest.TestCase):
+    """Test per-source flattening of raw payloads into EventRecord"""
+
+    def setUp(self):
+        documents = list(generate_raw_documents(200, seed=3))
+        self.paris = next(d for d in documents if d["source"] == "paris_open_data")
+        self.agenda = next(d for d in documents if d["source"] == "openagenda")
+
+    def test_sources_are_registered(self):
+        """Both collectors have an extractor"""
+        self.assertIn("paris_open_data", EXTRACTORS)
+        self.assertIn("openagenda", EXTRACTORS)
+
+    def test_paris_open_data_record(self):
+        """The normalized Paris payload maps field by field"""
+        payload = self.paris["payload"]
+        record = extract(self.paris)
+        self.assertIsInstance(record, EventRecord)
+        self.assertEqual(record.title, payload["title"])
+        self.assertEqual(record.street, payload["address"]["street"])
+        self.assertEqual(record.venue, payload["address"]["name"])
+        self.assertEqual(record.start, payload["dates"]["start"])
+        self.assertEqual(record.price_type, payload["price"]["type"])
+
+    def test_openagenda_record(self):
+        """Multilingual texts, nested location and timings are flattened"""
+        payload = self.agenda["payload"]
+        record = extract(self.agenda)
+        self.assertEqual(record.title, payload["title"]["fr"])
+        self.assertEqual(record.tags, payload["keywords"]["fr"])
+        self.assertEqual(record.zipcode, payload["location"]["postalCode"])
+        self.assertEqual(record.latitude, payload["location"]["latitude"])
+        self.assertNotIn(payload["location"]["postalCode"], record.street)
+        self.assertEqual(record.start, payload["timings"][0]["start"])
+        self.assertEqual(record.end, payload["timings"][-1]["end"])
+
+    def test_unknown_source_uses_default_extractor(self):
+        """Unknown sources and malformed payloads yield a record, not an error"""
+        record = extract({"source": "mongo", "payload": {"title": "Concert", "address": None, "location": "48,2"}})
+        self.assertEqual(record.source, "mongo")
+        self.assertEqual(record.title, "Concert")
+        self.assertIsNone(record.latitude)
+        self.assertEqual(extract({}).tags, [])
+
+    def test_projection_covers_every_extractor(self):
+        """The raw projection keeps every payload field an extractor reads"""
+        projection = payload_projection()
+        for extractor in EXTRACTORS.values():
+            for name in extractor.fields:
+                self.assertIn(f"payload.{name}", projection)
+        self.assertEqual(DataTransformer.RAW_PROJECTION, projection)
+
+    def test_enrichers_read_openagenda_events(self):
+        """OpenAgenda keywords and timings reach the categorization and date enrichers"""
+        event = {"source": "openagenda", "payload": {
+            "title": {"fr": "Soirée au Sunset"},
+            "keywords": {"fr": ["concert", "jazz"]},
+            "timings": [{"start": "2026-03-15T19:00:00.000Z", "end": "2026-03-15T21:00:00.000Z"},
+                        {"start": "2026-03-17T19:00:00.000Z", "end": "2026-03-17T21:00:00.000Z"}],
+        }}
+        category = CategorizationEnricher().enrich(event)
+        self.assertEqual((category["main_category"], category["sub_category"]), ("Musique", "Jazz"))
+        dates = DateEnricher().enrich(event)
+        self.assertEqual(dates["event_date"], "2026-03-15")
+        self.assertEqual(dates["duration_days"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import sys
+from collections import Counter
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.generate_raw import generate_raw_documents
+from etl.transformer import DataTransformer
+
+
+class TestGenerateRaw(unittest.TestCase):
+    """Test the synthetic raw document generator"""
+
+    def test_reproducible(self):
+        """Same seed, same documents"""
+        first = [d["raw_hash"] for d in generate_raw_documents(200, seed=7)]
+        second = [d["raw_hash"] for d in generate_raw_documents(200, seed=7)]
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, [d["raw_hash"] for d in generate_raw_documents(200, seed=8)])
+
+    def test_sources_and_duplicates(self):
+        """Both collector shapes are produced, duplicates keep their raw_hash"""
+        documents = list(generate_raw_documents(2000, openagenda_share=0.3, duplicate_rate=0.05))
+        sources = Counter(d["source"] for d in documents)
+        self.assertEqual(set(sources), {"paris_open_data", "openagenda"})
+        self.assertTrue(400 < sources["openagenda"] < 800)
+
+        hashes = Counter(d["raw_hash"] for d in documents)
+        self.assertTrue(any(count > 1 for count in hashes.values()))
+
+        paris = next(d for d in documents if d["source"] == "paris_open_data")["payload"]
+        self.assertIn("<p>", paris["description"])
+        self.assertIn("start", paris["dates"])
+        agenda = next(d for d in documents if d["source"] == "openagenda")["payload"]
+        self.assertIn("fr", agenda["title"])
+        self.assertTrue(agenda["timings"])
+
+    def test_paris_documents_transform(self):
+        """Paris Open Data documents go through DataTransformer"""
+        transformer = DataTransformer()
+        raw = next(d for d in generate_raw_documents(50) if d["source"] == "paris_open_data")
+        raw["_id"] = "0" * 24
+        event = transformer.transform_event(raw, {"raw_id": raw["_id"], "data": {"event_date": "2026-03-15"}})
+        self.assertEqual(event["source"], "paris_open_data")
+        self.assertEqual(event["title"], raw["payload"]["title"])
+
+
+if __name__ == '__main__':
+    unittest.main()
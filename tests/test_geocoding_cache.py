@@ -0,0 +1,158 @@
+import os
+import tempfile
+import time
+import unittest
+import sys
+from pathlib import Path
+from unittest import mock
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import requests
+
+from enrichment import geocoding_cache
+from enrichment.geocoding import GeocodingEnricher
+from enrichment.geocoding_cache import MISS, GeocodingCache, normalize_address
+
+ADDRESS_FEATURE = {"geometry": {"coordinates": [2.3488, 48.8534]},
+                   "properties": {"postcode": "75004", "city": "Paris"}}
+
+
+class FakeResponse:
+    def __init__(self, features):
+        self.features = features
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"features": self.features}
+
+
+class FakeSession:
+    """Records the API calls; unknown addresses get an empty answer"""
+
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    def get(self, url, params=None, timeout=None):
+        self.calls.append((url, params))
+        if self.fail:
+            raise requests.ConnectionError("réseau indisponible")
+        if "reverse" in url or "Notre" in params["q"]:
+            return FakeResponse([ADDRESS_FEATURE])
+        return FakeResponse([])
+
+    def close(self):
+        pass
+
+
+EVENTS = [
+    {"payload": {"location": [48.853412, 2.348801]}},
+    {"payload": {"address": {"street": "6 Parvis Notre-Dame", "zipcode": "75004"}}},
+    {"payload": {"address": {"street": "6, parvis NOTRE-DAME", "zipcode": "75004"}}},
+    {"payload": {"address": {"street": "Lieu inconnu"}}},
+]
+
+
+class TestGeocodingCache(unittest.TestCase):
+    """Test the persistent SQLite cache of the geocoding enricher"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "geocoding.sqlite")
+        sleep = mock.patch("enrichment.geocoding.time.sleep")
+        sleep.start()
+        self.addCleanup(sleep.stop)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def enricher(self, session=None, **options):
+        enricher = GeocodingEnricher(GeocodingCache(self.path, **options))
+        enricher.session = session or FakeSession()
+        return enricher
+
+    def test_unchanged_dataset_makes_no_http_call(self):
+        """A second run on the same events is served from the file"""
+        first = self.enricher()
+        results = [first.enrich(event) for event in EVENTS]
+        first.close()
+        # Adresses normalisées : la même adresse écrite autrement n'est demandée qu'une fois
+        self.assertEqual(len(first.session.calls), 3)
+        self.assertEqual(results[1]["arrondissement"], "4e")
+        self.assertFalse(results[3]["geocoded"])
+
+        second = self.enricher()
+        self.assertEqual([second.enrich(event) for event in EVENTS], results)
+        self.assertEqual(second.session.calls, [])
+        stats = second.cache.get_stats()
+        self.assertEqual((stats["hits"], stats["negative_hits"], stats["misses"]), (3, 1, 0))
+        self.assertEqual(stats["hit_rate"], 100.0)
+        second.close()
+
+    def test_network_errors_are_not_cached(self):
+        """Only API answers (even empty) are stored"""
+        offline = self.enricher(FakeSession(fail=True))
+        self.assertFalse(offline.enrich(EVENTS[1])["geocoded"])
+        offline.close()
+
+        online = self.enricher()
+        self.assertTrue(online.enrich(EVENTS[1])["geocoded"])
+        self.assertEqual(len(online.session.calls), 1)
+        online.close()
+
+    def test_string_coordinates_are_reverse_geocoded(self):
+        """Coordinates given as strings are converted before rounding"""
+        first = self.enricher()
+        result = first.enrich({"payload": {"location": ["48.853412", "2.348801"]}})
+        self.assertEqual(result["postcode"], "75004")
+        self.assertEqual(first.session.calls[0][1], {"lat": 48.8534, "lon": 2.3488})
+        first.close()
+
+        # Même clé que les coordonnées numériques
+        second = self.enricher()
+        self.assertEqual(second.enrich(EVENTS[0])["postcode"], "75004")
+        self.assertEqual(second.session.calls, [])
+        second.close()
+
+    def test_expired_entries_are_refreshed(self):
+        """Empty answers expire after the negative TTL, found ones after the TTL"""
+        cache = GeocodingCache(self.path, ttl=100, negative_ttl=10)
+        with mock.patch("enrichment.geocoding_cache.time.time", return_value=1000.0):
+            cache.put("forward", "lieu inconnu", None)
+            cache.put("forward", "notre dame", {"lat": 48.85})
+        with mock.patch("enrichment.geocoding_cache.time.time", return_value=1050.0):
+            self.assertIs(cache.get("forward", "lieu inconnu"), MISS)
+            self.assertEqual(cache.get("forward", "notre dame"), {"lat": 48.85})
+            cache.put("forward", "lieu inconnu", {"lat": 48.86})
+            self.assertEqual(cache.get("forward", "lieu inconnu"), {"lat": 48.86})
+        self.assertEqual(cache.get_stats()["expired"], 1)
+        self.assertEqual(cache.get_stats()["entries"], 2)
+        cache.close()
+
+    def test_least_recently_used_entries_are_evicted(self):
+        """The file stays under max_entries, recently used keys survive"""
+        cache = GeocodingCache(self.path, max_entries=10)
+        start = time.time() - geocoding_cache.TOUCH_SECONDS - 60
+        for i in range(10):
+            with mock.patch("enrichment.geocoding_cache.time.time", return_value=start + i):
+                cache.put("reverse", f"key{i}", {"i": i})
+        with mock.patch("enrichment.geocoding_cache.time.time",
+                        return_value=start + geocoding_cache.TOUCH_SECONDS + 20):
+            self.assertEqual(cache.get("reverse", "key0"), {"i": 0})
+            cache.put("reverse", "key10", {"i": 10})
+        self.assertEqual(cache.get_stats()["entries"], 9)
+        self.assertEqual(cache.get_stats()["evicted"], 2)
+        self.assertIs(cache.get("reverse", "key1"), MISS)
+        self.assertEqual(cache.get("reverse", "key0"), {"i": 0})
+        cache.close()
+
+    def test_normalize_address(self):
+        self.assertEqual(normalize_address("12, Rue de l'Église  75011 PARIS"), "12 rue de l eglise 75011 paris")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,568 @@
+import unittest
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import psycopg
+
+from etl.loader import CLEAR_EVENT_CATEGORIES, MERGE_EVENT_CATEGORIES, PostgreSQLLoader
+from etl import parallel_loader
+from etl.parallel_loader import merge_stats, parallel_load, split_id_ranges
+from etl.transformer import DataTransformer
+
+
+class FakeCursor:
+    """Iterator over documents, like pymongo.cursor.Cursor"""
+
+    def __init__(self, docs):
+        self.docs = iter(docs)
+
+    def batch_size(self, size):
+        return self
+
+    def close(self):
+        pass
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.docs)
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.find_calls = 0
+
+    def find(self, query=None, projection=None):
+        self.find_calls += 1
+        self.last_query = query
+        if query and "_id" in query:
+            wanted = set(query["_id"]["$in"])
+            return FakeCursor([d for d in self.docs if d["_id"] in wanted])
+        if query and "enriched_at" in query:
+            since = query["enriched_at"]["$gt"]
+            return FakeCursor([d for d in self.docs if d["enriched_at"] > since])
+        return FakeCursor(self.docs)
+
+    def estimated_document_count(self):
+        return len(self.docs)
+
+    def count_documents(self, query):
+        return len(list(self.find(query)))
+
+    def create_index(self, keys):
+        pass
+
+
+class FakeMongoClient:
+    def __init__(self, raw, enriched):
+        self.raw = FakeCollection(raw)
+        self.enriched = FakeCollection(enriched)
+
+    def connect(self):
+        return True
+
+    def disconnect(self):
+        pass
+
+
+class RecordingLoader(PostgreSQLLoader):
+    """Loader whose PostgreSQL writes are recorded instead of executed"""
+
+    def __init__(self, mongo_client):
+        super().__init__()
+        self.mongo_client = mongo_client
+        self.loaded_batches = []
+        self.deleted = []
+
+    def prefetch_dimensions(self):
+        pass
+
+    def ensure_future_partitions(self, months_ahead=12):
+        pass
+
+    def load_events(self, columns, bulk, stats):
+        self.loaded_batches.append(len(columns["raw_id"]))
+        stats["inserted"] += len(columns["raw_id"])
+
+    def delete_events(self, raw_ids):
+        self.deleted.extend(raw_ids)
+        return len(raw_ids)
+
+
+class FakePgCursor:
+    """Minimal cities/categories/events tables answering the loader's queries"""
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.statements = []
+        self.events = []
+        self.dead_letters = []
+        self.partition_months = []
+        # (raw_id, raw_hash, enricher_version) des lignes déjà chargées
+        self.loaded_hashes = set()
+
+    def execute(self, sql, params=None):
+        keyword = sql.split()[0]
+        self.statements.append(keyword)
+        if keyword in ("SAVEPOINT", "RELEASE", "ROLLBACK"):
+            return
+        if "ensure_event_partitions" in sql:
+            self.partition_months.append(list(params[0]))
+            return
+        if "enricher_version" in sql and keyword == "SELECT":
+            self.result = [key for key in zip(*params) if key in self.loaded_hashes]
+            return
+        if sql.startswith("SELECT 1 FROM events"):
+            self.result = [(1,)] if params[0] in self.events else []
+            return
+        if "INSERT INTO events " in sql:
+            if params[0] == "bad":
+                raise psycopg.errors.StringDataRightTruncation("value too long")
+            self.events.append(params[0])
+            self.result = [(len(self.events),)]
+            return
+        if "event_categories" in sql:
+            return
+
+        rows = self.tables["categories" if "categories" in sql else "cities"]
+        if keyword == "INSERT":
+            self.result = []
+            for name in params[0]:
+                if name not in rows:
+                    rows[name] = len(rows) + 1
+                    self.result.append((name, rows[name]))
+        elif params:
+            self.result = [(name, rows[name]) for name in params[0] if name in rows]
+        else:
+            self.result = list(rows.items())
+
+    def executemany(self, sql, params_seq):
+        self.dead_letters.extend(params_seq)
+
+    def fetchall(self):
+        return self.result
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+
+class FakePgConnection:
+    def __init__(self):
+        self.commits = 0
+        self.rollbacks = 0
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+def make_dimension_loader(cities=None, categories=None):
+    loader = PostgreSQLLoader()
+    loader.conn = FakePgConnection()
+    loader.cursor = FakePgCursor({"cities": dict(cities or {}), "categories": dict(categories or {})})
+    loader.prefetch_dimensions()
+    loader.cursor.statements.clear()
+    return loader
+
+
+def make_documents(count, missing_raw=()):
+    raw = [
+        {"_id": f"raw{i}", "source": "test", "payload": {"title": f"Event {i}"}}
+        for i in range(count) if i not in missing_raw
+    ]
+    enriched = [
+        {"_id": f"enr{i}", "raw_id": f"raw{i}", "status": "success",
+         "enriched_at": datetime(2026, 1, 1) + timedelta(hours=i), "data": {"event_date": "2026-03-15"}}
+        for i in range(count)
+    ]
+    return raw, enriched
+
+
+class TestStreamingLoader(unittest.TestCase):
+    """Test the streaming MongoDB -> PostgreSQL load pipeline"""
+
+    def test_batches_are_streamed(self):
+        """Enriched documents are read, paired and written batch by batch"""
+        raw, enriched = make_documents(25, missing_raw={3})
+        mongo = FakeMongoClient(raw, enriched)
+        loader = RecordingLoader(mongo)
+
+        stats = loader.load_all_events(batch_size=10, max_in_flight=1)
+
+        self.assertEqual(loader.loaded_batches, [9, 10, 5])
+        self.assertEqual(stats["processed"], 24)
+        self.assertEqual(stats["inserted"], 24)
+        self.assertEqual(stats["errors"], 1)
+        # Un $in par lot au lieu d'un find_one par événement
+        self.assertEqual(mongo.raw.find_calls, 3)
+        self.assertTrue(stats["completed"])
+
+    def test_incremental_load_with_tombstones(self):
+        """Only documents enriched after the watermark are loaded, tombstones are deleted"""
+        raw, enriched = make_documents(10)
+        enriched[8]["status"] = "deleted"
+        mongo = FakeMongoClient(raw, enriched)
+        loader = RecordingLoader(mongo)
+
+        stats = loader.load_all_events(batch_size=4, since=datetime(2026, 1, 1, 5))
+
+        self.assertIn("$lte", mongo.enriched.last_query["enriched_at"])
+        self.assertEqual(sum(loader.loaded_batches), 3)  # heures 6, 7, 9
+        self.assertEqual(loader.deleted, ["raw8"])
+        self.assertEqual(stats["deleted"], 1)
+        self.assertLess(stats["watermark"], datetime.utcnow())
+
+    def test_reader_error_is_reported(self):
+        """A failing MongoDB read stops the load without hanging"""
+        raw, enriched = make_documents(5)
+        mongo = FakeMongoClient(raw, enriched)
+
+        def broken_find(query=None, projection=None):
+            raise RuntimeError("cursor lost")
+
+        mongo.enriched.find = broken_find
+        loader = RecordingLoader(mongo)
+
+        class NoopConnection:
+            def rollback(self):
+                pass
+
+        loader.conn = NoopConnection()
+        stats = loader.load_all_events(batch_size=2)
+        self.assertEqual(loader.loaded_batches, [])
+        self.assertEqual(stats["processed"], 0)
+        self.assertFalse(stats["completed"])
+
+
+class TestDimensionCache(unittest.TestCase):
+    """Test set-based city/category resolution"""
+
+    def test_prefetch_fills_caches(self):
+        """All dimensions are loaded by name at startup"""
+        loader = make_dimension_loader({"Paris": 1}, {"Musique": 1, "Concert": 2})
+        self.assertEqual(loader.city_cache, {"Paris": 1})
+        self.assertEqual(loader.category_cache, {"Musique": 1, "Concert": 2})
+
+    def test_unseen_names_inserted_once_per_batch(self):
+        """Only unseen names are inserted, one statement per table, no commit"""
+        loader = make_dimension_loader({"Paris": 1}, {"Musique": 1})
+        events = [
+            {"city_name": "Lyon", "main_category": "Musique", "sub_category": "Jazz"},
+            {"city_name": "Lyon", "main_category": "Théâtre", "sub_category": None},
+            {"city_name": None, "main_category": "Musique", "sub_category": "Jazz"},
+        ]
+        columns = DataTransformer.columns(events)
+        loader.resolve_dimensions(columns)
+
+        self.assertEqual(loader.cursor.statements, ["INSERT", "INSERT"])
+        self.assertEqual(loader.conn.commits, 0)
+        self.assertEqual(set(loader.city_cache), {"Paris", "Lyon"})
+        self.assertEqual(set(loader.category_cache), {"Musique", "Jazz", "Théâtre"})
+        self.assertEqual(loader._dimension_columns(columns, [2]), ([1], [1], [loader.category_cache["Jazz"]]))
+
+        loader.cursor.statements.clear()
+        loader.resolve_dimensions(columns)
+        self.assertEqual(loader.cursor.statements, [])
+
+    def test_category_cache_is_keyed_by_name(self):
+        """A category cached without parent is found when looked up with one"""
+        loader = make_dimension_loader({}, {"Concert": 7})
+        self.assertEqual(loader.get_or_create_category("Concert", parent="Musique"), 7)
+        self.assertEqual(loader.cursor.statements, [])
+
+    def test_rollback_forgets_created_dimensions(self):
+        """Ids created in a rolled-back batch are not reused from the cache"""
+        loader = make_dimension_loader({"Paris": 1})
+        loader.resolve_dimensions(DataTransformer.columns([{"city_name": "Lyon"}]))
+        self.assertIn("Lyon", loader.city_cache)
+        loader._rollback()
+        self.assertEqual(loader.city_cache, {"Paris": 1})
+
+
+def make_event(raw_id, **fields):
+    return {
+        "raw_id": raw_id, "source": "test", "title": f"Event {raw_id}",
+        "city_name": "Paris", "event_date": "2026-03-15", **fields,
+    }
+
+
+class TestErrorIsolation(unittest.TestCase):
+    """Test that a bad row is quarantined and the rest of the batch commits"""
+
+    def test_validation_errors(self):
+        """Rows breaking schema constraints are rejected before writing"""
+        self.assertIsNone(PostgreSQLLoader.validate_event(make_event("r1")))
+        self.assertIn("title", PostgreSQLLoader.validate_event(make_event("r1", title="")))
+        self.assertIn("zipcode", PostgreSQLLoader.validate_event(make_event("r1", zipcode="75001-75020")))
+        self.assertIn("latitude", PostgreSQLLoader.validate_event(make_event("r1", latitude=148.8)))
+
+    def test_bulk_batch_isolates_failing_row(self):
+        """The failing row is bisected out, quarantined, and the others commit"""
+        class MergeLoader(PostgreSQLLoader):
+            def _merge(self, columns, rows):
+                raw_ids = [columns["raw_id"][i] for i in rows]
+                if "bad" in raw_ids:
+                    raise psycopg.errors.NumericValueOutOfRange("numeric field overflow")
+                return [(int(raw_id[1:]), True) for raw_id in raw_ids]
+
+        loader = MergeLoader()
+        loader.conn = FakePgConnection()
+        loader.cursor = FakePgCursor({"cities": {"Paris": 1}, "categories": {}})
+        events = [make_event("r1"), make_event("r2"), make_event("bad"), make_event("r3"), make_event("r4", zipcode="x" * 11)]
+
+        stats = loader.bulk_insert(DataTransformer.columns(events))
+        self.assertEqual(stats, {"inserted": 3, "updated": 0, "skipped": 0, "errors": 2})
+        self.assertEqual(sorted(loader.inserted_event_ids), [1, 2, 3])
+        self.assertEqual(sorted(d[0] for d in loader.cursor.dead_letters), ["bad", "r4"])
+        # Partitions du mois (transaction courte), puis le lot
+        self.assertEqual(loader.cursor.partition_months, [["2026-03-01"]])
+        self.assertEqual(loader.conn.commits, 2)
+        self.assertEqual(loader.conn.rollbacks, 0)
+        self.assertEqual(loader.failed_batches, 0)
+
+    def test_row_mode_keeps_rows_before_failure(self):
+        """A failing INSERT only rolls back to its savepoint"""
+        loader = make_dimension_loader({"Paris": 1})
+        stats = loader.insert_rows([make_event("r1"), make_event("bad"), make_event("r2")])
+
+        self.assertEqual(stats, {"inserted": 2, "updated": 0, "skipped": 0, "errors": 1})
+        self.assertEqual(loader.cursor.events, ["r1", "r2"])
+        self.assertEqual(loader.inserted_event_ids, [1, 2])
+        self.assertEqual(loader.cursor.statements.count("ROLLBACK"), 1)
+        self.assertEqual([d[0] for d in loader.cursor.dead_letters], ["bad"])
+        self.assertEqual(loader.conn.commits, 2)
+
+
+class ScriptedCursor:
+    """Cursor replaying canned results for the set-based merge statements"""
+
+    def __init__(self, results):
+        self.results = results
+        self.executed = []
+        self.copied = []
+        self.result = []
+
+    def copy(self, sql):
+        cursor = self
+
+        class Copy:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                pass
+
+            def write_row(self, row):
+                cursor.copied.append(row)
+
+        return Copy()
+
+    def execute(self, sql, params=None):
+        self.executed.append((" ".join(sql.split()), params))
+        self.result = next((rows for marker, rows in self.results.items() if marker in sql), [])
+
+    def fetchall(self):
+        return self.result
+
+
+class TestMerge(unittest.TestCase):
+    """Test the staging -> events merge"""
+
+    def test_category_only_change_rewrites_links(self):
+        """An event whose row is unchanged but whose categories changed is relinked"""
+        loader = PostgreSQLLoader()
+        loader.city_cache = {"Paris": 1}
+        loader.category_cache = {"Musique": 3}
+        loader.cursor = ScriptedCursor({
+            "RETURNING e.id": [],           # MOVE_EVENTS : aucun déplacement
+            "RETURNING id, (xmax = 0)": [],  # MERGE_EVENTS : ligne identique
+            "LEFT JOIN LATERAL": [(7,)],      # CHANGED_CATEGORIES
+        })
+
+        merged = loader._merge(DataTransformer.columns([make_event("r1", main_category="Musique")]), [0])
+
+        self.assertEqual(merged, [(7, False)])
+        statements = dict(loader.cursor.executed)
+        self.assertEqual(statements[" ".join(CLEAR_EVENT_CATEGORIES.split())], ([7],))
+        self.assertEqual(statements[" ".join(MERGE_EVENT_CATEGORIES.split())], ([7],))
+
+
+class TestPartitions(unittest.TestCase):
+    """Test on-demand creation of monthly partitions"""
+
+    def test_batch_months_created_once(self):
+        """Each month of a batch is ensured once, then served from the cache"""
+        loader = make_dimension_loader({"Paris": 1})
+        loader.ensure_partitions(["2026-03-15", "2026-03-31", "2027-01-02"])
+        loader.ensure_partitions(["2026-03-01"])
+
+        self.assertEqual(loader.cursor.partition_months, [["2026-03-01", "2027-01-01"]])
+        self.assertEqual(loader.conn.commits, 1)
+
+    def test_event_without_date_is_rejected(self):
+        """event_date is the partition key: dateless rows go to the dead-letter table"""
+        self.assertIn("event_date", PostgreSQLLoader.validate_event(make_event("r1", event_date=None)))
+
+    def test_row_mode_skips_event_loaded_under_another_date(self):
+        """The raw_id lookup spans every partition, whatever the new date"""
+        loader = make_dimension_loader({"Paris": 1})
+        loader.insert_rows([make_event("r1")])
+        stats = loader.insert_rows([make_event("r1", event_date="2026-04-02")])
+
+        self.assertEqual(stats, {"inserted": 0, "updated": 0, "skipped": 1, "errors": 0})
+        self.assertEqual(loader.cursor.events, ["r1"])
+
+
+class TestChangeDetection(unittest.TestCase):
+    """Test that events with an unchanged raw_hash and enricher version are not rewritten"""
+
+    def test_unchanged_events_are_not_written(self):
+        """Only new or changed (hash or version) events reach the merge"""
+        class MergeLoader(PostgreSQLLoader):
+            def bulk_insert(self, columns):
+                self.written = columns["raw_id"]
+                return {"inserted": len(columns["raw_id"]), "updated": 0, "skipped": 0, "errors": 0}
+
+        loader = MergeLoader()
+        loader.conn = FakePgConnection()
+        loader.cursor = FakePgCursor({"cities": {"Paris": 1}, "categories": {}})
+        loader.cursor.loaded_hashes = {("r1", "h1", 1), ("r2", "h2", 1), ("r3", "h3", 1)}
+        events = [
+            make_event("r1", raw_hash="h1", enricher_version=1),
+            make_event("r2", raw_hash="h2-modifié", enricher_version=1),
+            make_event("r3", raw_hash="h3", enricher_version=2),
+            make_event("r4", raw_hash="h4", enricher_version=1),
+            make_event("r5"),  # sans raw_hash : toujours écrit
+        ]
+        stats = {"inserted": 0, "updated": 0, "unchanged": 0, "skipped": 0, "errors": 0}
+
+        loader.load_events(DataTransformer.columns(events), True, stats)
+
+        self.assertEqual(loader.written, ["r2", "r3", "r4", "r5"])
+        self.assertEqual(stats["unchanged"], 1)
+        self.assertEqual(stats["inserted"], 4)
+
+    def test_fully_unchanged_batch_ends_transaction(self):
+        """A batch with nothing to write only closes its lookup transaction"""
+        loader = make_dimension_loader({"Paris": 1})
+        loader.cursor.loaded_hashes = {("r1", "h1", 1)}
+        stats = {"inserted": 0, "updated": 0, "unchanged": 0, "skipped": 0, "errors": 0}
+
+        loader.load_events(DataTransformer.columns([make_event("r1", raw_hash="h1", enricher_version=1)]), True, stats)
+
+        self.assertEqual(stats["unchanged"], 1)
+        self.assertEqual(loader.cursor.partition_months, [])
+        self.assertEqual(loader.conn.commits, 1)
+
+
+class TestParallelLoader(unittest.TestCase):
+    """Test the range-partitioned parallel loader helpers"""
+
+    def test_split_id_ranges(self):
+        """Buckets become contiguous ranges, the last one inclusive"""
+        class BucketCollection:
+            def aggregate(self, pipeline):
+                self.pipeline = pipeline
+                return [
+                    {"_id": {"min": 1, "max": 40}, "count": 40},
+                    {"_id": {"min": 40, "max": 80}, "count": 40},
+                    {"_id": {"min": 80, "max": 99}, "count": 20},
+                ]
+
+        collection = BucketCollection()
+        ranges = split_id_ranges(collection, 3)
+        self.assertEqual(ranges, [(1, 40, False), (40, 80, False), (80, 99, True)])
+        self.assertEqual(collection.pipeline[-1]["$bucketAuto"]["buckets"], 3)
+
+    def test_merge_stats(self):
+        """Per-worker stats are summed, completion requires every worker"""
+        results = [
+            {"worker": 0, "processed": 10, "inserted": 9, "errors": 1, "completed": True,
+             "timings": {"mongo": 1.0, "transform": 0.5, "postgres": 2.0}, "peak_rss_mb": 80.0},
+            {"worker": 1, "processed": 5, "inserted": 5, "errors": 0, "completed": False,
+             "failed_batches": 1, "timings": {"mongo": 0.5}, "peak_rss_mb": 95.5},
+        ]
+        merged = merge_stats(results)
+        self.assertEqual(merged["processed"], 15)
+        self.assertEqual(merged["inserted"], 14)
+        self.assertEqual(merged["failed_batches"], 1)
+        self.assertFalse(merged["completed"])
+        self.assertEqual(merged["timings"]["mongo"], 1.5)
+        self.assertEqual(merged["peak_rss_mb"], 95.5)
+
+    def test_workers_defer_counters_to_one_rebuild(self):
+        """Workers never lock dimension rows, event_count is rebuilt once after the pool"""
+        class InlinePool:
+            def __init__(self, processes):
+                pass
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def map(self, func, tasks):
+                return [func(task) for task in tasks]
+
+        class BucketMongo:
+            def connect(self):
+                return True
+
+            def disconnect(self):
+                pass
+
+            class enriched:
+                @staticmethod
+                def aggregate(pipeline, **options):
+                    if "$bucketAuto" in pipeline[-1]:
+                        return [{"_id": {"min": 1, "max": 50}}, {"_id": {"min": 50, "max": 99}}]
+                    return []
+
+        events = []
+
+        def load_range(task):
+            events.append(("worker", task["worker"]))
+            return {"worker": task["worker"], "processed": 10, "completed": True}
+
+        loader = make_dimension_loader()
+        loader.mongo_client = BucketMongo()
+        context = mock.Mock(Pool=InlinePool)
+        with mock.patch.object(parallel_loader.multiprocessing, "get_context", return_value=context), \
+                mock.patch.object(parallel_loader, "load_range", load_range), \
+                mock.patch.object(parallel_loader, "rebuild", lambda conn: events.append(("rebuild", conn))):
+            stats = parallel_load(loader, 2)
+
+        self.assertEqual(events, [("worker", 0), ("worker", 1), ("rebuild", loader.conn)])
+        self.assertEqual(stats["processed"], 20)
+        self.assertIn("counters_seconds", stats)
+
+    def test_worker_sessions_disable_counter_triggers(self):
+        """The deferred-counter setting exists in the trigger and is set by workers"""
+        schema = (Path(__file__).parent.parent / "sql" / "schema.sql").read_text(encoding="utf-8")
+        self.assertIn("current_setting('etl.defer_event_count', true) = 'on'", schema)
+        self.assertTrue(PostgreSQLLoader(defer_counters=True).defer_counters)
+        self.assertFalse(PostgreSQLLoader().defer_counters)
+
+    def test_failed_shadow_publish_is_reported(self):
+        """A lock timeout during the swap leaves the live generation in place"""
+        loader = make_dimension_loader()
+        loader.create_indexes = mock.Mock()
+        with mock.patch("etl.loader.swap", side_effect=psycopg.errors.LockNotAvailable("lock timeout")), \
+                self.assertLogs("etl.loader", level="ERROR") as logs:
+            self.assertFalse(loader.publish_shadow())
+        self.assertIn("Publication impossible", logs.output[0])
+        loader.create_indexes.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+import sys
+from math import asin
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from api.service import EventService, EARTH_RADIUS_KM
+
+
+class FakeCursor:
+    def __init__(self):
+        self.query = None
+        self.params = None
+
+    def execute(self, query, params=None):
+        self.query = query
+        self.params = params
+
+    def fetchall(self):
+        return []
+
+
+class FakeConnection:
+    def __init__(self):
+        self.cursor_obj = FakeCursor()
+
+    def cursor(self):
+        return self.cursor_obj
+
+
+class TestNearbyEvents(unittest.TestCase):
+    """Test the KNN nearby-events query"""
+
+    def test_query_uses_knn_ordering(self):
+        """Results are ordered by the indexable <-> operator"""
+        conn = FakeConnection()
+        EventService.get_nearby_events(conn, 48.8566, 2.3522, radius_km=1.5, limit=10)
+        query = conn.cursor_obj.query
+        self.assertIn("OPERATOR(extensions.<->)", query)
+        self.assertIn("OPERATOR(extensions.@>)", query)
+        self.assertEqual(conn.cursor_obj.params[-3:], [48.8566, 2.3522, 10])
+
+    def test_radius_converted_to_chord(self):
+        """Radius in km is converted to a unit-sphere chord length"""
+        conn = FakeConnection()
+        EventService.get_nearby_events(conn, 48.8566, 2.3522, radius_km=3.0)
+        chord = conn.cursor_obj.params[5]
+        self.assertAlmostEqual(2 * EARTH_RADIUS_KM * asin(chord / 2), 3.0, places=6)
+
+    def test_filters_are_combined(self):
+        """Usual /events filters are appended to the nearby query"""
+        conn = FakeConnection()
+        EventService.get_nearby_events(conn, 48.85, 2.35, is_free=True, arrondissement="11e")
+        query = conn.cursor_obj.query
+        self.assertIn("e.is_free = %s", query)
+        self.assertIn("e.arrondissement = %s", query)
+        self.assertIn(True, conn.cursor_obj.params)
+        self.assertIn("11e", conn.cursor_obj.params)
+
+
+if __name__ == '__main__':
+    unittest.main()
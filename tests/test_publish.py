@@ -0,0 +1,81 @@
+import unittest
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from etl.publish import rollback, swap
+
+
+class RecordingCursor:
+    def __init__(self, connection, answers):
+        self.connection = connection
+        self.answers = answers
+
+    def execute(self, query, params=None):
+        text = query if isinstance(query, str) else query.as_string(None)
+        self.connection.log.append(" ".join(text.split()))
+        self.result = self.answers.get(text.split("(")[0].strip(), (True,))
+
+    def fetchone(self):
+        return self.result
+
+
+class RecordingConnection:
+    """Records statements and the transaction they were committed in"""
+
+    def __init__(self, answers=None):
+        self.log = []
+        self.transactions = []
+        self.answers = answers or {}
+
+    def cursor(self):
+        return RecordingCursor(self, self.answers)
+
+    def commit(self):
+        self.transactions.append(self.log)
+        self.log = []
+
+    def rollback(self):
+        self.log = []
+
+
+class TestPublish(unittest.TestCase):
+    """Test the shadow-schema swap and rollback"""
+
+    def test_swap_is_one_rename_transaction(self):
+        """Both renames and the etl_state carry-over commit together"""
+        conn = RecordingConnection()
+        swap(conn)
+
+        drop, publish, reset = conn.transactions
+        self.assertEqual(drop, ['DROP SCHEMA IF EXISTS "events_previous" CASCADE'])
+        renames = [s for s in publish if s.startswith("ALTER SCHEMA")]
+        self.assertEqual(renames, [
+            'ALTER SCHEMA "public" RENAME TO "events_previous"',
+            'ALTER SCHEMA "events_shadow" RENAME TO "public"',
+        ])
+        self.assertTrue(any("INSERT INTO \"events_shadow\".etl_state" in s for s in publish))
+        self.assertEqual(reset, ["RESET search_path"])
+
+    def test_rollback_exchanges_generations(self):
+        """Rollback swaps public and events_previous through a temporary name"""
+        conn = RecordingConnection()
+        self.assertTrue(rollback(conn))
+        renames = [s for s in conn.transactions[-1] if s.startswith("ALTER SCHEMA")]
+        self.assertEqual(renames, [
+            'ALTER SCHEMA "public" RENAME TO "events_swap"',
+            'ALTER SCHEMA "events_previous" RENAME TO "public"',
+            'ALTER SCHEMA "events_swap" RENAME TO "events_previous"',
+        ])
+
+    def test_rollback_without_previous_generation(self):
+        """Nothing is renamed when no previous generation exists"""
+        conn = RecordingConnection({"SELECT EXISTS": (False,)})
+        self.assertFalse(rollback(conn))
+        self.assertEqual(conn.transactions, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,192 @@
+import unittest
+import gzip
+import sys
+import tempfile
+from datetime import date
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bson import ObjectId
+
+from etl.retention import archivable_months, archive_month, mongo_ids, next_month, prune_mongo
+
+
+class RecordingCursor:
+    """Answers the catalog queries of etl/retention.py from a table -> state map"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.result = []
+        self.rowcount = 0
+
+    def execute(self, query, params=None):
+        text = " ".join((query if isinstance(query, str) else query.as_string(None)).split())
+        conn = self.connection
+        conn.log.append((text, conn.autocommit))
+        tables = conn.tables
+
+        if "relispartition" in text:
+            state = tables.get(params[0])
+            self.result = [] if state is None else [(state,)]
+        elif "FROM pg_class" in text:
+            self.result = [(name,) for name in tables]
+        elif "DETACH PARTITION" in text:
+            tables[text.split('"')[3]] = False
+        elif text.startswith("DROP TABLE"):
+            del tables[text.split('"')[1]]
+        elif "FROM pg_constraint" in text:
+            self.result = [("event_categories_event_id_event_date_fkey",)]
+        elif text.startswith("SELECT id FROM"):
+            self.result = [(1,), (2,), (3,)]
+        elif "information_schema.columns" in text:
+            self.result = [("id",), ("raw_id",), ("event_date",)]
+        elif "archived_months WHERE month" in text:
+            self.result = [(params[0] in conn.archived,)]
+        elif "archived_months WHERE mongo_pruned_at IS NULL" in text:
+            self.result = [(date(2025, 1, 1),)]
+        elif text.startswith("SELECT raw_id FROM"):
+            self.result = [(raw_id,) for raw_id in conn.raw_ids]
+        elif text.startswith("INSERT INTO \"events_archive\".events"):
+            self.rowcount = 3
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+    def fetchall(self):
+        return self.result
+
+
+class RecordingConnection:
+    def __init__(self, tables=None, raw_ids=(), archived=()):
+        self.tables = dict(tables or {})
+        self.raw_ids = list(raw_ids)
+        self.archived = set(archived)
+        self.log = []
+        self.commits = 0
+        self.autocommit = False
+
+    def cursor(self):
+        return RecordingCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+class FakeDeleteResult:
+    def __init__(self, count):
+        self.deleted_count = count
+
+
+class FakeCollection:
+    def __init__(self, docs, key):
+        self.docs = docs
+        self.key = key
+
+    def find(self, query):
+        wanted = query[self.key]["$in"]
+        return [d for d in self.docs if d[self.key] in wanted]
+
+    def delete_many(self, query):
+        wanted = query[self.key]["$in"]
+        kept = [d for d in self.docs if d[self.key] not in wanted]
+        deleted = len(self.docs) - len(kept)
+        self.docs[:] = kept
+        return FakeDeleteResult(deleted)
+
+
+class FakeMongoClient:
+    def __init__(self, raw, enriched):
+        self.raw = FakeCollection(raw, "_id")
+        self.enriched = FakeCollection(enriched, "raw_id")
+
+
+class TestRetention(unittest.TestCase):
+    """Test the monthly archival of past events"""
+
+    def test_only_whole_months_before_cutoff(self):
+        """A month is archivable once all its days are before the cutoff"""
+        conn = RecordingConnection({"events_p2024_12": True, "events_p2025_01": False, "events_p2025_02": True})
+        self.assertEqual(next_month(date(2024, 12, 1)), date(2025, 1, 1))
+        self.assertEqual(archivable_months(conn, date(2025, 2, 15)), [date(2024, 12, 1), date(2025, 1, 1)])
+
+    def test_archive_month_detaches_then_copies(self):
+        """Partitions are detached concurrently, outside a transaction, in FK order"""
+        conn = RecordingConnection({
+            "events_p2025_01": True,
+            "event_categories_p2025_01": True,
+            "event_similarities_p2025_01": True,
+        })
+
+        self.assertEqual(archive_month(conn, date(2025, 1, 1), batch_size=2), 3)
+
+        detaches = [(text.split('"')[3], autocommit) for text, autocommit in conn.log if "DETACH" in text]
+        self.assertEqual(detaches, [
+            ("event_similarities_p2025_01", True),
+            ("event_categories_p2025_01", True),
+            ("events_p2025_01", True),
+        ])
+        statements = [text for text, _ in conn.log]
+        # Similarités entrantes supprimées par lots avant tout détachement
+        self.assertEqual(sum(s.startswith("DELETE FROM event_similarities") for s in statements), 2)
+        self.assertLess(
+            max(i for i, s in enumerate(statements) if s.startswith("DELETE FROM event_similarities")),
+            min(i for i, s in enumerate(statements) if "DETACH" in s),
+        )
+        self.assertTrue(any("DROP CONSTRAINT" in s for s in statements))
+        self.assertTrue(any("INSERT INTO \"events_archive\".event_categories" in s for s in statements))
+        self.assertEqual(conn.tables, {})
+
+    def test_interrupted_archive_resumes(self):
+        """A month left detached by an interrupted run is copied without detaching again"""
+        conn = RecordingConnection({"events_p2025_01": False})
+        self.assertEqual(archive_month(conn, date(2025, 1, 1)), 3)
+        self.assertFalse(any("DETACH" in text or "DELETE FROM" in text for text, _ in conn.log))
+        self.assertEqual(conn.tables, {})
+
+    def test_rearchived_month_is_merged(self):
+        """A month recreated by a late load replaces its archived versions and is pruned again"""
+        conn = RecordingConnection({"events_p2025_01": False}, archived={date(2025, 1, 1)})
+        self.assertEqual(archive_month(conn, date(2025, 1, 1)), 3)
+
+        statements = [text for text, _ in conn.log]
+        merges = [i for i, s in enumerate(statements) if s.startswith('DELETE FROM "events_archive"')]
+        self.assertEqual(len(merges), 2)
+        self.assertIn('"event_categories_p2025_01"', statements[merges[0]])
+        insert = next(i for i, s in enumerate(statements) if s.startswith('INSERT INTO "events_archive".events'))
+        self.assertLess(merges[-1], insert)
+        upsert = next(s for s in statements if "INSERT INTO \"events_archive\".archived_months" in s)
+        self.assertIn("ON CONFLICT (month) DO UPDATE", upsert)
+        self.assertIn("mongo_pruned_at = NULL", upsert)
+        self.assertEqual(conn.tables, {})
+
+    def test_mongo_ids_cover_objectids(self):
+        """Hex raw_ids match both string and ObjectId _id values"""
+        oid = ObjectId()
+        self.assertEqual(mongo_ids([str(oid), "seed1"]), [str(oid), oid, "seed1"])
+
+    def test_prune_mongo_exports_then_deletes(self):
+        """Archived documents are exported, deleted in batches and the month marked pruned"""
+        oid = ObjectId()
+        raw = [{"_id": oid, "title": "Archivé"}, {"_id": "seed2"}, {"_id": "live"}]
+        enriched = [{"raw_id": oid}, {"raw_id": "seed2"}, {"raw_id": "live"}]
+        mongo = FakeMongoClient(raw, enriched)
+        conn = RecordingConnection(raw_ids=[str(oid), "seed2"])
+
+        with tempfile.TemporaryDirectory() as export_dir:
+            counts = prune_mongo(conn, mongo, batch_size=1, export_dir=export_dir)
+            with gzip.open(Path(export_dir) / "events_raw_2025_01.jsonl.gz", "rt", encoding="utf-8") as f:
+                exported = f.read().splitlines()
+
+        self.assertEqual(counts, {"raw": 2, "enriched": 2})
+        self.assertEqual(len(exported), 2)
+        self.assertEqual([d["_id"] for d in mongo.raw.docs], ["live"])
+        self.assertTrue(any("SET mongo_pruned_at" in text for text, _ in conn.log))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+import unittest
+import sys
+from collections import Counter
+from datetime import date
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from etl.similarity import DOCUMENTS_TERM, SimilarityBuilder
+
+
+class FakeCopy:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def write_row(self, row):
+        self.rows.append(row)
+
+
+class FeatureCopy(FakeCopy):
+    """COPY into similarity_features, keyed by (event_id, term)"""
+
+    def write_row(self, row):
+        self.rows[(row[0], row[1])] = row[2]
+
+
+class SimilarityDatabase:
+    """events, event_similarities, similarity_features and similarity_terms in memory"""
+
+    COLUMNS = ("id", "event_date", "title", "description", "keywords", "arrondissement",
+               "latitude", "longitude", "category_name", "parent_category")
+
+    def __init__(self, events):
+        self.events = {e["id"]: dict(e, event_date=date(2026, 3, 15)) for e in events}
+        self.similarities = []
+        self.features = {}
+        self.terms = {}
+        self.statements = []
+        self.result = []
+
+    def cursor(self):
+        return self
+
+    def commit(self):
+        pass
+
+    def copy(self, statement):
+        if "similarity_features" in statement:
+            return FeatureCopy(self.features)
+        return FakeCopy(self.similarities)
+
+    def execute(self, query, params=None):
+        self.statements.append(query)
+        query = " ".join(query.split())
+        if query.startswith("SELECT df FROM similarity_terms"):
+            self.result = [(self.terms[params[0]],)] if params[0] in self.terms else []
+        elif query.startswith("SELECT e.id"):
+            ids = params[0] if params else self.events.keys()
+            self.result = [tuple(self.events[i].get(c) for c in self.COLUMNS) for i in ids if i in self.events]
+        elif query.startswith("DELETE FROM similarity_features"):
+            self.result = [key for key in self.features if key[0] in params[0]]
+            for key in self.result:
+                del self.features[key]
+        elif query.startswith("INSERT INTO similarity_terms"):
+            for term, delta in zip(*params):
+                self.terms[term] = self.terms.get(term, 0) + delta
+        elif query.startswith("DELETE FROM similarity_terms"):
+            self.terms = {t: df for t, df in self.terms.items() if not (t in params[0] and df <= 0)}
+        elif query.startswith("SELECT term FROM similarity_terms"):
+            self.result = [(t,) for t in params[0] if t in self.terms and self.terms[t] <= params[1]]
+        elif query.startswith("SELECT DISTINCT event_id"):
+            self.result = sorted({(i,) for i, t in self.features if t in params[0]})
+        elif query.startswith("SELECT id, event_date FROM events"):
+            self.result = [(i, self.events[i]["event_date"]) for i in params[0] if i in self.events]
+        elif query.startswith("SELECT f.event_id"):
+            self.result = [(i, t, tf, self.terms[t]) for (i, t), tf in self.features.items() if i in params[0]]
+        elif query.startswith("SELECT event_id, similar_event_id"):
+            self.result = [(r[0], r[2], r[5]) for r in self.similarities if r[0] in params[0]]
+        elif query.startswith("DELETE FROM event_similarities"):
+            self.similarities = [r for r in self.similarities if r[0] not in params[0]]
+        elif query.startswith("TRUNCATE event_similarities"):
+            self.similarities = []
+        elif query.startswith("TRUNCATE similarity_features"):
+            self.features, self.terms = {}, {}
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+    def fetchall(self):
+        return list(self.result)
+
+    def lists(self):
+        lists = {}
+        for event_id, _, similar_id, _, rank, _ in sorted(self.similarities, key=lambda r: (r[0], r[4])):
+            lists.setdefault(event_id, []).append(similar_id)
+        return lists
+
+
+class TestSimilarity(unittest.TestCase):
+    """Test the offline similar-events computation"""
+
+    def setUp(self):
+        self.builder = SimilarityBuilder(top_k=2)
+        self.rows = [
+            {"id": 1, "title": "Concert de jazz", "description": "<p>Quartet jazz au sunset</p>",
+             "keywords": ["jazz", "concert"], "category_name": "Jazz", "parent_category": "Musique",
+             "arrondissement": "1er", "latitude": 48.859, "longitude": 2.347},
+            {"id": 2, "title": "Soirée jazz manouche", "description": "Jazz et swing",
+             "keywords": ["jazz"], "category_name": "Jazz", "parent_category": "Musique",
+             "arrondissement": "1er", "latitude": 48.860, "longitude": 2.346},
+            {"id": 3, "title": "Exposition de peinture", "description": "Peintures impressionnistes",
+             "keywords": ["peinture"], "category_name": "Peinture", "parent_category": "Exposition",
+             "arrondissement": "7e", "latitude": 48.860, "longitude": 2.326},
+            {"id": 4, "title": "Rétrospective peinture moderne", "description": None,
+             "keywords": ["peinture", "exposition"], "category_name": "Peinture", "parent_category": "Exposition",
+             "arrondissement": "7e", "latitude": 48.861, "longitude": 2.327},
+        ]
+
+    def test_vectors_are_normalized(self):
+        """TF-IDF vectors have unit norm"""
+        vectors = self.builder.vectorize(self.rows)
+        for vector in vectors.values():
+            self.assertAlmostEqual(sum(w * w for w in vector.values()), 1.0, places=6)
+
+    def test_html_is_stripped(self):
+        """HTML tags in descriptions are not tokenized"""
+        vectors = self.builder.vectorize(self.rows)
+        self.assertNotIn("w:p", vectors[1])
+        self.assertIn("w:quartet", vectors[1])
+
+    def test_nearest_neighbour(self):
+        """Events sharing words, category and location are closest"""
+        lists = self.builder.neighbours(self.builder.vectorize(self.rows))
+        self.assertEqual(lists[1][0][0], 2)
+        self.assertEqual(lists[3][0][0], 4)
+        self.assertLessEqual(len(lists[1]), 2)
+        self.assertNotIn(1, [event_id for event_id, _ in lists[1]])
+
+
+    def test_stored_weights_match_full_vectorization(self):
+        """Vectors rebuilt from stored features and df equal the full computation"""
+        raw = {row["id"]: self.builder._features(row) for row in self.rows}
+        df = self.builder._df_changes([], raw)
+        n_docs = df.pop(DOCUMENTS_TERM)
+        vectors = self.builder.vectorize(self.rows)
+        for event_id, features in raw.items():
+            for term, weight in self.builder._weights(features, df, n_docs).items():
+                self.assertAlmostEqual(weight, vectors[event_id][term])
+
+    def test_df_changes_of_replaced_event(self):
+        """Replacing an event's features only moves the df of the terms that changed"""
+        changes = self.builder._df_changes(
+            [(1, "w:jazz"), (1, "w:concert")], {1: Counter({"w:jazz": 2.0, "w:swing": 1.0})}
+        )
+        self.assertEqual({t: d for t, d in changes.items() if d}, {"w:concert": -1, "w:swing": 1})
+
+    def test_refresh_reads_only_new_events_and_candidates(self):
+        """An incremental refresh gives the lists of a full build without rescanning events"""
+        db = SimilarityDatabase(self.rows)
+        db.events.pop(4)
+        self.builder.build(db)
+
+        db.events[4] = dict(self.rows[3], event_date=date(2026, 3, 15))
+        db.statements.clear()
+        stats = self.builder.refresh(db, [4])
+
+        expected = SimilarityDatabase(self.rows)
+        self.builder.build(expected)
+        self.assertEqual(stats["mode"], "incremental")
+        self.assertEqual(db.lists()[4], expected.lists()[4])
+        self.assertEqual(db.lists()[3][0], 4)
+        self.assertEqual(db.terms, expected.terms)
+        # Pas de lecture de tous les événements
+        self.assertFalse(any("e.id = ANY" not in q for q in db.statements if "FROM events e" in q))
+
+
+if __name__ == '__main__':
+    unittest.main()
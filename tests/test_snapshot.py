@@ -0,0 +1,84 @@
+import unittest
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from api.snapshot import EventSnapshot, SnapshotStore
+
+
+def make_row(event_id, event_date, category="Musique", arrondissement="11e", is_free=False,
+             is_weekend=False, season="Hiver", city="Paris", event_datetime=None):
+    sort_key = event_date or event_datetime
+    return (event_id, f"Event {event_id}", event_date, sort_key, arrondissement, is_free,
+            is_weekend, season, 48.85, 2.35, city, category)
+
+
+ROWS = [
+    make_row(3, date(2025, 1, 10), is_free=True),
+    make_row(1, date(2025, 1, 10), category="Théâtre", arrondissement="5e"),
+    make_row(2, date(2025, 1, 5), is_weekend=True, season="Hiver"),
+    make_row(4, None, category=None, arrondissement=None, event_datetime=datetime(2025, 1, 7, 20, 0)),
+    make_row(5, None, category="Théâtre", season=None),
+    make_row(6, date(2025, 4, 1), season="Printemps", city="Montreuil", is_free=None),
+]
+
+
+class TestSnapshot(unittest.TestCase):
+    """Test the in-memory columnar snapshot"""
+
+    def setUp(self):
+        self.snapshot = EventSnapshot(ROWS)
+
+    def test_sort_order_matches_sql(self):
+        """COALESCE(event_date, event_datetime), id with NULLs last"""
+        result = self.snapshot.get_events(page_size=10)
+        self.assertEqual([e["id"] for e in result["events"]], [2, 4, 1, 3, 6, 5])
+        self.assertEqual(result["total"], 6)
+
+    def test_filters(self):
+        """Filters follow SQL semantics (NULLs never match)"""
+        self.assertEqual(self.snapshot.get_events(category="Théâtre")["total"], 2)
+        self.assertEqual(self.snapshot.get_events(category="Inconnue")["total"], 0)
+        self.assertEqual(self.snapshot.get_events(is_free=False)["total"], 4)
+        self.assertEqual(self.snapshot.get_events(is_weekend=True)["total"], 1)
+        self.assertEqual(self.snapshot.get_events(city="Montreuil")["total"], 1)
+        self.assertEqual(self.snapshot.get_events(date_from=date(2025, 1, 6))["total"], 3)
+        self.assertEqual(
+            self.snapshot.get_events(date_from=date(2025, 1, 1), date_to=date(2025, 1, 31), season="Hiver")["total"], 3
+        )
+
+    def test_pagination(self):
+        """Pages are slices of the sorted matches"""
+        result = self.snapshot.get_events(page=2, page_size=4)
+        self.assertEqual(result["total_pages"], 2)
+        self.assertEqual([e["id"] for e in result["events"]], [6, 5])
+        self.assertEqual(result["events"][0]["event_date"], date(2025, 4, 1))
+        self.assertIsNone(result["events"][1]["event_date"])
+
+    def test_facets(self):
+        """Facet counts are computed on the filtered set"""
+        facets = self.snapshot.get_events(facets=True, is_free=False)["facets"]
+        self.assertEqual(facets["category"], {"Théâtre": 2, "Musique": 1})
+        self.assertEqual(facets["season"], {"Hiver": 3})
+        self.assertNotIn("facets", self.snapshot.get_events())
+
+    def test_memory_stats_and_swap(self):
+        """Memory is reported and swaps replace the served snapshot"""
+        stats = self.snapshot.memory_stats()
+        self.assertEqual(stats["events"], 6)
+        self.assertGreater(stats["memory_mb_per_million_events"], 0)
+
+        store = SnapshotStore()
+        store.swap(self.snapshot)
+        previous = store.current
+        store.swap(EventSnapshot(ROWS[:2]))
+        self.assertEqual(previous.size, 6)
+        self.assertEqual(store.current.size, 2)
+        self.assertEqual(store.stats()["swaps"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
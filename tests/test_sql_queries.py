@@ -23,6 +23,19 @@ class TestSQLQueries(unittest.TestCase):
             # Check for essential table definitions
             self.assertIn("CREATE", schema_content.upper())
 
+    def test_event_count_triggers(self):
+        """Test that event_count counters are maintained by statement-level triggers"""
+        schema_file = Path(__file__).parent.parent / "sql" / "schema.sql"
+        with open(schema_file, 'r', encoding='utf-8') as f:
+            schema_content = f.read()
+
+        for table, dimension in (("events", "'cities', 'city_id'"), ("event_categories", "'categories', 'category_id'")):
+            for operation in ("INSERT", "UPDATE", "DELETE"):
+                self.assertIn(f"AFTER {operation} ON {table}", schema_content)
+            self.assertIn(f"maintain_event_count({dimension})", schema_content)
+        self.assertIn("FOR EACH STATEMENT", schema_content)
+        self.assertIn("REFERENCING NEW TABLE AS new_rows", schema_content)
+
     def test_event_insertion_query(self):
         """Test event insertion query structure"""
         # Expected query structure for events
@@ -0,0 +1,350 @@
+import unittest
+import json
+import os
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bson import Timestamp
+from pymongo.errors import InvalidOperation
+
+from etl.loader import PostgreSQLLoader
+from etl.sync import ChangeStreamSync, STREAM_STATE_NAME
+
+
+def make_change(i, operation="update", status="success", raw_id=None):
+    change = {
+        "_id": {"_data": f"token{i}"},
+        "operationType": operation,
+        "clusterTime": Timestamp(1767225600 + i, 1),
+        "documentKey": {"_id": f"enr{i % 10}"},
+    }
+    if operation != "delete":
+        change["fullDocument"] = {"_id": f"enr{i % 10}", "raw_id": raw_id or f"raw{i % 10}", "status": status}
+    return change
+
+
+class FakeStream:
+    """Change stream replaying a list, then idle"""
+
+    def __init__(self, changes, resume_token=None):
+        self.changes = list(changes)
+        self.resume_token = resume_token
+
+    def try_next(self):
+        if self.changes:
+            change = self.changes.pop(0)
+            self.resume_token = change["_id"]
+            return change
+        return None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+class StateCursor:
+    """etl_state restricted to the change stream row"""
+
+    def __init__(self, state):
+        self.state = state
+        self.row = None
+
+    def execute(self, query, params=None):
+        if query.startswith("SELECT resume_token"):
+            self.row = self.state.get(params[0])
+        elif query.startswith("INSERT INTO etl_state"):
+            name, token, changed_at = params
+            previous = self.state.get(name, (None, None))
+            # JSONB : relu comme objet Python
+            self.state[name] = (json.loads(token) if token else None, changed_at or previous[1])
+
+    def fetchone(self):
+        return self.row
+
+
+class FakeConnection:
+    def commit(self):
+        pass
+
+
+class FakeLoader:
+    """Loader whose MongoDB reads and PostgreSQL writes are recorded"""
+
+    def __init__(self, state=None, watermark=None):
+        self.state = dict(state or {})
+        self.cursor = StateCursor(self.state)
+        self.conn = FakeConnection()
+        self.watermark = watermark
+        self.batches = []
+        self.modes = set()
+        self.deleted = []
+        self.catch_ups = []
+        self.failed_batches = 0
+        self.inserted_event_ids = []
+        self.published = 0
+
+    def prefetch_dimensions(self):
+        pass
+
+    def ensure_future_partitions(self):
+        pass
+
+    def get_watermark(self):
+        return self.watermark
+
+    def save_watermark(self, watermark):
+        self.watermark = watermark
+
+    def load_all_events(self, bulk=True, batch_size=1000, since=None, disconnect=True):
+        self.catch_ups.append(since)
+        return {"completed": True, "processed": 0, "watermark": datetime(2026, 1, 1)}
+
+    def fetch_raw_documents(self, enriched_docs):
+        return {doc["raw_id"]: {"_id": doc["raw_id"]} for doc in enriched_docs}
+
+    def transform_batch(self, enriched_docs, raw_docs):
+        return {"raw_id": [doc["raw_id"] for doc in enriched_docs]}, 0
+
+    def load_events(self, columns, bulk, stats):
+        self.batches.append(list(columns["raw_id"]))
+        self.modes.add(bulk)
+        stats["inserted"] += len(columns["raw_id"])
+        self.inserted_event_ids.extend(range(len(columns["raw_id"])))
+
+    def delete_events(self, raw_ids):
+        self.deleted.extend(raw_ids)
+        return len(raw_ids)
+
+    def refresh_similarities(self):
+        return {}
+
+    def publish(self):
+        self.published += 1
+
+
+class IterCursor:
+    """Single-pass iterator over documents, like pymongo.cursor.Cursor"""
+
+    def __init__(self, docs):
+        self.docs = iter(list(docs))
+
+    def batch_size(self, size):
+        return self
+
+    def close(self):
+        pass
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.docs)
+
+
+class ClosableCollection:
+    """Collection failing like pymongo once its client is closed"""
+
+    def __init__(self, client, docs):
+        self.client = client
+        self.docs = docs
+
+    def _check(self):
+        if self.client.closed:
+            raise InvalidOperation("Cannot use MongoClient after close")
+
+    def find(self, query=None, projection=None):
+        self._check()
+        if query and "_id" in query:
+            return IterCursor(d for d in self.docs if d["_id"] in query["_id"]["$in"])
+        return IterCursor(d for d in self.docs if d["enriched_at"] > query["enriched_at"]["$gt"])
+
+    def create_index(self, keys):
+        self._check()
+
+    def count_documents(self, query):
+        return len(list(self.find(query)))
+
+
+class ClosableMongoClient:
+    def __init__(self, raw, enriched):
+        self.closed = False
+        self.raw = ClosableCollection(self, raw)
+        self.enriched = ClosableCollection(self, enriched)
+
+    def connect(self):
+        return True
+
+    def disconnect(self):
+        self.closed = True
+
+
+class CatchUpLoader(PostgreSQLLoader):
+    """Real MongoDB reads (load_all_events, fetch_raw_documents), recorded PostgreSQL writes"""
+
+    def __init__(self, mongo_client, watermark):
+        super().__init__()
+        self.mongo_client = mongo_client
+        self.state = {}
+        self.cursor = StateCursor(self.state)
+        self.conn = FakeConnection()
+        self.watermark = watermark
+        self.batches = []
+
+    def prefetch_dimensions(self):
+        pass
+
+    def ensure_future_partitions(self, months_ahead=12):
+        pass
+
+    def get_watermark(self):
+        return self.watermark
+
+    def save_watermark(self, watermark):
+        self.watermark = watermark
+
+    def load_events(self, columns, bulk, stats):
+        self.batches.append(list(columns["raw_id"]))
+        stats["inserted"] += len(columns["raw_id"])
+
+    def delete_events(self, raw_ids):
+        return 0
+
+    def refresh_similarities(self):
+        return {}
+
+    def publish(self):
+        pass
+
+
+class RecordingSync(ChangeStreamSync):
+    def __init__(self, loader, stream, **kwargs):
+        super().__init__(loader, stream_client=object(), **kwargs)
+        self.stream = stream
+        self.opened_with = []
+
+    def _open_stream(self, token):
+        self.opened_with.append(token)
+        return self.stream
+
+
+class TestChangeStreamSync(unittest.TestCase):
+    """Test micro-batching and resume tokens of the change-stream sync"""
+
+    def test_split_changes_keeps_latest_version(self):
+        """Repeated updates collapse, tombstones are split out, hard deletes ignored"""
+        changes = [
+            make_change(1), make_change(11, raw_id="raw1-v2"),
+            make_change(2, status="deleted"), make_change(3, operation="delete"),
+        ]
+        live, tombstones, ignored = ChangeStreamSync(FakeLoader(), stream_client=object()).split_changes(changes)
+        self.assertEqual([doc["raw_id"] for doc in live], ["raw1-v2"])
+        self.assertEqual(tombstones, ["raw2"])
+        self.assertEqual(ignored, 1)
+
+    def test_micro_batches_save_token_of_last_change(self):
+        """Each written batch records the resume token of its last change"""
+        loader = FakeLoader(state={STREAM_STATE_NAME: ({"_data": "token0"}, None)})
+        stream = FakeStream([make_change(i) for i in range(1, 6)])
+        sync = RecordingSync(loader, stream, batch_size=2, max_wait=60)
+
+        stats = sync.run(threading.Event(), max_batches=2)
+
+        self.assertEqual(sync.opened_with, [{"_data": "token0"}])
+        self.assertEqual(loader.catch_ups, [])
+        self.assertEqual(loader.batches, [["raw1", "raw2"], ["raw3", "raw4"]])
+        # Fusion ensembliste uniquement : le mode ligne perdrait les modifications
+        self.assertEqual(loader.modes, {True})
+        token, changed_at = loader.state[STREAM_STATE_NAME]
+        self.assertEqual(token, {"_data": "token4"})
+        self.assertEqual(changed_at, datetime(2026, 1, 1, 0, 0, 4))
+        self.assertEqual(stats["changes"], 4)
+        self.assertEqual(loader.published, 1)
+
+    def test_first_start_opens_stream_before_catch_up(self):
+        """Without a token, the stream position is saved, then the watermark is caught up"""
+        loader = FakeLoader(watermark=datetime(2026, 1, 1))
+        stream = FakeStream([make_change(1)], resume_token={"_data": "start"})
+        sync = RecordingSync(loader, stream, batch_size=1)
+
+        sync.run(threading.Event(), max_batches=1)
+
+        self.assertEqual(sync.opened_with, [None])
+        self.assertEqual(loader.catch_ups, [datetime(2026, 1, 1)])
+        self.assertEqual(loader.batches, [["raw1"]])
+
+    def test_failed_batch_keeps_token(self):
+        """A batch that could not be written does not advance the resume token"""
+        loader = FakeLoader(state={STREAM_STATE_NAME: ({"_data": "token0"}, None)})
+
+        def failing_load(events, bulk, stats):
+            loader.failed_batches += 1
+
+        loader.load_events = failing_load
+        sync = RecordingSync(loader, FakeStream([make_change(1)]), batch_size=1)
+
+        with self.assertRaises(RuntimeError):
+            sync.run(threading.Event())
+        self.assertEqual(loader.state[STREAM_STATE_NAME][0], {"_data": "token0"})
+
+    def test_micro_batches_read_mongodb_after_catch_up(self):
+        """The catch-up leaves the loader's MongoDB client open for the next micro-batches"""
+        raw = [{"_id": f"raw{i}", "source": "test", "payload": {"title": f"Event {i}"}} for i in range(3)]
+        enriched = [
+            {"_id": f"enr{i}", "raw_id": f"raw{i}", "status": "success",
+             "enriched_at": datetime(2026, 1, 2), "data": {"event_date": "2026-03-15"}}
+            for i in range(2)
+        ]
+        mongo = ClosableMongoClient(raw, enriched)
+        loader = CatchUpLoader(mongo, watermark=datetime(2026, 1, 1))
+        change = make_change(2)
+        change["fullDocument"].update({"enriched_at": datetime(2026, 1, 3), "data": {"event_date": "2026-03-16"}})
+        sync = RecordingSync(loader, FakeStream([change], resume_token={"_data": "start"}), batch_size=1)
+
+        sync.run(threading.Event(), max_batches=1)
+
+        self.assertFalse(mongo.closed)
+        self.assertEqual(loader.batches, [["raw0"], ["raw1"], ["raw2"]])
+        self.assertEqual(loader.state[STREAM_STATE_NAME][0], {"_data": "token2"})
+
+
+@unittest.skipUnless(os.getenv("SYNC_TEST_MONGODB_URI"), "replica set MongoDB requis (SYNC_TEST_MONGODB_URI)")
+class TestChangeStreamReplicaSet(unittest.TestCase):
+    """Against a local single-node replica set, e.g. mongodb://localhost:27017/?replicaSet=rs0"""
+
+    def test_resume_after_saved_token(self):
+        """A stream reopened from a saved token yields only the later changes"""
+        from pymongo import MongoClient
+
+        client = MongoClient(os.getenv("SYNC_TEST_MONGODB_URI"))
+        collection = client["cultural_events_sync_test"]["events_enriched"]
+        collection.drop()
+        loader = FakeLoader()
+        sync = ChangeStreamSync(loader, max_wait=0.5, stream_client=type("Client", (), {"enriched": collection})())
+
+        try:
+            with sync._open_stream(None) as stream:
+                collection.insert_one({"_id": "enr1", "raw_id": "raw1", "status": "success"})
+                first = None
+                while first is None:
+                    first = stream.try_next()
+            collection.insert_one({"_id": "enr2", "raw_id": "raw2", "status": "success"})
+
+            with sync._open_stream(first["_id"]) as stream:
+                second = None
+                while second is None:
+                    second = stream.try_next()
+            self.assertEqual(second["fullDocument"]["raw_id"], "raw2")
+        finally:
+            collection.drop()
+            client.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -47,14 +47,26 @@ def test_transform_event_success():
     assert result["title"] == "Concert Test"
     assert result["city_name"] == "Paris"
 
-    # 📅 Vérification date
-    assert result["year"] == 2026
-    assert result["month"] == 6
-    assert result["day"] == 15
-    assert result["season"] == "Été"
-    assert result["time_period"] == "Soir"
+    # 📅 Vérification date (calendrier généré par PostgreSQL)
+    assert result["event_date"] == "2026-06-15"
+    assert result["event_datetime"] == "2026-06-15T19:30:00"
+    assert "season" not in result
+    assert "time_period" not in result
 
     # 📊 Vérification stats
     stats = transformer.get_stats()
     assert stats["processed"] == 1
     assert stats["errors"] == 0
+
+
+def test_date_only_event_has_no_time():
+    transformer = DataTransformer()
+
+    raw_doc = {"_id": "124", "source": "mongo", "payload": {"title": "Exposition"}}
+    enriched_doc = {"data": {"event_date": "2026-06-15"}}
+
+    result = transformer.transform_event(raw_doc, enriched_doc)
+
+    # 🌙 Pas d'heure inventée : time_period reste NULL dans PostgreSQL
+    assert result["event_date"] == "2026-06-15"
+    assert result["event_datetime"] is None